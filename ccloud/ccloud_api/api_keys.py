@@ -8,7 +8,7 @@ from dateutil import parser
 
 from ccloud.connections import CCloudBase
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 pp = pprint.PrettyPrinter(indent=2)
 LOGGER = logging.getLogger(__name__)
@@ -24,7 +24,7 @@ class CCloudAPIKey:
     created_at: datetime.datetime
 
 
-api_key_prom_metrics = TimestampedCollector(
+api_key_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_api_key",
     "API Key details for every API Key created within CCloud",
     ["api_key", "owner_id", "resource_id"],
@@ -40,6 +40,7 @@ api_key_prom_metrics = TimestampedCollector(
 @dataclass
 class CCloudAPIKeyList(CCloudBase):
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
 
     # ccloud_sa: service_account.CCloudServiceAccountList
     api_keys: Dict[str, CCloudAPIKey] = field(default_factory=dict, init=False)
@@ -60,15 +61,17 @@ class CCloudAPIKeyList(CCloudBase):
     def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
         LOGGER.debug("Exposing Prometheus Metrics for API Keys for timestamp: " + str(exposed_timestamp))
         self.force_clear_prom_metrics()
-        api_key_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.api_keys.items():
-            if v.created_at >= exposed_timestamp:
-                api_key_prom_metrics.labels(v.api_key, v.owner_id, v.cluster_id).set(1)
+        prom_metrics = self.prom_collectors.get(api_key_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        items = [v for v in self.api_keys.values() if v.created_at >= exposed_timestamp]
+        prom_metrics.set_samples(
+            label_values=[(v.api_key, v.owner_id, v.cluster_id) for v in items], values=[1] * len(items)
+        )
         # api_key_prom_status_metrics.set_timestamp(curr_timestamp=exposed_timestamp).set(1)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        api_key_prom_metrics.clear()
+        self.prom_collectors.get(api_key_prom_metrics).clear()
 
     # This method will help reading all the API Keys that are already provisioned.
     # Please note that the API Secrets cannot be read back again, so if you do not have
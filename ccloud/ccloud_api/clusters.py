@@ -6,7 +6,7 @@ from typing import Dict
 from ccloud.ccloud_api.environments import CCloudEnvironmentList
 from ccloud.connections import CCloudBase
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 LOGGER = logging.getLogger(__name__)
 
@@ -22,7 +22,7 @@ class CCloudCluster:
     bootstrap_url: str
 
 
-kafka_cluster_prom_metrics = TimestampedCollector(
+kafka_cluster_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_kafka_cluster",
     "Cluster Details for every Kafka Cluster created within CCloud",
     ["cluster_id", "env_id", "display_name"],
@@ -39,6 +39,7 @@ kafka_cluster_prom_metrics = TimestampedCollector(
 class CCloudClusterList(CCloudBase):
     ccloud_envs: CCloudEnvironmentList
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
 
     clusters: Dict[str, CCloudCluster] = field(default_factory=dict, init=False)
 
@@ -55,15 +56,18 @@ class CCloudClusterList(CCloudBase):
     def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
         LOGGER.debug("Exposing Prometheus Metrics for Kafka Clusters for timestamp: " + str(exposed_timestamp))
         self.force_clear_prom_metrics()
-        kafka_cluster_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.clusters.items():
-            # TODO: created datetime is missing from cluster creation date.
-            kafka_cluster_prom_metrics.labels(v.cluster_id, v.env_id, v.cluster_name).set(1)
+        prom_metrics = self.prom_collectors.get(kafka_cluster_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        # TODO: created datetime is missing from cluster creation date.
+        items = list(self.clusters.values())
+        prom_metrics.set_samples(
+            label_values=[(v.cluster_id, v.env_id, v.cluster_name) for v in items], values=[1] * len(items)
+        )
         # kafka_cluster_prom_status_metrics.set_timestamp(curr_timestamp=exposed_timestamp).set(1)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        kafka_cluster_prom_metrics.clear()
+        self.prom_collectors.get(kafka_cluster_prom_metrics).clear()
 
     @logged_method
     def __str__(self):
@@ -10,7 +10,7 @@ from ccloud.ccloud_api.clusters import CCloudCluster, CCloudClusterList
 from ccloud.ccloud_api.service_accounts import CCloudServiceAccountList
 from ccloud.ccloud_api.user_accounts import CCloudUserAccountList
 from ccloud.connections import CCloudBase
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 from helpers import logged_method
 
@@ -27,7 +27,7 @@ class CCloudConnector:
     owner_id: str
 
 
-kafka_connectors_prom_metrics = TimestampedCollector(
+kafka_connectors_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_connector",
     "Connector Details for every Fully Managed Connector created within CCloud",
     ["connector_id", "cluster_id", "env_id"],
@@ -47,6 +47,7 @@ class CCloudConnectorList(CCloudBase):
     ccloud_users: CCloudUserAccountList
     ccloud_api_keys: CCloudAPIKeyList
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
 
     connectors: Dict[str, CCloudConnector] = field(default_factory=dict, init=False)
     url_get_connector_config: str = field(init=False)
@@ -73,16 +74,17 @@ class CCloudConnectorList(CCloudBase):
             + str(exposed_timestamp)
         )
         self.force_clear_prom_metrics()
-        kafka_connectors_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.connectors.items():
-            # TODO: created datetime is missing from connector creation date.
-            kafka_connectors_prom_metrics.labels(
-                v.connector_id, v.cluster_id, v.env_id
-            ).set(1)
+        prom_metrics = self.prom_collectors.get(kafka_connectors_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        # TODO: created datetime is missing from connector creation date.
+        items = list(self.connectors.values())
+        prom_metrics.set_samples(
+            label_values=[(v.connector_id, v.cluster_id, v.env_id) for v in items], values=[1] * len(items)
+        )
 
     @logged_method
     def force_clear_prom_metrics(self):
-        kafka_connectors_prom_metrics.clear()
+        self.prom_collectors.get(kafka_connectors_prom_metrics).clear()
 
     @logged_method
     def read_all(self):
@@ -7,7 +7,7 @@ from dateutil import parser
 
 from ccloud.connections import CCloudBase
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 LOGGER = logging.getLogger(__name__)
 
@@ -19,7 +19,7 @@ class CCloudEnvironment:
     created_at: str
 
 
-env_prom_metrics = TimestampedCollector(
+env_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_environment",
     "Environment Details for every Environment created within CCloud",
     ["env_id", "display_name"],
@@ -36,6 +36,7 @@ env_prom_metrics = TimestampedCollector(
 class CCloudEnvironmentList(CCloudBase):
     env: Dict[str, CCloudEnvironment] = field(default_factory=dict, init=False)
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
 
     def __post_init__(self, exposed_timestamp: datetime.datetime) -> None:
         super().__post_init__()
@@ -50,15 +51,15 @@ class CCloudEnvironmentList(CCloudBase):
     def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
         LOGGER.debug("Exposing Prometheus Metrics for Environment List for timestamp: " + str(exposed_timestamp))
         self.force_clear_prom_metrics()
-        env_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.env.items():
-            if v.created_at >= exposed_timestamp:
-                env_prom_metrics.labels(v.env_id, v.display_name).set(1)
+        prom_metrics = self.prom_collectors.get(env_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        items = [v for v in self.env.values() if v.created_at >= exposed_timestamp]
+        prom_metrics.set_samples(label_values=[(v.env_id, v.display_name) for v in items], values=[1] * len(items))
         # env_prom_status_metrics.set_timestamp(curr_timestamp=exposed_timestamp).set(1)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        env_prom_metrics.clear()
+        self.prom_collectors.get(env_prom_metrics).clear()
 
     def __str__(self):
         LOGGER.debug("Found " + str(len(self.env)) + " environments.")
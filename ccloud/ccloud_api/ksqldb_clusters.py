@@ -9,7 +9,7 @@ from dateutil import parser
 from ccloud.ccloud_api.environments import CCloudEnvironmentList
 from ccloud.connections import CCloudBase
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 pp = pprint.PrettyPrinter(indent=2)
 LOGGER = logging.getLogger(__name__)
@@ -26,7 +26,7 @@ class CCloudKsqldbCluster:
     created_at: str
 
 
-ksqldb_prom_metrics = TimestampedCollector(
+ksqldb_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_ksqldb_cluster",
     "Environment Details for every Environment created within CCloud",
     [
@@ -45,6 +45,7 @@ ksqldb_prom_metrics = TimestampedCollector(
 class CCloudKsqldbClusterList(CCloudBase):
     ccloud_envs: CCloudEnvironmentList
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
 
     ksqldb_clusters: Dict[str, CCloudKsqldbCluster] = field(default_factory=dict, init=False)
 
@@ -64,15 +65,17 @@ class CCloudKsqldbClusterList(CCloudBase):
     def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
         LOGGER.debug("Exposing Prometheus Metrics for ksqlDB Cluster for timestamp: " + str(exposed_timestamp))
         self.force_clear_prom_metrics()
-        ksqldb_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.ksqldb_clusters.items():
-            if v.created_at >= exposed_timestamp:
-                ksqldb_prom_metrics.labels(v.cluster_id, v.env_id, v.kafka_cluster_id).set(1)
+        prom_metrics = self.prom_collectors.get(ksqldb_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        items = [v for v in self.ksqldb_clusters.values() if v.created_at >= exposed_timestamp]
+        prom_metrics.set_samples(
+            label_values=[(v.cluster_id, v.env_id, v.kafka_cluster_id) for v in items], values=[1] * len(items)
+        )
         # ksqldb_prom_status_metrics.set_timestamp(curr_timestamp=exposed_timestamp).set(1)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        ksqldb_prom_metrics.clear()
+        self.prom_collectors.get(ksqldb_prom_metrics).clear()
 
     # This method will help reading all the API Keys that are already provisioned.
     # Please note that the API Secrets cannot be read back again, so if you do not have
@@ -7,7 +7,7 @@ from dateutil import parser
 
 from ccloud.connections import CCloudBase
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 LOGGER = logging.getLogger(__name__)
 
@@ -21,7 +21,7 @@ class CCloudServiceAccount:
     updated_at: str
 
 
-sa_prom_metrics = TimestampedCollector(
+sa_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_sa",
     "Environment Details for every Environment created within CCloud",
     ["sa_id", "display_name"],
@@ -37,6 +37,7 @@ sa_prom_metrics = TimestampedCollector(
 @dataclass(kw_only=True)
 class CCloudServiceAccountList(CCloudBase):
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
     sa: Dict[str, CCloudServiceAccount] = field(default_factory=dict, init=False)
 
     def __post_init__(self, exposed_timestamp: datetime.datetime) -> None:
@@ -52,15 +53,15 @@ class CCloudServiceAccountList(CCloudBase):
     def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
         LOGGER.debug("Exposing Prometheus Metrics for Service Accounts for timestamp: " + str(exposed_timestamp))
         self.force_clear_prom_metrics()
-        sa_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.sa.items():
-            if v.created_at >= exposed_timestamp:
-                sa_prom_metrics.labels(v.resource_id, v.name).set(1)
+        prom_metrics = self.prom_collectors.get(sa_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        items = [v for v in self.sa.values() if v.created_at >= exposed_timestamp]
+        prom_metrics.set_samples(label_values=[(v.resource_id, v.name) for v in items], values=[1] * len(items))
         # sa_prom_status_metrics.set_timestamp(curr_timestamp=exposed_timestamp).set(1)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        sa_prom_metrics.clear()
+        self.prom_collectors.get(sa_prom_metrics).clear()
 
     def __str__(self) -> str:
         for item in self.sa.values():
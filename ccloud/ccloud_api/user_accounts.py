@@ -7,7 +7,7 @@ from dateutil import parser
 
 from ccloud.connections import CCloudBase
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 
 LOGGER = logging.getLogger(__name__)
 
@@ -20,7 +20,7 @@ class CCloudUserAccount:
     updated_at: str
 
 
-users_prom_metrics = TimestampedCollector(
+users_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_user",
     "Environment Details for every Environment created within CCloud",
     ["sa_id", "display_name"],
@@ -36,6 +36,7 @@ users_prom_metrics = TimestampedCollector(
 @dataclass(kw_only=True)
 class CCloudUserAccountList(CCloudBase):
     exposed_timestamp: InitVar[datetime.datetime] = field(init=True)
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
     users: Dict[str, CCloudUserAccount] = field(default_factory=dict, init=False)
 
     def __post_init__(self, exposed_timestamp: datetime.datetime) -> None:
@@ -51,15 +52,15 @@ class CCloudUserAccountList(CCloudBase):
     def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
         LOGGER.debug("Exposing Prometheus Metrics for Users for timestamp: " + str(exposed_timestamp))
         self.force_clear_prom_metrics()
-        users_prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
-        for _, v in self.users.items():
-            if v.created_at >= exposed_timestamp:
-                users_prom_metrics.labels(v.resource_id, v.name).set(1)
+        prom_metrics = self.prom_collectors.get(users_prom_metrics)
+        prom_metrics.set_timestamp(curr_timestamp=exposed_timestamp)
+        items = [v for v in self.users.values() if v.created_at >= exposed_timestamp]
+        prom_metrics.set_samples(label_values=[(v.resource_id, v.name) for v in items], values=[1] * len(items))
         # users_prom_status_metrics.set_timestamp(curr_timestamp=exposed_timestamp).set(1)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        users_prom_metrics.clear()
+        self.prom_collectors.get(users_prom_metrics).clear()
 
     def __str__(self) -> str:
         for item in self.users.values():
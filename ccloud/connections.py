@@ -13,6 +13,34 @@ from helpers import logged_method
 LOGGER = logging.getLogger(__name__)
 
 
+@logged_method
+def get_http_auth_from_yaml(auth_dict: Dict) -> HTTPBasicAuth | HTTPDigestAuth | None:
+    """Requests auth object for the auth section of a datastore in the config file.
+
+    Args:
+        auth_dict (Dict): enable_auth, auth_type (HTTPBasicAuth | HTTPDigestAuth) & auth_args
+
+    Returns:
+        HTTPBasicAuth | HTTPDigestAuth | None: None if the auth is disabled or the auth type is not supported
+    """
+    if auth_dict.get("enable_auth", False):
+        LOGGER.debug(f"Enable Auth Flag is found in the config with value {auth_dict.get('enable_auth', False)}.")
+        if auth_dict.get("auth_type") == "HTTPBasicAuth":
+            LOGGER.debug(f"Setting Auth Type as HTTPBasicAuth")
+            return HTTPBasicAuth(**auth_dict.get("auth_args"))
+        elif auth_dict.get("auth_type") == "HTTPDigestAuth":
+            LOGGER.debug(f"Setting Auth Type as HTTPDigestAuth")
+            return HTTPDigestAuth(**auth_dict.get("auth_args"))
+        else:
+            # Other AUTH Types are not implemented yet.
+            LOGGER.debug(f"Unsupported Auth Type received. Value: {auth_dict.get('enable_auth', False)}")
+            LOGGER.debug(f"Setting Auth Type as None")
+            return None
+    else:
+        LOGGER.debug(f"Enable Auth Flag is set to false.")
+        return None
+
+
 class EndpointURL(Enum):
     API_URL = auto()
     TELEMETRY_URL = auto()
@@ -80,22 +108,7 @@ class CCloudBase:
     @logged_method
     def override_auth_type_from_yaml(self, auth_dict: Dict):
         LOGGER.debug(f"Trying to override auth type")
-        if auth_dict.get("enable_auth", False):
-            LOGGER.debug(f"Enable Auth Flag is found in the config with value {auth_dict.get('enable_auth', False)}.")
-            if auth_dict.get("auth_type") == "HTTPBasicAuth":
-                LOGGER.debug(f"Setting Auth Type as HTTPBasicAuth")
-                self.http_connection = HTTPBasicAuth(**auth_dict.get("auth_args"))
-            elif auth_dict.get("auth_type") == "HTTPDigestAuth":
-                LOGGER.debug(f"Setting Auth Type as HTTPDigestAuth")
-                self.http_connection = HTTPDigestAuth(**auth_dict.get("auth_args"))
-            else:
-                # Other AUTH Types are not implemented yet.
-                LOGGER.debug(f"Unsupported Auth Type received. Value: {auth_dict.get('enable_auth', False)}")
-                LOGGER.debug(f"Setting Auth Type as None")
-                self.http_connection = None
-        else:
-            LOGGER.debug(f"Enable Auth Flag is set to false.")
-            self.http_connection = None
+        self.http_connection = get_http_auth_from_yaml(auth_dict=auth_dict)
 
     @logged_method
     def read_from_api(self, params={"page_size": 500}, **kwagrs):
@@ -1,21 +1,48 @@
 import datetime
 import logging
+import threading
 from copy import deepcopy
 from dataclasses import InitVar, dataclass, field
 from typing import Dict, List
+from urllib import parse
 
 import pandas as pd
+from prometheus_client import CollectorRegistry
 
 from ccloud.connections import CCloudConnection, EndpointURL
+from data_processing.chargeback_handlers.allocation_policy import compile_allocation_policies
+from data_processing.chargeback_handlers.types import ChargebackAllocationParams
 from data_processing.data_handlers.billing_api_handler import CCloudBillingHandler
 from data_processing.data_handlers.ccloud_api_handler import CCloudObjectsHandler
+from data_processing.data_handlers.ccloud_objects_snapshots import CCloudObjectsSnapshotStore
+from data_processing.data_handlers.chargeback_cardinality import ChargebackCardinalityGuard
 from data_processing.data_handlers.chargeback_handler import CCloudChargebackHandler
+from data_processing.data_handlers.chargeback_history import ChargebackHistory
+from data_processing.data_handlers.chargeback_shadow import ChargebackShadowEngine
+from data_processing.data_handlers.chargeback_streaming import (
+    STREAMING_INPUT_COLLECTORS,
+    ChargebackCSVSink,
+    ChargebackHourSink,
+    ChargebackOpenMetricsSink,
+    ChargebackRemoteWriteSink,
+    ChargebackStreamingPipeline,
+    ChargebackTSDBBlockSink,
+)
+from data_processing.data_handlers.chargeback_what_if import ChargebackWhatIfEngine
 from data_processing.data_handlers.prom_fetch_stats_handler import PrometheusStatusMetricsDataHandler, ScrapeType
 from data_processing.data_handlers.prom_metrics_api_handler import PrometheusMetricsDataHandler
-from helpers import logged_method, sanitize_id
-from internal_data_probe import set_current_exposed_date, set_readiness
-from prometheus_processing.custom_collector import TimestampedCollector
+from helpers import from_epoch_hour, logged_method, sanitize_id, to_epoch_hour
+from internal_data_probe import (
+    register_chargeback_hour_reader,
+    register_what_if_runner,
+    set_current_exposed_date,
+    set_readiness,
+    set_reconciliation_summary,
+    set_shadow_report,
+)
+from prometheus_processing.custom_collector import ScopedCollectors, TimestampedCollector
 from prometheus_processing.notifier import NotifierAbstract, Observer
+from prometheus_processing.remote_write import RemoteWriteClient
 
 LOGGER = logging.getLogger(__name__)
 
@@ -32,7 +59,14 @@ scrape_status_metrics = TimestampedCollector(
 class CCloudOrg(Observer):
     in_org_details: InitVar[List | None] = None
     in_days_in_memory: InitVar[int] = field(default=7)
+    # Headless orgs only prepare the API connections for the backfill mode. Nothing is read, computed or exposed.
+    in_headless: InitVar[bool] = field(default=False)
     org_id: str
+    # The root org is also served on / & /metrics and drives the process wide readiness & exposed date
+    is_root_org: bool = field(default=False)
+
+    # Collectors of the org in a registry of its own, served under /metrics/<org_id>
+    prom_collectors: ScopedCollectors = field(init=False, repr=False)
 
     objects_handler: CCloudObjectsHandler = field(init=False)
     metrics_handler: PrometheusMetricsDataHandler = field(init=False)
@@ -43,11 +77,20 @@ class CCloudOrg(Observer):
     epoch_start_date: datetime.datetime = field(init=False)
     exposed_end_date: datetime.datetime = field(init=False)
     reset_counter: int = field(default=0, init=False)
+    # Catch-up mode: hours exposed per scrape while the exposition lags more than catch_up_lag_hours behind
+    catch_up_max_hours: int = field(default=24, init=False)
+    catch_up_lag_hours: int = field(default=48, init=False)
+    # remote_write section of the chargeback datastore, used by the push mode
+    remote_write_config: Dict = field(default_factory=dict, init=False)
+    remote_write_url: str = field(init=False)
+    # Guards the datasets of the handlers. The exposition producer steps them while the internal API threads read them.
+    state_lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
 
-    def __post_init__(self, in_org_details, in_days_in_memory) -> None:
+    def __post_init__(self, in_org_details, in_days_in_memory, in_headless) -> None:
         Observer.__init__(self)
         LOGGER.debug(f"Sanitizing Org ID {in_org_details['id']}")
         self.org_id = sanitize_id(in_org_details["id"])
+        self.prom_collectors = ScopedCollectors(registry=CollectorRegistry(auto_describe=True))
         LOGGER.debug(f"Initializing CCloudOrg for Org ID: {self.org_id}")
         # This start date is calculated from the now time to rewind back "x" days as that is the
         # time limit of the billing dataset which is available to us. We will need the metrics handler
@@ -63,9 +106,12 @@ class CCloudOrg(Observer):
             minute=0, second=0, microsecond=0, tzinfo=datetime.timezone.utc
         ) + datetime.timedelta(days=lookback_days, hours=+1)
         LOGGER.debug(f"Starting Exposed Metrics Datetime: {self.exposed_metrics_datetime}")
-        set_current_exposed_date(exposed_date=self.exposed_metrics_datetime)
+        self.publish_exposed_date(exposed_date=self.exposed_metrics_datetime)
 
         self.epoch_start_date = deepcopy(self.exposed_metrics_datetime)
+        catch_up_config = in_org_details.get("catch_up", None) or {}
+        self.catch_up_max_hours = max(1, int(catch_up_config.get("max_hours_per_scrape", 24)))
+        self.catch_up_lag_hours = int(catch_up_config.get("lag_hours", 48))
         LOGGER.debug(f"Epoch Start Date: {self.epoch_start_date}")
 
         self.exposed_end_date = datetime.datetime.utcnow().replace(
@@ -80,12 +126,22 @@ class CCloudOrg(Observer):
         self.status_metrics_handler = PrometheusStatusMetricsDataHandler(
             in_prometheus_url=in_org_details["prometheus_details"]["chargeback_datastore"]["prometheus_url"],
         )
+        self.remote_write_config = (
+            in_org_details["prometheus_details"]["chargeback_datastore"].get("remote_write", None) or {}
+        )
+        self.remote_write_url = parse.urljoin(
+            base=in_org_details["prometheus_details"]["chargeback_datastore"]["prometheus_url"], url="/api/v1/write"
+        )
 
-        next_fetch_date = self.locate_next_fetch_date(start_date=self.exposed_metrics_datetime)
-        LOGGER.info(f"Initial Fetch Date after checking chargeback status in Prometheus: {next_fetch_date}")
+        if in_headless:
+            next_fetch_date = self.exposed_metrics_datetime
+        else:
+            next_fetch_date = self.locate_next_fetch_date(start_date=self.exposed_metrics_datetime)
+            LOGGER.info(f"Initial Fetch Date after checking chargeback status in Prometheus: {next_fetch_date}")
 
         LOGGER.debug(f"Initializing CCloud Objects Handler for Org ID: {self.org_id}")
         # Initialize the CCloud Objects Handler
+        objects_snapshots_config = in_org_details.get("objects_snapshots", None) or {}
         self.objects_handler = CCloudObjectsHandler(
             in_ccloud_connection=CCloudConnection(
                 in_api_key=in_org_details["ccloud_details"]["ccloud_api"]["api_key"],
@@ -93,6 +149,11 @@ class CCloudOrg(Observer):
                 base_url=EndpointURL.API_URL,
             ),
             start_date=next_fetch_date,
+            snapshots=CCloudObjectsSnapshotStore(
+                persistence_path=objects_snapshots_config.get("path", None),
+                checkpoint_interval=int(objects_snapshots_config.get("checkpoint_interval", 32)),
+            ),
+            prom_collectors=self.prom_collectors,
         )
 
         LOGGER.debug(f"Initializing CCloud Billing Handler for Org ID: {self.org_id}")
@@ -105,6 +166,8 @@ class CCloudOrg(Observer):
             ),
             start_date=next_fetch_date,
             objects_dataset=self.objects_handler,
+            read_on_init=not in_headless,
+            prom_collectors=self.prom_collectors,
         )
 
         LOGGER.debug(f"Initializing Prometheus Metrics Handler for Org ID: {self.org_id}")
@@ -120,23 +183,57 @@ class CCloudOrg(Observer):
             .get("metrics_api_datastore", dict())
             .get("auth", dict()),
             start_date=next_fetch_date,
+            read_on_init=not in_headless,
         )
 
         LOGGER.debug(f"Initializing CCloud Chargeback Handler for Org ID: {self.org_id}")
+        shadow_engine = None
+        shadow_engine_config = in_org_details.get("shadow_engine", None)
+        if shadow_engine_config and shadow_engine_config.get("enabled", True):
+            LOGGER.info(f"Shadow chargeback engine is enabled for Org ID: {self.org_id}")
+            shadow_engine = ChargebackShadowEngine.from_config(org_id=self.org_id, in_config=shadow_engine_config)
+        chargeback_history = None
+        chargeback_history_config = in_org_details.get("chargeback_history", None)
+        if chargeback_history_config and chargeback_history_config.get("enabled", True):
+            LOGGER.info(f"Compressed chargeback history is enabled for Org ID: {self.org_id}")
+            chargeback_history = ChargebackHistory(
+                value_scale_digits=int(chargeback_history_config.get("value_scale_digits", 9)),
+                max_days=int(chargeback_history_config.get("max_days", 180)),
+            )
         # Initialize the Chargeback Object Handler
         self.chargeback_handler = CCloudChargebackHandler(
             billing_dataset=self.billing_handler,
             objects_dataset=self.objects_handler,
             metrics_dataset=self.metrics_handler,
             start_date=next_fetch_date,
+            allocation_policies=compile_allocation_policies(in_org_details.get("chargeback_policies", None)),
+            shadow_engine=shadow_engine,
+            chargeback_history=chargeback_history,
+            cardinality_guard=ChargebackCardinalityGuard.from_config(in_org_details.get("cardinality_guard", None)),
+            prom_collectors=self.prom_collectors,
+            read_on_init=not in_headless,
         )
+        if in_headless:
+            LOGGER.info(f"Initialized headless CCloudOrg for Org ID: {self.org_id}")
+            return
+        set_reconciliation_summary(org_id=self.org_id, summary=self.chargeback_handler.get_reconciliation_summary())
+        register_what_if_runner(org_id=self.org_id, runner=self.run_what_if)
+        register_chargeback_hour_reader(org_id=self.org_id, reader=self.get_chargeback_for_hour)
+        self.publish_shadow_report()
 
         LOGGER.debug(f"Attaching CCloudOrg to notifier {scrape_status_metrics._name} for Org ID: {self.org_id}")
-        self.attach(notifier=scrape_status_metrics)
+        self.attach(notifier=self.prom_collectors.get(scrape_status_metrics))
         # self.update(notifier=scrape_status_metrics)
 
     @logged_method
     def update(self, notifier: NotifierAbstract):
+        """Step the org to the next hour. Runs on the ExpositionCache producer thread while the internal API threads
+        read the datasets, so the datasets are stepped under the state lock."""
+        with self.state_lock:
+            self.step(notifier=notifier)
+
+    @logged_method
+    def step(self, notifier: NotifierAbstract):
         self.exposed_end_date = datetime.datetime.utcnow().replace(
             hour=0, minute=0, second=0, microsecond=0, tzinfo=datetime.timezone.utc
         ) - datetime.timedelta(days=2)
@@ -150,30 +247,195 @@ class CCloudOrg(Observer):
                 self.objects_handler.force_clear_prom_metrics()
                 self.chargeback_handler.force_clear_prom_metrics()
             else:
-                set_readiness(readiness_flag=False)
-                notifier.clear()
-                notifier.set_timestamp(curr_timestamp=next_ts_in_dt)
-                # self.expose_prometheus_metrics(ts_filter=next_ts)
-                LOGGER.info(f"Refreshing CCloud Existing Objects Data")
-                self.objects_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
-                notifier.labels("ccloud_objects").set(1)
-                LOGGER.info(f"Gathering Metrics API Data")
-                self.metrics_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
-                LOGGER.info(f"Checking for new Billing CSV Files")
-                self.billing_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
-                LOGGER.info("Calculating next dataset for chargeback")
-                self.chargeback_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
-                notifier.labels("billing_chargeback").set(1)
-                self.exposed_metrics_datetime = next_ts_in_dt
-                LOGGER.info(f"Fetch Date: {next_ts_in_dt}")
-                set_current_exposed_date(exposed_date=next_ts_in_dt)
-                set_readiness(readiness_flag=True)
+                batch_hours = self.get_catch_up_batch_hours()
+                for hour_idx in range(batch_hours):
+                    if hour_idx > 0:
+                        # Keep the samples of the hour that was just computed for the next scrape & move to the next gap
+                        self.prom_collectors.stage_current_samples()
+                        next_ts_in_dt = self.locate_next_fetch_date(
+                            start_date=self.exposed_metrics_datetime, is_notifier_update=True
+                        )
+                        if not self.exposed_metrics_datetime < next_ts_in_dt < self.exposed_end_date:
+                            break
+                    self.expose_hour(notifier=notifier, next_ts_in_dt=next_ts_in_dt)
+                if batch_hours > 1:
+                    LOGGER.info(f"Catch-up mode exposed up to {batch_hours} hours in this step")
         else:
             LOGGER.info(
                 f"""Chargeback calculation is fully caught up to the point where it needs to be. 
                 More processing will continue after the day passes and the data for the day is finalized in the Billing API."""
             )
 
+    @logged_method
+    def expose_hour(self, notifier: NotifierAbstract, next_ts_in_dt: datetime.datetime):
+        """Step all the handlers to the hour and expose the datasets for it."""
+        notifier.clear()
+        notifier.set_timestamp(curr_timestamp=next_ts_in_dt)
+        # self.expose_prometheus_metrics(ts_filter=next_ts)
+        LOGGER.info(f"Refreshing CCloud Existing Objects Data")
+        self.objects_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
+        notifier.labels("ccloud_objects").set(1)
+        LOGGER.info(f"Gathering Metrics API Data")
+        self.metrics_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
+        LOGGER.info(f"Checking for new Billing CSV Files")
+        self.billing_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
+        LOGGER.info("Calculating next dataset for chargeback")
+        self.chargeback_handler.execute_requests(exposed_timestamp=next_ts_in_dt)
+        set_reconciliation_summary(org_id=self.org_id, summary=self.chargeback_handler.get_reconciliation_summary())
+        self.publish_shadow_report()
+        notifier.labels("billing_chargeback").set(1)
+        self.exposed_metrics_datetime = next_ts_in_dt
+        LOGGER.info(f"Fetch Date: {next_ts_in_dt}")
+        self.publish_exposed_date(exposed_date=next_ts_in_dt)
+
+    @logged_method
+    def publish_exposed_date(self, exposed_date: datetime.datetime):
+        """Publish the exposed date of the org. The root org also drives the process wide date, as it is the one
+        served on / & /metrics."""
+        set_current_exposed_date(exposed_date=exposed_date, org_id=self.org_id)
+        if self.is_root_org:
+            set_current_exposed_date(exposed_date=exposed_date)
+
+    @logged_method
+    def get_catch_up_batch_hours(self) -> int:
+        """Number of hours to expose in the next scrape. One hour per scrape once the exposition is within
+        catch_up_lag_hours of exposed_end_date, up to catch_up_max_hours per scrape while it lags further behind."""
+        lag_hours = to_epoch_hour(self.exposed_end_date) - to_epoch_hour(self.exposed_metrics_datetime)
+        if lag_hours <= self.catch_up_lag_hours:
+            return 1
+        return max(1, min(self.catch_up_max_hours, lag_hours - self.catch_up_lag_hours))
+
+    @logged_method
+    def publish_shadow_report(self):
+        if self.chargeback_handler.shadow_engine is not None:
+            set_shadow_report(org_id=self.org_id, report=self.chargeback_handler.shadow_engine.get_report())
+
+    @logged_method
+    def run_what_if(
+        self, start_date: datetime.datetime, end_date: datetime.datetime, allocation_params: Dict
+    ) -> Dict:
+        """Re-run the chargeback allocation for the in-memory data between the dates with alternative parameters.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Exclusive end datetime
+            allocation_params (Dict): Overrides for ChargebackAllocationParams. None values keep the defaults.
+
+        Returns:
+            Dict: "costs" holds the current, what-if & delta cost per principal & product type. "not_repriced" maps
+            the product types whose allocation policy ignores some of the changed parameters to those parameters.
+        """
+        start_date = start_date.replace(tzinfo=datetime.timezone.utc) if start_date.tzinfo is None else start_date
+        end_date = end_date.replace(tzinfo=datetime.timezone.utc) if end_date.tzinfo is None else end_date
+        with self.state_lock:
+            what_if_engine = ChargebackWhatIfEngine(
+                chargeback_handler=self.chargeback_handler, start_date=start_date, end_date=end_date
+            )
+            what_if_params = ChargebackAllocationParams.from_dict(allocation_params)
+            costs = what_if_engine.compare(allocation_params=what_if_params)
+            not_repriced = what_if_engine.get_not_repriced_product_types(allocation_params=what_if_params)
+        return {"costs": costs.reset_index().to_dict(orient="records"), "not_repriced": not_repriced}
+
+    @logged_method
+    def run_streaming_export(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        sink: ChargebackHourSink,
+        expose_inputs: bool = False,
+    ):
+        """Stream the chargeback between the dates into the sink, one day of inputs at a time.
+        The in-memory datasets of the org are not touched.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Exclusive end datetime
+            sink (ChargebackHourSink): Called once per hour with the chargeback rows for the hour
+            expose_inputs (bool): Expose the billing & objects of every hour to their collectors before the sink call
+        """
+        ChargebackStreamingPipeline(chargeback_handler=self.chargeback_handler, expose_inputs=expose_inputs).run(
+            start_date=start_date, end_date=end_date, sink=sink
+        )
+
+    @logged_method
+    def run_backfill(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        output_dir: str,
+        output_format: str = "openmetrics",
+    ):
+        """Compute the chargeback between the dates one day at a time and either write it as OpenMetrics files that
+        are ready for `promtool tsdb create-blocks-from openmetrics`, write it as Prometheus TSDB blocks, write it as
+        CSV files or push it to the remote_write receiver of the chargeback datastore. The blocks & the push also
+        carry the billing & objects series.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Exclusive end datetime
+            output_dir (str): Directory for the OpenMetrics or CSV files, or the TSDB data directory for the blocks
+            output_format (str): openmetrics | tsdb | csv | remote_write
+        """
+        if output_format == "tsdb":
+            sink = ChargebackTSDBBlockSink(
+                output_dir=output_dir,
+                block_prefix=f"chargeback_{self.org_id}",
+                collectors=[self.prom_collectors.get(x) for x in STREAMING_INPUT_COLLECTORS],
+            )
+        elif output_format == "remote_write":
+            sink = ChargebackRemoteWriteSink(
+                client=RemoteWriteClient.from_config(
+                    in_config=self.remote_write_config, default_url=self.remote_write_url
+                ),
+                collectors=[self.prom_collectors.get(x) for x in STREAMING_INPUT_COLLECTORS],
+            )
+        elif output_format == "csv":
+            sink = ChargebackCSVSink(output_dir=output_dir, file_prefix=f"chargeback_{self.org_id}")
+        else:
+            sink = ChargebackOpenMetricsSink(output_dir=output_dir, file_prefix=f"chargeback_{self.org_id}")
+        try:
+            self.run_streaming_export(
+                start_date=start_date,
+                end_date=end_date,
+                sink=sink,
+                expose_inputs=output_format in ["tsdb", "remote_write"],
+            )
+        finally:
+            sink.close()
+        if output_format == "remote_write":
+            LOGGER.info(
+                f"Backfill for Org ID {self.org_id} pushed {sink.hours_sent} hours to {sink.client.url}: "
+                f"{sink.client.samples_sent} samples sent, {sink.client.samples_failed} samples failed"
+            )
+        else:
+            LOGGER.info(f"Backfill for Org ID {self.org_id} wrote {len(sink.written_files)} files to {output_dir}")
+
+    @logged_method
+    def get_chargeback_for_hour(self, time_slice: datetime.datetime) -> List[Dict]:
+        """Chargeback for any hour, computed on demand if the hour is not in memory.
+
+        Args:
+            time_slice (datetime.datetime): The hour to read. Naive datetimes are treated as UTC.
+
+        Returns:
+            List[Dict]: Usage & shared cost per principal, product type & environment
+        """
+        time_slice = time_slice.replace(tzinfo=datetime.timezone.utc) if time_slice.tzinfo is None else time_slice
+        time_slice = time_slice.replace(minute=0, second=0, microsecond=0)
+        with self.state_lock:
+            rows = self.chargeback_handler.get_chargeback_rows_for_hour(time_slice=time_slice)
+        return [
+            {
+                "principal": principal,
+                "timestamp": pd.Timestamp(ts).isoformat(),
+                "product_type": product_type,
+                "env_id": env_id,
+                "usage_cost": float(usage),
+                "shared_cost": float(shared),
+            }
+            for principal, ts, product_type, env_id, usage, shared in rows
+        ]
+
     @logged_method
     def locate_next_fetch_date(
         self, start_date: datetime.datetime, is_notifier_update: bool = False
@@ -194,41 +456,46 @@ class CCloudOrg(Observer):
             self.reset_counter = 0
             next_ts_in_dt = self.epoch_start_date
             is_notifier_update = False
-        for next_date in pd.date_range(
-            start=start_date,
-            end=self.exposed_end_date,
-            freq="1H",
-            inclusive="neither" if is_notifier_update else "left",
+        # Walk the hours as epoch hours and only build the datetime for the hour that is returned.
+        # exposed_end_date is always midnight, so it is excluded the same way as the start for notifier updates.
+        next_epoch_hour = None
+        for next_epoch_hour in range(
+            to_epoch_hour(start_date) + (1 if is_notifier_update else 0), to_epoch_hour(self.exposed_end_date)
         ):
-            next_ts_in_dt = next_date.to_pydatetime(warn=False)
             if not self.status_metrics_handler.is_dataset_present(
                 scrape_type=ScrapeType.BillingChargeback,
-                ts_in_millis=self.status_metrics_handler.convert_dt_to_ts(next_ts_in_dt),
+                ts_in_millis=self.status_metrics_handler.convert_epoch_hour_to_ts(next_epoch_hour),
             ):
                 # return the immediate gap datetime in the series
-                return next_ts_in_dt
+                return from_epoch_hour(next_epoch_hour)
         # if no dates are found, use the last fetch date
-        return next_ts_in_dt
+        return next_ts_in_dt if next_epoch_hour is None else from_epoch_hour(next_epoch_hour)
 
 
 @dataclass(kw_only=True)
 class CCloudOrgList:
     in_orgs: InitVar[List | None] = None
     in_days_in_memory: InitVar[int] = field(default=7)
+    in_headless: InitVar[bool] = field(default=False)
 
     orgs: Dict[str, CCloudOrg] = field(default_factory=dict, init=False)
 
-    def __post_init__(self, in_orgs, in_days_in_memory) -> None:
+    def __post_init__(self, in_orgs, in_days_in_memory, in_headless) -> None:
         LOGGER.info("Initializing CCloudOrgList")
         req_count = 0
         for org_item in in_orgs:
             temp = CCloudOrg(
                 in_org_details=org_item,
                 in_days_in_memory=in_days_in_memory,
+                in_headless=in_headless,
+                # The first org stays on the root exposition path
+                is_root_org=len(self.orgs) == 0,
                 org_id=str(org_item["id"]) if org_item["id"] else str(req_count),
             )
             self.__add_org_to_cache(ccloud_org=temp)
         LOGGER.debug("Initialization Complete.")
+        if in_headless:
+            return
         LOGGER.debug("marking readiness")
         set_readiness(readiness_flag=True)
 
@@ -236,6 +503,19 @@ class CCloudOrgList:
     def __add_org_to_cache(self, ccloud_org: CCloudOrg) -> None:
         self.orgs[ccloud_org.org_id] = ccloud_org
 
+    @logged_method
+    def run_backfill(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        output_dir: str,
+        output_format: str = "openmetrics",
+    ):
+        for org_item in self.orgs.values():
+            org_item.run_backfill(
+                start_date=start_date, end_date=end_date, output_dir=output_dir, output_format=output_format
+            )
+
     @logged_method
     def execute_requests(self):
         for org_item in self.orgs.values():
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+from enum import Enum
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from data_processing.chargeback_handlers.types import (
+    ChargebackExecutorInputType,
+    VectorizedChargebackExecutor,
+    VectorizedChargebackExecutorInputObject,
+    VectorizedChargebackExecutorOutputObject,
+)
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
+from data_processing.data_handlers.dataframe_backend import get_dataframe_backend
+from data_processing.data_handlers.prom_metrics_api_handler import METRICS_API_COLUMNS, METRICS_API_PROMETHEUS_QUERIES
+from helpers import logged_method
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SplitBasis(Enum):
+    """What a share of the billing cost is split on.
+
+    USAGE          -- Usage metrics of the principals on the resource for the hour. Booked as usage cost.
+    API_KEY_OWNERS -- API Key holders of the resource, split as per the owner policy of the allocation params.
+    API_KEY_COUNT  -- API Key holders of the resource, weighted by the number of API Keys they hold.
+    RESOURCE       -- The resource itself. Always resolves, so it is the implicit end of every fallback chain.
+    """
+
+    USAGE = "usage"
+    API_KEY_OWNERS = "api_key_owners"
+    API_KEY_COUNT = "api_key_count"
+    RESOURCE = "resource"
+
+
+SPLIT_BASIS_INPUT_TYPES = {
+    SplitBasis.USAGE: ChargebackExecutorInputType.USAGE_METRIC,
+    SplitBasis.API_KEY_OWNERS: ChargebackExecutorInputType.OWNERSHIP_INDEX,
+    SplitBasis.API_KEY_COUNT: ChargebackExecutorInputType.OWNERSHIP_INDEX,
+    SplitBasis.RESOURCE: ChargebackExecutorInputType.FIXED_OWNER,
+}
+
+# Columns of the share tables. The cost share for a principal is cost * ratio * numerator / denominator.
+SHARE_RESOURCE = "ShareResource"
+SHARE_PRINCIPAL = "SharePrincipal"
+SHARE_NUMERATOR = "ShareNumerator"
+SHARE_DENOMINATOR = "ShareDenominator"
+
+
+@dataclass(frozen=True)
+class AllocationPolicyComponent:
+    """A fraction of the billing cost together with the chain of split bases used to allocate it.
+    The first basis that resolves to at least one principal for the resource is used."""
+
+    ratio: Decimal
+    split_chain: Tuple[SplitBasis, ...]
+    usage_metrics: Tuple[str, ...] = field(
+        default=(
+            METRICS_API_PROMETHEUS_QUERIES.request_bytes_name,
+            METRICS_API_PROMETHEUS_QUERIES.response_bytes_name,
+        )
+    )
+
+    @classmethod
+    def from_config(cls, product_type: str, in_config: Dict) -> AllocationPolicyComponent:
+        try:
+            split_chain = [SplitBasis(str(in_config["split_basis"]).lower())] + [
+                SplitBasis(str(x).lower()) for x in in_config.get("fallback", [])
+            ]
+        except (KeyError, ValueError) as e:
+            raise ValueError(
+                f"Allocation policy for {product_type} needs a split_basis & fallback from "
+                f"{[x.value for x in SplitBasis]}: {e}"
+            )
+        if SplitBasis.RESOURCE not in split_chain:
+            split_chain.append(SplitBasis.RESOURCE)
+        usage_metrics = tuple(in_config.get("usage_metrics", cls.usage_metrics))
+        unknown_metrics = set(usage_metrics) - {
+            METRICS_API_PROMETHEUS_QUERIES.request_bytes_name,
+            METRICS_API_PROMETHEUS_QUERIES.response_bytes_name,
+        }
+        if unknown_metrics:
+            raise ValueError(f"Allocation policy for {product_type} uses unknown usage metrics {unknown_metrics}")
+        return cls(
+            ratio=Decimal(str(in_config.get("ratio", 1))),
+            split_chain=tuple(split_chain[: split_chain.index(SplitBasis.RESOURCE) + 1]),
+            usage_metrics=usage_metrics,
+        )
+
+
+@dataclass(frozen=True)
+class AllocationPolicy:
+    """Declarative allocation rule for one product type, compiled into a vectorized chargeback executor.
+
+    Example configuration (per org under chargeback_policies):
+
+        KAFKA_NUM_CKU:
+          - ratio: 0.30
+            split_basis: api_key_owners
+          - ratio: 0.70
+            split_basis: usage
+            fallback: [api_key_owners]
+    """
+
+    product_type: str
+    components: Tuple[AllocationPolicyComponent, ...]
+
+    @classmethod
+    def from_config(cls, product_type: str, in_config: Dict | List) -> AllocationPolicy:
+        # A single component can be provided as a mapping instead of a list with one item
+        in_components = [in_config] if isinstance(in_config, dict) else list(in_config or [])
+        if not in_components:
+            raise ValueError(f"Allocation policy for {product_type} does not have any split definitions")
+        components = tuple(
+            AllocationPolicyComponent.from_config(product_type=product_type, in_config=x) for x in in_components
+        )
+        total_ratio = sum(x.ratio for x in components)
+        if total_ratio != Decimal(1):
+            raise ValueError(f"Allocation policy ratios for {product_type} must add up to 1. Found {total_ratio}")
+        return cls(product_type=product_type, components=components)
+
+    @property
+    def allocation_params_used(self) -> Tuple[str, ...]:
+        """ChargebackAllocationParams fields that change the allocation of the policy. The ratios of the components
+        replace common_charge_ratio, only the api_key_owners split follows the owner_policy."""
+        if any(SplitBasis.API_KEY_OWNERS in x.split_chain for x in self.components):
+            return ("owner_policy",)
+        return ()
+
+    @property
+    def input_types(self) -> Tuple[ChargebackExecutorInputType, ...]:
+        out = []
+        for component in self.components:
+            for split_basis in component.split_chain:
+                input_type = SPLIT_BASIS_INPUT_TYPES[split_basis]
+                if input_type not in out:
+                    out.append(input_type)
+        return tuple(out)
+
+    def compile(self) -> VectorizedChargebackExecutor:
+        return VectorizedChargebackExecutor(executor_func=self, input_types=self.input_types)
+
+    def __call__(
+        self, cb_handler_input, cb_vector_input: VectorizedChargebackExecutorInputObject
+    ) -> VectorizedChargebackExecutorOutputObject:
+        rows = cb_vector_input.billing_rows
+        out = VectorizedChargebackExecutorOutputObject()
+        resources = rows[BILLING_API_COLUMNS.cluster_id].unique()
+        # Share tables are calculated once per split basis per call and reused across the components
+        share_tables: Dict[Tuple[SplitBasis, Tuple[str, ...]], pd.DataFrame] = {}
+        for component in self.components:
+            pending = rows
+            for split_basis in component.split_chain:
+                if pending.empty:
+                    break
+                table_key = (split_basis, component.usage_metrics if split_basis == SplitBasis.USAGE else ())
+                if table_key not in share_tables:
+                    share_tables[table_key] = build_share_table(
+                        split_basis=split_basis,
+                        resources=resources,
+                        cb_handler_input=cb_handler_input,
+                        cb_vector_input=cb_vector_input,
+                        usage_metrics=component.usage_metrics,
+                    )
+                share_table = share_tables[table_key]
+                alloc = get_dataframe_backend().join(
+                    left=pending,
+                    right=share_table.rename(columns={SHARE_RESOURCE: BILLING_API_COLUMNS.cluster_id}),
+                    on=BILLING_API_COLUMNS.cluster_id,
+                    how="inner",
+                )
+                pending = pending[~pending[BILLING_API_COLUMNS.cluster_id].isin(share_table[SHARE_RESOURCE])]
+                if alloc.empty:
+                    continue
+                cost = (
+                    alloc[BILLING_API_COLUMNS.calc_split_total].map(Decimal)
+                    * component.ratio
+                    * alloc[SHARE_NUMERATOR]
+                    / alloc[SHARE_DENOMINATOR]
+                ).to_list()
+                zero_cost = [Decimal(0)] * len(alloc)
+                is_usage = split_basis == SplitBasis.USAGE
+                out.principal.extend(alloc[SHARE_PRINCIPAL].to_list())
+                out.time_slice.extend([x.to_pydatetime() for x in alloc[BILLING_API_COLUMNS.calc_timestamp]])
+                out.env_id.extend(alloc[BILLING_API_COLUMNS.env_id].to_list())
+                out.product_type_name.extend(alloc[BILLING_API_COLUMNS.product_type].to_list())
+                out.additional_usage_cost.extend(cost if is_usage else zero_cost)
+                out.additional_shared_cost.extend(zero_cost if is_usage else cost)
+        return out
+
+
+def build_share_table(
+    split_basis: SplitBasis,
+    resources,
+    cb_handler_input,
+    cb_vector_input: VectorizedChargebackExecutorInputObject,
+    usage_metrics: Tuple[str, ...],
+) -> pd.DataFrame:
+    """Share of every principal per resource for the split basis. Resources that cannot be split with the basis
+    are not present in the output.
+
+    Returns:
+        pd.DataFrame: ShareResource, SharePrincipal, ShareNumerator & ShareDenominator columns
+    """
+    columns = [SHARE_RESOURCE, SHARE_PRINCIPAL, SHARE_NUMERATOR, SHARE_DENOMINATOR]
+    if split_basis == SplitBasis.RESOURCE:
+        return pd.DataFrame([(x, x, Decimal(1), Decimal(1)) for x in resources], columns=columns)
+    if split_basis in (SplitBasis.API_KEY_OWNERS, SplitBasis.API_KEY_COUNT):
+        ownership_index = cb_vector_input.ownership_index or {}
+        records = []
+        for resource_id in resources:
+            owner_counts = ownership_index.get(resource_id, {})
+            if not owner_counts:
+                continue
+            if split_basis == SplitBasis.API_KEY_COUNT:
+                total_count = sum(owner_counts.values())
+                split_terms = [(owner, count, total_count) for owner, count in owner_counts.items()]
+            else:
+                split_terms = cb_handler_input.allocation_params.owner_split_terms(
+                    owner_counts=owner_counts, fallback_owner=resource_id
+                )
+            records.extend(
+                (resource_id, owner, Decimal(numerator), Decimal(denominator))
+                for owner, numerator, denominator in split_terms
+            )
+        return pd.DataFrame(records, columns=columns)
+    # SplitBasis.USAGE
+    usage_data = cb_vector_input.usage_dataframe
+    if usage_data is None or usage_data.empty:
+        return pd.DataFrame(columns=columns)
+    usage = usage_data[usage_data[METRICS_API_COLUMNS.cluster_id].isin(resources)]
+    usage = get_dataframe_backend().group_sum(
+        dataset=usage.assign(Usage=usage[list(usage_metrics)].sum(axis=1)),
+        by=[METRICS_API_COLUMNS.cluster_id, METRICS_API_COLUMNS.principal_id],
+        value_columns=["Usage"],
+    )
+    usage = usage[usage["Usage"] > 0]
+    if usage.empty:
+        return pd.DataFrame(columns=columns)
+    total_usage = usage.groupby(METRICS_API_COLUMNS.cluster_id)["Usage"].transform("sum")
+    return pd.DataFrame(
+        {
+            SHARE_RESOURCE: usage[METRICS_API_COLUMNS.cluster_id].to_numpy(),
+            SHARE_PRINCIPAL: usage[METRICS_API_COLUMNS.principal_id].to_numpy(),
+            SHARE_NUMERATOR: usage["Usage"].map(lambda x: Decimal(str(x))).to_numpy(),
+            SHARE_DENOMINATOR: total_usage.map(lambda x: Decimal(str(x))).to_numpy(),
+        }
+    )
+
+
+@logged_method
+def compile_allocation_policies(in_config: Dict | None) -> Dict[str, VectorizedChargebackExecutor]:
+    """Compile the allocation policies from the configuration into vectorized chargeback executors.
+
+    Args:
+        in_config (Dict | None): Product type --> policy definition
+
+    Returns:
+        Dict[str, VectorizedChargebackExecutor]: Product type --> compiled executor
+    """
+    out = {}
+    for product_type, policy_config in (in_config or {}).items():
+        policy = AllocationPolicy.from_config(product_type=str(product_type).upper(), in_config=policy_config)
+        LOGGER.info(f"Compiled allocation policy for {policy.product_type}: {policy.components}")
+        out[policy.product_type] = policy.compile()
+    return out
@@ -1,21 +1,25 @@
 from decimal import Decimal
 
-from data_processing.chargeback_handlers.types import ChargebackExecutorOutputObject
+from data_processing.chargeback_handlers.types import (
+    VectorizedChargebackExecutorInputObject,
+    VectorizedChargebackExecutorOutputObject,
+)
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
 
 
 def ClusterLinkingGenericChargeback(
     cb_handler_input,
-    cb_input_row,
-    cb_append_function,
-):
+    cb_vector_input: VectorizedChargebackExecutorInputObject,
+) -> VectorizedChargebackExecutorOutputObject:
     """
     # GOAL: Cost will be assumed by the Logical Cluster ID listed in the Billing API
     """
-    calc_data = ChargebackExecutorOutputObject(
-        principal=cb_input_row.row_cluster_id,
-        time_slice=cb_input_row.row_timestamp,
-        product_type_name=cb_input_row.row_product_type,
-        env_id=cb_input_row.row_env_id,
-        additional_shared_cost=Decimal(cb_input_row.row_billing_cost),
+    rows = cb_vector_input.billing_rows
+    return VectorizedChargebackExecutorOutputObject(
+        principal=rows[BILLING_API_COLUMNS.cluster_id].to_list(),
+        time_slice=[x.to_pydatetime() for x in rows[BILLING_API_COLUMNS.calc_timestamp]],
+        env_id=rows[BILLING_API_COLUMNS.env_id].to_list(),
+        product_type_name=rows[BILLING_API_COLUMNS.product_type].to_list(),
+        additional_usage_cost=[Decimal(0)] * len(rows),
+        additional_shared_cost=rows[BILLING_API_COLUMNS.calc_split_total].map(Decimal).to_list(),
     )
-    cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
@@ -9,32 +9,27 @@ def KafkaBaseChargeback(
     cb_append_function,
 ):
     """
-    # GOAL: Split Cost equally across all the SA/Users that have API Keys for that Kafka Cluster
+    # GOAL: Split Cost across all the SA/Users that have API Keys for that Kafka Cluster
     # Find all active Service Accounts/Users For kafka Cluster using the API Keys in the system.
+    # The split between the SA/Users follows the owner policy of the allocation params (equal split by default).
     """
     sa_count = cb_handler_input.ccloud_objects_handler.cc_api_keys.find_sa_count_for_clusters(
         cluster_id=cb_input_row.row_cluster_id
     )
 
-    if len(sa_count) == 0:
-        calc_data = ChargebackExecutorOutputObject(
-            principal=cb_input_row.row_cluster_id,
-            time_slice=cb_input_row.row_timestamp,
-            product_type_name=cb_input_row.row_product_type,
-            env_id=cb_input_row.row_env_id,
-            additional_shared_cost=Decimal(cb_input_row.row_billing_cost),
-        )
-        cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
-        return
-
-    splitter = len(sa_count)
-    for sa_name, sa_api_key_count in sa_count.items():
+    # Clusters without any API Key holders are charged to the cluster itself.
+    cost_split = cb_handler_input.allocation_params.split_cost(
+        cost=Decimal(cb_input_row.row_billing_cost),
+        owner_counts=sa_count,
+        fallback_owner=cb_input_row.row_cluster_id,
+    )
+    for sa_name, sa_cost in cost_split.items():
         calc_data = ChargebackExecutorOutputObject(
             principal=sa_name,
             time_slice=cb_input_row.row_timestamp,
             product_type_name=cb_input_row.row_product_type,
             env_id=cb_input_row.row_env_id,
-            additional_shared_cost=Decimal(cb_input_row.row_billing_cost) / Decimal(splitter),
+            additional_shared_cost=sa_cost,
         )
         cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
     return
@@ -16,8 +16,9 @@ def KafkaNumCKUChargeback(
     #       Shared Charge -- Some flat percentage of the cost Divided across all clients active in that duration.
     #       Usage Charge  -- Some flat percentage of the cost split variably by the amount of data produced + consumed by the SA/User
     """
-    common_charge_ratio = 0.30
-    usage_charge_ratio = 0.70
+    allocation_params = cb_handler_input.allocation_params
+    common_charge_ratio = allocation_params.common_charge_ratio
+    usage_charge_ratio = allocation_params.usage_charge_ratio
 
     # Common Charge will be added as a ratio of the count of API Keys created for each service account.
     sa_count = cb_handler_input.ccloud_objects_handler.cc_api_keys.find_sa_count_for_clusters(
@@ -25,93 +26,93 @@ def KafkaNumCKUChargeback(
     )
     df_time_slice = pd.Timestamp(cb_input_row.input_time_slice)
 
-    if len(sa_count) > 0:
-        splitter = len(sa_count)
-        # total_api_key_count = len(
-        #     [x for x in self.cc_objects.cc_api_keys.api_keys.values() if x.cluster_id != "cloud"]
-        # )
-        for sa_name, sa_api_key_count in sa_count.items():
-            calc_data = ChargebackExecutorOutputObject(
-                principal=sa_name,
-                time_slice=cb_input_row.row_timestamp,
-                product_type_name=cb_input_row.row_product_type,
-                env_id=cb_input_row.row_env_id,
-                additional_shared_cost=(Decimal(cb_input_row.row_billing_cost) * Decimal(common_charge_ratio))
-                / Decimal(splitter),
-            )
-            cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
-    else:
+    # total_api_key_count = len(
+    #     [x for x in self.cc_objects.cc_api_keys.api_keys.values() if x.cluster_id != "cloud"]
+    # )
+    cost_split = allocation_params.split_cost(
+        cost=Decimal(cb_input_row.row_billing_cost) * Decimal(common_charge_ratio),
+        owner_counts=sa_count,
+        fallback_owner=cb_input_row.row_cluster_id,
+    )
+    for sa_name, sa_cost in cost_split.items():
         calc_data = ChargebackExecutorOutputObject(
-            principal=cb_input_row.row_cluster_id,
+            principal=sa_name,
             time_slice=cb_input_row.row_timestamp,
             product_type_name=cb_input_row.row_product_type,
             env_id=cb_input_row.row_env_id,
-            additional_shared_cost=Decimal(cb_input_row.row_billing_cost) * Decimal(common_charge_ratio),
+            additional_shared_cost=sa_cost,
         )
         cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
 
-    # filter metrics for data that has some consumption > 0 , and then find all rows with index
-    # with that timestamp and that specific kafka cluster.
-    try:
-        metric_rows = cb_input_row.metrics_dataframe[
-            (cb_input_row.metrics_dataframe[METRICS_API_COLUMNS.timestamp] == df_time_slice)
-            & (cb_input_row.metrics_dataframe[METRICS_API_COLUMNS.cluster_id] == cb_input_row.row_cluster_id)
-        ]
-    except KeyError:
-        metric_rows = pd.DataFrame()
     # Usage Charge
-    if not metric_rows.empty:
-        # Find the total consumption during that time slice
-        query_dataset = [
-            METRICS_API_PROMETHEUS_QUERIES.request_bytes_name,
-            METRICS_API_PROMETHEUS_QUERIES.response_bytes_name,
-        ]
-
-        agg_data = metric_rows[query_dataset].agg(["sum"])
-        # add the Ratio consumption column by dividing every row by total consumption.
-        for metric_item in query_dataset.values():
-            metric_rows[f"{metric_item}_ratio"] = metric_rows[metric_item].transform(
-                lambda x: Decimal(x) / Decimal(agg_data.loc[["sum"]][metric_item])
-            )
-        # for every filtered Row , add consumption
-        for metric_row in metric_rows.itertuples(index=True, name="MetricsRow"):
-            req_cost = (
-                cb_input_row.row_billing_cost
-                / len(query_dataset)
-                * getattr(metric_row, f"{METRICS_API_PROMETHEUS_QUERIES.request_bytes_name}_ratio")
-            )
-            res_cost = (
-                cb_input_row.row_billing_cost
-                / len(query_dataset)
-                * getattr(metric_row, f"{METRICS_API_PROMETHEUS_QUERIES.response_bytes_name}_ratio")
-            )
+    principal_usage = get_cluster_usage(
+        metrics_dataframe=cb_input_row.metrics_dataframe,
+        time_slice=df_time_slice,
+        cluster_id=cb_input_row.row_cluster_id,
+    )
+    if not principal_usage.empty:
+        # Every metric with any bytes carries an equal part of the usage charge, split by the bytes of the principal
+        usage_cost = Decimal(cb_input_row.row_billing_cost) * Decimal(usage_charge_ratio)
+        metric_cost = usage_cost / len(principal_usage.columns)
+        metric_totals = {x: Decimal(str(principal_usage[x].sum())) for x in principal_usage.columns}
+        for principal_id, usage_row in principal_usage.iterrows():
             calc_data = ChargebackExecutorOutputObject(
-                principal=getattr(metric_row, METRICS_API_COLUMNS.principal_id),
+                principal=principal_id,
                 time_slice=cb_input_row.row_timestamp,
                 product_type_name=cb_input_row.row_product_type,
                 env_id=cb_input_row.row_env_id,
-                additional_usage_cost=Decimal(usage_charge_ratio) * (Decimal(req_cost) + Decimal(res_cost)),
+                additional_usage_cost=sum(
+                    metric_cost * Decimal(str(usage_row[x])) / metric_totals[x] for x in principal_usage.columns
+                ),
             )
             cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
     else:
-        if len(sa_count) > 0:
-            splitter = len(sa_count)
-            for sa_name, sa_api_key_count in sa_count.items():
-                calc_data = ChargebackExecutorOutputObject(
-                    principal=sa_name,
-                    time_slice=cb_input_row.row_timestamp,
-                    product_type_name=cb_input_row.row_product_type,
-                    env_id=cb_input_row.row_env_id,
-                    additional_shared_cost=(Decimal(cb_input_row.row_billing_cost) * Decimal(usage_charge_ratio))
-                    / Decimal(splitter),
-                )
-                cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
-        else:
+        cost_split = allocation_params.split_cost(
+            cost=Decimal(cb_input_row.row_billing_cost) * Decimal(usage_charge_ratio),
+            owner_counts=sa_count,
+            fallback_owner=cb_input_row.row_cluster_id,
+        )
+        for sa_name, sa_cost in cost_split.items():
             calc_data = ChargebackExecutorOutputObject(
-                principal=cb_input_row.row_cluster_id,
+                principal=sa_name,
                 time_slice=cb_input_row.row_timestamp,
                 product_type_name=cb_input_row.row_product_type,
                 env_id=cb_input_row.row_env_id,
-                additional_shared_cost=Decimal(cb_input_row.row_billing_cost) * Decimal(usage_charge_ratio),
+                additional_shared_cost=sa_cost,
             )
             cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
+
+
+def get_cluster_usage(metrics_dataframe: pd.DataFrame, time_slice: pd.Timestamp, cluster_id: str) -> pd.DataFrame:
+    """Bytes produced & consumed per principal on the cluster for the time slice.
+
+    Args:
+        metrics_dataframe (pd.DataFrame): Metrics rows indexed by timestamp, query type, cluster & principal ID
+        time_slice (pd.Timestamp): Time slice of the billing row
+        cluster_id (str): Kafka cluster of the billing row
+
+    Returns:
+        pd.DataFrame: Indexed by principal ID with one column per usage metric that has any bytes on the cluster
+    """
+    query_types = [
+        METRICS_API_PROMETHEUS_QUERIES.request_bytes_name,
+        METRICS_API_PROMETHEUS_QUERIES.response_bytes_name,
+    ]
+    if metrics_dataframe.empty or METRICS_API_COLUMNS.cluster_id not in metrics_dataframe.index.names:
+        return pd.DataFrame()
+    metric_rows = metrics_dataframe.reset_index()
+    metric_rows = metric_rows[
+        (metric_rows[METRICS_API_COLUMNS.timestamp] == time_slice)
+        & (metric_rows[METRICS_API_COLUMNS.cluster_id] == cluster_id)
+        & (metric_rows[METRICS_API_COLUMNS.query_type].isin(query_types))
+    ]
+    if metric_rows.empty:
+        return pd.DataFrame()
+    out = (
+        pd.to_numeric(metric_rows[METRICS_API_COLUMNS.value], errors="coerce")
+        .fillna(0)
+        .groupby([metric_rows[METRICS_API_COLUMNS.principal_id], metric_rows[METRICS_API_COLUMNS.query_type]])
+        .sum()
+        .unstack(fill_value=0)
+    )
+    return out.loc[:, out.sum() > 0]
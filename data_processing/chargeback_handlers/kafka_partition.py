@@ -1,38 +1,46 @@
 from decimal import Decimal
 
-from data_processing.chargeback_handlers.types import ChargebackExecutorOutputObject
+from data_processing.chargeback_handlers.types import (
+    VectorizedChargebackExecutorInputObject,
+    VectorizedChargebackExecutorOutputObject,
+)
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
 
 
 def KafkaPartitionChargeback(
     cb_handler_input,
-    cb_input_row,
-    cb_append_function,
-):
+    cb_vector_input: VectorizedChargebackExecutorInputObject,
+) -> VectorizedChargebackExecutorOutputObject:
     """
     # GOAL: Split cost across all the API Key holders for the specific Cluster
-    # Find all active Service Accounts/Users For kafka Cluster using the API Keys in the system.
+    # Find all active Service Accounts/Users For kafka Cluster using the API Key ownership index.
+    # The split follows the owner policy of the allocation params (equal split by default).
+    # Clusters without any API Key holders are charged to the cluster itself.
     """
-    sa_count = cb_handler_input.ccloud_objects_handler.cc_api_keys.find_sa_count_for_clusters(
-        cluster_id=cb_input_row.row_cluster_id
-    )
-    if len(sa_count) > 0:
-        splitter = len(sa_count)
-        # Add Shared Cost for all active SA/Users in the cluster and split it equally
-        for sa_name, sa_api_key_count in sa_count.items():
-            calc_data = ChargebackExecutorOutputObject(
-                principal=sa_name,
-                time_slice=cb_input_row.row_timestamp,
-                product_type_name=cb_input_row.row_product_type,
-                env_id=cb_input_row.row_env_id,
-                additional_shared_cost=Decimal(cb_input_row.row_billing_cost) / Decimal(splitter),
-            )
-            cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
-    else:
-        calc_data = ChargebackExecutorOutputObject(
-            principal=cb_input_row.row_cluster_id,
-            time_slice=cb_input_row.row_timestamp,
-            product_type_name=cb_input_row.row_product_type,
-            env_id=cb_input_row.row_env_id,
-            additional_shared_cost=Decimal(cb_input_row.row_billing_cost),
+    rows = cb_vector_input.billing_rows
+    ownership_index = cb_vector_input.ownership_index
+    allocation_params = cb_handler_input.allocation_params
+    # Every billing row gets the split terms of the owners for its cluster, then the rows are exploded to one row
+    # per owner. The split terms are calculated once per cluster.
+    split_terms = {
+        cluster_id: allocation_params.owner_split_terms(
+            owner_counts=ownership_index.get(cluster_id, {}), fallback_owner=cluster_id
         )
-        cb_append_function(calc_data, cb_handler_input.ccloud_chargeback_handler)
+        for cluster_id in rows[BILLING_API_COLUMNS.cluster_id].unique()
+    }
+    alloc = rows.assign(split_terms=rows[BILLING_API_COLUMNS.cluster_id].map(split_terms)).explode("split_terms")
+    principal = alloc["split_terms"].map(lambda x: x[0])
+    shared_cost = (
+        alloc[BILLING_API_COLUMNS.calc_split_total].map(Decimal)
+        * alloc["split_terms"].map(lambda x: Decimal(x[1]))
+        / alloc["split_terms"].map(lambda x: Decimal(x[2]))
+    )
+
+    return VectorizedChargebackExecutorOutputObject(
+        principal=principal.to_list(),
+        time_slice=[x.to_pydatetime() for x in alloc[BILLING_API_COLUMNS.calc_timestamp]],
+        env_id=alloc[BILLING_API_COLUMNS.env_id].to_list(),
+        product_type_name=alloc[BILLING_API_COLUMNS.product_type].to_list(),
+        additional_usage_cost=[Decimal(0)] * len(alloc),
+        additional_shared_cost=shared_cost.to_list(),
+    )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import datetime
+import logging
+from typing import Dict, Set
+
+import pandas as pd
+
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
+from helpers import SECONDS_PER_HOUR, logged_method
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReconciliationColumnNames:
+    DAY = "Day"
+    BILLED = "Billed"
+    ALLOCATED = "Allocated"
+    # Allocated minus Billed for the product types that have a chargeback executor
+    DRIFT = "Drift"
+    # Billed cost for the product types that do not have a chargeback executor and are never allocated
+    UNALLOCATED = "Unallocated"
+
+
+RECONCILIATION_COLUMNS = ReconciliationColumnNames()
+
+RECONCILIATION_INDEX = [
+    BILLING_API_COLUMNS.calc_timestamp,
+    BILLING_API_COLUMNS.env_id,
+    BILLING_API_COLUMNS.product_type,
+]
+
+
+def _allocated_dataframe(chargeback_dataset: Dict, ts_column_name: str) -> pd.DataFrame:
+    """Total allocated cost from a chargeback dict keyed by epoch hours per time slice, env ID & product type."""
+    out = pd.DataFrame(
+        [(k[1], k[3], k[2], v[0] + v[1]) for k, v in chargeback_dataset.items()],
+        columns=[ts_column_name, BILLING_API_COLUMNS.env_id, BILLING_API_COLUMNS.product_type, "Cost"],
+    )
+    if out.empty:
+        return out
+    out[ts_column_name] = pd.to_datetime(out[ts_column_name] * SECONDS_PER_HOUR, unit="s", utc=True)
+    out["Cost"] = out["Cost"].astype(float)
+    return out.groupby([ts_column_name, BILLING_API_COLUMNS.env_id, BILLING_API_COLUMNS.product_type], sort=False)[
+        "Cost"
+    ].sum()
+
+
+@logged_method
+def reconcile_chargeback(
+    billing_data: pd.DataFrame,
+    chargeback_dataset: Dict,
+    daily_chargeback_dataset: Dict,
+    allocatable_product_types: Set[str],
+) -> pd.DataFrame:
+    """Compare the billing TotalAfterSplit with the allocated chargeback per hour, environment & product type.
+    Everything is compared as float as this is a health signal and not an accounting output.
+
+    Args:
+        billing_data (pd.DataFrame): Billing rows for the reconciled window
+        chargeback_dataset (Dict): Hourly chargeback dataset (principal, epoch hour, product type, env ID) --> (usage, shared)
+        daily_chargeback_dataset (Dict): Daily chargeback dataset with the per hour costs keyed by the epoch hour of the day
+        allocatable_product_types (Set[str]): Product types that have a chargeback executor
+
+    Returns:
+        pd.DataFrame: Indexed by (Interval, EnvironmentID, Type) with Billed, Allocated, Drift & Unallocated columns
+    """
+    if billing_data is None or billing_data.empty:
+        return pd.DataFrame(
+            columns=RECONCILIATION_INDEX
+            + [
+                RECONCILIATION_COLUMNS.BILLED,
+                RECONCILIATION_COLUMNS.ALLOCATED,
+                RECONCILIATION_COLUMNS.DRIFT,
+                RECONCILIATION_COLUMNS.UNALLOCATED,
+            ]
+        ).set_index(RECONCILIATION_INDEX)
+
+    billed = billing_data[BILLING_API_COLUMNS.calc_split_total].astype(float).groupby(level=RECONCILIATION_INDEX).sum()
+    out = billed.rename(RECONCILIATION_COLUMNS.BILLED).reset_index()
+    out[RECONCILIATION_COLUMNS.DAY] = out[BILLING_API_COLUMNS.calc_timestamp].dt.floor("D")
+
+    allocated = pd.Series(0.0, index=out.index)
+    for dataset, ts_column_name in [
+        (chargeback_dataset, BILLING_API_COLUMNS.calc_timestamp),
+        (daily_chargeback_dataset, RECONCILIATION_COLUMNS.DAY),
+    ]:
+        allocated_frame = _allocated_dataframe(dataset, ts_column_name=ts_column_name)
+        if allocated_frame.empty:
+            continue
+        merged = out.merge(
+            allocated_frame.reset_index(),
+            on=[ts_column_name, BILLING_API_COLUMNS.env_id, BILLING_API_COLUMNS.product_type],
+            how="left",
+        )
+        allocated += merged["Cost"].fillna(0.0).to_numpy()
+    out[RECONCILIATION_COLUMNS.ALLOCATED] = allocated
+
+    is_allocatable = out[BILLING_API_COLUMNS.product_type].isin(allocatable_product_types)
+    out[RECONCILIATION_COLUMNS.DRIFT] = (
+        out[RECONCILIATION_COLUMNS.ALLOCATED] - out[RECONCILIATION_COLUMNS.BILLED]
+    ).where(is_allocatable, 0.0)
+    out[RECONCILIATION_COLUMNS.UNALLOCATED] = out[RECONCILIATION_COLUMNS.BILLED].where(~is_allocatable, 0.0)
+    return out.drop(columns=[RECONCILIATION_COLUMNS.DAY]).set_index(RECONCILIATION_INDEX)
+
+
+@logged_method
+def summarize_reconciliation(reconciliation_dataset: pd.DataFrame) -> Dict:
+    """JSON friendly summary of the reconciliation dataset for the internal API.
+
+    Args:
+        reconciliation_dataset (pd.DataFrame): Output of reconcile_chargeback
+
+    Returns:
+        Dict: totals for the window, the worst hourly drift and totals per product type
+    """
+    if reconciliation_dataset is None or reconciliation_dataset.empty:
+        return {"hours": 0}
+    ts_values = reconciliation_dataset.index.get_level_values(BILLING_API_COLUMNS.calc_timestamp)
+    drift = reconciliation_dataset[RECONCILIATION_COLUMNS.DRIFT]
+    hourly_drift = drift.abs().groupby(level=BILLING_API_COLUMNS.calc_timestamp).sum()
+    totals_columns = [
+        RECONCILIATION_COLUMNS.BILLED,
+        RECONCILIATION_COLUMNS.ALLOCATED,
+        RECONCILIATION_COLUMNS.DRIFT,
+        RECONCILIATION_COLUMNS.UNALLOCATED,
+    ]
+    per_product_type = reconciliation_dataset[totals_columns].groupby(level=BILLING_API_COLUMNS.product_type).sum()
+    return {
+        "window_start": ts_values.min().isoformat(),
+        "window_end": (ts_values.max() + datetime.timedelta(hours=1)).isoformat(),
+        "hours": int(ts_values.nunique()),
+        **{k.lower(): float(v) for k, v in reconciliation_dataset[totals_columns].sum().items()},
+        "abs_drift": float(drift.abs().sum()),
+        "max_abs_hourly_drift": float(hourly_drift.max()),
+        "max_abs_hourly_drift_timestamp": hourly_drift.idxmax().isoformat(),
+        "product_types": {
+            product_type: {k.lower(): float(v) for k, v in row.items()}
+            for product_type, row in per_product_type.iterrows()
+        },
+    }
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from data_processing.chargeback_handlers.types import VectorizedChargebackExecutorOutputObject
+
+LOGGER = logging.getLogger(__name__)
+
+# Product types where the split across principals only depends on the CCloud objects catalog.
+# The split for these product types does not change from hour to hour unless the catalog changes.
+SPLIT_RATIO_PRODUCT_TYPES = {
+    "KAFKA_BASE",
+    "KAFKA_PARTITION",
+    "KAFKA_STORAGE",
+    "AUDIT_LOG_READ",
+    "CONNECT_CAPACITY",
+    "SCHEMA_REGISTRY",
+}
+
+
+class SplitRatioColumnNames:
+    PRINCIPAL = "SplitPrincipal"
+    USAGE_RATIO = "SplitUsageRatio"
+    SHARED_RATIO = "SplitSharedRatio"
+
+
+SPLIT_RATIO_COLUMNS = SplitRatioColumnNames()
+
+
+@dataclass
+class SplitRatios:
+    principal: List[str] = field(default_factory=list)
+    usage_ratio: List[Decimal] = field(default_factory=list)
+    shared_ratio: List[Decimal] = field(default_factory=list)
+
+    @classmethod
+    def from_unit_output(cls, cb_output: VectorizedChargebackExecutorOutputObject) -> SplitRatios:
+        """Derive the split ratios from an executor output that was calculated for a billing cost of exactly 1.
+
+        Args:
+            cb_output (VectorizedChargebackExecutorOutputObject): Executor output for the unit cost billing row
+
+        Returns:
+            SplitRatios: ratio vectors per principal
+        """
+        out: Dict[str, Tuple[Decimal, Decimal]] = {}
+        for principal, _, _, _, usage, shared in cb_output.iter_rows():
+            u, s = out.get(principal, (Decimal(0), Decimal(0)))
+            out[principal] = (u + usage, s + shared)
+        return cls(
+            principal=list(out.keys()),
+            usage_ratio=[x[0] for x in out.values()],
+            shared_ratio=[x[1] for x in out.values()],
+        )
+
+    def as_dataframe(self, **resource_columns) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                **resource_columns,
+                SPLIT_RATIO_COLUMNS.PRINCIPAL: self.principal,
+                SPLIT_RATIO_COLUMNS.USAGE_RATIO: pd.Series(self.usage_ratio, dtype=object),
+                SPLIT_RATIO_COLUMNS.SHARED_RATIO: pd.Series(self.shared_ratio, dtype=object),
+            }
+        )
+
+
+@dataclass
+class SplitRatioCache:
+    """Memoized split ratios keyed by (objects version, product type, resource), bounded to max_entries with least
+    recently used eviction. Hours allocated with different catalog snapshots keep their ratios side by side, so
+    alternating between objects versions does not throw away the ratios of the other versions.
+    """
+
+    max_entries: int = field(default=16384)
+    ratios: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    hits: int = field(default=0)
+    misses: int = field(default=0)
+
+    def get(self, product_type: str, resource: Tuple[str, str], objects_version: int) -> SplitRatios | None:
+        key = (objects_version, product_type, resource)
+        out = self.ratios.get(key, None)
+        if out is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.ratios.move_to_end(key)
+        return out
+
+    def put(self, product_type: str, resource: Tuple[str, str], objects_version: int, split_ratios: SplitRatios):
+        key = (objects_version, product_type, resource)
+        self.ratios[key] = split_ratios
+        self.ratios.move_to_end(key)
+        while len(self.ratios) > self.max_entries:
+            self.ratios.popitem(last=False)
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import datetime
 import decimal
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from enum import Enum, auto
+from typing import Any, Callable, Dict, List, Tuple
 
 import pandas as pd
 
@@ -29,3 +31,160 @@ class ChargebackExecutorOutputObject:
     product_type_name: str
     additional_usage_cost: decimal.Decimal = decimal.Decimal(0)
     additional_shared_cost: decimal.Decimal = decimal.Decimal(0)
+
+
+class OwnerPolicy(Enum):
+    """How a cost that is shared by the API Key holders of a resource is divided between them.
+
+    EQUAL_SPLIT      -- Every principal holding an API Key for the resource pays the same share
+    API_KEY_WEIGHTED -- The share is proportional to the number of API Keys held by the principal
+    RESOURCE_OWNER   -- The cost is not split and stays with the resource itself
+    """
+
+    EQUAL_SPLIT = auto()
+    API_KEY_WEIGHTED = auto()
+    RESOURCE_OWNER = auto()
+
+
+@dataclass(frozen=True)
+class ChargebackAllocationParams:
+    """Tunable parameters of the allocation. The defaults are the standard chargeback behavior.
+
+    Args:
+        common_charge_ratio: Fraction of the Kafka CKU cost that is shared between the cluster principals
+        owner_policy: Policy used to split shared Kafka costs between the API Key holders of the cluster
+    """
+
+    common_charge_ratio: float = field(default=0.30)
+    owner_policy: OwnerPolicy = field(default=OwnerPolicy.EQUAL_SPLIT)
+
+    @property
+    def usage_charge_ratio(self) -> float:
+        return 1 - self.common_charge_ratio
+
+    @classmethod
+    def from_dict(cls, in_params: Dict) -> ChargebackAllocationParams:
+        out = cls()
+        if in_params.get("common_charge_ratio", None) is not None:
+            common_charge_ratio = float(in_params["common_charge_ratio"])
+            if not 0 <= common_charge_ratio <= 1:
+                raise ValueError(f"common_charge_ratio must be between 0 and 1. Found {common_charge_ratio}")
+            out = replace(out, common_charge_ratio=common_charge_ratio)
+        if in_params.get("owner_policy", None) is not None:
+            out = replace(out, owner_policy=OwnerPolicy[str(in_params["owner_policy"]).upper()])
+        return out
+
+    def owner_split_terms(self, owner_counts: Dict[str, int], fallback_owner: str) -> List[Tuple[str, int, int]]:
+        """Split a cost between owners as (owner, numerator, denominator) so that the cost share for the owner is
+        cost * numerator / denominator.
+
+        Args:
+            owner_counts (Dict[str, int]): API Key count per owner of the resource
+            fallback_owner (str): Owner charged when there are no API Key holders, usually the resource itself
+
+        Returns:
+            List[Tuple[str, int, int]]: One entry per owner that receives a share of the cost
+        """
+        if not owner_counts or self.owner_policy == OwnerPolicy.RESOURCE_OWNER:
+            return [(fallback_owner, 1, 1)]
+        if self.owner_policy == OwnerPolicy.API_KEY_WEIGHTED:
+            total_count = sum(owner_counts.values())
+            return [(owner, count, total_count) for owner, count in owner_counts.items()]
+        return [(owner, 1, len(owner_counts)) for owner in owner_counts.keys()]
+
+    def split_cost(
+        self, cost: decimal.Decimal, owner_counts: Dict[str, int], fallback_owner: str
+    ) -> Dict[str, decimal.Decimal]:
+        return {
+            owner: cost * decimal.Decimal(numerator) / decimal.Decimal(denominator)
+            for owner, numerator, denominator in self.owner_split_terms(
+                owner_counts=owner_counts, fallback_owner=fallback_owner
+            )
+        }
+
+
+class ChargebackExecutorInputType(Enum):
+    """The inputs that a vectorized chargeback executor can declare.
+    The Chargeback handler only prepares the inputs that are declared by the executor.
+
+    USAGE_METRIC    -- Usage metrics for the time slice, pivoted per cluster & principal
+    OWNERSHIP_INDEX -- API Key ownership index (cluster ID --> {owner ID: API Key count})
+    FIXED_OWNER     -- No additional input. The resource in the billing row owns the cost
+    OBJECTS_CATALOG -- CCloud objects (API Keys, Connectors, ...) read through the handler input
+    METRICS_ROWS    -- Metrics rows for the time slice as provided by the metrics handler, read by the row
+                       based executors
+
+    Executors that declare neither USAGE_METRIC nor METRICS_ROWS are metric independent: their allocation is
+    identical for every hour of a billing day, so the Chargeback handler computes them once per day.
+    """
+
+    USAGE_METRIC = auto()
+    OWNERSHIP_INDEX = auto()
+    FIXED_OWNER = auto()
+    OBJECTS_CATALOG = auto()
+    METRICS_ROWS = auto()
+
+
+@dataclass
+class VectorizedChargebackExecutorInputObject:
+    input_time_slice: datetime.datetime
+    product_type: str
+    # Every billing row of the product type for the time slice with the index flattened out into columns
+    billing_rows: pd.DataFrame
+    # The complete billing & metrics datasets for the time slice as provided by the data handlers
+    billing_dataframe: pd.DataFrame
+    metrics_dataframe: pd.DataFrame
+    usage_dataframe: pd.DataFrame | None = None
+    ownership_index: Dict[str, Dict[str, int]] | None = None
+
+
+@dataclass
+class VectorizedChargebackExecutorOutputObject:
+    """Allocation arrays returned by a vectorized executor. All the arrays are expected to be the same length
+    and every position across the arrays represents one allocation."""
+
+    principal: List[str] = field(default_factory=list)
+    time_slice: List[datetime.datetime] = field(default_factory=list)
+    env_id: List[str] = field(default_factory=list)
+    product_type_name: List[str] = field(default_factory=list)
+    additional_usage_cost: List[decimal.Decimal] = field(default_factory=list)
+    additional_shared_cost: List[decimal.Decimal] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.principal)
+
+    def append(self, calc_row: ChargebackExecutorOutputObject) -> None:
+        self.principal.append(calc_row.principal)
+        self.time_slice.append(calc_row.time_slice)
+        self.env_id.append(calc_row.env_id)
+        self.product_type_name.append(calc_row.product_type_name)
+        self.additional_usage_cost.append(calc_row.additional_usage_cost)
+        self.additional_shared_cost.append(calc_row.additional_shared_cost)
+
+    def iter_rows(self):
+        return zip(
+            self.principal,
+            self.time_slice,
+            self.product_type_name,
+            self.env_id,
+            self.additional_usage_cost,
+            self.additional_shared_cost,
+        )
+
+
+@dataclass
+class VectorizedChargebackExecutor:
+    """Registry entry for an executor that receives all the billing rows of its product type at once.
+
+    Args:
+        executor_func: Callable accepting (cb_handler_input, cb_vector_input) and returning the allocation arrays
+        input_types: The inputs that need to be prepared by the chargeback handler for this executor
+    """
+
+    executor_func: Callable[[Any, VectorizedChargebackExecutorInputObject], VectorizedChargebackExecutorOutputObject]
+    input_types: Tuple[ChargebackExecutorInputType, ...] = field(default=())
+
+    def __call__(
+        self, cb_handler_input, cb_vector_input: VectorizedChargebackExecutorInputObject
+    ) -> VectorizedChargebackExecutorOutputObject:
+        return self.executor_func(cb_handler_input, cb_vector_input)
@@ -2,15 +2,15 @@ import datetime
 import logging
 from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
 import pandas as pd
 
 from ccloud.connections import CCloudBase
 from data_processing.data_handlers.ccloud_api_handler import CCloudObjectsHandler
-from data_processing.data_handlers.types import AbstractDataHandler
+from data_processing.data_handlers.types import AbstractDataHandler, TimePartitionedDataset
 from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 from prometheus_processing.notifier import NotifierAbstract
 
 LOGGER = logging.getLogger(__name__)
@@ -35,7 +35,7 @@ class BillingAPIColumnNames:
 
 BILLING_API_COLUMNS = BillingAPIColumnNames()
 
-billing_api_prom_metrics = TimestampedCollector(
+billing_api_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_billing_details",
     "Confluent Cloud Costs API data distribution details divided on a per hour basis",
     [
@@ -56,8 +56,16 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
     objects_dataset: CCloudObjectsHandler = field(init=True)
     days_per_query: int = field(default=7)
     max_days_in_memory: int = field(default=14)
+    # False leaves the dataset empty until the first read, e.g. for the streaming & backfill modes
+    read_on_init: bool = field(default=True)
+    # Collectors of the org that exposes the billing dataset
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
 
-    billing_dataset: pd.DataFrame = field(init=False, default=None)
+    # Hourly partitions of the split billing rows, see TimePartitionedDataset
+    billing_dataset: TimePartitionedDataset = field(
+        init=False,
+        default_factory=lambda: TimePartitionedDataset(ts_column_name=BILLING_API_COLUMNS.calc_timestamp),
+    )
     last_available_date: datetime.datetime = field(init=False)
     curr_export_datetime: datetime.datetime = field(init=False)
 
@@ -67,12 +75,15 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
         CCloudBase.__post_init__(self)
         self.url = self.in_ccloud_connection.get_endpoint_url(key=self.in_ccloud_connection.uri.get_billing_costs)
         LOGGER.info(f"Initialized the Billing API Handler with URL: {self.url}")
+        self.curr_export_datetime = self.start_date
+        if not self.read_on_init:
+            self.last_available_date = self.start_date
+            return
         # Calculate the end_date from start_date plus number of days per query
         end_date = self.start_date + datetime.timedelta(days=self.days_per_query)
         # Set up params for querying the Billing API
         self.read_all(start_date=self.start_date, end_date=end_date)
-        self.curr_export_datetime = self.start_date
-        self.update(notifier=billing_api_prom_metrics)
+        self.update(notifier=self.prom_collectors.get(billing_api_prom_metrics))
 
         self.last_available_date = end_date
         LOGGER.info(f"Initialized the Billing API Handler with last available date: {self.last_available_date}")
@@ -108,6 +119,7 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
             dataset=self.billing_dataset, ts_column_name=BILLING_API_COLUMNS.calc_timestamp, time_slice=ts_filter
         )
         if not is_none:
+            label_values, values = [], []
             for df_row in out.itertuples(name="BillingData"):
                 env_id = df_row[0][1]
                 resource_id = df_row[0][2]
@@ -119,14 +131,9 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
                     env_id=env_id, resource_id=resource_id
                 )
                 for item in kafka_cluster_list:
-                    billing_api_prom_metrics.labels(
-                        env_id,
-                        item,
-                        not_found_reason,
-                        resource_id,
-                        product_name,
-                        product_line_type,
-                    ).set(cost / len(kafka_cluster_list))
+                    label_values.append((env_id, item, not_found_reason, resource_id, product_name, product_line_type))
+                    values.append(cost / len(kafka_cluster_list))
+            self.prom_collectors.get(billing_api_prom_metrics).set_samples(label_values=label_values, values=values)
 
     @logged_method
     def get_connected_kafka_cluster_id(self, env_id: str, resource_id: str) -> Tuple[List[str], str]:
@@ -143,12 +150,29 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
 
     @logged_method
     def force_clear_prom_metrics(self):
-        billing_api_prom_metrics.clear()
+        self.prom_collectors.get(billing_api_prom_metrics).clear()
 
     @logged_method
     def read_all(
         self, start_date: datetime.datetime, end_date: datetime.datetime, params={"page_size": 2000}, **kwargs
     ):
+        billing_frames = list(self.iter_billing_frames(start_date=start_date, end_date=end_date, params=params))
+        if billing_frames:
+            LOGGER.debug(f"Appending new Billing data to the existing dataset")
+            self.billing_dataset.append(dataset=pd.concat(billing_frames))
+
+    def iter_billing_frames(
+        self, start_date: datetime.datetime, end_date: datetime.datetime, params={"page_size": 2000}
+    ) -> Iterator[pd.DataFrame]:
+        """Read the Billing API lines for the date range without keeping them in the handler.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start date
+            end_date (datetime.datetime): Exclusive end date
+
+        Yields:
+            pd.DataFrame: The hourly split rows for one billing line at a time
+        """
         params["start_date"] = str(start_date.date())
         params["end_date"] = str(end_date.date())
         LOGGER.debug(f"Reading from Billing API with params: {params}")
@@ -179,35 +203,16 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
                 for idx, x in enumerate(temp_date_range)
             ]
             if temp_data is not None:
-                if self.billing_dataset is not None:
-                    LOGGER.debug(f"Appending new Billing data to the existing dataset")
-                    self.billing_dataset = pd.concat(
-                        [
-                            self.billing_dataset,
-                            pd.DataFrame.from_records(
-                                temp_data,
-                                index=[
-                                    BILLING_API_COLUMNS.calc_timestamp,
-                                    BILLING_API_COLUMNS.env_id,
-                                    BILLING_API_COLUMNS.cluster_id,
-                                    BILLING_API_COLUMNS.product_name,
-                                    BILLING_API_COLUMNS.product_type,
-                                ],
-                            ),
-                        ]
-                    )
-                else:
-                    LOGGER.debug(f"Initializing the Billing dataset with new data")
-                    self.billing_dataset = pd.DataFrame.from_records(
-                        temp_data,
-                        index=[
-                            BILLING_API_COLUMNS.calc_timestamp,
-                            BILLING_API_COLUMNS.env_id,
-                            BILLING_API_COLUMNS.cluster_id,
-                            BILLING_API_COLUMNS.product_name,
-                            BILLING_API_COLUMNS.product_type,
-                        ],
-                    )
+                yield pd.DataFrame.from_records(
+                    temp_data,
+                    index=[
+                        BILLING_API_COLUMNS.calc_timestamp,
+                        BILLING_API_COLUMNS.env_id,
+                        BILLING_API_COLUMNS.cluster_id,
+                        BILLING_API_COLUMNS.product_name,
+                        BILLING_API_COLUMNS.product_type,
+                    ],
+                )
 
     @logged_method
     def read_next_dataset(self, exposed_timestamp: datetime.datetime):
@@ -223,11 +228,11 @@ class CCloudBillingHandler(AbstractDataHandler, CCloudBase):
             )
             self.last_available_date = effective_dates.next_fetch_end_date
             LOGGER.debug("Trimming Billing dataset to max days in memory per config")
-            self.billing_dataset, is_none = self.get_dataset_for_timerange(
+            self.billing_dataset.evict(
                 start_datetime=effective_dates.retention_start_date, end_datetime=effective_dates.retention_end_date
             )
         self.curr_export_datetime = exposed_timestamp
-        self.update(notifier=billing_api_prom_metrics)
+        self.update(notifier=self.prom_collectors.get(billing_api_prom_metrics))
 
     @logged_method
     def get_dataset_for_timerange(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime, **kwargs):
@@ -1,7 +1,10 @@
+from __future__ import annotations
+
+import copy
 import datetime
 import logging
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from ccloud.ccloud_api.api_keys import CCloudAPIKeyList
 from ccloud.ccloud_api.clusters import CCloudClusterList
@@ -11,11 +14,97 @@ from ccloud.ccloud_api.ksqldb_clusters import CCloudKsqldbClusterList
 from ccloud.ccloud_api.service_accounts import CCloudServiceAccountList
 from ccloud.ccloud_api.user_accounts import CCloudUserAccountList
 from ccloud.connections import CCloudBase
+from data_processing.data_handlers.ccloud_objects_snapshots import CCloudObjectsSnapshotStore
 from data_processing.data_handlers.types import AbstractDataHandler
 from helpers import logged_method
+from prometheus_processing.custom_collector import ScopedCollectors
 
 LOGGER = logging.getLogger(__name__)
 
+# Object type in the catalog --> (handler attribute, attribute of the list object holding the objects)
+OBJECTS_CATALOG_ATTRIBUTES = {
+    "service_accounts": ("cc_sa", "sa"),
+    "users": ("cc_users", "users"),
+    "api_keys": ("cc_api_keys", "api_keys"),
+    "environments": ("cc_environments", "env"),
+    "clusters": ("cc_clusters", "clusters"),
+    "connectors": ("cc_connectors", "connectors"),
+    "ksqldb_clusters": ("cc_ksqldb_clusters", "ksqldb_clusters"),
+}
+
+
+@dataclass
+class CCloudObjectsDiff:
+    """Difference between two consecutive CCloud objects catalogs.
+    All the dicts are keyed by object type (same keys as CCloudObjectsHandler.get_objects_catalog) and then object ID.
+    """
+
+    previous_version: int
+    current_version: int
+    # UTC datetime of the refresh. The current catalog applies to the hours starting at this point.
+    refreshed_at: datetime.datetime | None = field(default=None)
+    # UTC datetime of the first objects snapshot. The hours before it have no recorded catalog and follow the
+    # current catalog, so the refresh changes their allocation too.
+    history_start: datetime.datetime | None = field(default=None)
+    added: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    removed: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    # object ID --> (previous object, current object)
+    changed: Dict[str, Dict[str, Tuple[object, object]]] = field(default_factory=dict)
+    # Shallow copy of the objects handler before the refresh, so that the previous catalog can still be queried
+    previous_objects: CCloudObjectsHandler | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_catalogs(
+        cls,
+        previous_catalog: Dict[str, Dict],
+        current_catalog: Dict[str, Dict],
+        previous_version: int,
+        current_version: int,
+        previous_objects: CCloudObjectsHandler | None = None,
+        refreshed_at: datetime.datetime | None = None,
+        history_start: datetime.datetime | None = None,
+    ) -> CCloudObjectsDiff:
+        out = cls(
+            previous_version=previous_version,
+            current_version=current_version,
+            refreshed_at=refreshed_at,
+            history_start=history_start,
+            previous_objects=previous_objects,
+        )
+        for object_type, current_items in current_catalog.items():
+            previous_items = previous_catalog.get(object_type, {})
+            out.added[object_type] = {k: v for k, v in current_items.items() if k not in previous_items}
+            out.removed[object_type] = {k: v for k, v in previous_items.items() if k not in current_items}
+            out.changed[object_type] = {
+                k: (previous_items[k], v)
+                for k, v in current_items.items()
+                if k in previous_items and previous_items[k] != v
+            }
+        return out
+
+    def is_empty(self) -> bool:
+        return not any([any(self.added.values()), any(self.removed.values()), any(self.changed.values())])
+
+    def changes_catalog_at(self, ts: datetime.datetime) -> bool:
+        """Whether the refresh changed the catalog that applies at the timestamp. That is the case for the hours
+        after the refresh and for the hours before the first snapshot, which always follow the current catalog.
+
+        Args:
+            ts (datetime.datetime): timezone aware point in time
+        """
+        if self.refreshed_at is None or ts >= self.refreshed_at:
+            return True
+        return self.history_start is not None and ts < self.history_start
+
+    def all_touched_objects(self, object_type: str) -> List[object]:
+        """Every object of the type that was added, removed or changed. Changed objects are returned in both the
+        previous and the current form as both versions might have impacted the chargeback.
+        """
+        out = list(self.added.get(object_type, {}).values()) + list(self.removed.get(object_type, {}).values())
+        for previous_item, current_item in self.changed.get(object_type, {}).values():
+            out += [previous_item, current_item]
+        return out
+
 
 @dataclass
 class CCloudObjectsHandler(AbstractDataHandler, CCloudBase):
@@ -28,6 +117,17 @@ class CCloudObjectsHandler(AbstractDataHandler, CCloudBase):
     cc_clusters: CCloudClusterList = field(init=False)
     cc_connectors: CCloudConnectorList = field(init=False)
     cc_ksqldb_clusters: CCloudKsqldbClusterList = field(init=False)
+    # Incremented every time a refresh actually changes the objects catalog. 0 means never refreshed.
+    objects_version: int = field(init=False, default=0)
+    # Diff produced by the last refresh that changed the objects catalog.
+    last_objects_diff: CCloudObjectsDiff | None = field(init=False, default=None, repr=False)
+    # History of the catalog, used to allocate every hour with the objects that existed at that time.
+    snapshots: CCloudObjectsSnapshotStore = field(default_factory=CCloudObjectsSnapshotStore, repr=False)
+    # Collectors of the org, handed to the object lists
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
+    catalog_refreshed: bool = field(init=False, default=False)
+    # objects version --> handler view over the snapshot for that version
+    snapshot_views: Dict[int, CCloudObjectsHandler] = field(init=False, default_factory=dict, repr=False)
 
     def __post_init__(self) -> None:
         LOGGER.debug(f"Initializing CCloudObjectsHandler")
@@ -35,6 +135,8 @@ class CCloudObjectsHandler(AbstractDataHandler, CCloudBase):
         AbstractDataHandler.__init__(self, start_date=self.start_date)
         CCloudBase.__post_init__(self)
         self.last_refresh = datetime.datetime.now() - self.min_refresh_gap
+        # Continue the versions of the persisted snapshots so that they stay unique across restarts
+        self.objects_version = self.snapshots.latest_version
         effective_dates = self.calculate_effective_dates(
             last_available_date=self.start_date, days_per_query=1, max_days_in_memory=1
         )
@@ -49,31 +151,44 @@ class CCloudObjectsHandler(AbstractDataHandler, CCloudBase):
             LOGGER.info(f"Not refreshing the CCloud Object state  -- TimeDelta is not enough. {self.min_refresh_gap}")
         else:
             LOGGER.info(f"Starting CCloud Object refresh now -- {datetime.datetime.now()}")
+            previous_objects = None
+            # Catalog of the latest snapshot. Available from the persisted snapshots even right after a restart.
+            previous_catalog = self.snapshots.get_latest_catalog()
+            if self.catalog_refreshed:
+                previous_objects = copy.copy(self)
+                # Prevent the diffs from chaining every older catalog in memory
+                previous_objects.last_objects_diff = None
+                previous_catalog = previous_objects.get_objects_catalog()
             LOGGER.info(f"Refreshing CCloud Service Accounts")
             self.cc_sa = CCloudServiceAccountList(
                 in_ccloud_connection=self.in_ccloud_connection,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             LOGGER.info(f"Refreshing CCloud User Accounts")
             self.cc_users = CCloudUserAccountList(
                 in_ccloud_connection=self.in_ccloud_connection,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             LOGGER.info(f"Refreshing CCloud API Keys")
             self.cc_api_keys = CCloudAPIKeyList(
                 in_ccloud_connection=self.in_ccloud_connection,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             LOGGER.info(f"Refreshing CCloud Environments")
             self.cc_environments = CCloudEnvironmentList(
                 in_ccloud_connection=self.in_ccloud_connection,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             LOGGER.info(f"Refreshing CCloud Kafka Clusters")
             self.cc_clusters = CCloudClusterList(
                 in_ccloud_connection=self.in_ccloud_connection,
                 ccloud_envs=self.cc_environments,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             LOGGER.info(f"Refreshing CCloud Connectors")
             self.cc_connectors = CCloudConnectorList(
@@ -83,20 +198,90 @@ class CCloudObjectsHandler(AbstractDataHandler, CCloudBase):
                 ccloud_users=self.cc_users,
                 ccloud_api_keys=self.cc_api_keys,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             LOGGER.info(f"Refreshing CCloud KSQLDB Clusters")
             self.cc_ksqldb_clusters = CCloudKsqldbClusterList(
                 in_ccloud_connection=self.in_ccloud_connection,
                 ccloud_envs=self.cc_environments,
                 exposed_timestamp=exposed_timestamp,
+                prom_collectors=self.prom_collectors,
             )
             self.last_refresh = datetime.datetime.now()
+            self.catalog_refreshed = True
+            current_catalog = self.get_objects_catalog()
+            if previous_catalog != current_catalog:
+                self.objects_version += 1
+                refreshed_at = datetime.datetime.now(tz=datetime.timezone.utc)
+                LOGGER.info(f"CCloud Objects catalog changed. Objects version is now {self.objects_version}")
+                self.snapshots.record(
+                    refreshed_at=refreshed_at,
+                    objects_version=self.objects_version,
+                    current_catalog=current_catalog,
+                    previous_catalog=previous_catalog,
+                )
+                if previous_objects is not None:
+                    self.last_objects_diff = CCloudObjectsDiff.from_catalogs(
+                        previous_catalog=previous_catalog,
+                        current_catalog=current_catalog,
+                        previous_version=self.objects_version - 1,
+                        current_version=self.objects_version,
+                        previous_objects=previous_objects,
+                        refreshed_at=refreshed_at,
+                        history_start=self.snapshots.history_start,
+                    )
             LOGGER.info(f"Finished CCloud Object refresh -- {self.last_refresh}")
 
+    @logged_method
+    def get_objects_catalog(self) -> Dict[str, Dict]:
+        """Returns all the CCloud objects known to the handler grouped by object type.
+
+        Returns:
+            Dict[str, Dict]: object type --> {object ID: object}
+        """
+        return {
+            object_type: getattr(getattr(self, handler_attr), list_attr)
+            for object_type, (handler_attr, list_attr) in OBJECTS_CATALOG_ATTRIBUTES.items()
+        }
+
+    @logged_method
+    def get_objects_as_of(self, ts: datetime.datetime) -> CCloudObjectsHandler:
+        """Objects handler view with the catalog that applied at the provided timestamp. The view is built from the
+        snapshot store, so no CCloud API calls are made. Timestamps before the first snapshot have no recorded catalog
+        and use the current one.
+
+        Args:
+            ts (datetime.datetime): timezone aware point in time
+
+        Returns:
+            CCloudObjectsHandler: self if the current catalog applies, otherwise a read only view of the snapshot
+        """
+        objects_version, catalog = self.snapshots.as_of(ts=ts)
+        if catalog is None or objects_version == self.objects_version:
+            return self
+        if objects_version not in self.snapshot_views:
+            out = copy.copy(self)
+            out.objects_version = objects_version
+            out.last_objects_diff = None
+            out.snapshot_views = {}
+            for object_type, (handler_attr, list_attr) in OBJECTS_CATALOG_ATTRIBUTES.items():
+                list_object = copy.copy(getattr(self, handler_attr))
+                setattr(list_object, list_attr, catalog.get(object_type, {}))
+                setattr(out, handler_attr, list_object)
+            if len(self.snapshot_views) >= self.snapshots.max_cached_catalogs:
+                self.snapshot_views.pop(next(iter(self.snapshot_views)))
+            self.snapshot_views[objects_version] = out
+        return self.snapshot_views[objects_version]
+
     @logged_method
     def read_next_dataset(self, exposed_timestamp: datetime.datetime):
         self.read_all(exposed_timestamp=exposed_timestamp)
         LOGGER.info(f"Reading Objects dataset for Timestamp: {exposed_timestamp}")
+        self.expose_prometheus_metrics(exposed_timestamp=exposed_timestamp)
+
+    @logged_method
+    def expose_prometheus_metrics(self, exposed_timestamp: datetime.datetime):
+        """Expose the objects of every object type to their collectors for the timestamp."""
         self.cc_sa.expose_prometheus_metrics(exposed_timestamp=exposed_timestamp)
         self.cc_users.expose_prometheus_metrics(exposed_timestamp=exposed_timestamp)
         self.cc_api_keys.expose_prometheus_metrics(exposed_timestamp=exposed_timestamp)
@@ -120,6 +305,19 @@ class CCloudObjectsHandler(AbstractDataHandler, CCloudBase):
         # TODO: Do we want to narrow down the active dataset for the timelines ?
         pass
 
+    @logged_method
+    def get_api_key_ownership_index(self) -> Dict[str, Dict[str, int]]:
+        """Builds the API Key ownership index for all the resources in one pass over the API Keys.
+
+        Returns:
+            Dict[str, Dict[str, int]]: resource ID --> {owner ID: count of API Keys owned for that resource}
+        """
+        out = {}
+        for item in self.cc_api_keys.api_keys.values():
+            owners = out.setdefault(item.cluster_id, {})
+            owners[item.owner_id] = owners.get(item.owner_id, 0) + 1
+        return out
+
     @logged_method
     def get_connected_kafka_cluster_id(self, env_id: str, resource_id: str) -> Tuple[List[str], str]:
         cluster_list = []
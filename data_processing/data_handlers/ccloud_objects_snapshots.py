@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import bisect
+import datetime
+import logging
+import os
+import pickle
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from helpers import logged_method
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CCloudObjectsSnapshotEntry:
+    # UTC datetime from which this snapshot is the valid catalog
+    refreshed_at: datetime.datetime
+    objects_version: int
+    # object type --> {"upsert": {object ID: object}, "remove": [object ID]} against the previous snapshot
+    delta: Dict[str, Dict]
+    # Full catalog, only stored for every checkpoint_interval'th entry to bound the reconstruction cost
+    checkpoint: Dict[str, Dict] | None = field(default=None, repr=False)
+
+
+@dataclass
+class CCloudObjectsSnapshotStore:
+    """History of the CCloud objects catalog. Every refresh that changes the catalog is stored as a delta against
+    the previous snapshot, with a full checkpoint every checkpoint_interval entries. Locating the snapshot for a
+    point in time is a binary search over the refresh timestamps and reconstructing it replays at most
+    checkpoint_interval - 1 deltas on top of the nearest checkpoint.
+
+    Args:
+        persistence_path: Optional file where every snapshot entry is appended, so the history survives restarts
+        checkpoint_interval: Number of entries between two full checkpoints
+        max_cached_catalogs: Number of reconstructed catalogs kept in memory
+    """
+
+    persistence_path: str | None = field(default=None)
+    checkpoint_interval: int = field(default=32)
+    max_cached_catalogs: int = field(default=8)
+
+    entries: List[CCloudObjectsSnapshotEntry] = field(init=False, repr=False, default_factory=list)
+    refresh_timestamps: List[datetime.datetime] = field(init=False, repr=False, default_factory=list)
+    cached_catalogs: OrderedDict = field(init=False, repr=False, default_factory=OrderedDict)
+
+    def __post_init__(self) -> None:
+        if self.persistence_path is not None and os.path.exists(self.persistence_path):
+            self.load()
+
+    @property
+    def latest_version(self) -> int:
+        return self.entries[-1].objects_version if self.entries else 0
+
+    @property
+    def history_start(self) -> datetime.datetime | None:
+        """UTC datetime of the first snapshot. No catalog is recorded for the hours before it."""
+        return self.refresh_timestamps[0] if self.refresh_timestamps else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @logged_method
+    def load(self):
+        LOGGER.info(f"Loading CCloud objects snapshots from {self.persistence_path}")
+        with open(self.persistence_path, "rb") as snapshot_file:
+            while True:
+                try:
+                    entry: CCloudObjectsSnapshotEntry = pickle.load(snapshot_file)
+                except EOFError:
+                    break
+                self.__append_entry(entry=entry)
+        LOGGER.info(f"Loaded {len(self.entries)} CCloud objects snapshots. Latest version: {self.latest_version}")
+
+    def __append_entry(self, entry: CCloudObjectsSnapshotEntry):
+        self.entries.append(entry)
+        self.refresh_timestamps.append(entry.refreshed_at)
+
+    @logged_method
+    def record(
+        self,
+        refreshed_at: datetime.datetime,
+        objects_version: int,
+        current_catalog: Dict[str, Dict],
+        previous_catalog: Dict[str, Dict] | None,
+    ):
+        """Store a new snapshot of the catalog as a delta against the previous snapshot.
+
+        Args:
+            refreshed_at (datetime.datetime): UTC datetime of the refresh that produced the catalog
+            objects_version (int): Objects version of the catalog
+            current_catalog (Dict[str, Dict]): Catalog after the refresh
+            previous_catalog (Dict[str, Dict] | None): Catalog of the latest snapshot, None if there is none
+        """
+        if self.refresh_timestamps and refreshed_at < self.refresh_timestamps[-1]:
+            raise ValueError(f"Snapshot at {refreshed_at} is older than the latest snapshot {self.refresh_timestamps[-1]}")
+        previous_catalog = previous_catalog or {}
+        delta = {}
+        for object_type, current_items in current_catalog.items():
+            previous_items = previous_catalog.get(object_type, {})
+            delta[object_type] = {
+                "upsert": {k: v for k, v in current_items.items() if previous_items.get(k, None) != v},
+                "remove": [k for k in previous_items.keys() if k not in current_items],
+            }
+        entry = CCloudObjectsSnapshotEntry(refreshed_at=refreshed_at, objects_version=objects_version, delta=delta)
+        if len(self.entries) % self.checkpoint_interval == 0:
+            entry.checkpoint = {k: dict(v) for k, v in current_catalog.items()}
+        self.__append_entry(entry=entry)
+        if self.persistence_path is not None:
+            persistence_dir = os.path.dirname(self.persistence_path)
+            if persistence_dir:
+                os.makedirs(persistence_dir, exist_ok=True)
+            with open(self.persistence_path, "ab") as snapshot_file:
+                pickle.dump(entry, snapshot_file)
+
+    def locate(self, ts: datetime.datetime) -> int:
+        """Index of the snapshot that applies to the timestamp.
+
+        Args:
+            ts (datetime.datetime): timezone aware point in time
+
+        Returns:
+            int: index of the entry, -1 if the timestamp is before the first snapshot or the store is empty
+        """
+        return bisect.bisect_right(self.refresh_timestamps, ts) - 1
+
+    def get_catalog(self, index: int) -> Dict[str, Dict]:
+        """Reconstruct the catalog for the entry index from the nearest checkpoint and the deltas after it."""
+        if index in self.cached_catalogs:
+            self.cached_catalogs.move_to_end(index)
+            return self.cached_catalogs[index]
+        checkpoint_index = index - (index % self.checkpoint_interval)
+        out = {k: dict(v) for k, v in self.entries[checkpoint_index].checkpoint.items()}
+        for entry in self.entries[checkpoint_index + 1 : index + 1]:
+            for object_type, object_delta in entry.delta.items():
+                items = out.setdefault(object_type, {})
+                for object_id in object_delta["remove"]:
+                    items.pop(object_id, None)
+                items.update(object_delta["upsert"])
+        self.cached_catalogs[index] = out
+        if len(self.cached_catalogs) > self.max_cached_catalogs:
+            self.cached_catalogs.popitem(last=False)
+        return out
+
+    @logged_method
+    def get_latest_catalog(self) -> Dict[str, Dict] | None:
+        return self.get_catalog(index=len(self.entries) - 1) if self.entries else None
+
+    def as_of(self, ts: datetime.datetime) -> Tuple[int, Dict[str, Dict] | None]:
+        """Objects version & catalog that applied at the timestamp.
+
+        Args:
+            ts (datetime.datetime): timezone aware point in time
+
+        Returns:
+            Tuple[int, Dict[str, Dict] | None]: objects version and catalog. (0, None) if no snapshot applies
+        """
+        index = self.locate(ts=ts)
+        if index < 0:
+            return (0, None)
+        return (self.entries[index].objects_version, self.get_catalog(index=index))
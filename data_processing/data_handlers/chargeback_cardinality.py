@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Principal of the series that holds the cost of the folded principals
+OTHER_PRINCIPAL = "other"
+
+
+@dataclass(kw_only=True)
+class ChargebackCardinalityGuard:
+    """Caps the number of exposed chargeback series. Every hour, only the top_principals principals with the highest
+    cost (usage + shared) are kept per product type & env ID. The other principals are folded into the OTHER_PRINCIPAL
+    row of the product type & env ID, whose usage & shared costs are the sums of the folded rows, so the totals stay
+    exact.
+
+    Args:
+        top_principals: Principals kept per product type & env ID for every hour
+    """
+
+    top_principals: int = field(default=100)
+
+    def __post_init__(self):
+        if self.top_principals < 1:
+            raise ValueError(f"top_principals must be at least 1, got {self.top_principals}")
+
+    @classmethod
+    def from_config(cls, in_config: Dict | None) -> ChargebackCardinalityGuard | None:
+        """Guard for the cardinality_guard section of an org. None when the section is missing or disabled."""
+        if not in_config or not in_config.get("enabled", True):
+            return None
+        return cls(top_principals=int(in_config.get("top_principals", 100)))
+
+    def fold_rows(self, rows: Iterable[Tuple]) -> Tuple[List[Tuple], Dict[Tuple[str, str], int]]:
+        """Fold the long tail of the chargeback rows of one hour.
+
+        Args:
+            rows (Iterable[Tuple]): (principal, time slice, product type, env ID, usage cost, shared cost) rows
+
+        Returns:
+            Tuple[List[Tuple], Dict[Tuple[str, str], int]]: Kept rows followed by the OTHER_PRINCIPAL rows, and the
+            number of folded principals per (product type, env ID) that has any
+        """
+        # (product type, env ID) --> principal --> row. A repeated principal keeps its last row, as the exposition does.
+        groups: Dict[Tuple[str, str], Dict[str, Tuple]] = {}
+        for row in rows:
+            groups.setdefault((row[2], row[3]), {})[row[0]] = row
+        out, folded_counts = [], {}
+        for (product_type, env_id), group_principals in groups.items():
+            group_rows = list(group_principals.values())
+            ranked = [x for x in group_rows if x[0] != OTHER_PRINCIPAL]
+            if len(ranked) <= self.top_principals and len(ranked) == len(group_rows):
+                out.extend(group_rows)
+                continue
+            ranked.sort(key=lambda x: (-(x[4] + x[5]), x[0]))
+            kept, folded = ranked[: self.top_principals], ranked[self.top_principals :]
+            if folded:
+                folded_counts[(product_type, env_id)] = len(folded)
+            # A principal that is literally named like the bucket is folded into it rather than exposed twice
+            folded.extend(x for x in group_rows if x[0] == OTHER_PRINCIPAL)
+            out.extend(kept)
+            if folded:
+                out.append(
+                    (
+                        OTHER_PRINCIPAL,
+                        folded[0][1],
+                        product_type,
+                        env_id,
+                        sum(x[4] for x in folded),
+                        sum(x[5] for x in folded),
+                    )
+                )
+        return out, folded_counts
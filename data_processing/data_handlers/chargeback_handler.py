@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import copy
 import datetime
 import decimal
 import logging
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from typing import Callable
-from typing import Dict, List
+from typing import Dict, List, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
 from data_processing.chargeback_handlers.audit_log_read import AuditLogReadChargeback
@@ -19,16 +22,39 @@ from data_processing.chargeback_handlers.kafka_network_write import KafkaNetwork
 from data_processing.chargeback_handlers.kafka_num_cku import KafkaNumCKUChargeback
 from data_processing.chargeback_handlers.kafka_partition import KafkaPartitionChargeback
 from data_processing.chargeback_handlers.ksql_num_csu import KSQLNumCSUChargeback
+from data_processing.chargeback_handlers.reconciliation import (
+    RECONCILIATION_COLUMNS,
+    reconcile_chargeback,
+    summarize_reconciliation,
+)
 from data_processing.chargeback_handlers.schema_registry_generic import SchemaRegistryGenericChargeback
-from data_processing.chargeback_handlers.types import ChargebackExecutorOutputObject, ChargebackExecutorInputObject
+from data_processing.chargeback_handlers.split_ratio_cache import (
+    SPLIT_RATIO_COLUMNS,
+    SPLIT_RATIO_PRODUCT_TYPES,
+    SplitRatioCache,
+    SplitRatios,
+)
+from data_processing.chargeback_handlers.types import (
+    ChargebackAllocationParams,
+    ChargebackExecutorInputObject,
+    ChargebackExecutorInputType,
+    ChargebackExecutorOutputObject,
+    VectorizedChargebackExecutor,
+    VectorizedChargebackExecutorInputObject,
+    VectorizedChargebackExecutorOutputObject,
+)
 from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS, CCloudBillingHandler
-from data_processing.data_handlers.ccloud_api_handler import CCloudObjectsHandler
+from data_processing.data_handlers.ccloud_api_handler import CCloudObjectsDiff, CCloudObjectsHandler
+from data_processing.data_handlers.chargeback_cardinality import ChargebackCardinalityGuard
+from data_processing.data_handlers.chargeback_history import ChargebackHistory
+from data_processing.data_handlers.chargeback_shadow import ChargebackShadowEngine
+from data_processing.data_handlers.dataframe_backend import get_dataframe_backend
 from data_processing.data_handlers.prom_metrics_api_handler import (
     PrometheusMetricsDataHandler,
 )
 from data_processing.data_handlers.types import AbstractDataHandler
-from helpers import logged_method
-from prometheus_processing.custom_collector import TimestampedCollector
+from helpers import HOURS_PER_DAY, epoch_hour_to_day, from_epoch_hour, logged_method, to_epoch_hour
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
 from prometheus_processing.notifier import NotifierAbstract, Observer
 
 LOGGER = logging.getLogger(__name__)
@@ -54,7 +80,7 @@ class ChargebackColumnNames:
 
 CHARGEBACK_COLUMNS = ChargebackColumnNames()
 
-chargeback_prom_metrics = TimestampedCollector(
+chargeback_prom_metrics = ArrayTimestampedCollector(
     "confluent_cloud_chargeback_details",
     "Approximate Chargeback Distribution details for costs w.r.t contextual access within CCloud",
     [
@@ -66,30 +92,123 @@ chargeback_prom_metrics = TimestampedCollector(
     in_begin_timestamp=datetime.datetime.now(),
 )
 
+chargeback_reconciliation_prom_metrics = ArrayTimestampedCollector(
+    "confluent_cloud_chargeback_reconciliation",
+    "Difference between the Billing API cost and the allocated Chargeback cost per hour",
+    [
+        "product_type",
+        "env_id",
+        "reconciliation_type",
+    ],
+    in_begin_timestamp=datetime.datetime.now(),
+)
+
+chargeback_folded_principals_prom_metrics = ArrayTimestampedCollector(
+    "confluent_cloud_chargeback_folded_principals",
+    "Number of principals folded into the other principal of the Chargeback details by the cardinality guard per hour",
+    [
+        "product_type",
+        "env_id",
+    ],
+    in_begin_timestamp=datetime.datetime.now(),
+)
+
 
 CHARGEBACK_EXECUTORS = {
     # This is a dict of all the chargeback executors that are available
     # The key is the product type and the value is the class that handles the chargeback
+    # The value is either a row based executor function or a VectorizedChargebackExecutor.
+    # Row based executors are wrapped in RowChargebackExecutorAdapter before they are invoked.
     "KAFKA_BASE": KafkaBaseChargeback,
     "KAFKA_NETWORK_READ": KafkaNetworkReadChargeback,
     "KAFKA_NETWORK_WRITE": KafkaNetworkWriteChargeback,
     "KAFKA_NUM_CKU": KafkaNumCKUChargeback,
     "KAFKA_NUM_CKUS": KafkaNumCKUChargeback,
-    "KAFKA_PARTITION": KafkaPartitionChargeback,
-    "KAFKA_STORAGE": KafkaPartitionChargeback,
+    "KAFKA_PARTITION": VectorizedChargebackExecutor(
+        executor_func=KafkaPartitionChargeback, input_types=(ChargebackExecutorInputType.OWNERSHIP_INDEX,)
+    ),
+    "KAFKA_STORAGE": VectorizedChargebackExecutor(
+        executor_func=KafkaPartitionChargeback, input_types=(ChargebackExecutorInputType.OWNERSHIP_INDEX,)
+    ),
     "AUDIT_LOG_READ": AuditLogReadChargeback,
     "CONNECT_CAPACITY": ConnectCapacityChargeback,
     "CONNECT_NUM_TASKS": ConnectTasksChargeback,
     "CONNECT_THROUGHPUT": ConnectTasksChargeback,
-    "CLUSTER_LINKING_PER_LINK": ClusterLinkingGenericChargeback,
-    "CLUSTER_LINKING_READ": ClusterLinkingGenericChargeback,
-    "CLUSTER_LINKING_WRITE": ClusterLinkingGenericChargeback,
+    "CLUSTER_LINKING_PER_LINK": VectorizedChargebackExecutor(
+        executor_func=ClusterLinkingGenericChargeback, input_types=(ChargebackExecutorInputType.FIXED_OWNER,)
+    ),
+    "CLUSTER_LINKING_READ": VectorizedChargebackExecutor(
+        executor_func=ClusterLinkingGenericChargeback, input_types=(ChargebackExecutorInputType.FIXED_OWNER,)
+    ),
+    "CLUSTER_LINKING_WRITE": VectorizedChargebackExecutor(
+        executor_func=ClusterLinkingGenericChargeback, input_types=(ChargebackExecutorInputType.FIXED_OWNER,)
+    ),
     "GOVERNANCE_BASE": SchemaRegistryGenericChargeback,
     "SCHEMA_REGISTRY": SchemaRegistryGenericChargeback,
     "KSQL_NUM_CSU": KSQLNumCSUChargeback,
     "KSQL_NUM_CSUS": KSQLNumCSUChargeback,
 }
 
+# Inputs declared for the row based executors. Row based executors that are not listed here are assumed to need
+# every input they can receive. The ones that do not read the metrics are computed once per billing day instead of
+# every hour.
+ROW_EXECUTOR_INPUT_TYPES = {
+    KafkaNetworkReadChargeback: (ChargebackExecutorInputType.METRICS_ROWS,),
+    KafkaNetworkWriteChargeback: (ChargebackExecutorInputType.METRICS_ROWS,),
+    KafkaNumCKUChargeback: (ChargebackExecutorInputType.METRICS_ROWS, ChargebackExecutorInputType.OBJECTS_CATALOG),
+    KafkaBaseChargeback: (ChargebackExecutorInputType.OBJECTS_CATALOG,),
+    AuditLogReadChargeback: (ChargebackExecutorInputType.OBJECTS_CATALOG,),
+    ConnectCapacityChargeback: (ChargebackExecutorInputType.OBJECTS_CATALOG,),
+    ConnectTasksChargeback: (ChargebackExecutorInputType.OBJECTS_CATALOG,),
+    SchemaRegistryGenericChargeback: (ChargebackExecutorInputType.OBJECTS_CATALOG,),
+    KSQLNumCSUChargeback: (ChargebackExecutorInputType.OBJECTS_CATALOG,),
+}
+
+# Product types whose split depends on the API Keys created for the Kafka cluster
+API_KEY_DEPENDENT_KAFKA_PRODUCT_TYPES = [
+    "KAFKA_BASE",
+    "KAFKA_PARTITION",
+    "KAFKA_STORAGE",
+    "KAFKA_NUM_CKU",
+    "KAFKA_NUM_CKUS",
+]
+SCHEMA_REGISTRY_PRODUCT_TYPES = ["GOVERNANCE_BASE", "SCHEMA_REGISTRY"]
+ZERO_COST_TOLERANCE = decimal.Decimal("1e-18")
+RECONCILIATION_DRIFT_TOLERANCE = 1e-6
+# Billing columns holding the per hour share of a billing line, summed when the lines of a day are combined
+BILLING_SPLIT_COLUMNS = [
+    BILLING_API_COLUMNS.calc_split_quantity,
+    BILLING_API_COLUMNS.calc_split_amt,
+    BILLING_API_COLUMNS.calc_split_total,
+]
+
+
+@logged_method
+def get_daily_billing_rows(billing_data: pd.DataFrame, day: datetime.datetime) -> pd.DataFrame:
+    """One representative hour per billing key (environment, resource, product & line type) for the day.
+    Every billing line with the key is included: the split columns hold the day total of all the rows with the key
+    divided by 24, so the day fanned out to 24 hours adds up to the billed amount even when the key has several
+    lines, e.g. after a price change. The other columns are taken from the first row of the key.
+
+    Args:
+        billing_data (pd.DataFrame): Billing rows within the day
+        day (datetime.datetime): UTC midnight of the day, used as the timestamp of the returned rows
+
+    Returns:
+        pd.DataFrame: One row per billing key with the same columns & index levels as billing_data
+    """
+    non_ts_levels = [x for x in billing_data.index.names if x != BILLING_API_COLUMNS.calc_timestamp]
+    key_groups = billing_data.sort_index(level=BILLING_API_COLUMNS.calc_timestamp).groupby(
+        level=non_ts_levels, sort=False, dropna=False
+    )
+    day_rows = key_groups.head(1).droplevel(BILLING_API_COLUMNS.calc_timestamp)
+    split_columns = [x for x in BILLING_SPLIT_COLUMNS if x in billing_data.columns]
+    day_totals = key_groups[split_columns].agg(lambda x: sum(x.to_list()))
+    for column in split_columns:
+        day_rows[column] = [x / HOURS_PER_DAY for x in day_totals.loc[day_rows.index, column]]
+    day_rows = pd.concat({pd.Timestamp(day): day_rows}, names=[BILLING_API_COLUMNS.calc_timestamp])
+    return day_rows.reorder_levels(billing_data.index.names)
+
 
 @dataclass(kw_only=True)
 class CCloudChargebackHandler(AbstractDataHandler):
@@ -99,11 +218,39 @@ class CCloudChargebackHandler(AbstractDataHandler):
     start_date: datetime.datetime = field(init=True)
     days_per_query: int = field(default=7)
     max_days_in_memory: int = field(default=14)
+    allocation_params: ChargebackAllocationParams = field(default_factory=ChargebackAllocationParams)
+    # Product type --> executor compiled from the declarative allocation policies. Overrides CHARGEBACK_EXECUTORS.
+    allocation_policies: Dict[str, VectorizedChargebackExecutor] = field(default_factory=dict)
+    # Optional engine that computes every window next to this one for comparison. Its output is never exposed.
+    shadow_engine: ChargebackShadowEngine | None = field(default=None)
+    # Number of hours outside the in-memory window that are kept after an on demand computation
+    hour_cache_size: int = field(default=48)
+    # Optional compressed store that the closed days are moved into instead of keeping them in the datasets below
+    chargeback_history: ChargebackHistory | None = field(default=None)
+    # Optional cap on the exposed principals per product type & env ID, the long tail is folded into one series
+    cardinality_guard: ChargebackCardinalityGuard | None = field(default=None)
+    # Collectors of the org that exposes the chargeback
+    prom_collectors: ScopedCollectors = field(default_factory=ScopedCollectors, repr=False)
+    # False skips the compute of the first window, e.g. for the streaming & backfill modes
+    read_on_init: bool = field(default=True)
 
     last_available_date: datetime.datetime = field(init=False)
+    # (principal, epoch hour, product type, env ID) --> (usage cost, shared cost)
     chargeback_dataset: Dict = field(init=False, repr=False, default_factory=dict)
+    # Same structure as chargeback_dataset, but keyed by the epoch hour of the day for the metric independent product types.
+    # The per hour cost is stored once per day and fanned out to the 24 hours of the day when read.
+    daily_chargeback_dataset: Dict = field(init=False, repr=False, default_factory=dict)
+    # Billed vs allocated cost per (Interval, EnvironmentID, Type) for the computed windows
+    reconciliation_dataset: pd.DataFrame = field(init=False, repr=False, default=None)
     curr_export_datetime: datetime.datetime = field(init=False)
-    metrics_collector: TimestampedCollector = field(init=False)
+    metrics_collector: ArrayTimestampedCollector = field(init=False)
+    split_ratio_cache: SplitRatioCache = field(init=False, repr=False, default_factory=SplitRatioCache)
+    objects_version_applied: int = field(init=False, default=0)
+    # Hours for which chargeback_dataset & daily_chargeback_dataset hold the computed output. [start, end)
+    computed_window_start: datetime.datetime | None = field(init=False, default=None)
+    computed_window_end: datetime.datetime | None = field(init=False, default=None)
+    # LRU of the hours computed on demand: epoch hour --> chargeback rows for the hour
+    computed_hours: OrderedDict = field(init=False, repr=False, default_factory=OrderedDict)
 
     def __post_init__(self) -> None:
         """Initialize the Chargeback handler:
@@ -119,10 +266,13 @@ class CCloudChargebackHandler(AbstractDataHandler):
         # )
         # Calculate the end_date from start_date plus number of days per query
         self.last_available_date = self.start_date + datetime.timedelta(days=self.days_per_query)
-        self.read_all(start_date=self.start_date, end_date=self.last_available_date)
+        self.objects_version_applied = self.objects_dataset.objects_version
         # self.attach(chargeback_prom_metrics)
         self.curr_export_datetime = self.start_date
-        self.metrics_collector = chargeback_prom_metrics
+        self.metrics_collector = self.prom_collectors.get(chargeback_prom_metrics)
+        if not self.read_on_init:
+            return
+        self.read_all(start_date=self.start_date, end_date=self.last_available_date)
         self.update(notifier=self.metrics_collector)
 
     @logged_method
@@ -151,27 +301,40 @@ class CCloudChargebackHandler(AbstractDataHandler):
         # chargeback_prom_status_metrics.clear()
         # chargeback_prom_status_metrics.set(1)
         self.force_clear_prom_metrics()
+        reconciliation_collector = self.prom_collectors.get(chargeback_reconciliation_prom_metrics)
+        folded_principals_collector = self.prom_collectors.get(chargeback_folded_principals_prom_metrics)
+        rows = self.get_chargeback_rows_for_hour(time_slice=ts_filter)
+        if self.cardinality_guard is not None:
+            rows, folded_counts = self.cardinality_guard.fold_rows(rows=rows)
+            folded_principals_collector.set_timestamp(curr_timestamp=ts_filter.to_pydatetime())
+            folded_principals_collector.set_samples(label_values=folded_counts.keys(), values=folded_counts.values())
+        label_values, values = [], []
+        for principal_id, _, product_type, env_id, usage_cost, shared_cost in rows:
+            label_values.append((principal_id, product_type, env_id, CHARGEBACK_COLUMNS.USAGE_COST))
+            values.append(usage_cost)
+            label_values.append((principal_id, product_type, env_id, CHARGEBACK_COLUMNS.SHARED_COST))
+            values.append(shared_cost)
+        self.metrics_collector.set_samples(label_values=label_values, values=values)
+
+        reconciliation_collector.set_timestamp(curr_timestamp=ts_filter.to_pydatetime())
         out, is_none = self._get_dataset_for_exact_timestamp(
-            dataset=self.get_chargeback_dataframe(), ts_column_name=CHARGEBACK_COLUMNS.TS, time_slice=ts_filter
+            dataset=self.reconciliation_dataset, ts_column_name=BILLING_API_COLUMNS.calc_timestamp, time_slice=ts_filter
         )
         if not is_none:
-            for df_row in out.itertuples(name="ChargeBackData"):
-                principal_id = df_row[0][0]
+            label_values, values = [], []
+            for df_row in out.itertuples(name="ReconciliationData"):
+                env_id = df_row[0][1]
                 product_type = df_row[0][2]
-                env_id = df_row[0][3]
-                usage_cost = df_row[1]
-                shared_cost = df_row[2]
-
-                chargeback_prom_metrics.labels(principal_id, product_type, env_id, CHARGEBACK_COLUMNS.USAGE_COST).set(
-                    usage_cost
-                )
-                chargeback_prom_metrics.labels(principal_id, product_type, env_id, CHARGEBACK_COLUMNS.SHARED_COST).set(
-                    shared_cost
-                )
+                for reconciliation_type in [RECONCILIATION_COLUMNS.DRIFT, RECONCILIATION_COLUMNS.UNALLOCATED]:
+                    label_values.append((product_type, env_id, reconciliation_type))
+                    values.append(getattr(df_row, reconciliation_type))
+            reconciliation_collector.set_samples(label_values=label_values, values=values)
 
     @logged_method
     def force_clear_prom_metrics(self):
-        chargeback_prom_metrics.clear()
+        self.metrics_collector.clear()
+        self.prom_collectors.get(chargeback_reconciliation_prom_metrics).clear()
+        self.prom_collectors.get(chargeback_folded_principals_prom_metrics).clear()
 
     @logged_method
     def read_all(self, start_date: datetime.datetime, end_date: datetime.datetime, **kwargs):
@@ -181,19 +344,95 @@ class CCloudChargebackHandler(AbstractDataHandler):
             start_date (datetime.datetime): Inclusive datetime for the period beginning
             end_date (datetime.datetime): Exclusive datetime for the period ending
         """
+        if self.shadow_engine is not None:
+            self.shadow_engine.run_window(chargeback_handler=self, start_date=start_date, end_date=end_date)
+        else:
+            self.compute_window(start_date=start_date, end_date=end_date)
+        self.reconcile(start_date=start_date, end_date=end_date)
+        self.computed_window_start = (
+            start_date if self.computed_window_start is None else min(self.computed_window_start, start_date)
+        )
+        self.computed_window_end = end_date if self.computed_window_end is None else max(self.computed_window_end, end_date)
+        # The inputs might have been refreshed, so the hours computed on demand are stale
+        self.computed_hours.clear()
+
+    @logged_method
+    def compute_window(self, start_date: datetime.datetime, end_date: datetime.datetime):
+        """Calculate the chargeback for every day & hour in the window and add it to the chargeback datasets.
+
+        Args:
+            start_date (datetime.datetime): Inclusive datetime for the period beginning
+            end_date (datetime.datetime): Exclusive datetime for the period ending
+        """
+        for day_item in self._generate_date_range_per_row(start_date=start_date, end_date=end_date, freq="1D"):
+            self.compute_daily_output(day=day_item)
         for time_slice_item in self._generate_date_range_per_row(start_date=start_date, end_date=end_date):
             self.compute_output(time_slice=time_slice_item)
 
+    @logged_method
+    def reconcile(self, start_date: datetime.datetime, end_date: datetime.datetime):
+        """Verify that the allocated chargeback adds up to the billing cost for every hour, environment & product
+        type in the window. The result replaces any older reconciliation for the same window.
+
+        Args:
+            start_date (datetime.datetime): Inclusive datetime for the period beginning
+            end_date (datetime.datetime): Exclusive datetime for the period ending
+        """
+        billing_data, _ = self.billing_dataset.get_dataset_for_timerange(
+            start_datetime=start_date, end_datetime=end_date
+        )
+        window_reconciliation = reconcile_chargeback(
+            billing_data=billing_data,
+            chargeback_dataset=self.chargeback_dataset,
+            daily_chargeback_dataset=self.daily_chargeback_dataset,
+            allocatable_product_types=set(CHARGEBACK_EXECUTORS.keys()) | set(self.allocation_policies.keys()),
+        )
+        if self.reconciliation_dataset is not None and not self.reconciliation_dataset.empty:
+            ts_values = self.reconciliation_dataset.index.get_level_values(BILLING_API_COLUMNS.calc_timestamp)
+            retained = self.reconciliation_dataset[
+                (ts_values < pd.to_datetime(start_date)) | (ts_values >= pd.to_datetime(end_date))
+            ]
+            window_reconciliation = pd.concat([retained, window_reconciliation]).sort_index()
+        self.reconciliation_dataset = window_reconciliation
+        abs_drift = window_reconciliation[RECONCILIATION_COLUMNS.DRIFT].abs().sum()
+        unallocated = window_reconciliation[RECONCILIATION_COLUMNS.UNALLOCATED].sum()
+        if abs_drift > RECONCILIATION_DRIFT_TOLERANCE:
+            LOGGER.warning(
+                f"Chargeback does not reconcile with Billing between {start_date} and {end_date}. "
+                f"Absolute drift: {abs_drift}, Unallocated: {unallocated}"
+            )
+        else:
+            LOGGER.debug(f"Chargeback reconciled with Billing between {start_date} and {end_date}.")
+
+    @logged_method
+    def get_reconciliation_summary(self) -> Dict:
+        return summarize_reconciliation(reconciliation_dataset=self.reconciliation_dataset)
+
     @logged_method
     def cleanup_old_data(self, retention_start_date: datetime.datetime):
         """Cleanup the older dataset from the chargeback object and prevent it from using too much memory"""
+        retention_start_hour = to_epoch_hour(retention_start_date)
         for (k1, k2, k3, k4), (_, _) in self.chargeback_dataset.copy().items():
-            if k2 < retention_start_date:
+            if k2 < retention_start_hour:
                 del self.chargeback_dataset[(k1, k2, k3, k4)]
+        retention_start_day = epoch_hour_to_day(retention_start_hour)
+        for (k1, k2, k3, k4), (_, _) in self.daily_chargeback_dataset.copy().items():
+            if k2 < retention_start_day:
+                del self.daily_chargeback_dataset[(k1, k2, k3, k4)]
+        if self.reconciliation_dataset is not None:
+            self.reconciliation_dataset = self.reconciliation_dataset[
+                self.reconciliation_dataset.index.get_level_values(BILLING_API_COLUMNS.calc_timestamp)
+                >= pd.to_datetime(retention_start_date)
+            ]
+        if self.computed_window_start is not None:
+            self.computed_window_start = max(self.computed_window_start, retention_start_date)
 
     @logged_method
     def read_next_dataset(self, exposed_timestamp: datetime.datetime):
         """Calculate chargeback data fom the next timeslot. This should be used when the current_export_datetime is running very close to the days_per_query end_date."""
+        objects_diff = self.objects_dataset.last_objects_diff
+        if objects_diff is not None and objects_diff.current_version > self.objects_version_applied:
+            self.apply_objects_diff(objects_diff=objects_diff)
         if self.is_next_fetch_required(exposed_timestamp, self.last_available_date, 2):
             effective_dates = self.calculate_effective_dates(
                 self.last_available_date, self.days_per_query, self.max_days_in_memory
@@ -201,9 +440,54 @@ class CCloudChargebackHandler(AbstractDataHandler):
             self.read_all(effective_dates.next_fetch_start_date, effective_dates.next_fetch_end_date)
             self.last_available_date = effective_dates.next_fetch_end_date
             self.cleanup_old_data(retention_start_date=effective_dates.retention_start_date)
+        self.move_closed_days_to_history(closed_before=exposed_timestamp)
         self.curr_export_datetime = exposed_timestamp
         self.update(notifier=self.metrics_collector)
 
+    @logged_method
+    def move_closed_days_to_history(self, closed_before: datetime.datetime):
+        """Move the chargeback of the days before the day of closed_before into the compressed history. These days
+        have been exposed already, so they are only read again for re-exposition and queries.
+
+        Args:
+            closed_before (datetime.datetime): The days before the UTC midnight of this datetime are closed
+        """
+        if self.chargeback_history is None or self.computed_window_start is None:
+            return
+        closed_before_hour = epoch_hour_to_day(to_epoch_hour(closed_before))
+        if to_epoch_hour(self.computed_window_start) >= closed_before_hour:
+            return
+        hourly_rows: Dict[int, List[Tuple]] = {}
+        for row_key, (usage, shared) in list(self.chargeback_dataset.items()):
+            if row_key[1] < closed_before_hour:
+                hourly_rows.setdefault(epoch_hour_to_day(row_key[1]), []).append((*row_key, usage, shared))
+                del self.chargeback_dataset[row_key]
+        daily_rows: Dict[int, List[Tuple]] = {}
+        for (principal, epoch_day, product_type, env_id), (usage, shared) in list(
+            self.daily_chargeback_dataset.items()
+        ):
+            if epoch_day < closed_before_hour:
+                daily_rows.setdefault(epoch_day, []).append((principal, product_type, env_id, usage, shared))
+                del self.daily_chargeback_dataset[(principal, epoch_day, product_type, env_id)]
+        for epoch_day in sorted(hourly_rows.keys() | daily_rows.keys()):
+            self.chargeback_history.add_day(
+                day_start_hour=epoch_day,
+                hourly_rows=hourly_rows.get(epoch_day, []),
+                daily_rows=daily_rows.get(epoch_day, []),
+            )
+        self.computed_window_start = max(self.computed_window_start, from_epoch_hour(closed_before_hour))
+        LOGGER.info(
+            f"Moved the Chargeback before {self.computed_window_start} to the compressed history. "
+            f"History size: {len(self.chargeback_history.chunks)} days, {self.chargeback_history.nbytes} bytes"
+        )
+
+    def is_hour_in_history(self, time_slice: datetime.datetime) -> bool:
+        return (
+            self.chargeback_history is not None
+            and not self.is_hour_in_memory(time_slice=time_slice)
+            and self.chargeback_history.has_hour(epoch_hour=to_epoch_hour(time_slice))
+        )
+
     @logged_method
     def get_dataset_for_timerange(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime, **kwargs):
         """Wrapper over the internal method so that cross-imports are not necessary
@@ -226,43 +510,166 @@ class CCloudChargebackHandler(AbstractDataHandler):
     def add_cost_to_chargeback_dataset(
         self,
         principal: str,
-        time_slice: datetime.datetime,
+        time_slice: datetime.datetime | int,
         product_type_name: str,
         env_id: str,
         additional_usage_cost: decimal.Decimal = decimal.Decimal(0),
         additional_shared_cost: decimal.Decimal = decimal.Decimal(0),
+        day_granularity: bool = False,
     ):
         """Internal chargeback Data structure to hold all the calculated chargeback data in memory.
         As the column names & values were needed to be dynamic, we did not use a dataframe here for ease of use.
 
         Args:
             principal (str): The Principal used for Chargeback Aggregation -- Primary Complex key
-            time_slice (datetime.datetime): datetime of the Hour used for chargeback aggregation -- Primary complex key
+            time_slice (datetime.datetime | int): datetime or epoch hour of the Hour used for chargeback aggregation -- Primary complex key. Stored as the epoch hour.
             product_type_name (str): The different product names available in CCloud for aggregation
             additional_usage_cost (decimal.Decimal, optional): Is the cost Usage cost for that product type and what is the total usage cost for that duration? Defaults to decimal.Decimal(0).
             additional_shared_cost (decimal.Decimal, optional): Is the cost Shared cost for that product type and what is the total shared cost for that duration. Defaults to decimal.Decimal(0).
+            day_granularity (bool, optional): time_slice is a day and the costs are the per hour costs for every hour of that day. Defaults to False.
         """
-        row_key = (principal, time_slice, product_type_name, env_id)
-        if row_key in self.chargeback_dataset:
-            u, s = self.chargeback_dataset[row_key]
-            self.chargeback_dataset[row_key] = (
+        chargeback_dataset = self.daily_chargeback_dataset if day_granularity else self.chargeback_dataset
+        epoch_hour = time_slice if isinstance(time_slice, int) else to_epoch_hour(time_slice)
+        row_key = (principal, epoch_hour, product_type_name, env_id)
+        if row_key in chargeback_dataset:
+            u, s = chargeback_dataset[row_key]
+            chargeback_dataset[row_key] = (
                 u + additional_usage_cost,
                 s + additional_shared_cost,
             )
         else:
-            self.chargeback_dataset[row_key] = (
+            chargeback_dataset[row_key] = (
                 additional_usage_cost,
                 additional_shared_cost,
             )
 
+    @logged_method
+    def get_day_for_time_slice(self, time_slice: datetime.datetime) -> datetime.datetime:
+        """Day (UTC midnight) that the time slice belongs to. Used as the key for the daily chargeback dataset."""
+        return pd.Timestamp(time_slice).floor("D").to_pydatetime()
+
+    def iter_chargeback_keys(self, time_slice: datetime.datetime | None = None):
+        """Same as iter_chargeback_rows, but with the epoch hour instead of the datetime. Used internally to avoid
+        building datetime objects for every row.
+
+        Yields:
+            Tuple: (principal, epoch hour, product type, env ID, usage cost, shared cost)
+        """
+        if time_slice is None:
+            if self.chargeback_history is not None:
+                # Days that were computed again after being closed are read from the datasets
+                history_end_hour = (
+                    None if self.computed_window_start is None else to_epoch_hour(self.computed_window_start)
+                )
+                for row in self.chargeback_history.iter_rows():
+                    if history_end_hour is not None and row[1] >= history_end_hour:
+                        break
+                    yield row
+            for (principal, epoch_hour, product_type, env_id), (usage, shared) in self.chargeback_dataset.items():
+                yield principal, epoch_hour, product_type, env_id, usage, shared
+            for (principal, epoch_day, product_type, env_id), (usage, shared) in self.daily_chargeback_dataset.items():
+                for hour in range(24):
+                    yield principal, epoch_day + hour, product_type, env_id, usage, shared
+            return
+
+        if self.is_hour_in_history(time_slice=time_slice):
+            yield from self.chargeback_history.iter_hour(epoch_hour=to_epoch_hour(time_slice))
+            return
+        epoch_hour = to_epoch_hour(time_slice)
+        for (principal, row_hour, product_type, env_id), (usage, shared) in self.chargeback_dataset.items():
+            if row_hour == epoch_hour:
+                yield principal, epoch_hour, product_type, env_id, usage, shared
+        epoch_day = epoch_hour_to_day(epoch_hour)
+        for (principal, row_day, product_type, env_id), (usage, shared) in self.daily_chargeback_dataset.items():
+            if row_day == epoch_day:
+                yield principal, epoch_hour, product_type, env_id, usage, shared
+
+    def iter_chargeback_rows(self, time_slice: datetime.datetime | None = None):
+        """Iterate through the chargeback rows with the daily rows fanned out to every hour of their day.
+        The fan out is lazy, so the daily rows are never materialized 24 times in memory.
+
+        Args:
+            time_slice (datetime.datetime, optional): Only yield the rows for this hour. Defaults to all the hours.
+
+        Yields:
+            Tuple: (principal, time slice, product type, env ID, usage cost, shared cost)
+        """
+        hour_datetimes: Dict[int, datetime.datetime] = {}
+        for principal, epoch_hour, product_type, env_id, usage, shared in self.iter_chargeback_keys(time_slice):
+            if epoch_hour not in hour_datetimes:
+                hour_datetimes[epoch_hour] = from_epoch_hour(epoch_hour)
+            yield principal, hour_datetimes[epoch_hour], product_type, env_id, usage, shared
+
+    @logged_method
+    def is_hour_in_memory(self, time_slice: datetime.datetime) -> bool:
+        if self.computed_window_start is None or self.computed_window_end is None:
+            return False
+        return self.computed_window_start <= time_slice < self.computed_window_end
+
+    @logged_method
+    def get_chargeback_rows_for_hour(self, time_slice: datetime.datetime) -> List[Tuple]:
+        """Chargeback rows for any hour. Hours within the in-memory window are read from the chargeback datasets.
+        Other hours are computed on demand from the billing, metrics & objects stores and kept in a size bounded LRU,
+        so re-exposing or inspecting an older hour costs one hour of compute instead of a replay of the window.
+
+        Args:
+            time_slice (datetime.datetime): The hour to read
+
+        Returns:
+            List[Tuple]: (principal, time slice, product type, env ID, usage cost, shared cost)
+        """
+        if self.is_hour_in_memory(time_slice=time_slice) or self.is_hour_in_history(time_slice=time_slice):
+            return list(self.iter_chargeback_rows(time_slice=time_slice))
+        epoch_hour = to_epoch_hour(time_slice)
+        if epoch_hour in self.computed_hours:
+            self.computed_hours.move_to_end(epoch_hour)
+            return self.computed_hours[epoch_hour]
+        out = self.compute_hour(time_slice=time_slice)
+        self.computed_hours[epoch_hour] = out
+        while len(self.computed_hours) > self.hour_cache_size:
+            self.computed_hours.popitem(last=False)
+        return out
+
+    @logged_method
+    def compute_hour(self, time_slice: datetime.datetime) -> List[Tuple]:
+        """Compute the chargeback for a single hour into a detached copy of the handler. The chargeback datasets of
+        this handler are left untouched.
+
+        Args:
+            time_slice (datetime.datetime): The hour to compute
+
+        Returns:
+            List[Tuple]: (principal, time slice, product type, env ID, usage cost, shared cost)
+        """
+        LOGGER.info(f"Computing Chargeback on demand for Timestamp: {time_slice}")
+        hour_handler = copy.copy(self)
+        hour_handler.chargeback_dataset = {}
+        hour_handler.daily_chargeback_dataset = {}
+        hour_handler.shadow_engine = None
+        hour_handler.chargeback_history = None
+        hour_handler.computed_hours = OrderedDict()
+        day = self.get_day_for_time_slice(time_slice=time_slice)
+        billing_data, is_none = self.billing_dataset.get_dataset_for_timerange(
+            start_datetime=day, end_datetime=day + datetime.timedelta(days=1)
+        )
+        if is_none or billing_data.empty:
+            LOGGER.debug(f"No Billing data available in memory for {time_slice}")
+            return []
+        hour_handler.compute_daily_output(day=day, billing_data=billing_data)
+        hour_handler.compute_output(time_slice=time_slice)
+        return list(hour_handler.iter_chargeback_rows(time_slice=time_slice))
+
     @logged_method
     def get_chargeback_dataset(self):
         temp_ds = []
-        for (principal, ts, product_type, env_id), (usage, shared) in self.chargeback_dataset.items():
-            next_ts = self._generate_next_timestamp(curr_date=ts, position=0)
+        # Every epoch hour is converted to a Timestamp once instead of once per row
+        hour_timestamps: Dict[int, pd.Timestamp] = {}
+        for principal, epoch_hour, product_type, env_id, usage, shared in self.iter_chargeback_keys():
+            if epoch_hour not in hour_timestamps:
+                hour_timestamps[epoch_hour] = pd.Timestamp(from_epoch_hour(epoch_hour))
             temp_dict = {
                 CHARGEBACK_COLUMNS.PRINCIPAL: principal,
-                CHARGEBACK_COLUMNS.TS: next_ts,
+                CHARGEBACK_COLUMNS.TS: hour_timestamps[epoch_hour],
                 CHARGEBACK_COLUMNS.PRODUCT_TYPE: product_type,
                 CHARGEBACK_COLUMNS.ENV_ID: env_id,
                 CHARGEBACK_COLUMNS.USAGE_COST: usage,
@@ -297,65 +704,355 @@ class CCloudChargebackHandler(AbstractDataHandler):
     def compute_output(
         self,
         time_slice: datetime.datetime,
+        billing_data: pd.DataFrame | None = None,
+        objects_dataset: CCloudObjectsHandler | None = None,
+        subtract: bool = False,
+        day_granularity: bool = False,
     ):
         """The core calculation method. This method aggregates all the costs on
            a per product type basis for every principal per hour and appends that
-           calculated dataset in chargeback_dataset object attribute
+           calculated dataset in chargeback_dataset object attribute.
+           Metric independent product types are skipped here as they are calculated by compute_daily_output.
 
         Args:
             time_slice (datetime.datetime): The exact timestamp for which the compute will happen
+            billing_data (pd.DataFrame, optional): Billing rows to allocate. Defaults to all the billing rows for the time slice.
+            objects_dataset (CCloudObjectsHandler, optional): Objects catalog used for the allocation. Defaults to the catalog snapshot that applied at the time slice.
+            subtract (bool, optional): Remove the allocation from the chargeback dataset instead of adding it. Defaults to False.
+            day_granularity (bool, optional): Only calculate the metric independent product types and store them in daily_chargeback_dataset. Defaults to False.
         """
-
+        if objects_dataset is None:
+            objects_dataset = self.objects_dataset.get_objects_as_of(ts=time_slice)
         handlers_base = CCloudChargebackHandlersInputBase(
             ccloud_billing_handler=self.billing_dataset,
             prometheus_metrics_data_handler=self.metrics_dataset,
-            ccloud_objects_handler=self.objects_dataset,
+            ccloud_objects_handler=objects_dataset,
             ccloud_chargeback_handler=self,
+            allocation_params=self.allocation_params,
         )
 
-        billing_data = self.billing_dataset.get_dataset_for_time_slice(time_slice=time_slice)
+        if billing_data is None:
+            billing_data = self.billing_dataset.get_dataset_for_time_slice(time_slice=time_slice)
         metrics_data = self.metrics_dataset.get_dataset_for_time_slice(time_slice=time_slice)
-        for bill_row in billing_data.itertuples(index=True, name="BillingRow"):
-            row_ts, row_env, row_cid, row_pname, row_ptype = (
-                bill_row.Index[0].to_pydatetime(),
-                bill_row.Index[1],
-                bill_row.Index[2],
-                bill_row.Index[3],
-                bill_row.Index[4],
-            )
-
-            df_time_slice = pd.Timestamp(time_slice)
+        if billing_data.empty:
+            return
+        # Inputs that are shared by multiple executors are prepared only once per time slice and only if needed.
+        usage_data, ownership_index = None, None
+        flat_billing_data = billing_data.reset_index()
+        for row_ptype, billing_rows in flat_billing_data.groupby(BILLING_API_COLUMNS.product_type, sort=False):
+            LOGGER.debug(f"Locating Chargeback Executor for {row_ptype}")
+            chargeback_executor = self.locate_chargeback_executor(product_type=row_ptype)
+            LOGGER.debug(f"Found Chargeback Executor for {row_ptype} is {chargeback_executor}")
+            if chargeback_executor is None:
+                LOGGER.warning(
+                    f"No Chargeback calculation available for {row_ptype}. Please request for it to be added. The data might be an inaccurate split for {row_ptype}"
+                )
+                continue
+            if self.is_metric_independent(chargeback_executor=chargeback_executor) != day_granularity:
+                continue
 
-            row_cname = getattr(bill_row, BILLING_API_COLUMNS.cluster_name)
-            row_cost = getattr(bill_row, BILLING_API_COLUMNS.calc_split_total)
+            if ChargebackExecutorInputType.USAGE_METRIC in chargeback_executor.input_types and usage_data is None:
+                usage_data = self.metrics_dataset.get_usage_dataframe_for_time_slice(time_slice=time_slice)
+            if ChargebackExecutorInputType.OWNERSHIP_INDEX in chargeback_executor.input_types and ownership_index is None:
+                ownership_index = objects_dataset.get_api_key_ownership_index()
 
-            row_input_object = ChargebackExecutorInputObject(
+            cb_vector_input = VectorizedChargebackExecutorInputObject(
                 input_time_slice=time_slice,
+                product_type=row_ptype,
+                billing_rows=billing_rows,
                 billing_dataframe=billing_data,
                 metrics_dataframe=metrics_data,
-                row_timestamp=row_ts,
-                row_env_id=row_env,
-                row_cluster_id=row_cid,
-                row_cluster_name=row_cname,
-                row_product_name=row_pname,
-                row_product_type=row_ptype,
-                row_billing_cost=row_cost,
+                usage_dataframe=usage_data,
+                ownership_index=ownership_index,
+            )
+            if row_ptype in SPLIT_RATIO_PRODUCT_TYPES and self.is_metric_independent(
+                chargeback_executor=chargeback_executor
+            ):
+                cb_output = self.allocate_with_split_ratios(
+                    chargeback_executor=chargeback_executor,
+                    cb_handler_input=handlers_base,
+                    cb_vector_input=cb_vector_input,
+                )
+            else:
+                cb_output = chargeback_executor(cb_handler_input=handlers_base, cb_vector_input=cb_vector_input)
+            self.add_executor_output_to_chargeback_dataset(
+                cb_output=cb_output, subtract=subtract, day_granularity=day_granularity
             )
 
-            LOGGER.debug(f"Locating Chargeback Executor for {row_ptype}")
-            chargeback_executor = CHARGEBACK_EXECUTORS.get(row_ptype, None)
-            LOGGER.debug(f"Found Chargeback Executor for {row_ptype} is {chargeback_executor}")
-            if chargeback_executor is None:
-                LOGGER.warning(
-                    f"No Chargeback calculation available for {row_ptype}. Please request for it to be added. The data might be an inaccurate split for {row_ptype}"
+    @logged_method
+    def compute_daily_output(
+        self,
+        day: datetime.datetime,
+        billing_data: pd.DataFrame | None = None,
+        objects_dataset: CCloudObjectsHandler | None = None,
+        subtract: bool = False,
+    ):
+        """Calculate the metric independent product types once for the whole day.
+        The Billing handler splits every daily cost evenly across the 24 hours, so a single representative hour
+        per billing key is allocated and stored with the day as the key in daily_chargeback_dataset.
+        See get_daily_billing_rows.
+
+        Args:
+            day (datetime.datetime): UTC midnight of the day for which the compute will happen
+            billing_data (pd.DataFrame, optional): Billing rows within the day to allocate. Defaults to all the billing rows for the day.
+            objects_dataset (CCloudObjectsHandler, optional): Objects catalog used for the allocation. Defaults to the catalog snapshot that applied at the start of the day.
+            subtract (bool, optional): Remove the allocation from the chargeback dataset instead of adding it. Defaults to False.
+        """
+        if billing_data is None:
+            billing_data, is_none = self.billing_dataset.get_dataset_for_timerange(
+                start_datetime=day, end_datetime=day + datetime.timedelta(days=1)
+            )
+            if is_none:
+                return
+        if billing_data.empty:
+            return
+        self.compute_output(
+            time_slice=day,
+            billing_data=get_daily_billing_rows(billing_data=billing_data, day=day),
+            objects_dataset=objects_dataset,
+            subtract=subtract,
+            day_granularity=True,
+        )
+
+    @logged_method
+    def is_metric_independent(self, chargeback_executor: VectorizedChargebackExecutor | None) -> bool:
+        """Metric independent executors produce the same allocation for every hour of a billing day.
+
+        Args:
+            chargeback_executor (VectorizedChargebackExecutor | None): Executor located for the product type
+
+        Returns:
+            bool: True if the executor declares neither the usage metrics nor the metrics rows as an input
+        """
+        return chargeback_executor is not None and not (
+            ChargebackExecutorInputType.USAGE_METRIC in chargeback_executor.input_types
+            or ChargebackExecutorInputType.METRICS_ROWS in chargeback_executor.input_types
+        )
+
+    @logged_method
+    def allocate_with_split_ratios(
+        self,
+        chargeback_executor: VectorizedChargebackExecutor,
+        cb_handler_input: CCloudChargebackHandlersInputBase,
+        cb_vector_input: VectorizedChargebackExecutorInputObject,
+    ) -> VectorizedChargebackExecutorOutputObject:
+        """Allocate the billing rows for product types whose split only depends on the objects catalog.
+        The split ratios are calculated once per resource & objects version by running the executor for a unit
+        cost billing row. After that, the allocation is a multiplication of the cost with the cached ratio vectors.
+
+        Args:
+            chargeback_executor (VectorizedChargebackExecutor): Executor used to calculate missing split ratios
+            cb_handler_input (CCloudChargebackHandlersInputBase): handler references passed to the executor
+            cb_vector_input (VectorizedChargebackExecutorInputObject): All the billing rows of the product type
+
+        Returns:
+            VectorizedChargebackExecutorOutputObject: Allocation arrays for the billing rows
+        """
+        objects_version = cb_handler_input.ccloud_objects_handler.objects_version
+        resource_columns = [BILLING_API_COLUMNS.env_id, BILLING_API_COLUMNS.cluster_id]
+        billing_rows = cb_vector_input.billing_rows
+        ratio_frames = []
+        for (env_id, resource_id), resource_rows in billing_rows.groupby(resource_columns, sort=False):
+            split_ratios = self.split_ratio_cache.get(
+                product_type=cb_vector_input.product_type,
+                resource=(env_id, resource_id),
+                objects_version=objects_version,
+            )
+            if split_ratios is None:
+                unit_row = resource_rows.head(1).assign(**{BILLING_API_COLUMNS.calc_split_total: decimal.Decimal(1)})
+                split_ratios = SplitRatios.from_unit_output(
+                    chargeback_executor(
+                        cb_handler_input=cb_handler_input,
+                        cb_vector_input=replace(cb_vector_input, billing_rows=unit_row),
+                    )
                 )
-                continue
+                self.split_ratio_cache.put(
+                    product_type=cb_vector_input.product_type,
+                    resource=(env_id, resource_id),
+                    objects_version=objects_version,
+                    split_ratios=split_ratios,
+                )
+            ratio_frames.append(
+                split_ratios.as_dataframe(
+                    **{BILLING_API_COLUMNS.env_id: env_id, BILLING_API_COLUMNS.cluster_id: resource_id}
+                )
+            )
+        if not ratio_frames:
+            return VectorizedChargebackExecutorOutputObject()
 
-            chargeback_executor(
-                cb_handler_input=handlers_base,
-                cb_input_row=row_input_object,
-                cb_append_function=CCloudChargebackCostAppender,
+        alloc = get_dataframe_backend().join(
+            left=billing_rows, right=pd.concat(ratio_frames, ignore_index=True), on=resource_columns, how="inner"
+        )
+        cost = alloc[BILLING_API_COLUMNS.calc_split_total].map(decimal.Decimal)
+        return VectorizedChargebackExecutorOutputObject(
+            principal=alloc[SPLIT_RATIO_COLUMNS.PRINCIPAL].to_list(),
+            time_slice=[x.to_pydatetime() for x in alloc[BILLING_API_COLUMNS.calc_timestamp]],
+            env_id=alloc[BILLING_API_COLUMNS.env_id].to_list(),
+            product_type_name=alloc[BILLING_API_COLUMNS.product_type].to_list(),
+            additional_usage_cost=(cost * alloc[SPLIT_RATIO_COLUMNS.USAGE_RATIO]).to_list(),
+            additional_shared_cost=(cost * alloc[SPLIT_RATIO_COLUMNS.SHARED_RATIO]).to_list(),
+        )
+
+    @logged_method
+    def locate_chargeback_executor(self, product_type: str) -> VectorizedChargebackExecutor | None:
+        """Find the executor for the product type. Allocation policies from the configuration take precedence over
+        the built-in executors. Row based executors are wrapped in the adapter so that the compute loop only needs
+        to understand the vectorized protocol.
+
+        Args:
+            product_type (str): Product type as provided by the Billing API
+
+        Returns:
+            VectorizedChargebackExecutor | None: Executor for the product type, None if no executor is registered
+        """
+        chargeback_executor = self.allocation_policies.get(product_type, CHARGEBACK_EXECUTORS.get(product_type, None))
+        if chargeback_executor is None or isinstance(chargeback_executor, VectorizedChargebackExecutor):
+            return chargeback_executor
+        if chargeback_executor in ROW_EXECUTOR_INPUT_TYPES:
+            return RowChargebackExecutorAdapter(
+                executor_func=chargeback_executor, input_types=ROW_EXECUTOR_INPUT_TYPES[chargeback_executor]
+            )
+        return RowChargebackExecutorAdapter(executor_func=chargeback_executor)
+
+    @logged_method
+    def add_executor_output_to_chargeback_dataset(
+        self,
+        cb_output: VectorizedChargebackExecutorOutputObject,
+        subtract: bool = False,
+        day_granularity: bool = False,
+    ):
+        """Add the allocation arrays returned by an executor to the chargeback dataset.
+
+        Args:
+            cb_output (VectorizedChargebackExecutorOutputObject): Allocation arrays calculated by the executor
+            subtract (bool, optional): Remove the allocation from the chargeback dataset instead. Defaults to False.
+            day_granularity (bool, optional): Add the allocation to the daily chargeback dataset. Defaults to False.
+        """
+        epoch_hours: Dict[datetime.datetime, int] = {}
+        for principal, time_slice, product_type_name, env_id, usage_cost, shared_cost in cb_output.iter_rows():
+            if time_slice not in epoch_hours:
+                epoch_hours[time_slice] = to_epoch_hour(time_slice)
+            self.add_cost_to_chargeback_dataset(
+                principal=principal,
+                time_slice=epoch_hours[time_slice],
+                product_type_name=product_type_name,
+                env_id=env_id,
+                additional_usage_cost=-usage_cost if subtract else usage_cost,
+                additional_shared_cost=-shared_cost if subtract else shared_cost,
+                day_granularity=day_granularity,
+            )
+
+    @logged_method
+    def locate_affected_chargeback_rows(self, objects_diff: CCloudObjectsDiff) -> Set[Tuple[str | None, str | None, str]]:
+        """Map a CCloud objects diff to the billing rows whose allocation depends on the changed objects.
+
+        Args:
+            objects_diff (CCloudObjectsDiff): Diff produced by the objects handler on refresh
+
+        Returns:
+            Set[Tuple[str | None, str | None, str]]: (env ID, resource ID, product type). None matches any value.
+        """
+        out = set()
+        for item in objects_diff.all_touched_objects("api_keys"):
+            for product_type in API_KEY_DEPENDENT_KAFKA_PRODUCT_TYPES:
+                out.add((None, item.cluster_id, product_type))
+            # Schema Registry falls back to every API Key in the environment, so any key might change the split
+            for product_type in SCHEMA_REGISTRY_PRODUCT_TYPES:
+                out.add((None, None, product_type))
+        for item in objects_diff.all_touched_objects("clusters"):
+            for product_type in API_KEY_DEPENDENT_KAFKA_PRODUCT_TYPES:
+                out.add((item.env_id, item.cluster_id, product_type))
+        if objects_diff.all_touched_objects("service_accounts") or objects_diff.all_touched_objects("users"):
+            out.add((None, None, "AUDIT_LOG_READ"))
+        for item in objects_diff.all_touched_objects("connectors"):
+            out.add((item.env_id, item.cluster_id, "CONNECT_CAPACITY"))
+            for product_type in ["CONNECT_NUM_TASKS", "CONNECT_THROUGHPUT"]:
+                out.add((item.env_id, item.connector_id, product_type))
+        for item in objects_diff.all_touched_objects("ksqldb_clusters"):
+            for product_type in ["KSQL_NUM_CSU", "KSQL_NUM_CSUS"]:
+                out.add((item.env_id, item.cluster_id, product_type))
+        return out
+
+    @logged_method
+    def apply_objects_diff(self, objects_diff: CCloudObjectsDiff):
+        """Recompute only the chargeback rows that are affected by an objects change for the in-memory window.
+        The allocation with the previous catalog is subtracted and the allocation with the current catalog is added.
+
+        Every hour is allocated with the catalog snapshot that applied at that time, so only the hours & days whose
+        snapshot the refresh changed are recomputed: the ones after the refresh and the ones before the first snapshot.
+
+        Args:
+            objects_diff (CCloudObjectsDiff): Diff produced by the objects handler on refresh
+        """
+        self.objects_version_applied = objects_diff.current_version
+        if objects_diff.is_empty() or objects_diff.previous_objects is None:
+            return
+        if not self.chargeback_dataset and not self.daily_chargeback_dataset:
+            return
+        affected_rows = self.locate_affected_chargeback_rows(objects_diff=objects_diff)
+        if not affected_rows:
+            return
+        window_start = from_epoch_hour(
+            min(k[1] for k in [*self.chargeback_dataset.keys(), *self.daily_chargeback_dataset.keys()])
+        )
+        billing_data, is_none = self.billing_dataset.get_dataset_for_timerange(
+            start_datetime=window_start, end_datetime=self.last_available_date
+        )
+        if is_none or billing_data.empty:
+            return
+        row_ts = billing_data.index.get_level_values(BILLING_API_COLUMNS.calc_timestamp)
+        affected_ts = [ts for ts in row_ts.unique() if objects_diff.changes_catalog_at(ts=ts)]
+        billing_data = billing_data[row_ts.isin(affected_ts)]
+        if billing_data.empty:
+            return
+
+        row_env = billing_data.index.get_level_values(BILLING_API_COLUMNS.env_id)
+        row_resource = billing_data.index.get_level_values(BILLING_API_COLUMNS.cluster_id)
+        row_ptype = billing_data.index.get_level_values(BILLING_API_COLUMNS.product_type)
+        mask = np.zeros(len(billing_data), dtype=bool)
+        for env_id, resource_id, product_type in affected_rows:
+            temp = row_ptype == product_type
+            if env_id is not None:
+                temp &= row_env == env_id
+            if resource_id is not None:
+                temp &= row_resource == resource_id
+            mask |= temp
+        affected_billing_data = billing_data[mask]
+        LOGGER.info(
+            f"Objects version {objects_diff.previous_version} --> {objects_diff.current_version}. "
+            f"Recomputing {len(affected_billing_data)} billing rows for {len(affected_rows)} affected resources."
+        )
+        for time_slice, slice_billing_data in affected_billing_data.groupby(
+            level=BILLING_API_COLUMNS.calc_timestamp, sort=True
+        ):
+            self.compute_output(
+                time_slice=time_slice,
+                billing_data=slice_billing_data,
+                objects_dataset=objects_diff.previous_objects,
+                subtract=True,
+            )
+            self.compute_output(time_slice=time_slice, billing_data=slice_billing_data)
+        affected_days = affected_billing_data.index.get_level_values(BILLING_API_COLUMNS.calc_timestamp).floor("D")
+        for day, day_billing_data in affected_billing_data.groupby(affected_days, sort=True):
+            day = day.to_pydatetime()
+            if not objects_diff.changes_catalog_at(ts=day):
+                # Days are allocated with the snapshot from the start of the day, which the refresh did not change
+                continue
+            self.compute_daily_output(
+                day=day,
+                billing_data=day_billing_data,
+                objects_dataset=objects_diff.previous_objects,
+                subtract=True,
             )
+            self.compute_daily_output(day=day, billing_data=day_billing_data)
+        self.computed_hours.clear()
+        # Principals that do not own anything anymore are left with zero cost rows after the subtraction.
+        # Tiny residues can remain after the Decimal rounding of add & subtract, those are removed too.
+        for chargeback_dataset in [self.chargeback_dataset, self.daily_chargeback_dataset]:
+            for row_key, (usage, shared) in list(chargeback_dataset.items()):
+                if abs(usage) + abs(shared) < ZERO_COST_TOLERANCE:
+                    del chargeback_dataset[row_key]
+        self.reconcile(start_date=window_start, end_date=self.last_available_date)
 
 
 @dataclass
@@ -364,6 +1061,7 @@ class CCloudChargebackHandlersInputBase:
     prometheus_metrics_data_handler: PrometheusMetricsDataHandler
     ccloud_objects_handler: CCloudObjectsHandler
     ccloud_chargeback_handler: CCloudChargebackHandler
+    allocation_params: ChargebackAllocationParams = field(default_factory=ChargebackAllocationParams)
 
 
 # This Append Function is used to add the calculated cost to the Chargeback Dataset.
@@ -393,3 +1091,52 @@ def CCloudChargebackCostAppender(
 CCloudChargebackCalculatorFunction = Callable[
     [CCloudChargebackHandlersInputBase, ChargebackExecutorInputObject, CCloudChargebackAppendFunction], None
 ]
+
+
+def CCloudChargebackOutputCollector(cb_output: VectorizedChargebackExecutorOutputObject) -> CCloudChargebackAppendFunction:
+    # Implementation for CCloudChargebackAppendFunction that collects the rows into allocation arrays
+    # instead of adding them to the chargeback dataset directly.
+    def append_to_output(cb_calc_row: ChargebackExecutorOutputObject, cb_handler: CCloudChargebackHandler) -> None:
+        cb_output.append(cb_calc_row)
+
+    return append_to_output
+
+
+@dataclass
+class RowChargebackExecutorAdapter(VectorizedChargebackExecutor):
+    """Adapter for the row based executors (CCloudChargebackCalculatorFunction) so that they can be invoked
+    with the vectorized protocol. Row based executors receive the metrics rows and the handlers, never the pivoted
+    usage or the ownership index, so by default both inputs they can read are declared.
+    """
+
+    input_types: tuple = field(
+        default=(
+            ChargebackExecutorInputType.METRICS_ROWS,
+            ChargebackExecutorInputType.OBJECTS_CATALOG,
+        )
+    )
+
+    def __call__(
+        self, cb_handler_input: CCloudChargebackHandlersInputBase, cb_vector_input: VectorizedChargebackExecutorInputObject
+    ) -> VectorizedChargebackExecutorOutputObject:
+        cb_output = VectorizedChargebackExecutorOutputObject()
+        cb_append_function = CCloudChargebackOutputCollector(cb_output=cb_output)
+        for bill_row in cb_vector_input.billing_rows.itertuples(index=False, name="BillingRow"):
+            row_input_object = ChargebackExecutorInputObject(
+                input_time_slice=cb_vector_input.input_time_slice,
+                billing_dataframe=cb_vector_input.billing_dataframe,
+                metrics_dataframe=cb_vector_input.metrics_dataframe,
+                row_timestamp=getattr(bill_row, BILLING_API_COLUMNS.calc_timestamp).to_pydatetime(),
+                row_env_id=getattr(bill_row, BILLING_API_COLUMNS.env_id),
+                row_cluster_id=getattr(bill_row, BILLING_API_COLUMNS.cluster_id),
+                row_cluster_name=getattr(bill_row, BILLING_API_COLUMNS.cluster_name),
+                row_product_name=getattr(bill_row, BILLING_API_COLUMNS.product_name),
+                row_product_type=getattr(bill_row, BILLING_API_COLUMNS.product_type),
+                row_billing_cost=getattr(bill_row, BILLING_API_COLUMNS.calc_split_total),
+            )
+            self.executor_func(
+                cb_handler_input=cb_handler_input,
+                cb_input_row=row_input_object,
+                cb_append_function=cb_append_function,
+            )
+        return cb_output
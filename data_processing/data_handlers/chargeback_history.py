@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import decimal
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from helpers import HOURS_PER_DAY, epoch_hour_to_day, logged_method
+
+LOGGER = logging.getLogger(__name__)
+
+# (principal, product type, env ID)
+ChargebackHistoryKey = Tuple[str, str, str]
+
+
+@dataclass
+class ChargebackHistoryChunk:
+    """Compressed chargeback rows for one UTC day. Rows are sorted by hour, so the rows for an hour are a
+    contiguous slice that is located with a binary search and decoded without touching the rest of the chunk.
+    """
+
+    # Epoch hour of the UTC midnight of the day
+    start_hour: int
+    # Hour of the row as the delta from start_hour, 0 - 23
+    hour_offsets: np.ndarray = field(repr=False)
+    # Index of (principal, product type, env ID) in ChargebackHistory.keys
+    key_ids: np.ndarray = field(repr=False)
+    # Fixed point costs: the cost multiplied by 10 ** ChargebackHistory.value_scale_digits
+    usage_costs: np.ndarray = field(repr=False)
+    shared_costs: np.ndarray = field(repr=False)
+    # Rows of the daily chargeback dataset. The per hour cost applies to every hour of the day.
+    daily_key_ids: np.ndarray = field(repr=False)
+    daily_usage_costs: np.ndarray = field(repr=False)
+    daily_shared_costs: np.ndarray = field(repr=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            x.nbytes
+            for x in [
+                self.hour_offsets,
+                self.key_ids,
+                self.usage_costs,
+                self.shared_costs,
+                self.daily_key_ids,
+                self.daily_usage_costs,
+                self.daily_shared_costs,
+            ]
+        )
+
+    def get_hour_rows(self, epoch_hour: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Key IDs, usage & shared costs of the hourly rows for the hour, as views over the chunk arrays."""
+        offset = epoch_hour - self.start_hour
+        row_start, row_end = np.searchsorted(self.hour_offsets, [offset, offset + 1])
+        return (
+            self.key_ids[row_start:row_end],
+            self.usage_costs[row_start:row_end],
+            self.shared_costs[row_start:row_end],
+        )
+
+
+@dataclass
+class ChargebackHistory:
+    """Compact store for the chargeback of closed days, so that months of chargeback can be kept in memory for
+    re-exposition and queries. Compared with the dict of Decimal tuples a row shrinks to about 21 bytes:
+    * (principal, product type, env ID) is dictionary encoded to an int32 key ID shared by all the days
+    * the hour is stored as a uint8 delta from the midnight of the chunk
+    * the costs are int64 fixed point values with value_scale_digits decimal digits
+    Every day is a separate chunk, so reading an hour only decodes the rows of that hour and eviction drops
+    whole days.
+
+    Args:
+        value_scale_digits: Number of decimal digits kept for the costs
+        max_days: Number of days kept, counted back from the latest day in the history
+    """
+
+    value_scale_digits: int = field(default=9)
+    max_days: int = field(default=180)
+
+    keys: List[ChargebackHistoryKey] = field(init=False, repr=False, default_factory=list)
+    key_ids: Dict[ChargebackHistoryKey, int] = field(init=False, repr=False, default_factory=dict)
+    # epoch hour of the UTC midnight --> chunk for the day
+    chunks: Dict[int, ChargebackHistoryChunk] = field(init=False, repr=False, default_factory=dict)
+
+    def __len__(self) -> int:
+        return sum(len(x.key_ids) + HOURS_PER_DAY * len(x.daily_key_ids) for x in self.chunks.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(x.nbytes for x in self.chunks.values())
+
+    @property
+    def end_hour(self) -> int | None:
+        """Exclusive epoch hour up to which the history holds the chargeback. None if the history is empty."""
+        return max(self.chunks.keys()) + HOURS_PER_DAY if self.chunks else None
+
+    def has_hour(self, epoch_hour: int) -> bool:
+        return epoch_hour_to_day(epoch_hour) in self.chunks
+
+    def encode_key(self, key: ChargebackHistoryKey) -> int:
+        key_id = self.key_ids.get(key, None)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self.key_ids[key] = key_id
+        return key_id
+
+    def encode_cost(self, cost: decimal.Decimal) -> int:
+        return int(decimal.Decimal(cost).scaleb(self.value_scale_digits).to_integral_value(decimal.ROUND_HALF_EVEN))
+
+    def decode_cost(self, cost: int) -> decimal.Decimal:
+        return decimal.Decimal(int(cost)).scaleb(-self.value_scale_digits)
+
+    @logged_method
+    def add_day(
+        self,
+        day_start_hour: int,
+        hourly_rows: List[Tuple[str, int, str, str, decimal.Decimal, decimal.Decimal]],
+        daily_rows: List[Tuple[str, str, str, decimal.Decimal, decimal.Decimal]],
+    ):
+        """Compress the chargeback of a closed day into a chunk. An existing chunk for the day is replaced.
+
+        Args:
+            day_start_hour (int): Epoch hour of the UTC midnight of the day
+            hourly_rows (List[Tuple]): (principal, epoch hour, product type, env ID, usage cost, shared cost)
+            daily_rows (List[Tuple]): (principal, product type, env ID, usage cost, shared cost) per hour of the day
+        """
+        hourly_rows = sorted(hourly_rows, key=lambda x: x[1])
+        self.chunks[day_start_hour] = ChargebackHistoryChunk(
+            start_hour=day_start_hour,
+            hour_offsets=np.fromiter((x[1] - day_start_hour for x in hourly_rows), dtype=np.uint8),
+            key_ids=np.fromiter((self.encode_key((x[0], x[2], x[3])) for x in hourly_rows), dtype=np.int32),
+            usage_costs=np.fromiter((self.encode_cost(x[4]) for x in hourly_rows), dtype=np.int64),
+            shared_costs=np.fromiter((self.encode_cost(x[5]) for x in hourly_rows), dtype=np.int64),
+            daily_key_ids=np.fromiter((self.encode_key((x[0], x[1], x[2])) for x in daily_rows), dtype=np.int32),
+            daily_usage_costs=np.fromiter((self.encode_cost(x[3]) for x in daily_rows), dtype=np.int64),
+            daily_shared_costs=np.fromiter((self.encode_cost(x[4]) for x in daily_rows), dtype=np.int64),
+        )
+        self.evict(start_hour=day_start_hour - (self.max_days - 1) * HOURS_PER_DAY)
+
+    @logged_method
+    def evict(self, start_hour: int):
+        """Drop the days before the day of start_hour. The key dictionary is kept as the keys repeat every day."""
+        start_day = epoch_hour_to_day(start_hour)
+        for day_start_hour in [x for x in self.chunks.keys() if x < start_day]:
+            del self.chunks[day_start_hour]
+
+    def iter_hour(self, epoch_hour: int) -> Iterator[Tuple[str, int, str, str, decimal.Decimal, decimal.Decimal]]:
+        """Chargeback rows for the hour in the same format as CCloudChargebackHandler.iter_chargeback_keys.
+
+        Yields:
+            Tuple: (principal, epoch hour, product type, env ID, usage cost, shared cost)
+        """
+        chunk = self.chunks.get(epoch_hour_to_day(epoch_hour), None)
+        if chunk is None:
+            return
+        for key_ids, usage_costs, shared_costs in [
+            chunk.get_hour_rows(epoch_hour=epoch_hour),
+            (chunk.daily_key_ids, chunk.daily_usage_costs, chunk.daily_shared_costs),
+        ]:
+            for key_id, usage, shared in zip(key_ids.tolist(), usage_costs.tolist(), shared_costs.tolist()):
+                principal, product_type, env_id = self.keys[key_id]
+                yield principal, epoch_hour, product_type, env_id, self.decode_cost(usage), self.decode_cost(shared)
+
+    def iter_rows(self) -> Iterator[Tuple[str, int, str, str, decimal.Decimal, decimal.Decimal]]:
+        """All the chargeback rows in the history, hour by hour."""
+        for day_start_hour in sorted(self.chunks.keys()):
+            for epoch_hour in range(day_start_hour, day_start_hour + HOURS_PER_DAY):
+                yield from self.iter_hour(epoch_hour=epoch_hour)
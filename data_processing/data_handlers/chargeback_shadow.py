@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import copy
+import datetime
+import json
+import logging
+import os
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Deque, Dict, List, Tuple
+
+from prometheus_client import CollectorRegistry, Gauge
+
+from data_processing.chargeback_handlers.allocation_policy import compile_allocation_policies
+from data_processing.chargeback_handlers.split_ratio_cache import SplitRatioCache
+from data_processing.chargeback_handlers.types import ChargebackAllocationParams, VectorizedChargebackExecutor
+from helpers import logged_method
+
+LOGGER = logging.getLogger(__name__)
+
+# The shadow engine metrics are kept in their own registry so that they are never exposed to the chargeback
+# Prometheus through the default registry. They are served by the internal API instead.
+SHADOW_REGISTRY = CollectorRegistry(auto_describe=True)
+
+shadow_wall_time_metrics = Gauge(
+    "confluent_cloud_chargeback_shadow_wall_time_seconds",
+    "Wall time to compute the last chargeback window",
+    ["org_id", "engine"],
+    registry=SHADOW_REGISTRY,
+)
+shadow_peak_memory_metrics = Gauge(
+    "confluent_cloud_chargeback_shadow_peak_memory_bytes",
+    "Peak traced memory while computing the last chargeback window, only traced with measure_memory",
+    ["org_id", "engine"],
+    registry=SHADOW_REGISTRY,
+)
+shadow_divergence_metrics = Gauge(
+    "confluent_cloud_chargeback_shadow_divergence",
+    "Per key allocation differences between the shadow and the current engine for the last chargeback window",
+    ["org_id", "divergence_type"],
+    registry=SHADOW_REGISTRY,
+)
+
+SHADOW_DIVERGENCE_TOLERANCE = Decimal("1e-9")
+
+
+@dataclass
+class EngineRunStats:
+    wall_time_secs: float
+    # None when the memory of the run was not traced
+    peak_memory_bytes: int | None = field(default=None)
+
+
+@logged_method
+def measure_engine_run(compute_func: Callable[[], None], trace_memory: bool = False) -> EngineRunStats:
+    """Run the compute function and measure the wall time for the run. With trace_memory, the peak traced memory is
+    measured too. Tracing slows down every allocation, so it is only enabled on request."""
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    peak_memory_bytes = None
+    start_time = time.perf_counter()
+    try:
+        compute_func()
+    finally:
+        wall_time_secs = time.perf_counter() - start_time
+        if trace_memory:
+            _, peak_memory_bytes = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+    return EngineRunStats(wall_time_secs=wall_time_secs, peak_memory_bytes=peak_memory_bytes)
+
+
+@dataclass(kw_only=True)
+class ChargebackShadowEngine:
+    """Alternative chargeback engine that computes every window next to the current engine with the same inputs.
+    The shadow output is only compared with the current output and is never added to the exposed chargeback.
+
+    Args:
+        org_id: Org ID used as the label for the shadow metrics
+        allocation_policies: Executors that override CHARGEBACK_EXECUTORS for the shadow engine
+        allocation_params: Allocation parameters for the shadow engine
+        report_path: Optional path where the JSON report is written after every window
+        max_reports: Number of window reports kept in memory
+        max_divergent_keys: Number of the most divergent keys listed in a window report
+        measure_memory: Trace the peak memory of the shadow run. The current engine is never traced.
+    """
+
+    org_id: str
+    allocation_policies: Dict[str, VectorizedChargebackExecutor] = field(default_factory=dict)
+    allocation_params: ChargebackAllocationParams = field(default_factory=ChargebackAllocationParams)
+    report_path: str | None = field(default=None)
+    max_reports: int = field(default=48)
+    max_divergent_keys: int = field(default=20)
+    measure_memory: bool = field(default=False)
+
+    split_ratio_cache: SplitRatioCache = field(init=False, repr=False, default_factory=SplitRatioCache)
+    reports: Deque[Dict] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.reports = deque(maxlen=self.max_reports)
+
+    @classmethod
+    def from_config(cls, org_id: str, in_config: Dict) -> ChargebackShadowEngine:
+        return cls(
+            org_id=org_id,
+            allocation_policies=compile_allocation_policies(in_config.get("chargeback_policies", None)),
+            allocation_params=ChargebackAllocationParams.from_dict(in_config),
+            report_path=in_config.get("report_path", None),
+            max_reports=int(in_config.get("max_reports", 48)),
+            measure_memory=bool(in_config.get("measure_memory", False)),
+        )
+
+    @logged_method
+    def run_window(self, chargeback_handler, start_date: datetime.datetime, end_date: datetime.datetime):
+        """Compute the window with the current engine and then with the shadow engine and record the comparison.
+
+        Args:
+            chargeback_handler (CCloudChargebackHandler): The current engine. Its output is left untouched.
+            start_date (datetime.datetime): Inclusive datetime for the window beginning
+            end_date (datetime.datetime): Exclusive datetime for the window ending
+        """
+        current_stats = measure_engine_run(
+            lambda: chargeback_handler.compute_window(start_date=start_date, end_date=end_date)
+        )
+
+        shadow_handler = copy.copy(chargeback_handler)
+        shadow_handler.allocation_params = self.allocation_params
+        shadow_handler.allocation_policies = self.allocation_policies
+        shadow_handler.chargeback_dataset = {}
+        shadow_handler.daily_chargeback_dataset = {}
+        shadow_handler.split_ratio_cache = self.split_ratio_cache
+        shadow_handler.shadow_engine = None
+        shadow_handler.chargeback_history = None
+        shadow_handler.computed_hours = OrderedDict()
+        shadow_stats = measure_engine_run(
+            lambda: shadow_handler.compute_window(start_date=start_date, end_date=end_date),
+            trace_memory=self.measure_memory,
+        )
+
+        report = self.compare_outputs(
+            current_rows=self.collect_window_rows(chargeback_handler, start_date=start_date, end_date=end_date),
+            shadow_rows=self.collect_window_rows(shadow_handler, start_date=start_date, end_date=end_date),
+        )
+        report = {
+            "window_start": start_date.isoformat(),
+            "window_end": end_date.isoformat(),
+            "engines": {
+                "current": vars(current_stats),
+                "shadow": vars(shadow_stats),
+            },
+            **report,
+        }
+        self.reports.append(report)
+        self.export_metrics(report=report)
+        LOGGER.info(
+            f"Shadow engine window {start_date} - {end_date}: current {current_stats.wall_time_secs:.3f}s, "
+            f"shadow {shadow_stats.wall_time_secs:.3f}s, {report['keys_diverged']} diverged keys"
+        )
+        if self.report_path is not None:
+            self.write_report()
+
+    def collect_window_rows(
+        self, chargeback_handler, start_date: datetime.datetime, end_date: datetime.datetime
+    ) -> Dict[Tuple, Tuple[Decimal, Decimal]]:
+        start_date, end_date = start_date.timestamp(), end_date.timestamp()
+        return {
+            (principal, ts, product_type, env_id): (usage, shared)
+            for principal, ts, product_type, env_id, usage, shared in chargeback_handler.iter_chargeback_rows()
+            if start_date <= ts.timestamp() < end_date
+        }
+
+    @logged_method
+    def compare_outputs(
+        self, current_rows: Dict[Tuple, Tuple[Decimal, Decimal]], shadow_rows: Dict[Tuple, Tuple[Decimal, Decimal]]
+    ) -> Dict:
+        zero_cost = (Decimal(0), Decimal(0))
+        divergent_keys: List[Tuple[Decimal, Tuple]] = []
+        total_abs_diff = Decimal(0)
+        for row_key in current_rows.keys() | shadow_rows.keys():
+            current_usage, current_shared = current_rows.get(row_key, zero_cost)
+            shadow_usage, shadow_shared = shadow_rows.get(row_key, zero_cost)
+            abs_diff = abs(shadow_usage - current_usage) + abs(shadow_shared - current_shared)
+            total_abs_diff += abs_diff
+            if abs_diff > SHADOW_DIVERGENCE_TOLERANCE:
+                divergent_keys.append((abs_diff, row_key))
+        divergent_keys.sort(key=lambda x: x[0], reverse=True)
+        return {
+            "keys_current": len(current_rows),
+            "keys_shadow": len(shadow_rows),
+            "keys_only_current": len(current_rows.keys() - shadow_rows.keys()),
+            "keys_only_shadow": len(shadow_rows.keys() - current_rows.keys()),
+            "keys_diverged": len(divergent_keys),
+            "total_abs_diff": float(total_abs_diff),
+            "max_abs_diff": float(divergent_keys[0][0]) if divergent_keys else 0.0,
+            "top_divergent_keys": [
+                {
+                    "principal": row_key[0],
+                    "timestamp": row_key[1].isoformat(),
+                    "product_type": row_key[2],
+                    "env_id": row_key[3],
+                    "current": [float(x) for x in current_rows.get(row_key, zero_cost)],
+                    "shadow": [float(x) for x in shadow_rows.get(row_key, zero_cost)],
+                }
+                for _, row_key in divergent_keys[: self.max_divergent_keys]
+            ],
+        }
+
+    @logged_method
+    def export_metrics(self, report: Dict):
+        for engine, stats in report["engines"].items():
+            shadow_wall_time_metrics.labels(self.org_id, engine).set(stats["wall_time_secs"])
+            if stats["peak_memory_bytes"] is not None:
+                shadow_peak_memory_metrics.labels(self.org_id, engine).set(stats["peak_memory_bytes"])
+        for divergence_type in [
+            "keys_only_current",
+            "keys_only_shadow",
+            "keys_diverged",
+            "total_abs_diff",
+            "max_abs_diff",
+        ]:
+            shadow_divergence_metrics.labels(self.org_id, divergence_type).set(report[divergence_type])
+
+    @logged_method
+    def get_report(self) -> Dict:
+        return {"org_id": self.org_id, "windows": list(self.reports)}
+
+    @logged_method
+    def write_report(self):
+        report_dir = os.path.dirname(self.report_path)
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+        with open(self.report_path, "w") as report_file:
+            json.dump(self.get_report(), report_file, indent=2)
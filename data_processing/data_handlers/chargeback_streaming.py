@@ -0,0 +1,379 @@
+import copy
+import csv
+import datetime
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import pandas as pd
+from prometheus_client.utils import floatToGoString
+
+from ccloud.ccloud_api.api_keys import api_key_prom_metrics
+from ccloud.ccloud_api.clusters import kafka_cluster_prom_metrics
+from ccloud.ccloud_api.connectors import kafka_connectors_prom_metrics
+from ccloud.ccloud_api.environments import env_prom_metrics
+from ccloud.ccloud_api.ksqldb_clusters import ksqldb_prom_metrics
+from ccloud.ccloud_api.service_accounts import sa_prom_metrics
+from ccloud.ccloud_api.user_accounts import users_prom_metrics
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS, billing_api_prom_metrics
+from data_processing.data_handlers.chargeback_handler import (
+    CHARGEBACK_COLUMNS,
+    CCloudChargebackHandler,
+    chargeback_prom_metrics,
+)
+from data_processing.data_handlers.prom_fetch_stats_handler import METRICS_API_PROMETHEUS_STATUS_QUERIES
+from data_processing.data_handlers.prom_metrics_api_handler import METRICS_API_COLUMNS, METRICS_API_PROMETHEUS_QUERIES
+from data_processing.data_handlers.types import TimePartitionedDataset
+from helpers import logged_method
+from prometheus_processing.custom_collector import TimestampedCollectorBase
+from prometheus_processing.remote_write import RemoteWriteClient
+from prometheus_processing.tsdb_block_writer import TSDBBlockWriter, iter_metric_samples
+
+LOGGER = logging.getLogger(__name__)
+
+# Receives the chargeback rows for one hour: (principal, time slice, product type, env ID, usage cost, shared cost)
+ChargebackHourSink = Callable[[datetime.datetime, List[Tuple]], None]
+
+
+@dataclass(kw_only=True)
+class ChargebackStreamingPipeline:
+    """Alternative execution mode for very large orgs. Billing lines & usage metrics are read from the APIs one day
+    at a time, allocated hour by hour and handed to a sink, so that nothing outlives the day being processed.
+    Peak memory is bounded by one day of inputs instead of the whole lookback.
+
+    The in-memory datasets of the org handlers are not used or modified. Only their API connections, the objects
+    snapshots and the allocation settings of the chargeback handler are reused.
+
+    With expose_inputs, the billing lines and the objects of every hour are also exposed to their collectors before
+    the hour is handed to the sink, so that sinks can record the billing & objects series next to the chargeback.
+    """
+
+    chargeback_handler: CCloudChargebackHandler = field(init=True, repr=False)
+    expose_inputs: bool = field(default=False)
+
+    @logged_method
+    def fetch_billing_day(self, day: datetime.datetime) -> pd.DataFrame | None:
+        """Billing rows for the day, read page by page from the Billing API."""
+        billing_frames = list(
+            self.chargeback_handler.billing_dataset.iter_billing_frames(
+                start_date=day, end_date=day + datetime.timedelta(days=1), params={"page_size": 2000}
+            )
+        )
+        return pd.concat(billing_frames) if billing_frames else None
+
+    @logged_method
+    def fetch_metrics_day(self, day: datetime.datetime) -> pd.DataFrame | None:
+        """Usage metrics for the hours of the day, read one query type at a time."""
+        metrics_frames = []
+        for query_type in [
+            METRICS_API_PROMETHEUS_QUERIES.request_bytes_name,
+            METRICS_API_PROMETHEUS_QUERIES.response_bytes_name,
+        ]:
+            metrics_frames.extend(
+                self.chargeback_handler.metrics_dataset.iter_metrics_frames(
+                    start_date=day,
+                    end_date=day + datetime.timedelta(hours=23),
+                    query_type=query_type,
+                    params={"step": 3600},
+                )
+            )
+        return pd.concat(metrics_frames) if metrics_frames else None
+
+    def get_day_handler(
+        self, billing_frame: pd.DataFrame | None, metrics_frame: pd.DataFrame | None
+    ) -> CCloudChargebackHandler:
+        """Detached chargeback handler whose input stores only hold the provided frames."""
+        billing_handler = copy.copy(self.chargeback_handler.billing_dataset)
+        billing_handler.billing_dataset = TimePartitionedDataset.from_frame(
+            dataset=billing_frame, ts_column_name=BILLING_API_COLUMNS.calc_timestamp
+        )
+        metrics_handler = copy.copy(self.chargeback_handler.metrics_dataset)
+        metrics_handler.metrics_dataset = TimePartitionedDataset.from_frame(
+            dataset=metrics_frame, ts_column_name=METRICS_API_COLUMNS.timestamp
+        )
+        out = copy.copy(self.chargeback_handler)
+        out.billing_dataset = billing_handler
+        out.metrics_dataset = metrics_handler
+        out.chargeback_dataset = {}
+        out.daily_chargeback_dataset = {}
+        out.reconciliation_dataset = None
+        out.computed_hours = OrderedDict()
+        out.shadow_engine = None
+        out.chargeback_history = None
+        return out
+
+    def iter_hours(
+        self, start_date: datetime.datetime, end_date: datetime.datetime
+    ) -> Iterator[Tuple[datetime.datetime, List[Tuple]]]:
+        """Allocate every hour between the dates. Every day is read, allocated & released before the next day.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Exclusive end datetime
+
+        Yields:
+            Tuple[datetime.datetime, List[Tuple]]: hour & chargeback rows for the hour
+        """
+        for day in self.chargeback_handler._generate_date_range_per_row(
+            start_date=start_date, end_date=end_date, freq="1D"
+        ):
+            day = day.to_pydatetime()
+            billing_frame = self.fetch_billing_day(day=day)
+            if billing_frame is None or billing_frame.empty:
+                LOGGER.info(f"No Billing data for {day.date()}. Skipping the day.")
+                continue
+            day_handler = self.get_day_handler(
+                billing_frame=billing_frame, metrics_frame=self.fetch_metrics_day(day=day)
+            )
+            day_handler.compute_daily_output(day=day)
+            for time_slice in pd.date_range(day, periods=24, freq="1H"):
+                day_handler.compute_output(time_slice=time_slice)
+                if self.expose_inputs:
+                    self.expose_hour_inputs(day_handler=day_handler, time_slice=time_slice)
+                yield time_slice.to_pydatetime(), list(day_handler.iter_chargeback_rows(time_slice=time_slice))
+                # The hour is handed over to the sink, so only the daily rows are kept until the day is done
+                day_handler.chargeback_dataset.clear()
+            LOGGER.info(f"Streamed Chargeback for {day.date()}")
+
+    @logged_method
+    def expose_hour_inputs(self, day_handler: CCloudChargebackHandler, time_slice: pd.Timestamp):
+        """Expose the billing lines of the day handler and the objects catalog that applied at the hour."""
+        day_handler.billing_dataset.expose_prometheus_metrics(ts_filter=time_slice)
+        day_handler.objects_dataset.get_objects_as_of(ts=time_slice.to_pydatetime()).expose_prometheus_metrics(
+            exposed_timestamp=time_slice.to_pydatetime()
+        )
+
+    @logged_method
+    def run(self, start_date: datetime.datetime, end_date: datetime.datetime, sink: ChargebackHourSink):
+        """Stream the chargeback for every hour between the dates into the sink.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Exclusive end datetime
+            sink (ChargebackHourSink): Called once per hour with the chargeback rows for the hour
+        """
+        for time_slice, rows in self.iter_hours(start_date=start_date, end_date=end_date):
+            sink(time_slice, rows)
+
+
+@dataclass(kw_only=True)
+class ChargebackCSVSink:
+    """Export sink writing the streamed chargeback rows to one CSV file per day. The hours are appended to the file
+    of their day as they arrive. A file left by an earlier run for the same day is replaced."""
+
+    output_dir: str
+    file_prefix: str = field(default="chargeback")
+
+    written_files: List[str] = field(init=False, default_factory=list)
+
+    def get_file_path(self, time_slice: datetime.datetime) -> str:
+        return os.path.join(self.output_dir, f"{self.file_prefix}_{time_slice.date().isoformat()}.csv")
+
+    def __call__(self, time_slice: datetime.datetime, rows: List[Tuple]):
+        file_path = self.get_file_path(time_slice=time_slice)
+        is_new_file = file_path not in self.written_files
+        if is_new_file:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.written_files.append(file_path)
+        with open(file_path, "w" if is_new_file else "a", newline="") as out_file:
+            writer = csv.writer(out_file)
+            if is_new_file:
+                writer.writerow(
+                    [
+                        CHARGEBACK_COLUMNS.PRINCIPAL,
+                        CHARGEBACK_COLUMNS.TS,
+                        CHARGEBACK_COLUMNS.PRODUCT_TYPE,
+                        CHARGEBACK_COLUMNS.ENV_ID,
+                        CHARGEBACK_COLUMNS.USAGE_COST,
+                        CHARGEBACK_COLUMNS.SHARED_COST,
+                    ]
+                )
+            for principal, _, product_type, env_id, usage, shared in rows:
+                writer.writerow([principal, time_slice.isoformat(), product_type, env_id, usage, shared])
+
+    def close(self):
+        pass
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+@dataclass(kw_only=True)
+class ChargebackOpenMetricsSink:
+    """Export sink writing the streamed chargeback as one OpenMetrics file per day, with the same series as the
+    chargeback exposition. Every file holds the chargeback samples grouped per label set & ordered by timestamp and
+    the billing_chargeback scrape status sample for every hour, so the files can be imported as is with
+    `promtool tsdb create-blocks-from openmetrics` and the scrape loop treats the hours as done.
+    The hours of a day are buffered until the stream moves to the next day or the sink is closed.
+    """
+
+    output_dir: str
+    file_prefix: str = field(default="chargeback")
+
+    curr_day: datetime.date | None = field(init=False, default=None)
+    # (principal, product type, env ID, cost type) --> [(epoch seconds, cost)]
+    samples: Dict[Tuple, List[Tuple[int, float]]] = field(init=False, repr=False, default_factory=dict)
+    status_timestamps: List[int] = field(init=False, repr=False, default_factory=list)
+    written_files: List[str] = field(init=False, default_factory=list)
+
+    def get_file_path(self, day: datetime.date) -> str:
+        return os.path.join(self.output_dir, f"{self.file_prefix}_{day.isoformat()}.om.txt")
+
+    def __call__(self, time_slice: datetime.datetime, rows: List[Tuple]):
+        if self.curr_day is not None and time_slice.date() != self.curr_day:
+            self.flush()
+        self.curr_day = time_slice.date()
+        ts_in_secs = int(time_slice.timestamp())
+        for principal, _, product_type, env_id, usage, shared in rows:
+            for cost_type, cost in [(CHARGEBACK_COLUMNS.USAGE_COST, usage), (CHARGEBACK_COLUMNS.SHARED_COST, shared)]:
+                self.samples.setdefault((principal, product_type, env_id, cost_type), []).append(
+                    (ts_in_secs, float(cost))
+                )
+        self.status_timestamps.append(ts_in_secs)
+
+    @logged_method
+    def flush(self):
+        """Write the buffered day to its file. An existing file for the day is replaced."""
+        if self.curr_day is None:
+            return
+        chargeback_metric = chargeback_prom_metrics.describe()[0]
+        status_name = METRICS_API_PROMETHEUS_STATUS_QUERIES.status_query
+        status_labels = f'{{object_type="{METRICS_API_PROMETHEUS_STATUS_QUERIES.chargeback_sync_status_name}"}}'
+        file_path = self.get_file_path(day=self.curr_day)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(file_path, "w") as out_file:
+            out_file.write(f"# HELP {chargeback_metric.name} {chargeback_metric.documentation}\n")
+            out_file.write(f"# TYPE {chargeback_metric.name} gauge\n")
+            for (principal, product_type, env_id, cost_type), points in sorted(
+                self.samples.items(), key=lambda x: tuple(str(y) for y in x[0])
+            ):
+                labels = (
+                    f'{{principal="{escape_label_value(principal)}",product_type="{escape_label_value(product_type)}",'
+                    f'env_id="{escape_label_value(env_id)}",cost_type="{cost_type}"}}'
+                )
+                for ts_in_secs, cost in sorted(points):
+                    out_file.write(f"{chargeback_metric.name}{labels} {floatToGoString(cost)} {ts_in_secs}\n")
+            out_file.write(f"# HELP {status_name} CCloud Scrape Status for various object types\n")
+            out_file.write(f"# TYPE {status_name} gauge\n")
+            for ts_in_secs in sorted(self.status_timestamps):
+                out_file.write(f"{status_name}{status_labels} 1.0 {ts_in_secs}\n")
+            out_file.write("# EOF\n")
+        self.written_files.append(file_path)
+        LOGGER.info(f"Wrote Chargeback OpenMetrics for {self.curr_day} to {file_path}")
+        self.curr_day = None
+        self.samples = {}
+        self.status_timestamps = []
+
+    def close(self):
+        self.flush()
+
+
+# Collectors of the billing & objects series, exposed for every hour by a pipeline with expose_inputs enabled
+STREAMING_INPUT_COLLECTORS: List[TimestampedCollectorBase] = [
+    billing_api_prom_metrics,
+    sa_prom_metrics,
+    users_prom_metrics,
+    api_key_prom_metrics,
+    env_prom_metrics,
+    kafka_cluster_prom_metrics,
+    kafka_connectors_prom_metrics,
+    ksqldb_prom_metrics,
+]
+
+
+def iter_hour_samples(
+    rows: List[Tuple], collectors: List[TimestampedCollectorBase]
+) -> Iterator[Tuple[str, Dict[str, str], float]]:
+    """Samples for one streamed hour with the same series as the live exposition: the chargeback rows, the current
+    samples of the collectors and the scrape status samples that mark the hour as done.
+
+    Yields:
+        Tuple[str, Dict[str, str], float]: metric name, labels & value
+    """
+    chargeback_metric_name = chargeback_prom_metrics.describe()[0].name
+    for principal, _, product_type, env_id, usage, shared in rows:
+        for cost_type, cost in [(CHARGEBACK_COLUMNS.USAGE_COST, usage), (CHARGEBACK_COLUMNS.SHARED_COST, shared)]:
+            yield chargeback_metric_name, {
+                "principal": principal,
+                "product_type": product_type,
+                "env_id": env_id,
+                "cost_type": cost_type,
+            }, float(cost)
+    status_types = [METRICS_API_PROMETHEUS_STATUS_QUERIES.chargeback_sync_status_name]
+    if collectors:
+        status_types.append(METRICS_API_PROMETHEUS_STATUS_QUERIES.objects_sync_status_name)
+    for collector in collectors:
+        yield from iter_metric_samples(collector.collect_with_timestamp())
+    for object_type in status_types:
+        yield METRICS_API_PROMETHEUS_STATUS_QUERIES.status_query, {"object_type": object_type}, 1.0
+
+
+@dataclass(kw_only=True)
+class ChargebackTSDBBlockSink:
+    """Export sink writing the streamed chargeback as one Prometheus TSDB block per day, straight into the data
+    directory of the chargeback Prometheus, without the OpenMetrics text round trip through `promtool`.
+    Every block holds the chargeback series, the series of the collectors (the billing & objects collectors when the
+    pipeline exposes its inputs) and the scrape status samples for every hour, so the scrape loop treats the hours
+    as done. The hours of a day are buffered until the stream moves to the next day or the sink is closed.
+    Writing a day again replaces its block, as the block ULID is derived from block_prefix and the day.
+    """
+
+    output_dir: str
+    block_prefix: str = field(default="chargeback")
+    collectors: List[TimestampedCollectorBase] = field(default_factory=list)
+
+    curr_day: datetime.date | None = field(init=False, default=None)
+    block_writer: TSDBBlockWriter = field(init=False, repr=False, default_factory=TSDBBlockWriter)
+    written_files: List[str] = field(init=False, default_factory=list)
+
+    def __call__(self, time_slice: datetime.datetime, rows: List[Tuple]):
+        if self.curr_day is not None and time_slice.date() != self.curr_day:
+            self.flush()
+        self.curr_day = time_slice.date()
+        ts_in_ms = int(time_slice.timestamp()) * 1000
+        for metric_name, labels, value in iter_hour_samples(rows=rows, collectors=self.collectors):
+            self.block_writer.add_sample(metric_name=metric_name, labels=labels, ts_in_ms=ts_in_ms, value=value)
+
+    @logged_method
+    def flush(self):
+        """Write the buffered day as a block."""
+        if self.curr_day is None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        block_dir = self.block_writer.write(
+            output_dir=self.output_dir, block_seed=f"{self.block_prefix}_{self.curr_day.isoformat()}"
+        )
+        if block_dir is not None:
+            self.written_files.append(block_dir)
+            LOGGER.info(f"Wrote Chargeback TSDB block for {self.curr_day} to {block_dir}")
+        self.curr_day = None
+        self.block_writer = TSDBBlockWriter()
+
+    def close(self):
+        self.flush()
+
+
+@dataclass(kw_only=True)
+class ChargebackRemoteWriteSink:
+    """Push sink sending the streamed hours to a remote_write receiver as soon as they are computed, so the
+    throughput is bound by the computation instead of the scrape cadence of the pull exposition. Every hour holds
+    the same series as a TSDB block: chargeback, collectors & scrape status. Batching, concurrency & retries are
+    handled by the client.
+    """
+
+    client: RemoteWriteClient = field(repr=False)
+    collectors: List[TimestampedCollectorBase] = field(default_factory=list)
+
+    hours_sent: int = field(init=False, default=0)
+
+    def __call__(self, time_slice: datetime.datetime, rows: List[Tuple]):
+        ts_in_ms = int(time_slice.timestamp()) * 1000
+        for metric_name, labels, value in iter_hour_samples(rows=rows, collectors=self.collectors):
+            self.client.add_sample(metric_name=metric_name, labels=labels, ts_in_ms=ts_in_ms, value=value)
+        self.hours_sent += 1
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,128 @@
+import copy
+import dataclasses
+import datetime
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import pandas as pd
+
+from data_processing.chargeback_handlers.split_ratio_cache import SplitRatioCache
+from data_processing.chargeback_handlers.types import ChargebackAllocationParams
+from data_processing.data_handlers.chargeback_handler import CHARGEBACK_COLUMNS, CCloudChargebackHandler
+from helpers import logged_method
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class ChargebackWhatIfEngine:
+    """Re-run the chargeback allocation for a date range under alternative allocation parameters.
+    The billing, metrics & objects inputs of the range are snapshotted from the in-memory handlers when the engine
+    is created, so every run only repeats the allocation and never calls the CCloud / Prometheus APIs.
+    The allocation policies of the org are kept, see get_not_repriced_product_types for the parameters they ignore.
+    """
+
+    chargeback_handler: CCloudChargebackHandler = field(init=True, repr=False)
+    start_date: datetime.datetime = field(init=True)
+    end_date: datetime.datetime = field(init=True)
+
+    snapshot_handler: CCloudChargebackHandler = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        LOGGER.debug(f"Snapshotting chargeback inputs between {self.start_date} and {self.end_date}")
+        # The snapshot shares the partitions of the range with the live handlers instead of copying the rows
+        billing_handler = copy.copy(self.chargeback_handler.billing_dataset)
+        billing_handler.billing_dataset = billing_handler.billing_dataset.get_subset(
+            start_datetime=self.start_date, end_datetime=self.end_date
+        )
+        metrics_handler = copy.copy(self.chargeback_handler.metrics_dataset)
+        metrics_handler.metrics_dataset = metrics_handler.metrics_dataset.get_subset(
+            start_datetime=self.start_date, end_datetime=self.end_date
+        )
+        # Objects refresh replaces the object lists instead of mutating them, so a shallow copy is a stable snapshot
+        objects_handler = copy.copy(self.chargeback_handler.objects_dataset)
+        objects_handler.last_objects_diff = None
+        self.snapshot_handler = copy.copy(self.chargeback_handler)
+        self.snapshot_handler.billing_dataset = billing_handler
+        self.snapshot_handler.metrics_dataset = metrics_handler
+        self.snapshot_handler.objects_dataset = objects_handler
+
+    @logged_method
+    def run(self, allocation_params: ChargebackAllocationParams) -> CCloudChargebackHandler:
+        """Allocate the snapshotted range with the provided parameters.
+
+        Args:
+            allocation_params (ChargebackAllocationParams): Parameters used for the allocation
+
+        Returns:
+            CCloudChargebackHandler: Detached chargeback handler holding only the what-if chargeback dataset
+        """
+        out = copy.copy(self.snapshot_handler)
+        out.allocation_params = allocation_params
+        out.chargeback_dataset = {}
+        out.daily_chargeback_dataset = {}
+        out.reconciliation_dataset = None
+        out.split_ratio_cache = SplitRatioCache()
+        out.shadow_engine = None
+        out.chargeback_history = None
+        out.computed_hours = OrderedDict()
+        out.read_all(start_date=self.start_date, end_date=self.end_date)
+        return out
+
+    @logged_method
+    def get_not_repriced_product_types(self, allocation_params: ChargebackAllocationParams) -> Dict[str, List[str]]:
+        """Product types allocated by an allocation policy that does not read some of the changed parameters. The
+        what-if cost of these product types does not follow those parameters.
+
+        Args:
+            allocation_params (ChargebackAllocationParams): Alternative parameters for the allocation
+
+        Returns:
+            Dict[str, List[str]]: Product type --> changed parameters that its allocation policy ignores
+        """
+        current_params = self.chargeback_handler.allocation_params
+        changed_params = [
+            x.name
+            for x in dataclasses.fields(current_params)
+            if getattr(current_params, x.name) != getattr(allocation_params, x.name)
+        ]
+        out = {}
+        for product_type, chargeback_executor in self.chargeback_handler.allocation_policies.items():
+            params_used = getattr(chargeback_executor.executor_func, "allocation_params_used", ())
+            ignored_params = [x for x in changed_params if x not in params_used]
+            if ignored_params:
+                out[product_type] = ignored_params
+        return out
+
+    @logged_method
+    def compare(self, allocation_params: ChargebackAllocationParams) -> pd.DataFrame:
+        """Total cost per principal & product type for the range with the current parameters and the provided ones.
+
+        Args:
+            allocation_params (ChargebackAllocationParams): Alternative parameters for the allocation
+
+        Returns:
+            pd.DataFrame: Indexed by (Principal, ProductType) with current, what-if & delta costs
+        """
+        totals = []
+        for name, params in [
+            ("Current", self.chargeback_handler.allocation_params),
+            ("WhatIf", allocation_params),
+        ]:
+            what_if_handler = self.run(allocation_params=params)
+            if not what_if_handler.chargeback_dataset and not what_if_handler.daily_chargeback_dataset:
+                continue
+            result = what_if_handler.get_chargeback_dataframe().astype(float)
+            totals.append(
+                (result[CHARGEBACK_COLUMNS.USAGE_COST] + result[CHARGEBACK_COLUMNS.SHARED_COST])
+                .groupby(level=[CHARGEBACK_COLUMNS.PRINCIPAL, CHARGEBACK_COLUMNS.PRODUCT_TYPE])
+                .sum()
+                .rename(f"{name}Cost")
+            )
+        if not totals:
+            return pd.DataFrame(columns=["CurrentCost", "WhatIfCost", "DeltaCost"])
+        out = pd.concat(totals, axis=1).reindex(columns=["CurrentCost", "WhatIfCost"]).fillna(0.0)
+        out["DeltaCost"] = out["WhatIfCost"] - out["CurrentCost"]
+        return out
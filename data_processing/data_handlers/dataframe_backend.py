@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import weakref
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from helpers import logged_method
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DataFrameBackend(ABC):
+    """Execution backend for the time slice, time range, join & group by operations of the data handlers and the
+    chargeback engine. The handlers keep storing pandas MultiIndex frames and every method accepts & returns pandas
+    frames, so the executors are not aware of the backend in use.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def filter_time_slice(self, dataset: pd.DataFrame, ts_column_name: str, time_slice: pd.Timestamp) -> pd.DataFrame:
+        """Rows of the dataset where the timestamp index level is equal to the time slice."""
+        pass
+
+    @abstractmethod
+    def filter_time_range(
+        self,
+        dataset: pd.DataFrame,
+        ts_column_name: str,
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+    ) -> pd.DataFrame:
+        """Rows of the dataset where the timestamp index level is within [start_datetime, end_datetime)."""
+        pass
+
+    @abstractmethod
+    def join(self, left: pd.DataFrame, right: pd.DataFrame, on: str | List[str], how: str = "inner") -> pd.DataFrame:
+        """Join two flat frames on columns. Same output columns & row order as pd.merge without suffixes."""
+        pass
+
+    @abstractmethod
+    def group_sum(self, dataset: pd.DataFrame, by: List[str], value_columns: List[str]) -> pd.DataFrame:
+        """Sum of the numeric value columns of a flat frame per group. The group keys are returned as columns."""
+        pass
+
+
+class PandasDataFrameBackend(DataFrameBackend):
+    name = "pandas"
+
+    def filter_time_slice(self, dataset: pd.DataFrame, ts_column_name: str, time_slice: pd.Timestamp) -> pd.DataFrame:
+        return dataset[dataset.index.get_level_values(ts_column_name) == time_slice]
+
+    def filter_time_range(
+        self,
+        dataset: pd.DataFrame,
+        ts_column_name: str,
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+    ) -> pd.DataFrame:
+        ts_values = dataset.index.get_level_values(ts_column_name)
+        return dataset[(ts_values >= pd.to_datetime(start_datetime)) & (ts_values < pd.to_datetime(end_datetime))]
+
+    def join(self, left: pd.DataFrame, right: pd.DataFrame, on: str | List[str], how: str = "inner") -> pd.DataFrame:
+        return left.merge(right, on=on, how=how)
+
+    def group_sum(self, dataset: pd.DataFrame, by: List[str], value_columns: List[str]) -> pd.DataFrame:
+        return dataset.groupby(by, sort=False)[value_columns].sum().reset_index()
+
+
+class PolarsDataFrameBackend(DataFrameBackend):
+    """Runs the filters, joins & group bys multi-threaded with Polars (0.20.4 or newer).
+    Only the timestamp, key & numeric columns are handed to Polars. The filters and joins return row positions that
+    are used to take the rows from the pandas frames and the group bys return the group of every row, which pandas
+    sums the object columns on. So the Decimal object columns never leave pandas and the output is the same as with
+    the pandas backend. The timestamp column of the stored datasets is converted once per dataset.
+    """
+
+    name = "polars"
+
+    def __init__(self) -> None:
+        if pl is None:
+            raise ImportError("The polars dataframe backend needs the polars package to be installed")
+        # id(dataset) --> (weak reference to the dataset, timestamp column name, epoch nanoseconds of the timestamps)
+        self.ts_columns: Dict[int, Tuple[weakref.ref, str, pl.Series]] = {}
+
+    def _get_ts_column(self, dataset: pd.DataFrame, ts_column_name: str) -> pl.Series:
+        cached = self.ts_columns.get(id(dataset), None)
+        if cached is not None and cached[0]() is dataset and cached[1] == ts_column_name:
+            return cached[2]
+        # Drop the entries for the datasets that are not in use anymore
+        self.ts_columns = {k: v for k, v in self.ts_columns.items() if v[0]() is not None}
+        out = pl.Series(ts_column_name, pd.DatetimeIndex(dataset.index.get_level_values(ts_column_name)).asi8)
+        self.ts_columns[id(dataset)] = (weakref.ref(dataset), ts_column_name, out)
+        return out
+
+    def _take_rows(self, dataset: pd.DataFrame, mask: pl.Series) -> pd.DataFrame:
+        return dataset.iloc[mask.arg_true().to_numpy()]
+
+    def filter_time_slice(self, dataset: pd.DataFrame, ts_column_name: str, time_slice: pd.Timestamp) -> pd.DataFrame:
+        ts_column = self._get_ts_column(dataset=dataset, ts_column_name=ts_column_name)
+        return self._take_rows(dataset=dataset, mask=ts_column == pd.Timestamp(time_slice).value)
+
+    def filter_time_range(
+        self,
+        dataset: pd.DataFrame,
+        ts_column_name: str,
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+    ) -> pd.DataFrame:
+        ts_column = self._get_ts_column(dataset=dataset, ts_column_name=ts_column_name)
+        start_value, end_value = pd.Timestamp(start_datetime).value, pd.Timestamp(end_datetime).value
+        return self._take_rows(dataset=dataset, mask=(ts_column >= start_value) & (ts_column < end_value))
+
+    def join(self, left: pd.DataFrame, right: pd.DataFrame, on: str | List[str], how: str = "inner") -> pd.DataFrame:
+        on = [on] if isinstance(on, str) else list(on)
+        if how != "inner":
+            return left.merge(right, on=on, how=how)
+        left_keys = pl.from_pandas(left[on].reset_index(drop=True)).with_row_index("__left_row")
+        right_keys = pl.from_pandas(right[on].reset_index(drop=True)).with_row_index("__right_row")
+        # pd.merge (pandas 2.0) orders the inner join by the first left row of every key, then by left & right row
+        key_rows = left_keys.group_by(on, maintain_order=True).agg(pl.col("__left_row").first().alias("__key_row"))
+        pairs = (
+            left_keys.join(right_keys, on=on, how="inner")
+            .join(key_rows, on=on, how="inner")
+            .sort(["__key_row", "__left_row", "__right_row"])
+        )
+        return pd.concat(
+            [
+                left.iloc[pairs["__left_row"].to_numpy()].reset_index(drop=True),
+                right.drop(columns=on).iloc[pairs["__right_row"].to_numpy()].reset_index(drop=True),
+            ],
+            axis=1,
+        )
+
+    def group_sum(self, dataset: pd.DataFrame, by: List[str], value_columns: List[str]) -> pd.DataFrame:
+        object_columns = [x for x in value_columns if dataset[x].dtype == object]
+        numeric_columns = [x for x in value_columns if x not in object_columns]
+        groups = (
+            pl.from_pandas(dataset[by + numeric_columns].reset_index(drop=True))
+            .with_row_index("__row")
+            .group_by(by, maintain_order=True)
+            .agg([pl.col("__row")] + [pl.col(x).sum() for x in numeric_columns])
+        )
+        out = groups.drop("__row").to_pandas()
+        if object_columns:
+            # Group number of every row, the groups are numbered in the order of their first row like pandas does
+            row_groups = groups.select("__row").with_row_index("__group").explode("__row").sort("__row")["__group"]
+            object_sums = dataset[object_columns].reset_index(drop=True).groupby(row_groups.to_numpy(), sort=True).sum()
+            for column_name in object_columns:
+                out[column_name] = object_sums[column_name].to_numpy()
+        return out[by + value_columns]
+
+DATAFRAME_BACKENDS = {
+    PandasDataFrameBackend.name: PandasDataFrameBackend,
+    PolarsDataFrameBackend.name: PolarsDataFrameBackend,
+}
+
+DATAFRAME_BACKEND: DataFrameBackend = PandasDataFrameBackend()
+
+
+@logged_method
+def set_dataframe_backend(backend_name: str):
+    """Select the dataframe backend used by all the handlers. Unknown or unavailable backends fall back to pandas.
+
+    Args:
+        backend_name (str): pandas | polars
+    """
+    global DATAFRAME_BACKEND
+    backend_class = DATAFRAME_BACKENDS.get(str(backend_name).lower(), None)
+    if backend_class is None:
+        LOGGER.warning(f"Unknown dataframe backend {backend_name}. Using pandas.")
+        backend_class = PandasDataFrameBackend
+    try:
+        DATAFRAME_BACKEND = backend_class()
+    except ImportError as e:
+        LOGGER.warning(f"{e}. Using pandas.")
+        DATAFRAME_BACKEND = PandasDataFrameBackend()
+    LOGGER.info(f"Using the {DATAFRAME_BACKEND.name} dataframe backend")
+
+
+def get_dataframe_backend() -> DataFrameBackend:
+    return DATAFRAME_BACKEND
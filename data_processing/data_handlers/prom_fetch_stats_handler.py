@@ -6,7 +6,7 @@ from urllib import parse
 
 import requests
 
-from helpers import logged_method
+from helpers import SECONDS_PER_HOUR, logged_method
 
 LOGGER = logging.getLogger(__name__)
 
@@ -54,6 +54,9 @@ class PrometheusStatusMetricsDataHandler:
     def convert_dt_to_ts(self, ts_date: datetime.datetime) -> int:
         return int(ts_date.timestamp())
 
+    def convert_epoch_hour_to_ts(self, epoch_hour: int) -> int:
+        return epoch_hour * SECONDS_PER_HOUR
+
     @logged_method
     def is_dataset_present(self, scrape_type: ScrapeType, ts_in_millis: int) -> bool:
         # return True if (scrape_type.value, ts_in_millis) in self.scrape_status_dataset.keys() else False
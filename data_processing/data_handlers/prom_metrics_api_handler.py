@@ -1,14 +1,14 @@
 import datetime
 import logging
 from dataclasses import InitVar, dataclass, field
-from typing import Dict
+from typing import Dict, Iterator
 from urllib import parse
 
 import pandas as pd
 import requests
 
 from ccloud.connections import CCloudBase
-from data_processing.data_handlers.types import AbstractDataHandler
+from data_processing.data_handlers.types import AbstractDataHandler, TimePartitionedDataset
 from helpers import logged_method
 
 LOGGER = logging.getLogger(__name__)
@@ -44,10 +44,16 @@ class PrometheusMetricsDataHandler(AbstractDataHandler, CCloudBase):
     in_connection_auth: Dict = field(default_factory=dict())
     days_per_query: int = field(default=7)
     max_days_in_memory: int = field(default=14)
+    # False leaves the dataset empty until the first read, e.g. for the streaming & backfill modes
+    read_on_init: bool = field(default=True)
 
     last_available_date: datetime.datetime = field(init=False)
     url: str = field(init=False)
-    metrics_dataset: pd.DataFrame = field(init=False, default=None)
+    # Hourly partitions of the metrics rows, see TimePartitionedDataset
+    metrics_dataset: TimePartitionedDataset = field(
+        init=False,
+        default_factory=lambda: TimePartitionedDataset(ts_column_name=METRICS_API_COLUMNS.timestamp),
+    )
 
     def __post_init__(self, in_prometheus_url, in_prometheus_query_endpoint) -> None:
         # Initialize the super classes to set the internal attributes
@@ -57,6 +63,9 @@ class PrometheusMetricsDataHandler(AbstractDataHandler, CCloudBase):
         self.override_auth_type_from_yaml(self.in_connection_auth)
         self.url = parse.urljoin(base=in_prometheus_url, url=in_prometheus_query_endpoint)
         LOGGER.debug(f"Prometheus URL: {self.url}")
+        if not self.read_on_init:
+            self.last_available_date = self.start_date
+            return
         end_date = self.start_date + datetime.timedelta(days=self.days_per_query)
         # Set up params for querying the Billing API
         for item in [
@@ -76,6 +85,44 @@ class PrometheusMetricsDataHandler(AbstractDataHandler, CCloudBase):
         params={"step": 3600},
         **kwargs,
     ):
+        """Read the metrics for [start_date, end_date) into the dataset.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Exclusive end datetime
+            query_type (str): Name of the query in METRICS_API_PROMETHEUS_QUERIES
+        """
+        end_ts = pd.Timestamp(end_date)
+        end_ts = end_ts.tz_localize(datetime.timezone.utc) if end_ts.tz is None else end_ts
+        metrics_frames = []
+        for frame in self.iter_metrics_frames(
+            start_date=start_date, end_date=end_date, query_type=query_type, params=params
+        ):
+            # query_range includes its end, which is also the start of the next fetch. The end is left to that fetch
+            # so the boundary hour is only read once.
+            frame = frame[frame.index.get_level_values(METRICS_API_COLUMNS.timestamp) < end_ts]
+            if not frame.empty:
+                metrics_frames.append(frame)
+        if metrics_frames:
+            self.metrics_dataset.append(dataset=pd.concat(metrics_frames))
+
+    def iter_metrics_frames(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        query_type: str,
+        params={"step": 3600},
+    ) -> Iterator[pd.DataFrame]:
+        """Query Prometheus for the date range without keeping the result in the handler.
+
+        Args:
+            start_date (datetime.datetime): Inclusive start datetime
+            end_date (datetime.datetime): Inclusive end datetime
+            query_type (str): Name of the query in METRICS_API_PROMETHEUS_QUERIES
+
+        Yields:
+            pd.DataFrame: The values of one result series at a time
+        """
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         post_body = {}
         post_body["start"] = f'{start_date.replace(tzinfo=datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")}+00:00'
@@ -104,31 +151,15 @@ class PrometheusMetricsDataHandler(AbstractDataHandler, CCloudBase):
                             for in_item in item["values"]
                         ]
                         if temp_data:
-                            if self.metrics_dataset is not None:
-                                self.metrics_dataset = pd.concat(
-                                    [
-                                        self.metrics_dataset,
-                                        pd.DataFrame.from_records(
-                                            temp_data,
-                                            index=[
-                                                METRICS_API_COLUMNS.timestamp,
-                                                METRICS_API_COLUMNS.query_type,
-                                                METRICS_API_COLUMNS.cluster_id,
-                                                METRICS_API_COLUMNS.principal_id,
-                                            ],
-                                        ),
-                                    ]
-                                )
-                            else:
-                                self.metrics_dataset = pd.DataFrame.from_records(
-                                    temp_data,
-                                    index=[
-                                        METRICS_API_COLUMNS.timestamp,
-                                        METRICS_API_COLUMNS.query_type,
-                                        METRICS_API_COLUMNS.cluster_id,
-                                        METRICS_API_COLUMNS.principal_id,
-                                    ],
-                                )
+                            yield pd.DataFrame.from_records(
+                                temp_data,
+                                index=[
+                                    METRICS_API_COLUMNS.timestamp,
+                                    METRICS_API_COLUMNS.query_type,
+                                    METRICS_API_COLUMNS.cluster_id,
+                                    METRICS_API_COLUMNS.principal_id,
+                                ],
+                            )
             else:
                 LOGGER.debug("No data found in the API response. Response Received is: " + str(out_json))
         else:
@@ -150,7 +181,7 @@ class PrometheusMetricsDataHandler(AbstractDataHandler, CCloudBase):
                     query_type=item,
                 )
             self.last_available_date = effective_dates.next_fetch_end_date
-            self.metrics_dataset, is_none = self.get_dataset_for_timerange(
+            self.metrics_dataset.evict(
                 start_datetime=effective_dates.retention_start_date, end_datetime=effective_dates.retention_end_date
             )
 
@@ -197,3 +228,41 @@ class PrometheusMetricsDataHandler(AbstractDataHandler, CCloudBase):
             )
         else:
             return temp_data
+
+    @logged_method
+    def get_usage_dataframe_for_time_slice(self, time_slice: pd.Timestamp, **kwargs) -> pd.DataFrame:
+        """Pivots the metrics for the exact timestamp so that every query type is available as a numeric column.
+
+        Args:
+            time_slice (pd.Timestamp): Time slice to be used for fetching the data from datafame for the exact timestamp
+
+        Returns:
+            pd.DataFrame: Flat DataFrame with timestamp, cluster & principal columns and one column per query type.
+        """
+        query_types = [
+            METRICS_API_PROMETHEUS_QUERIES.request_bytes_name,
+            METRICS_API_PROMETHEUS_QUERIES.response_bytes_name,
+        ]
+        temp_data, is_none = self._get_dataset_for_exact_timestamp(
+            dataset=self.metrics_dataset, ts_column_name=METRICS_API_COLUMNS.timestamp, time_slice=time_slice
+        )
+        if is_none or temp_data.empty:
+            return pd.DataFrame(
+                columns=[
+                    METRICS_API_COLUMNS.timestamp,
+                    METRICS_API_COLUMNS.cluster_id,
+                    METRICS_API_COLUMNS.principal_id,
+                ]
+                + query_types
+            )
+        values = pd.to_numeric(temp_data[METRICS_API_COLUMNS.value], errors="coerce").fillna(0)
+        # Repeated samples of a series are summed, so a duplicated index entry never fails the pivot
+        out = (
+            values.groupby(level=list(values.index.names), sort=False)
+            .sum()
+            .unstack(METRICS_API_COLUMNS.query_type, fill_value=0)
+            .reindex(columns=query_types, fill_value=0)
+            .reset_index()
+        )
+        out.columns.name = None
+        return out
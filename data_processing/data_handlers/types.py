@@ -1,13 +1,17 @@
+from __future__ import annotations
+
 import datetime
 import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from types import NoneType
-from typing import Tuple
+from typing import Dict, Iterator, List, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
-from helpers import logged_method
+from data_processing.data_handlers.dataframe_backend import get_dataframe_backend
+from helpers import HOURS_PER_DAY, SECONDS_PER_HOUR, from_epoch_hour, logged_method, to_epoch_hour
 
 LOGGER = logging.getLogger(__name__)
 
@@ -22,6 +26,176 @@ class EffectiveDates:
     retention_end_date: datetime.datetime
 
 
+def _get_utc_seconds(ts: datetime.datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=datetime.timezone.utc)
+    return ts.timestamp()
+
+
+@dataclass
+class TimePartitionedDataset:
+    """MultiIndex dataset stored as one DataFrame per hour or per day, keyed by the epoch hour of the partition start.
+    Reading a time slice is a dict lookup, reading a range only concatenates the partitions within the range and
+    retention drops whole partitions without copying the rows that are kept.
+    The returned partitions are the stored frames and must not be modified in place.
+
+    Args:
+        ts_column_name: Name of the timestamp level in the index
+        partition_hours: 1 for hourly partitions, 24 for daily partitions
+    """
+
+    ts_column_name: str
+    partition_hours: int = field(default=1)
+
+    # epoch hour of the partition start --> rows within [start, start + partition_hours)
+    partitions: Dict[int, pd.DataFrame] = field(init=False, repr=False, default_factory=dict)
+    # Partitions where every row is at the partition start, so a slice of that hour is the whole partition
+    aligned_keys: Set[int] = field(init=False, repr=False, default_factory=set)
+    # Zero row frame with the columns & index levels of the data, returned for the slices without rows
+    empty_frame: pd.DataFrame | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self) -> None:
+        if self.partition_hours not in (1, HOURS_PER_DAY):
+            raise ValueError(f"Partitions can be hourly or daily. Found {self.partition_hours} hours per partition.")
+
+    @classmethod
+    def from_frame(
+        cls, dataset: pd.DataFrame | None, ts_column_name: str, partition_hours: int = 1
+    ) -> TimePartitionedDataset:
+        out = cls(ts_column_name=ts_column_name, partition_hours=partition_hours)
+        out.append(dataset=dataset)
+        return out
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.partitions.values())
+
+    @property
+    def is_none(self) -> bool:
+        """True until the first rows are appended, same as a dataset that was never initialized."""
+        return self.empty_frame is None
+
+    @property
+    def empty(self) -> bool:
+        return not self.partitions
+
+    def get_partition_key(self, epoch_hour: int) -> int:
+        return epoch_hour - (epoch_hour % self.partition_hours)
+
+    def iter_partitions(
+        self, start_hour: int | None = None, end_hour: int | None = None
+    ) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """Partitions in time order that overlap [start_hour, end_hour). None leaves that side unbounded."""
+        for key in sorted(self.partitions.keys()):
+            if start_hour is not None and key + self.partition_hours <= start_hour:
+                continue
+            if end_hour is not None and key >= end_hour:
+                break
+            yield key, self.partitions[key]
+
+    @logged_method
+    def append(self, dataset: pd.DataFrame | None):
+        """Split the rows per partition and append them to the existing partitions. Only the partitions that
+        receive rows are rebuilt.
+
+        Args:
+            dataset (pd.DataFrame | None): rows with the timestamp level in the index
+        """
+        if dataset is None:
+            return
+        if self.empty_frame is None:
+            self.empty_frame = dataset.iloc[:0]
+        if dataset.empty:
+            return
+        ts_values = pd.DatetimeIndex(dataset.index.get_level_values(self.ts_column_name))
+        if ts_values.tz is None:
+            ts_values = ts_values.tz_localize(datetime.timezone.utc)
+        ns_per_hour = SECONDS_PER_HOUR * 1_000_000_000
+        ts_in_ns = ts_values.asi8
+        epoch_hours = ts_in_ns // ns_per_hour
+        partition_keys = epoch_hours - (epoch_hours % self.partition_hours)
+        for key, positions in pd.Series(np.arange(len(dataset))).groupby(partition_keys, sort=True).indices.items():
+            key = int(key)
+            rows = dataset.iloc[positions]
+            existing = self.partitions.get(key, None)
+            self.partitions[key] = rows if existing is None else pd.concat([existing, rows])
+            if (existing is None or key in self.aligned_keys) and (ts_in_ns[positions] == key * ns_per_hour).all():
+                self.aligned_keys.add(key)
+            else:
+                self.aligned_keys.discard(key)
+
+    def get_time_slice(self, time_slice: datetime.datetime) -> pd.DataFrame:
+        """Rows with the exact timestamp. Hourly partitions with all their rows at the whole hour are returned as is."""
+        ts_in_secs = _get_utc_seconds(time_slice)
+        epoch_hour = int(ts_in_secs) // SECONDS_PER_HOUR
+        partition = self.partitions.get(self.get_partition_key(epoch_hour=epoch_hour), None)
+        if partition is None:
+            return self.empty_frame
+        if epoch_hour in self.aligned_keys and ts_in_secs == epoch_hour * SECONDS_PER_HOUR:
+            return partition
+        return get_dataframe_backend().filter_time_slice(
+            dataset=partition,
+            ts_column_name=self.ts_column_name,
+            time_slice=pd.Timestamp(ts_in_secs, unit="s", tz=datetime.timezone.utc),
+        )
+
+    def get_time_range(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> pd.DataFrame:
+        """Rows within [start_datetime, end_datetime). Partitions that are fully within the range are used as is,
+        only the partitions at the edges of the range are filtered."""
+        start_secs, end_secs = _get_utc_seconds(start_datetime), _get_utc_seconds(end_datetime)
+        out: List[pd.DataFrame] = []
+        for key, partition in self.iter_partitions(
+            start_hour=int(start_secs // SECONDS_PER_HOUR), end_hour=-int(-end_secs // SECONDS_PER_HOUR)
+        ):
+            if start_secs <= key * SECONDS_PER_HOUR and (key + self.partition_hours) * SECONDS_PER_HOUR <= end_secs:
+                out.append(partition)
+            else:
+                out.append(
+                    get_dataframe_backend().filter_time_range(
+                        dataset=partition,
+                        ts_column_name=self.ts_column_name,
+                        start_datetime=start_datetime,
+                        end_datetime=end_datetime,
+                    )
+                )
+        if not out:
+            return self.empty_frame
+        return out[0] if len(out) == 1 else pd.concat(out)
+
+    def get_subset(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> TimePartitionedDataset:
+        """New container sharing the partitions that overlap [start_datetime, end_datetime) with this one."""
+        out = TimePartitionedDataset(ts_column_name=self.ts_column_name, partition_hours=self.partition_hours)
+        out.empty_frame = self.empty_frame
+        out.partitions = dict(
+            self.iter_partitions(
+                start_hour=to_epoch_hour(start_datetime),
+                end_hour=-int(-_get_utc_seconds(end_datetime) // SECONDS_PER_HOUR),
+            )
+        )
+        out.aligned_keys = self.aligned_keys & out.partitions.keys()
+        return out
+
+    @logged_method
+    def evict(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime):
+        """Drop the partitions that are completely outside [start_datetime, end_datetime).
+
+        Args:
+            start_datetime (datetime.datetime): Inclusive start of the retained period
+            end_datetime (datetime.datetime): Exclusive end of the retained period
+        """
+        retained = self.get_subset(start_datetime=start_datetime, end_datetime=end_datetime)
+        evicted = len(self.partitions) - len(retained.partitions)
+        self.partitions, self.aligned_keys = retained.partitions, retained.aligned_keys
+        LOGGER.debug(f"Evicted {evicted} partitions outside {start_datetime} - {end_datetime}")
+
+    def to_frame(self) -> pd.DataFrame | None:
+        """Whole dataset as a single DataFrame in time order. None if nothing was ever appended."""
+        if self.empty_frame is None:
+            return None
+        if not self.partitions:
+            return self.empty_frame
+        return pd.concat([x for _, x in self.iter_partitions()])
+
+
 @dataclass
 class AbstractDataHandler(ABC):
     start_date: datetime.datetime = field(init=True)
@@ -75,12 +249,15 @@ class AbstractDataHandler(ABC):
             pd.Timestamp: converted timestamp object
         """
         start_date = curr_date.replace(minute=0, microsecond=0, tzinfo=datetime.timezone.utc)
+        if freq == "1H":
+            # Plain integer arithmetic on the epoch hour instead of building a date_range for a single timestamp
+            return pd.Timestamp(from_epoch_hour(to_epoch_hour(start_date) + position))
         return pd.date_range(start_date, freq=freq, periods=2)[position]
 
     @logged_method
     def _get_dataset_for_timerange(
         self,
-        dataset: pd.DataFrame,
+        dataset: pd.DataFrame | TimePartitionedDataset,
         ts_column_name: str,
         start_datetime: datetime.datetime,
         end_datetime: datetime.datetime,
@@ -89,7 +266,7 @@ class AbstractDataHandler(ABC):
         """Converts the chargeback dict stored internally to a dataframe and filter the data using the args
 
         Args:
-            dataset (pd.DataFrame): input pandas Dataframe
+            dataset (pd.DataFrame | TimePartitionedDataset): input pandas Dataframe or partitioned dataset
             ts_column_name (str): Column name for the timestamp column in the index
             start_datetime (datetime.datetime): Inclusive start datetime
             end_datetime (datetime.datetime): Exclusive End datetime
@@ -100,6 +277,11 @@ class AbstractDataHandler(ABC):
         start_date = pd.to_datetime(start_datetime)
         end_date = pd.to_datetime(end_datetime)
 
+        if isinstance(dataset, TimePartitionedDataset):
+            if dataset.is_none:
+                return (None, True)
+            return (dataset.get_time_range(start_datetime=start_date, end_datetime=end_date), False)
+
         if isinstance(dataset, NoneType):
             return (None, True)
 
@@ -107,10 +289,9 @@ class AbstractDataHandler(ABC):
             return (dataset, False)
 
         return (
-            dataset[
-                (dataset.index.get_level_values(ts_column_name) >= start_date)
-                & (dataset.index.get_level_values(ts_column_name) < end_date)
-            ],
+            get_dataframe_backend().filter_time_range(
+                dataset=dataset, ts_column_name=ts_column_name, start_datetime=start_date, end_datetime=end_date
+            ),
             False,
         )
 
@@ -155,26 +336,35 @@ class AbstractDataHandler(ABC):
 
     @logged_method
     def _get_dataset_for_exact_timestamp(
-        self, dataset: pd.DataFrame, ts_column_name: str, time_slice: pd.Timestamp, **kwargs
+        self, dataset: pd.DataFrame | TimePartitionedDataset, ts_column_name: str, time_slice: pd.Timestamp, **kwargs
     ) -> Tuple[pd.DataFrame | None, bool]:
         """used to filter down the data in a dataframe to a specific timestamp that is present in a timestamp index
 
         Args:
-            dataset (pd.DataFrame): The dataframe to filter the data
+            dataset (pd.DataFrame | TimePartitionedDataset): The dataframe or partitioned dataset to filter the data
             ts_column_name (str): The timestamp column name used to filter the data
             time_slice (pd.Timestamp): The exact pandas timestamp used as the filter criterion
 
         Returns:
             _type_: _description_
         """
+        if isinstance(dataset, TimePartitionedDataset):
+            if dataset.is_none:
+                return (None, True)
+            return (dataset.get_time_slice(time_slice=time_slice), False)
+
         if isinstance(dataset, NoneType):
             return (None, True)
 
         if dataset.empty:
             return (dataset, False)
 
-        temp_ds = dataset.index.get_level_values(ts_column_name)
-        return (dataset[(dataset.index.get_level_values(ts_column_name) == time_slice)], False)
+        return (
+            get_dataframe_backend().filter_time_slice(
+                dataset=dataset, ts_column_name=ts_column_name, time_slice=time_slice
+            ),
+            False,
+        )
 
     @logged_method
     def execute_requests(self, exposed_timestamp: datetime.datetime):
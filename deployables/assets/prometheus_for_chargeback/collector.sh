@@ -4,30 +4,33 @@
 
 READINESS_PROBE="/is_ready"
 CURRENT_TS_PROBE="/current_timestamp"
+ORGS_PROBE="/orgs"
 
-READINESS_URL="${CHARGEBACK_READINESS_PROBE_URL}${READINESS_PROBE}"
-TS_URL="${CHARGEBACK_READINESS_PROBE_URL}${CURRENT_TS_PROBE}"
+ORGS_URL="${CHARGEBACK_READINESS_PROBE_URL}${ORGS_PROBE}"
 
-SCRAPE_URL="${CHARGEBACK_METRICS_URL}"
+# Every org is served under /metrics/<org_id> with its own readiness & timestamp probes
+SCRAPE_PATH="/metrics"
 
 check_readiness () {
-    # This function checks if the readiness probe is True
-    # If it is not, it will wait 5 seconds and try again
+    # This function checks if the readiness probe of the org in $1 is True
+    # If it is not, it will wait 3 seconds and try again
+    READINESS_URL="${CHARGEBACK_READINESS_PROBE_URL}${READINESS_PROBE}/$1"
     test=`wget -O - -q ${READINESS_URL} 2>&1 | cut -d ' ' -f 1`
-    echo "Readiness probe is ${test}"
-    while [ ${test} != "True" ]
+    echo "Readiness probe for $1 is ${test}"
+    while [ "${test}" != "True" ]
     do
         test=`wget -O - -q ${READINESS_URL} 2>&1 | cut -d ' ' -f 1`
-        echo "Readiness probe is ${test}"
+        echo "Readiness probe for $1 is ${test}"
         echo "Waiting for readiness probe to be True"
         sleep 3
     done
 }
 
 check_ts_vicinity () {
-    # This function checks if the scrape timestamp is getting close to the current time
+    # This function checks if the scrape timestamp of the org in $1 is getting close to the current time
     # If it is, it will increase the scrape interval to 10 minutes
-    # If it is not, it will set the scrape interval to 0.1 seconds
+    # If it is not, it will set the scrape interval to 1 second
+    TS_URL="${CHARGEBACK_READINESS_PROBE_URL}${CURRENT_TS_PROBE}/$1"
     TS_VALUE=`wget -O - -q ${TS_URL} 2>&1 | cut -d ' ' -f 1`
     VICINITY_CUTOFF=$(( `date '+%s'` - $(( 24 * 60 * 60 * 5 )) ))
     if [ ${TS_VALUE} -gt ${VICINITY_CUTOFF} ]
@@ -38,27 +41,43 @@ check_ts_vicinity () {
     fi
 }
 
+list_orgs () {
+    # This function waits until the chargeback handler lists the orgs it serves
+    ORG_IDS=`wget -O - -q ${ORGS_URL} 2>&1`
+    while [ -z "${ORG_IDS}" ]
+    do
+        echo "Waiting for the chargeback handler to list its orgs" >&2
+        sleep 3
+        ORG_IDS=`wget -O - -q ${ORGS_URL} 2>&1`
+    done
+    echo ${ORG_IDS}
+}
+
 # Main loop
-# This loop will check if the readiness probe is True
-# If it is not, it will wait 5 seconds and try again
-# If it is, it will check if the scrape timestamp is getting close to the current time
-# If it is, it will increase the scrape interval to 10 minutes
-# If it is not, it will set the scrape interval to 0.1 seconds
-# It will then scrape the Chargeback API and create a new block
-# It will then wait for the scrape interval and repeat
+# For every org, this loop will check if the readiness probe of the org is True
+# If it is not, it will wait 3 seconds and try again
+# If it is, it will check if the scrape timestamp of the org is getting close to the current time
+# It will then scrape the Chargeback API of the org and create a new block
+# Once every org is scraped, it will wait for the shortest scrape interval of the orgs and repeat
 # Don't we just love the Auto generated Comments :) 
 while true
 do
-    check_readiness
-    SCRAPE_INTERVAL=`check_ts_vicinity`
+    SCRAPE_INTERVAL=600
+    for ORG_ID in `list_orgs`
+    do
+        check_readiness ${ORG_ID}
+        ORG_SCRAPE_INTERVAL=`check_ts_vicinity ${ORG_ID}`
+        if [ ${ORG_SCRAPE_INTERVAL} -lt ${SCRAPE_INTERVAL} ]
+        then
+            SCRAPE_INTERVAL=${ORG_SCRAPE_INTERVAL}
+        fi
+        rm -f index.html
+        wget -T 300 -O index.html "${CHARGEBACK_METRICS_URL}${SCRAPE_PATH}/${ORG_ID}"
+        echo "# EOF" >> index.html
+        promtool tsdb create-blocks-from openmetrics index.html .
+        # rm -f index.html
+    done
     echo "Scraping Interval set to ${SCRAPE_INTERVAL}"
-    rm -f index.html index2.html
-    wget -T 60 ${SCRAPE_URL}
-    tail +37 index.html > index2.html
-    echo "# EOF" >> index2.html
-    promtool tsdb create-blocks-from openmetrics index2.html .
-    # rm -f index.html index2.html
     echo "Sleeping for ${SCRAPE_INTERVAL} seconds"
     sleep ${SCRAPE_INTERVAL}
 done
-
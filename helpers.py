@@ -1,3 +1,4 @@
+import datetime
 import logging
 import os
 import pprint
@@ -108,6 +109,28 @@ def check_pair(key1Name, key1Value, key2Name, key2Value):
     return
 
 
+SECONDS_PER_HOUR = 3600
+HOURS_PER_DAY = 24
+
+
+def to_epoch_hour(ts: datetime.datetime) -> int:
+    """Number of whole hours since the Unix epoch. Naive datetimes are treated as UTC.
+    Used as the internal time key so that the datetime objects are only built at the API & exposition boundaries."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=datetime.timezone.utc)
+    return int(ts.timestamp()) // SECONDS_PER_HOUR
+
+
+def from_epoch_hour(epoch_hour: int) -> datetime.datetime:
+    """UTC datetime for the epoch hour."""
+    return datetime.datetime.fromtimestamp(epoch_hour * SECONDS_PER_HOUR, tz=datetime.timezone.utc)
+
+
+def epoch_hour_to_day(epoch_hour: int) -> int:
+    """Epoch hour of the UTC midnight of the day the epoch hour belongs to."""
+    return epoch_hour - (epoch_hour % HOURS_PER_DAY)
+
+
 def printline():
     print("=" * 80)
 
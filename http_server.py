@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import decimal
+import email.utils
+import gzip
+import json
+import logging
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Callable, Dict, List, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+LOGGER = logging.getLogger(__name__)
+
+# Responses smaller than this are sent uncompressed, the gzip framing would outweigh the savings
+MIN_COMPRESS_BYTES = 1024
+MAX_REQUEST_LINE_BYTES = 8192
+MAX_HEADER_COUNT = 100
+
+
+@dataclass(kw_only=True)
+class HTTPRequest:
+    method: str
+    path: str
+    # Query parameters, the first value of every parameter
+    args: Dict[str, str] = field(default_factory=dict)
+    # Header names are lower case
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(kw_only=True)
+class HTTPResponse:
+    body: bytes = field(default=b"")
+    status: int = field(default=200)
+    content_type: str = field(default="text/html; charset=utf-8")
+    # Set when the body is already encoded, e.g. the cached gzip exposition payloads. The body is then sent as is.
+    content_encoding: str | None = field(default=None)
+
+
+def json_default(obj):
+    """Same conversions as the Flask JSON provider that served the internal API before."""
+    if isinstance(obj, datetime.date):
+        if not isinstance(obj, datetime.datetime):
+            obj = datetime.datetime.combine(obj, datetime.time.min)
+        obj = obj.replace(tzinfo=datetime.timezone.utc) if obj.tzinfo is None else obj.astimezone(datetime.timezone.utc)
+        return email.utils.format_datetime(obj, usegmt=True)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def jsonify(obj, status: int = 200) -> HTTPResponse:
+    body = json.dumps(obj, default=json_default, sort_keys=True, separators=(",", ":")) + "\n"
+    return HTTPResponse(body=body.encode("utf-8"), status=status, content_type="application/json")
+
+
+def accepts_gzip(accept_encoding_header: str | None) -> bool:
+    """Whether the Accept-Encoding header allows a gzip encoded response."""
+    for item in (accept_encoding_header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q_value = params.strip().partition("q=")[2]
+            try:
+                return not q_value or float(q_value) > 0
+            except ValueError:
+                return False
+    return False
+
+
+@dataclass(kw_only=True)
+class HTTPRouter:
+    """GET routes of the HTTP server. Path segments written as <name> match one segment and are passed to the
+    handler as keyword arguments, next to the request. A handler returns an HTTPResponse, a str, or a
+    (response, status code) tuple."""
+
+    routes: List[Tuple[re.Pattern, Callable]] = field(default_factory=list)
+
+    def route(self, path: str):
+        def decorator(func: Callable) -> Callable:
+            self.add_route(path=path, handler=func)
+            return func
+
+        return decorator
+
+    def add_route(self, path: str, handler: Callable):
+        pattern = re.compile("^" + re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", path.rstrip("/") or "/") + "$")
+        self.routes.append((pattern, handler))
+
+    def dispatch(self, request: HTTPRequest) -> HTTPResponse:
+        path = request.path.rstrip("/") or "/"
+        for pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match is not None:
+                return to_response(handler(request, **{k: unquote(v) for k, v in match.groupdict().items()}))
+        return HTTPResponse(body=b"Not Found", status=404, content_type="text/plain; charset=utf-8")
+
+
+def to_response(result) -> HTTPResponse:
+    if isinstance(result, tuple):
+        out, status = result
+        out = to_response(out)
+        out.status = status
+        return out
+    if isinstance(result, HTTPResponse):
+        return result
+    return HTTPResponse(body=str(result).encode("utf-8"))
+
+
+@dataclass(kw_only=True)
+class AsyncHTTPServer:
+    """Single asyncio HTTP/1.1 server for the Prometheus exposition and the internal API, running its event loop on
+    one daemon thread. Connections are kept alive between requests and responses are gzip encoded when the client
+    accepts it. The handlers run on the default executor of the loop, so a slow handler neither blocks the other
+    connections nor the compute threads.
+
+    Args:
+        router: Routes to serve
+        ports: Ports to listen on, every port serves every route
+        addr: Interface to listen on
+        keep_alive_timeout_secs: Idle time after which a kept alive connection is closed
+    """
+
+    router: HTTPRouter
+    ports: List[int] = field(default_factory=lambda: [8000])
+    addr: str = field(default="0.0.0.0")
+    keep_alive_timeout_secs: float = field(default=75)
+
+    loop: asyncio.AbstractEventLoop | None = field(init=False, repr=False, default=None)
+    servers: List[asyncio.AbstractServer] = field(init=False, repr=False, default_factory=list)
+    # Tasks of the open connections, cancelled on stop as kept alive connections would otherwise outlive the servers
+    connections: Set[asyncio.Task] = field(init=False, repr=False, default_factory=set)
+    thread: threading.Thread | None = field(init=False, repr=False, default=None)
+
+    def start(self) -> AsyncHTTPServer:
+        """Start listening on every port. Returns once the sockets are bound, port 0 picks a free port."""
+        started = threading.Event()
+        errors = []
+
+        def run_loop():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                for port in self.ports:
+                    self.servers.append(
+                        self.loop.run_until_complete(
+                            asyncio.start_server(self.handle_connection, host=self.addr, port=port)
+                        )
+                    )
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True, name="http-server")
+        self.thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        self.ports = [server.sockets[0].getsockname()[1] for server in self.servers]
+        LOGGER.info(f"HTTP server listening on {self.addr} ports {self.ports}")
+        return self
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        async def close_servers():
+            for server in self.servers:
+                server.close()
+                await server.wait_closed()
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(close_servers(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+        self.servers = []
+
+    async def read_request(self, reader: asyncio.StreamReader) -> HTTPRequest | None:
+        """Next request of the connection. None once the client closed the connection or stayed idle too long."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=self.keep_alive_timeout_secs)
+        except (asyncio.TimeoutError, ConnectionError):
+            return None
+        if not request_line:
+            return None
+        if len(request_line) > MAX_REQUEST_LINE_BYTES:
+            raise ValueError("Request line too long")
+        method, target, version = request_line.decode("latin-1").strip().split(" ", 2)
+        headers = {}
+        # Header lines are counted rather than the names, as a repeated name only keeps its last value
+        for header_count in range(MAX_HEADER_COUNT + 1):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if header_count == MAX_HEADER_COUNT:
+                raise ValueError("Too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        # Bodies are not used by any route, but have to be consumed to keep the connection usable
+        content_length = int(headers.get("content-length", 0) or 0)
+        if content_length:
+            await reader.readexactly(content_length)
+        url = urlsplit(target)
+        headers[":version"] = version.upper()
+        return HTTPRequest(
+            method=method.upper(),
+            path=url.path,
+            args={k: v[0] for k, v in parse_qs(url.query).items()},
+            headers=headers,
+        )
+
+    def respond(self, request: HTTPRequest) -> HTTPResponse:
+        """Dispatch the request and encode the response. Runs on the executor."""
+        if request.method not in ("GET", "HEAD"):
+            return HTTPResponse(body=b"Method Not Allowed", status=405, content_type="text/plain; charset=utf-8")
+        try:
+            response = self.router.dispatch(request)
+        except Exception as e:
+            LOGGER.exception(f"Request for {request.path} failed: {e}")
+            response = HTTPResponse(body=b"Internal Server Error", status=500, content_type="text/plain; charset=utf-8")
+        if (
+            response.content_encoding is None
+            and len(response.body) >= MIN_COMPRESS_BYTES
+            and accepts_gzip(request.headers.get("accept-encoding", None))
+        ):
+            response.body = gzip.compress(response.body, compresslevel=6)
+            response.content_encoding = "gzip"
+        return response
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    LOGGER.debug(f"Malformed request: {e}")
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+                connection_header = request.headers.get("connection", "").lower()
+                keep_alive = (
+                    connection_header == "keep-alive"
+                    if request.headers[":version"] == "HTTP/1.0"
+                    else connection_header != "close"
+                )
+                response = await asyncio.get_running_loop().run_in_executor(None, self.respond, request)
+                head = [
+                    f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}",
+                    f"Content-Type: {response.content_type}",
+                    f"Content-Length: {len(response.body)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if response.content_encoding is not None:
+                    head.append(f"Content-Encoding: {response.content_encoding}")
+                    head.append("Vary: Accept-Encoding")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if request.method != "HEAD":
+                    writer.write(response.body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled by stop, the connection just closes
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
@@ -1,42 +1,165 @@
 import logging
 from datetime import datetime
+from typing import Callable, Dict
 
-from flask import Flask
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from data_processing.data_handlers.chargeback_shadow import SHADOW_REGISTRY
 from helpers import logged_method
+from http_server import HTTPRequest, HTTPResponse, HTTPRouter, jsonify
 
 LOGGER = logging.getLogger(__name__)
 
-internal_api = Flask(__name__)
+internal_api = HTTPRouter()
 
+# Process wide readiness & exposed date. They follow the root org, which is also served on / & /metrics
 READINESS_FLAG = False
 CURRENT_EXPOSED_DATE: datetime = None
+# Org ID --> readiness & exposed date of the org, which is served on /metrics/<org_id> and steps on its own
+ORG_READINESS_FLAGS: Dict[str, bool] = {}
+ORG_EXPOSED_DATES: Dict[str, datetime] = {}
+# Org ID --> Chargeback vs Billing reconciliation summary for the data in memory
+RECONCILIATION_SUMMARY: Dict[str, Dict] = {}
+# Org ID --> what-if runner accepting (start_date, end_date, allocation_params dict) and returning a list of records
+WHAT_IF_RUNNERS: Dict[str, Callable] = {}
+# Org ID --> Shadow engine report with the comparison for the last computed windows
+SHADOW_REPORTS: Dict[str, Dict] = {}
+# Org ID --> reader accepting a datetime and returning the chargeback records for that hour
+CHARGEBACK_HOUR_READERS: Dict[str, Callable] = {}
 
 
 @logged_method
-def set_readiness(readiness_flag: bool):
+def set_readiness(readiness_flag: bool, org_id: str | None = None):
+    """Set the readiness of the org, or the process wide readiness when no org is given."""
     global READINESS_FLAG
-    READINESS_FLAG = readiness_flag
+    if org_id is None:
+        READINESS_FLAG = readiness_flag
+    else:
+        ORG_READINESS_FLAGS[org_id] = readiness_flag
 
 
-@internal_api.route("/is_ready", methods=["GET"])
-def is_ready():
+@internal_api.route("/is_ready")
+def is_ready(request: HTTPRequest):
     global READINESS_FLAG
     return str(READINESS_FLAG)
 
 
-def set_current_exposed_date(exposed_date: datetime):
+@internal_api.route("/is_ready/<org_id>")
+def is_org_ready(request: HTTPRequest, org_id: str):
+    if org_id not in ORG_EXPOSED_DATES:
+        return f"Unknown Org ID {org_id}", 404
+    return str(ORG_READINESS_FLAGS.get(org_id, False))
+
+
+def set_current_exposed_date(exposed_date: datetime, org_id: str | None = None):
+    """Set the exposed date of the org, or the process wide exposed date when no org is given."""
     global CURRENT_EXPOSED_DATE
-    CURRENT_EXPOSED_DATE = exposed_date
+    if org_id is None:
+        CURRENT_EXPOSED_DATE = exposed_date
+    else:
+        ORG_EXPOSED_DATES[org_id] = exposed_date
+
+
+@internal_api.route("/orgs")
+def org_ids(request: HTTPRequest):
+    """Org IDs served under /metrics/<org_id>, one per line."""
+    return HTTPResponse(
+        body="".join(f"{x}\n" for x in ORG_EXPOSED_DATES.keys()).encode("utf-8"),
+        content_type="text/plain; charset=utf-8",
+    )
 
 
-@internal_api.route("/current_exposed_date", methods=["GET"])
-def current_exposed_date():
+@internal_api.route("/current_exposed_date")
+def current_exposed_date(request: HTTPRequest):
     global CURRENT_EXPOSED_DATE
     return str(CURRENT_EXPOSED_DATE)
 
 
-@internal_api.route("/current_timestamp", methods=["GET"])
-def current_timestamp():
+@internal_api.route("/current_exposed_date/<org_id>")
+def current_org_exposed_date(request: HTTPRequest, org_id: str):
+    if org_id not in ORG_EXPOSED_DATES:
+        return f"Unknown Org ID {org_id}", 404
+    return str(ORG_EXPOSED_DATES[org_id])
+
+
+@internal_api.route("/current_timestamp")
+def current_timestamp(request: HTTPRequest):
     global CURRENT_EXPOSED_DATE
     return str(int(CURRENT_EXPOSED_DATE.timestamp()))
+
+
+@internal_api.route("/current_timestamp/<org_id>")
+def current_org_timestamp(request: HTTPRequest, org_id: str):
+    if org_id not in ORG_EXPOSED_DATES:
+        return f"Unknown Org ID {org_id}", 404
+    return str(int(ORG_EXPOSED_DATES[org_id].timestamp()))
+
+
+def set_reconciliation_summary(org_id: str, summary: Dict):
+    global RECONCILIATION_SUMMARY
+    RECONCILIATION_SUMMARY[org_id] = summary
+
+
+@internal_api.route("/reconciliation")
+def reconciliation(request: HTTPRequest):
+    global RECONCILIATION_SUMMARY
+    return jsonify(RECONCILIATION_SUMMARY)
+
+
+def register_what_if_runner(org_id: str, runner: Callable):
+    global WHAT_IF_RUNNERS
+    WHAT_IF_RUNNERS[org_id] = runner
+
+
+@internal_api.route("/what_if/<org_id>")
+def what_if(request: HTTPRequest, org_id: str):
+    global WHAT_IF_RUNNERS
+    if org_id not in WHAT_IF_RUNNERS:
+        return jsonify({"error": f"Unknown Org ID {org_id}"}), 404
+    try:
+        start_date = datetime.fromisoformat(request.args["start_date"])
+        end_date = datetime.fromisoformat(request.args["end_date"])
+        result = WHAT_IF_RUNNERS[org_id](
+            start_date=start_date,
+            end_date=end_date,
+            allocation_params={
+                "common_charge_ratio": request.args.get("common_charge_ratio", None),
+                "owner_policy": request.args.get("owner_policy", None),
+            },
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid what-if request: {e}"}), 400
+    return jsonify(result)
+
+
+def register_chargeback_hour_reader(org_id: str, reader: Callable):
+    global CHARGEBACK_HOUR_READERS
+    CHARGEBACK_HOUR_READERS[org_id] = reader
+
+
+@internal_api.route("/chargeback/<org_id>")
+def chargeback_for_hour(request: HTTPRequest, org_id: str):
+    global CHARGEBACK_HOUR_READERS
+    if org_id not in CHARGEBACK_HOUR_READERS:
+        return jsonify({"error": f"Unknown Org ID {org_id}"}), 404
+    try:
+        time_slice = datetime.fromisoformat(request.args["timestamp"])
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid chargeback request: {e}"}), 400
+    return jsonify(CHARGEBACK_HOUR_READERS[org_id](time_slice=time_slice))
+
+
+def set_shadow_report(org_id: str, report: Dict):
+    global SHADOW_REPORTS
+    SHADOW_REPORTS[org_id] = report
+
+
+@internal_api.route("/shadow/report")
+def shadow_report(request: HTTPRequest):
+    global SHADOW_REPORTS
+    return jsonify(SHADOW_REPORTS)
+
+
+@internal_api.route("/shadow/metrics")
+def shadow_metrics(request: HTTPRequest):
+    return HTTPResponse(body=generate_latest(SHADOW_REGISTRY), content_type=CONTENT_TYPE_LATEST)
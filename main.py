@@ -4,7 +4,7 @@ import os
 
 import dotenv
 
-from workflow_runner import execute_workflow
+from workflow_runner import execute_backfill, execute_workflow
 
 parser = argparse.ArgumentParser(
     description="Command line arguments for controlling the application",
@@ -19,6 +19,42 @@ wf_args.add_argument(
     help="Provide the path to the config file. Default is ./config/config_internal.yaml.",
 )
 
+backfill_args = parser.add_argument_group(
+    "backfill-args",
+    "Headless backfill. Computes the chargeback for the date range, writes OpenMetrics files, TSDB blocks or CSV "
+    "files per day or pushes it with remote_write, and exits.",
+)
+backfill_args.add_argument(
+    "--backfill-start",
+    type=str,
+    default=None,
+    help="Inclusive start date (YYYY-MM-DD) for the backfill. Enables the backfill mode.",
+)
+backfill_args.add_argument(
+    "--backfill-end",
+    type=str,
+    default=None,
+    help="Exclusive end date (YYYY-MM-DD) for the backfill. Default is 2 days before today, the last finalized day.",
+)
+backfill_args.add_argument(
+    "--backfill-output-dir",
+    type=str,
+    default=None,
+    help="Directory for the OpenMetrics files, the TSDB blocks or the CSV files. Default is "
+    "<output_dir_name>/backfill from the config file. For TSDB blocks, point it to the data directory of the "
+    "chargeback Prometheus.",
+)
+backfill_args.add_argument(
+    "--backfill-format",
+    type=str,
+    choices=["openmetrics", "tsdb", "csv", "remote_write"],
+    default="openmetrics",
+    help="openmetrics writes files for `promtool tsdb create-blocks-from openmetrics`. tsdb writes Prometheus TSDB "
+    "blocks with the chargeback, billing & objects series. csv writes the chargeback rows as one CSV file per day. "
+    "remote_write pushes the same series as tsdb to the remote_write receiver of the chargeback datastore, see "
+    "remote_write in the config file. Default is openmetrics.",
+)
+
 arg_flags = parser.parse_args()
 
 # Load dev.env file if in development mode
@@ -41,4 +77,7 @@ else:
     )
 
 
-execute_workflow(arg_flags)
+if arg_flags.backfill_start is not None:
+    execute_backfill(arg_flags)
+else:
+    execute_workflow(arg_flags)
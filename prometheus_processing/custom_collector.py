@@ -1,34 +1,92 @@
+from __future__ import annotations
+
 import datetime
 import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple, TypeVar
 
-from prometheus_client import Gauge
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge
+from prometheus_client.metrics_core import GaugeMetricFamily, Metric
+from prometheus_client.samples import Sample
 
 from helpers import logged_method
 from prometheus_processing.notifier import NotifierAbstract
 
 LOGGER = logging.getLogger(__name__)
 
+# Every TimestampedCollector instance, so that the catch-up mode can stage all of them after every exposed hour
+TIMESTAMPED_COLLECTORS: List["TimestampedCollectorBase"] = []
+# Switched off while the exposition is served from the ExpositionCache, which notifies the observers itself once the
+# cached payload of a scrape has been sent
+NOTIFY_ON_COLLECT = True
 
-class TimestampedCollector(NotifierAbstract, Gauge):
-    def __init__(self, *args, in_begin_timestamp: datetime.datetime = None, **kwargs):
+
+def set_notify_on_collect(notify_on_collect: bool):
+    global NOTIFY_ON_COLLECT
+    NOTIFY_ON_COLLECT = notify_on_collect
+
+
+class TimestampedCollectorBase(NotifierAbstract):
+    """Exposes the current samples of a collector with the exported timestamp, stages them for the catch-up mode and
+    notifies the observers after every collection. Subclasses provide the current samples in collect_current."""
+
+    def __init__(self, in_begin_timestamp: datetime.datetime = None):
         NotifierAbstract.__init__(self)
-        Gauge.__init__(self, *args, **kwargs)
+        # Sample timestamp value --> metrics staged for that timestamp, exposed by the next scrape
+        self._staged_metrics: Dict[float, List[Metric]] = {}
         if in_begin_timestamp is not None:
             self.set_timestamp(curr_timestamp=in_begin_timestamp)
+        TIMESTAMPED_COLLECTORS.append(self)
+
+    def collect_current(self, ts_value: float) -> List[Metric]:
+        """Metric families with the current samples, every sample carrying the timestamp value."""
+        raise NotImplementedError
+
+    def copy_to(self, registry: CollectorRegistry) -> TimestampedCollectorBase:
+        """Empty collector with the same metric definition & exported timestamp, registered in the registry."""
+        raise NotImplementedError
+
+    def get_timestamp_value(self) -> float:
+        return int(self._exported_timestamp.timestamp()) / 1000
+
+    def collect_with_timestamp(self) -> List[Metric]:
+        return self.collect_current(ts_value=self.get_timestamp_value())
+
+    @logged_method
+    def stage_current_samples(self):
+        """Keep the samples of the current timestamp, so that the next scrape exposes them together with the samples
+        of the later timestamps. Staging the same timestamp again replaces the earlier samples."""
+        if getattr(self, "_exported_timestamp", None) is None:
+            return
+        self._staged_metrics[self.get_timestamp_value()] = self.collect_with_timestamp()
 
     @logged_method
     def collect(self):
         try:
-            metrics = super().collect()
-            ts_value = int(self._exported_timestamp.timestamp()) / 1000
-            for metric in metrics:
-                metric.samples = [
-                    type(sample)(sample.name, sample.labels, sample.value, ts_value, sample.exemplar)
-                    for sample in metric.samples
-                ]
+            metrics = self.collect_with_timestamp()
+            if self._staged_metrics:
+                self._staged_metrics[self.get_timestamp_value()] = metrics
+                metrics = self.merge_staged_metrics()
             return metrics
         finally:
-            self.notify()
+            if NOTIFY_ON_COLLECT:
+                self.notify()
+
+    def merge_staged_metrics(self) -> List[Metric]:
+        """Single metric family with the samples of every staged timestamp. The samples are grouped per label set and
+        ordered by timestamp within a label set, as needed by the OpenMetrics importers."""
+        staged_metrics, self._staged_metrics = self._staged_metrics, {}
+        out = None
+        samples = []
+        for ts_value in sorted(staged_metrics.keys()):
+            for metric in staged_metrics[ts_value]:
+                out = metric if out is None else out
+                samples.extend(metric.samples)
+        if out is None:
+            return []
+        out.samples = sorted(samples, key=lambda x: (x.name, sorted(x.labels.items()), x.timestamp))
+        return [out]
 
     @logged_method
     def notify(self) -> None:
@@ -39,3 +97,153 @@ class TimestampedCollector(NotifierAbstract, Gauge):
     @logged_method
     def convert_ts_to_str(self, input_datetime: datetime.datetime) -> str:
         return input_datetime.strftime("%Y_%m_%d_%H_%M_%S")
+
+
+class TimestampedCollector(TimestampedCollectorBase, Gauge):
+    def __init__(self, *args, in_begin_timestamp: datetime.datetime = None, **kwargs):
+        Gauge.__init__(self, *args, **kwargs)
+        TimestampedCollectorBase.__init__(self, in_begin_timestamp=in_begin_timestamp)
+
+    def copy_to(self, registry: CollectorRegistry) -> TimestampedCollector:
+        return TimestampedCollector(
+            self._name,
+            self._documentation,
+            self._labelnames,
+            registry=registry,
+            in_begin_timestamp=getattr(self, "_exported_timestamp", None),
+        )
+
+    def collect_current(self, ts_value: float) -> List[Metric]:
+        metrics = Gauge.collect(self)
+        for metric in metrics:
+            metric.samples = [
+                type(sample)(sample.name, sample.labels, sample.value, ts_value, sample.exemplar)
+                for sample in metric.samples
+            ]
+        return metrics
+
+
+class ArrayTimestampedCollector(TimestampedCollectorBase):
+    """Gauge collector holding the samples of the current hour as parallel label value & value arrays.
+    The hour is replaced in one call to set_samples and the GaugeMetricFamily is built straight from the arrays at
+    collect time, so no Gauge child, lock or label lookup is created per label set.
+
+    Args:
+        name: Metric name
+        documentation: Metric help text
+        labelnames: Label names, in the order of the label values of every sample
+        in_begin_timestamp: Initial exported timestamp
+        registry: Registry the collector is registered with. None leaves it unregistered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        in_begin_timestamp: datetime.datetime = None,
+        registry=REGISTRY,
+    ):
+        self._name = name
+        self._documentation = documentation
+        self._labelnames = tuple(labelnames)
+        self._label_values: List[Tuple[str, ...]] = []
+        self._values: List[float] = []
+        TimestampedCollectorBase.__init__(self, in_begin_timestamp=in_begin_timestamp)
+        if registry is not None:
+            registry.register(self)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def describe(self) -> List[Metric]:
+        return [GaugeMetricFamily(self._name, self._documentation, labels=self._labelnames)]
+
+    def copy_to(self, registry: CollectorRegistry) -> ArrayTimestampedCollector:
+        return ArrayTimestampedCollector(
+            self._name,
+            self._documentation,
+            self._labelnames,
+            in_begin_timestamp=getattr(self, "_exported_timestamp", None),
+            registry=registry,
+        )
+
+    def set_samples(self, label_values: Iterable[Tuple], values: Iterable[float]):
+        """Replace the current samples. A label set that repeats keeps its last value, the same as setting a Gauge
+        child again.
+
+        Args:
+            label_values (Iterable[Tuple]): Label values of every sample, in the order of the label names
+            values (Iterable[float]): Value of every sample
+        """
+        samples = dict(zip((tuple(str(x) for x in labels) for labels in label_values), values))
+        self._label_values = list(samples.keys())
+        self._values = [float(x) for x in samples.values()]
+
+    def clear(self):
+        self._label_values = []
+        self._values = []
+
+    def collect_current(self, ts_value: float) -> List[Metric]:
+        metric = GaugeMetricFamily(self._name, self._documentation, labels=self._labelnames)
+        name, labelnames = self._name, self._labelnames
+        metric.samples = [
+            Sample(name, dict(zip(labelnames, labels)), value, ts_value, None)
+            for labels, value in zip(self._label_values, self._values)
+        ]
+        return [metric]
+
+
+CollectorType = TypeVar("CollectorType", bound=TimestampedCollectorBase)
+
+
+@dataclass(kw_only=True)
+class ScopedCollectors:
+    """Collectors owned by one scope, e.g. one org. With a registry, every module level collector is replaced by a
+    copy registered in that registry, so the scope sets, clears, stages & steps its collectors without touching the
+    other scopes. Without a registry, the module level collectors themselves are used.
+
+    Args:
+        registry: Registry of the scope. None uses the module level collectors.
+    """
+
+    registry: CollectorRegistry | None = field(default=None)
+
+    # module level collector --> collector of the scope
+    collectors: Dict[TimestampedCollectorBase, TimestampedCollectorBase] = field(
+        init=False, repr=False, default_factory=dict
+    )
+    lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def get(self, collector: CollectorType) -> CollectorType:
+        """Collector of the scope for a module level collector, created on first use."""
+        with self.lock:
+            if collector not in self.collectors:
+                self.collectors[collector] = collector if self.registry is None else collector.copy_to(self.registry)
+            return self.collectors[collector]
+
+    @logged_method
+    def stage_current_samples(self):
+        """Stage the current samples of every collector of the scope, see stage_timestamped_collectors."""
+        for collector in list(self.collectors.values()):
+            collector.stage_current_samples()
+
+    @logged_method
+    def notify(self):
+        """Notify the observers of every collector of the scope, see notify_timestamped_collectors."""
+        for collector in list(self.collectors.values()):
+            collector.notify()
+
+
+@logged_method
+def stage_timestamped_collectors():
+    """Stage the current samples of every TimestampedCollector before the exposition moves to the next hour."""
+    for collector in TIMESTAMPED_COLLECTORS:
+        collector.stage_current_samples()
+
+
+@logged_method
+def notify_timestamped_collectors():
+    """Notify the observers of every TimestampedCollector, the same as a scrape does when NOTIFY_ON_COLLECT is on."""
+    for collector in list(TIMESTAMPED_COLLECTORS):
+        collector.notify()
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import copy
+import gzip
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client import exposition as text_exposition
+from prometheus_client.metrics_core import Metric
+from prometheus_client.openmetrics import exposition as openmetrics_exposition
+
+from helpers import logged_method
+from http_server import HTTPRequest, HTTPResponse, HTTPRouter
+from internal_data_probe import set_readiness
+from prometheus_processing.custom_collector import (
+    ScopedCollectors,
+    notify_timestamped_collectors,
+    set_notify_on_collect,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CollectedMetrics:
+    """Metric families collected once, handed to the exposition encoders in place of a registry."""
+
+    metrics: List[Metric]
+
+    def collect(self):
+        return iter(self.metrics)
+
+
+def to_openmetrics_timestamps(metrics: List[Metric]) -> List[Metric]:
+    """Copies of the metric families with the sample timestamps in seconds. The timestamped collectors keep their
+    timestamps in thousands of seconds, so that the text format, which writes them in milliseconds, holds seconds."""
+    out = []
+    for metric in metrics:
+        temp = copy.copy(metric)
+        temp.samples = [
+            x if x.timestamp is None else x._replace(timestamp=x.timestamp * 1000) for x in metric.samples
+        ]
+        out.append(temp)
+    return out
+
+
+@dataclass(kw_only=True)
+class RenderedExposition:
+    content_type: str
+    payload: bytes
+    gzip_payload: bytes
+
+
+@dataclass(kw_only=True)
+class ExpositionCache:
+    """Double-buffered exposition payloads of the registry, rendered once per exposed hour instead of on every scrape.
+
+    The registry is collected once per hour step and encoded in the Prometheus text format and in the OpenMetrics
+    format, each with a gzip variant. A scrape is answered from the front buffer with the cached bytes that match its
+    Accept & Accept-Encoding headers. The producer thread notifies the observers to compute the next hour (or hours)
+    and renders it into the back buffer while the front buffer is served. Once the front buffer has been served, the
+    next scrape swaps the buffers and wakes the producer up, so no computation runs on the scrape path.
+
+    The readiness flags of the internal API reflect the buffers: ready while the next scrape gets an hour that has
+    not been served yet.
+
+    Args:
+        registry: Registry to expose
+        scope: Collectors that the producer steps. None steps every TimestampedCollector.
+        gzip_level: Compression level of the gzip payloads
+        publish_readiness: Whether the buffers drive the process wide readiness flag of the internal API
+        org_id: Org whose readiness flag the buffers drive. None leaves the org readiness flags alone.
+    """
+
+    registry: CollectorRegistry = field(default=REGISTRY)
+    scope: ScopedCollectors | None = field(default=None)
+    gzip_level: int = field(default=6)
+    publish_readiness: bool = field(default=True)
+    org_id: str | None = field(default=None)
+
+    # content type --> rendered payloads, for the buffer being served & for the buffer being computed
+    front: Dict[str, RenderedExposition] = field(init=False, repr=False, default_factory=dict)
+    back: Dict[str, RenderedExposition] | None = field(init=False, repr=False, default=None)
+    front_served: bool = field(init=False, default=False)
+    render_count: int = field(init=False, default=0)
+    scrape_count: int = field(init=False, default=0)
+    swap_count: int = field(init=False, default=0)
+    condition: threading.Condition = field(init=False, repr=False, default_factory=threading.Condition)
+    producer: threading.Thread | None = field(init=False, repr=False, default=None)
+    stop_requested: bool = field(init=False, default=False)
+
+    @logged_method
+    def render(self) -> Dict[str, RenderedExposition]:
+        """Collect the registry and render the payloads of every exposition format."""
+        metrics = list(self.registry.collect())
+        renders = {}
+        for content_type, encoder, collected in [
+            (text_exposition.CONTENT_TYPE_LATEST, text_exposition.generate_latest, CollectedMetrics(metrics=metrics)),
+            (
+                openmetrics_exposition.CONTENT_TYPE_LATEST,
+                openmetrics_exposition.generate_latest,
+                CollectedMetrics(metrics=to_openmetrics_timestamps(metrics)),
+            ),
+        ]:
+            payload = encoder(collected)
+            renders[content_type] = RenderedExposition(
+                content_type=content_type,
+                payload=payload,
+                gzip_payload=gzip.compress(payload, compresslevel=self.gzip_level),
+            )
+        self.render_count += 1
+        LOGGER.debug(
+            f"Rendered the exposition payloads: "
+            f"{len(renders[text_exposition.CONTENT_TYPE_LATEST].payload)} bytes in the text format"
+        )
+        return renders
+
+    def is_ready(self) -> bool:
+        return self.producer is not None and (not self.front_served or self.back is not None)
+
+    def update_readiness(self):
+        if self.publish_readiness:
+            set_readiness(readiness_flag=self.is_ready())
+        if self.org_id is not None:
+            set_readiness(readiness_flag=self.is_ready(), org_id=self.org_id)
+
+    def get_payload(self, accept_header: str | None, accept_encoding_header: str | None) -> Tuple[bytes, str, bool]:
+        """Cached payload matching the request headers. Swaps in the back buffer once the front buffer has been
+        served. Before the producer is started, every scrape renders the current state of the registry.
+
+        Args:
+            accept_header (str | None): Accept header of the scrape
+            accept_encoding_header (str | None): Accept-Encoding header of the scrape
+
+        Returns:
+            Tuple[bytes, str, bool]: Payload, its content type & whether it is gzip encoded
+        """
+        with self.condition:
+            if self.front_served and self.back is not None:
+                self.front, self.back = self.back, None
+                self.front_served = False
+                self.swap_count += 1
+                self.condition.notify_all()
+            if self.producer is None:
+                self.front = self.render()
+            self.front_served = True
+            self.scrape_count += 1
+            self.update_readiness()
+            _, content_type = text_exposition.choose_encoder(accept_header)
+            rendered = self.front[content_type]
+        if text_exposition.gzip_accepted(accept_encoding_header):
+            return rendered.gzip_payload, rendered.content_type, True
+        return rendered.payload, rendered.content_type, False
+
+    @logged_method
+    def start_producer(self):
+        """Render the current state into the front buffer and start computing the next hour into the back buffer."""
+        with self.condition:
+            self.front = self.render()
+            self.front_served = False
+            self.back = None
+            self.producer = threading.Thread(target=self.run_producer, daemon=True, name="exposition-producer")
+            self.update_readiness()
+        self.producer.start()
+
+    def run_producer(self):
+        while True:
+            with self.condition:
+                while self.back is not None and not self.stop_requested:
+                    self.condition.wait()
+                if self.stop_requested:
+                    return
+            try:
+                if self.scope is not None:
+                    self.scope.notify()
+                else:
+                    notify_timestamped_collectors()
+            except Exception as e:
+                LOGGER.exception(f"Computing the next exposed hour failed: {e}")
+            back = self.render()
+            with self.condition:
+                self.back = back
+                self.update_readiness()
+                self.condition.notify_all()
+
+    @logged_method
+    def stop_producer(self):
+        with self.condition:
+            self.stop_requested = True
+            self.condition.notify_all()
+        if self.producer is not None:
+            self.producer.join()
+
+
+@logged_method
+def add_exposition_routes(router: HTTPRouter, org_caches: Dict[str, ExpositionCache]):
+    """Serve the cached exposition payloads of every org under /metrics/<org_id>. The first org of org_caches is the
+    root org and is also served under /metrics and /. The collectors stop notifying their observers on collect, only
+    the producers of the caches step them.
+
+    Args:
+        router (HTTPRouter): Router of the HTTP server
+        org_caches (Dict[str, ExpositionCache]): Org ID --> cache of the org, root org first. Filled in as the orgs are
+            initialized.
+    """
+
+    def to_http_response(scrape_cache: ExpositionCache, request: HTTPRequest) -> HTTPResponse:
+        payload, content_type, is_gzip = scrape_cache.get_payload(
+            accept_header=request.headers.get("accept", None),
+            accept_encoding_header=request.headers.get("accept-encoding", None),
+        )
+        return HTTPResponse(body=payload, content_type=content_type, content_encoding="gzip" if is_gzip else None)
+
+    def org_metrics(request: HTTPRequest, org_id: str):
+        if org_id not in org_caches:
+            return HTTPResponse(body=f"Unknown Org ID {org_id}".encode("utf-8"), status=404)
+        return to_http_response(scrape_cache=org_caches[org_id], request=request)
+
+    def root_org_metrics(request: HTTPRequest):
+        root_org_id = next(iter(org_caches), None)
+        if root_org_id is None:
+            return HTTPResponse(body=b"No org is initialized yet", status=503)
+        return to_http_response(scrape_cache=org_caches[root_org_id], request=request)
+
+    set_notify_on_collect(False)
+    router.add_route(path="/metrics/<org_id>", handler=org_metrics)
+    router.add_route(path="/metrics", handler=root_org_metrics)
+    router.add_route(path="/", handler=root_org_metrics)
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import logging
+import queue
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+import requests
+from requests.auth import AuthBase
+
+from ccloud.connections import get_http_auth_from_yaml
+from helpers import logged_method
+from prometheus_processing.tsdb_block_writer import TSDBLabels, encode_uvarint, to_series_labels
+
+try:
+    import snappy as _native_snappy
+except ImportError:
+    _native_snappy = None
+
+LOGGER = logging.getLogger(__name__)
+
+REMOTE_WRITE_HEADERS = {
+    "Content-Encoding": "snappy",
+    "Content-Type": "application/x-protobuf",
+    "User-Agent": "ccloud-chargeback-handler",
+    "X-Prometheus-Remote-Write-Version": "0.1.0",
+}
+# Same block size as the reference snappy implementation, copies never reach outside of the block
+SNAPPY_BLOCK_SIZE = 1 << 16
+
+
+def _read_uvarint(data: bytes, pos: int) -> Tuple[int, int]:
+    out = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        out |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return out, pos
+        shift += 7
+
+
+def _emit_snappy_literal(out: bytearray, literal: bytes):
+    size = len(literal) - 1
+    if size < 60:
+        out.append(size << 2)
+    else:
+        size_bytes = (size.bit_length() + 7) // 8
+        out.append((59 + size_bytes) << 2)
+        out.extend(size.to_bytes(size_bytes, "little"))
+    out.extend(literal)
+
+
+def _emit_snappy_copy(out: bytearray, offset: int, length: int):
+    while length >= 68:
+        out.append((63 << 2) | 2)
+        out.extend(offset.to_bytes(2, "little"))
+        length -= 64
+    if length > 64:
+        out.append((59 << 2) | 2)
+        out.extend(offset.to_bytes(2, "little"))
+        length -= 60
+    if length >= 12 or offset >= 2048:
+        out.append(((length - 1) << 2) | 2)
+        out.extend(offset.to_bytes(2, "little"))
+    else:
+        out.append(((offset >> 8) << 5) | ((length - 4) << 2) | 1)
+        out.append(offset & 0xFF)
+
+
+def snappy_compress(data: bytes) -> bytes:
+    """Snappy block format compression, as expected by the remote_write receivers. The python-snappy package is used
+    when it is installed, otherwise a greedy hash table matcher produces the block format in pure Python."""
+    if _native_snappy is not None:
+        return _native_snappy.compress(data)
+    out = bytearray(encode_uvarint(len(data)))
+    for block_start in range(0, len(data), SNAPPY_BLOCK_SIZE):
+        block = data[block_start : block_start + SNAPPY_BLOCK_SIZE]
+        block_size = len(block)
+        # 4 byte sequence --> latest position in the block
+        positions: Dict[bytes, int] = {}
+        pos = literal_start = 0
+        while pos + 4 <= block_size:
+            key = block[pos : pos + 4]
+            candidate = positions.get(key, None)
+            positions[key] = pos
+            if candidate is None:
+                pos += 1
+                continue
+            length = 4
+            while pos + length < block_size and block[candidate + length] == block[pos + length]:
+                length += 1
+            if literal_start < pos:
+                _emit_snappy_literal(out, block[literal_start:pos])
+            _emit_snappy_copy(out, offset=pos - candidate, length=length)
+            pos += length
+            literal_start = pos
+        if literal_start < block_size:
+            _emit_snappy_literal(out, block[literal_start:])
+    return bytes(out)
+
+
+def snappy_decompress(data: bytes) -> bytes:
+    if _native_snappy is not None:
+        return _native_snappy.decompress(data)
+    expected_size, pos = _read_uvarint(data, 0)
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        element_type = tag & 0x03
+        if element_type == 0:
+            size = tag >> 2
+            if size >= 60:
+                size_bytes = size - 59
+                size = int.from_bytes(data[pos : pos + size_bytes], "little")
+                pos += size_bytes
+            out.extend(data[pos : pos + size + 1])
+            pos += size + 1
+            continue
+        if element_type == 1:
+            length = ((tag >> 2) & 0x07) + 4
+            offset = ((tag >> 5) << 8) | data[pos]
+            pos += 1
+        else:
+            offset_bytes = 2 if element_type == 2 else 4
+            length = (tag >> 2) + 1
+            offset = int.from_bytes(data[pos : pos + offset_bytes], "little")
+            pos += offset_bytes
+        if offset == 0 or offset > len(out):
+            raise ValueError("Corrupt snappy input: copy offset outside of the decoded data")
+        copy_start = len(out) - offset
+        if offset >= length:
+            out.extend(out[copy_start : copy_start + length])
+        else:
+            for idx in range(length):
+                out.append(out[copy_start + idx])
+    if len(out) != expected_size:
+        raise ValueError("Corrupt snappy input: decoded size does not match the header")
+    return bytes(out)
+
+
+def _encode_protobuf_field(field_number: int, payload: bytes) -> bytes:
+    return encode_uvarint((field_number << 3) | 2) + encode_uvarint(len(payload)) + payload
+
+
+def encode_write_request(series: Iterable[Tuple[TSDBLabels, List[Tuple[int, float]]]]) -> bytes:
+    """Protobuf encoded prometheus.WriteRequest (remote write 1.0) for (label set, [(timestamp in ms, value)])."""
+    out = bytearray()
+    for series_labels, samples in series:
+        timeseries = bytearray()
+        for label_name, label_value in series_labels:
+            timeseries.extend(
+                _encode_protobuf_field(
+                    1,
+                    _encode_protobuf_field(1, label_name.encode("utf-8"))
+                    + _encode_protobuf_field(2, label_value.encode("utf-8")),
+                )
+            )
+        for ts_in_ms, value in samples:
+            # Sample: double value = 1, int64 timestamp = 2
+            timeseries.extend(
+                _encode_protobuf_field(2, b"\x09" + struct.pack("<d", value) + b"\x10" + encode_uvarint(ts_in_ms))
+            )
+        out.extend(_encode_protobuf_field(1, bytes(timeseries)))
+    return bytes(out)
+
+
+def _iter_protobuf_fields(data: bytes):
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_uvarint(data, pos)
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type == 0:
+            value, pos = _read_uvarint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos : pos + 8], pos + 8
+        elif wire_type == 2:
+            size, pos = _read_uvarint(data, pos)
+            value, pos = data[pos : pos + size], pos + size
+        elif wire_type == 5:
+            value, pos = data[pos : pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field_number, value
+
+
+def decode_write_request(data: bytes) -> List[Tuple[TSDBLabels, List[Tuple[int, float]]]]:
+    """Decode a protobuf prometheus.WriteRequest. Fields other than the labels & samples are skipped."""
+    out = []
+    for field_number, timeseries in _iter_protobuf_fields(data):
+        if field_number != 1:
+            continue
+        labels, samples = [], []
+        for ts_field_number, payload in _iter_protobuf_fields(timeseries):
+            if ts_field_number == 1:
+                label = {k: v.decode("utf-8") for k, v in _iter_protobuf_fields(payload)}
+                labels.append((label.get(1, ""), label.get(2, "")))
+            elif ts_field_number == 2:
+                sample = dict(_iter_protobuf_fields(payload))
+                ts_in_ms = sample.get(2, 0)
+                ts_in_ms = ts_in_ms - (1 << 64) if ts_in_ms >= 1 << 63 else ts_in_ms
+                samples.append((ts_in_ms, struct.unpack("<d", sample[1])[0] if 1 in sample else 0.0))
+        out.append((tuple(sorted(labels)), samples))
+    return out
+
+
+@dataclass(kw_only=True)
+class RemoteWriteClient:
+    """Pushes samples to a Prometheus remote_write receiver (Prometheus with --web.enable-remote-write-receiver,
+    Mimir, Thanos Receive, VictoriaMetrics...) instead of waiting for them to be scraped.
+
+    The series are sharded over `concurrency` worker threads by label set, the same as the Prometheus queue manager,
+    so the samples of a series are always sent in order while the shards send in parallel. Every shard buffers up to
+    batch_size samples per request. Requests failing with a connection error, a 5xx or a 429 are retried with an
+    exponential backoff, other 4xx responses are dropped as the receiver will never accept them.
+    The samples are added from a single producer thread. The shard queues are bounded, so the producer waits when
+    the receiver falls behind.
+
+    Args:
+        url: Remote write endpoint, e.g. http://prometheus_for_chargeback:9090/api/v1/write
+        batch_size: Maximum number of samples per request
+        concurrency: Number of shards, each sending one request at a time
+        max_retries: Retries for a request before its samples are dropped
+        min_backoff_secs: Wait before the first retry, doubled for every retry
+        max_backoff_secs: Upper limit for the wait between retries
+        timeout_secs: Timeout for every request
+        http_auth: Optional requests auth for the receiver
+        connection_params: Extra keyword arguments for requests, e.g. verify
+    """
+
+    url: str
+    batch_size: int = field(default=2000)
+    concurrency: int = field(default=4)
+    max_retries: int = field(default=5)
+    min_backoff_secs: float = field(default=0.03)
+    max_backoff_secs: float = field(default=5.0)
+    timeout_secs: float = field(default=30.0)
+    http_auth: AuthBase | None = field(default=None, repr=False)
+    connection_params: Dict = field(default_factory=dict)
+
+    samples_sent: int = field(init=False, default=0)
+    samples_failed: int = field(init=False, default=0)
+    requests_sent: int = field(init=False, default=0)
+    # Per shard: label set --> buffered samples & the buffered sample count
+    pending_batches: List[Dict[TSDBLabels, List[Tuple[int, float]]]] = field(init=False, repr=False)
+    pending_samples: List[int] = field(init=False, repr=False)
+    shard_queues: List[queue.Queue] = field(init=False, repr=False)
+    workers: List[threading.Thread] = field(init=False, repr=False)
+    stats_lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.concurrency = max(1, self.concurrency)
+        self.pending_batches = [{} for _ in range(self.concurrency)]
+        self.pending_samples = [0] * self.concurrency
+        self.shard_queues = [queue.Queue(maxsize=2) for _ in range(self.concurrency)]
+        self.workers = [
+            threading.Thread(target=self.run_shard, args=(shard_idx,), daemon=True, name=f"remote-write-{shard_idx}")
+            for shard_idx in range(self.concurrency)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    @classmethod
+    def from_config(cls, in_config: Dict, default_url: str) -> RemoteWriteClient:
+        return cls(
+            url=in_config.get("url", None) or default_url,
+            batch_size=int(in_config.get("batch_size", 2000)),
+            concurrency=int(in_config.get("concurrency", 4)),
+            max_retries=int(in_config.get("max_retries", 5)),
+            min_backoff_secs=float(in_config.get("min_backoff_secs", 0.03)),
+            max_backoff_secs=float(in_config.get("max_backoff_secs", 5.0)),
+            timeout_secs=float(in_config.get("timeout_secs", 30.0)),
+            http_auth=get_http_auth_from_yaml(auth_dict=in_config.get("auth", None) or {}),
+            connection_params=in_config.get("connection_params", None) or {},
+        )
+
+    def add_sample(self, metric_name: str, labels: Dict[str, str], ts_in_ms: int, value: float):
+        self.add_samples(
+            series_labels=to_series_labels(metric_name=metric_name, labels=labels),
+            samples=[(int(ts_in_ms), float(value))],
+        )
+
+    def add_samples(self, series_labels: TSDBLabels, samples: List[Tuple[int, float]]):
+        """Buffer samples of a series, ordered by timestamp, on the shard of the series."""
+        shard_idx = hash(series_labels) % self.concurrency
+        self.pending_batches[shard_idx].setdefault(series_labels, []).extend(samples)
+        self.pending_samples[shard_idx] += len(samples)
+        if self.pending_samples[shard_idx] >= self.batch_size:
+            self.enqueue_shard(shard_idx=shard_idx)
+
+    def enqueue_shard(self, shard_idx: int):
+        if not self.pending_samples[shard_idx]:
+            return
+        batch = self.pending_batches[shard_idx]
+        self.pending_batches[shard_idx] = {}
+        self.pending_samples[shard_idx] = 0
+        self.shard_queues[shard_idx].put(batch)
+
+    @logged_method
+    def flush(self):
+        """Send all the buffered samples and wait until every shard is done with its requests."""
+        for shard_idx in range(self.concurrency):
+            self.enqueue_shard(shard_idx=shard_idx)
+        for shard_queue in self.shard_queues:
+            shard_queue.join()
+
+    @logged_method
+    def close(self):
+        self.flush()
+        for shard_queue in self.shard_queues:
+            shard_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        LOGGER.info(
+            f"Remote write to {self.url} sent {self.samples_sent} samples in {self.requests_sent} requests, "
+            f"{self.samples_failed} samples failed"
+        )
+
+    def run_shard(self, shard_idx: int):
+        session = requests.Session()
+        shard_queue = self.shard_queues[shard_idx]
+        while True:
+            batch = shard_queue.get()
+            try:
+                if batch is None:
+                    return
+                self.send_batch(session=session, batch=batch)
+            except Exception as e:
+                LOGGER.error(f"Remote write shard {shard_idx} failed to send a batch: {e}")
+                with self.stats_lock:
+                    self.samples_failed += sum(len(x) for x in batch.values())
+            finally:
+                shard_queue.task_done()
+
+    def send_batch(self, session: requests.Session, batch: Dict[TSDBLabels, List[Tuple[int, float]]]):
+        sample_count = sum(len(x) for x in batch.values())
+        body = snappy_compress(encode_write_request(batch.items()))
+        backoff_secs = self.min_backoff_secs
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = session.post(
+                    self.url,
+                    data=body,
+                    headers=REMOTE_WRITE_HEADERS,
+                    auth=self.http_auth,
+                    timeout=self.timeout_secs,
+                    **self.connection_params,
+                )
+                if resp.status_code < 300:
+                    with self.stats_lock:
+                        self.samples_sent += sample_count
+                        self.requests_sent += 1
+                    return
+                if resp.status_code != 429 and resp.status_code < 500:
+                    LOGGER.error(f"Remote write rejected {sample_count} samples: {resp.status_code} {resp.text}")
+                    break
+                error = f"{resp.status_code} {resp.text}"
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt < self.max_retries:
+                LOGGER.warning(f"Remote write failed with {error}. Retrying in {backoff_secs:.2f} seconds.")
+                time.sleep(backoff_secs)
+                backoff_secs = min(backoff_secs * 2, self.max_backoff_secs)
+            else:
+                LOGGER.error(f"Remote write failed after {self.max_retries} retries with {error}")
+        with self.stats_lock:
+            self.samples_failed += sample_count
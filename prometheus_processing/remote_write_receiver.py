@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from prometheus_processing.remote_write import decode_write_request, snappy_decompress
+from prometheus_processing.tsdb_block_writer import TSDBLabels
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class RemoteWriteReceiver:
+    """Stand-in remote_write receiver for local testing of the push mode. The requests are decoded and the samples
+    are kept in memory, nothing is persisted.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on, 0 picks a free port
+        fail_requests: Number of requests answered with a 503 before the receiver starts accepting, to exercise the
+            retries of the client
+    """
+
+    host: str = field(default="127.0.0.1")
+    port: int = field(default=9201)
+    fail_requests: int = field(default=0)
+
+    # label set --> {timestamp in ms: value}
+    series: Dict[TSDBLabels, Dict[int, float]] = field(init=False, repr=False, default_factory=dict)
+    requests_received: int = field(init=False, default=0)
+    requests_failed: int = field(init=False, default=0)
+    lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+    server: ThreadingHTTPServer | None = field(init=False, repr=False, default=None)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v1/write"
+
+    @property
+    def sample_count(self) -> int:
+        with self.lock:
+            return sum(len(x) for x in self.series.values())
+
+    def handle_write(self, body: bytes) -> int:
+        """Store the samples of a request. Returns the HTTP status code for the response."""
+        with self.lock:
+            self.requests_received += 1
+            if self.requests_received <= self.fail_requests:
+                self.requests_failed += 1
+                return 503
+        try:
+            write_request = decode_write_request(snappy_decompress(body))
+        except Exception as e:
+            LOGGER.error(f"Could not decode the remote write request: {e}")
+            return 400
+        with self.lock:
+            for series_labels, samples in write_request:
+                self.series.setdefault(series_labels, {}).update(samples)
+        return 204
+
+    def start(self) -> RemoteWriteReceiver:
+        receiver = self
+
+        class RemoteWriteRequestHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status_code = (
+                    receiver.handle_write(body=body) if self.path.rstrip("/") == "/api/v1/write" else 404
+                )
+                self.send_response(status_code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                LOGGER.debug(format % args)
+
+        self.server = ThreadingHTTPServer((self.host, self.port), RemoteWriteRequestHandler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="remote-write-receiver").start()
+        LOGGER.info(f"Stand-in remote write receiver listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in Prometheus remote_write receiver for local testing.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=9201, help="Port to listen on. Default is 9201.")
+    parser.add_argument(
+        "--fail-requests", type=int, default=0, help="Number of requests answered with a 503 before accepting."
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="{asctime} {name:25s} {levelname:8s} {message}", style="{")
+    receiver = RemoteWriteReceiver(host=args.host, port=args.port, fail_requests=args.fail_requests).start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        LOGGER.info(f"Received {receiver.sample_count} samples in {receiver.requests_received} requests")
+        receiver.stop()
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+from helpers import logged_method
+
+try:
+    from crc32c import crc32c as _native_crc32c
+except ImportError:
+    _native_crc32c = None
+
+LOGGER = logging.getLogger(__name__)
+
+# Label set of a series as (label name, label value) pairs sorted by label name, including __name__
+TSDBLabels = Tuple[Tuple[str, str], ...]
+
+INDEX_MAGIC = 0xBAAAD700
+INDEX_VERSION = 2
+CHUNKS_MAGIC = 0x85BD40DD
+CHUNKS_VERSION = 1
+TOMBSTONES_MAGIC = 0x0130BA30
+TOMBSTONES_VERSION = 1
+BLOCK_META_VERSION = 1
+XOR_CHUNK_ENCODING = 1
+# Same limits as the Prometheus head block & the chunk segment files
+MAX_SAMPLES_PER_CHUNK = 120
+MAX_CHUNK_SEGMENT_SIZE = 512 * 1024 * 1024
+# Suffix of the directories Prometheus removes on startup, so that half written blocks are never loaded
+TMP_BLOCK_SUFFIX = ".tmp-for-creation"
+ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _build_crc32c_table() -> List[int]:
+    out = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        out.append(crc)
+    return out
+
+
+CRC32C_TABLE = _build_crc32c_table()
+
+
+def crc32c(data: bytes) -> int:
+    """CRC32 with the Castagnoli polynomial, used by every checksum of the TSDB block files. The crc32c package is
+    used when it is installed, otherwise the checksum is computed with a lookup table."""
+    if _native_crc32c is not None:
+        return _native_crc32c(data)
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc = CRC32C_TABLE[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def encode_uvarint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode_varint(value: int) -> bytes:
+    """Zig-zag encoded signed varint, same as Go's binary.PutVarint."""
+    return encode_uvarint((value << 1) ^ (value >> 63) if value < 0 else value << 1)
+
+
+def encode_be32(value: int) -> bytes:
+    return struct.pack(">I", value)
+
+
+def float_to_bits(value: float) -> int:
+    return struct.unpack(">Q", struct.pack(">d", value))[0]
+
+
+class BitWriter:
+    """Bit stream written from the most significant bit of every byte, as read by the Prometheus chunk iterators."""
+
+    def __init__(self) -> None:
+        self.out = bytearray()
+        self.acc = 0
+        self.acc_bits = 0
+
+    def write_bits(self, value: int, nbits: int):
+        self.acc = (self.acc << nbits) | (value & ((1 << nbits) - 1))
+        self.acc_bits += nbits
+        while self.acc_bits >= 8:
+            self.acc_bits -= 8
+            self.out.append((self.acc >> self.acc_bits) & 0xFF)
+        self.acc &= (1 << self.acc_bits) - 1
+
+    def write_bytes(self, data: bytes):
+        for byte in data:
+            self.write_bits(byte, 8)
+
+    def get_bytes(self) -> bytes:
+        if self.acc_bits == 0:
+            return bytes(self.out)
+        return bytes(self.out) + bytes([(self.acc << (8 - self.acc_bits)) & 0xFF])
+
+
+def _fits_bit_range(value: int, nbits: int) -> bool:
+    return -((1 << (nbits - 1)) - 1) <= value <= 1 << (nbits - 1)
+
+
+def encode_xor_chunk(samples: List[Tuple[int, float]]) -> bytes:
+    """Gorilla style XOR chunk with the same bit layout as the Prometheus XORChunk: delta of delta encoded
+    timestamps and XOR encoded values.
+
+    Args:
+        samples (List[Tuple[int, float]]): (timestamp in ms, value) ordered by timestamp, at most 65535 samples
+
+    Returns:
+        bytes: chunk data, starting with the big endian sample count
+    """
+    stream = BitWriter()
+    prev_ts = prev_ts_delta = prev_value_bits = 0
+    leading, trailing = 0xFF, 0
+    for sample_idx, (ts, value) in enumerate(samples):
+        value_bits = float_to_bits(value)
+        if sample_idx == 0:
+            stream.write_bytes(encode_varint(ts))
+            stream.write_bits(value_bits, 64)
+            prev_ts, prev_value_bits = ts, value_bits
+            continue
+        ts_delta = ts - prev_ts
+        if sample_idx == 1:
+            stream.write_bytes(encode_uvarint(ts_delta))
+        else:
+            delta_of_delta = ts_delta - prev_ts_delta
+            if delta_of_delta == 0:
+                stream.write_bits(0, 1)
+            elif _fits_bit_range(delta_of_delta, 14):
+                stream.write_bits(0b10, 2)
+                stream.write_bits(delta_of_delta, 14)
+            elif _fits_bit_range(delta_of_delta, 17):
+                stream.write_bits(0b110, 3)
+                stream.write_bits(delta_of_delta, 17)
+            elif _fits_bit_range(delta_of_delta, 20):
+                stream.write_bits(0b1110, 4)
+                stream.write_bits(delta_of_delta, 20)
+            else:
+                stream.write_bits(0b1111, 4)
+                stream.write_bits(delta_of_delta, 64)
+        value_xor = value_bits ^ prev_value_bits
+        if value_xor == 0:
+            stream.write_bits(0, 1)
+        else:
+            stream.write_bits(1, 1)
+            curr_leading = min(64 - value_xor.bit_length(), 31)
+            curr_trailing = (value_xor & -value_xor).bit_length() - 1
+            if leading != 0xFF and curr_leading >= leading and curr_trailing >= trailing:
+                stream.write_bits(0, 1)
+                stream.write_bits(value_xor >> trailing, 64 - leading - trailing)
+            else:
+                leading, trailing = curr_leading, curr_trailing
+                significant_bits = 64 - leading - trailing
+                stream.write_bits(1, 1)
+                stream.write_bits(leading, 5)
+                # 64 significant bits overflow to 0 in the 6 bit field, the readers map 0 back to 64
+                stream.write_bits(significant_bits, 6)
+                stream.write_bits(value_xor >> trailing, significant_bits)
+        prev_ts, prev_ts_delta, prev_value_bits = ts, ts_delta, value_bits
+    return struct.pack(">H", len(samples)) + stream.get_bytes()
+
+
+def new_ulid(ts_in_ms: int, seed: str) -> str:
+    """ULID with the timestamp part set to ts_in_ms and the random part derived from the seed, so that writing the
+    same block again produces the same block directory."""
+    entropy = int.from_bytes(hashlib.sha256(seed.encode("utf-8")).digest()[:10], "big")
+    value = ((ts_in_ms & ((1 << 48) - 1)) << 80) | entropy
+    out = []
+    for _ in range(26):
+        out.append(ULID_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(out))
+
+
+def to_series_labels(metric_name: str, labels: Dict[str, str]) -> TSDBLabels:
+    return tuple(sorted([("__name__", metric_name)] + [(k, str(v)) for k, v in labels.items()]))
+
+
+@dataclass
+class TSDBChunkMeta:
+    min_time: int
+    max_time: int
+    ref: int
+
+
+@dataclass
+class TSDBBlockWriter:
+    """Writes Prometheus TSDB blocks (meta.json, index, chunks & tombstones, format version 1 with the v2 index)
+    straight from Python, so that history can be loaded into the chargeback Prometheus without the OpenMetrics text
+    round trip through `promtool`. The samples of the block are buffered in memory until the block is written.
+    Adding a sample for an existing series & timestamp replaces the value, the same as setting a Gauge again.
+    """
+
+    # label set --> {timestamp in ms: value}
+    series: Dict[TSDBLabels, Dict[int, float]] = field(init=False, repr=False, default_factory=dict)
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.series.values())
+
+    def add_sample(self, metric_name: str, labels: Dict[str, str], ts_in_ms: int, value: float):
+        series_labels = to_series_labels(metric_name=metric_name, labels=labels)
+        self.series.setdefault(series_labels, {})[int(ts_in_ms)] = float(value)
+
+    @logged_method
+    def write(self, output_dir: str, block_seed: str) -> str | None:
+        """Write the buffered samples as one block into the output directory. The block is written to a temporary
+        directory and renamed once complete. A block with the same ULID, written earlier for the same seed & start
+        time, is replaced.
+
+        Args:
+            output_dir (str): TSDB data directory, e.g. the --storage.tsdb.path of the Prometheus server
+            block_seed (str): Stable identifier of the block contents used to derive the block ULID
+
+        Returns:
+            str | None: Path of the block directory. None if there are no samples to write.
+        """
+        if not self.series:
+            return None
+        min_time = min(min(x.keys()) for x in self.series.values())
+        max_time = max(max(x.keys()) for x in self.series.values())
+        block_id = new_ulid(ts_in_ms=min_time, seed=block_seed)
+        block_dir = os.path.join(output_dir, block_id)
+        tmp_dir = block_dir + TMP_BLOCK_SUFFIX
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_dir, "chunks"))
+
+        sorted_series = sorted(self.series.keys())
+        series_chunks, num_chunks = self.write_chunks(chunks_dir=os.path.join(tmp_dir, "chunks"), series=sorted_series)
+        self.write_index(index_path=os.path.join(tmp_dir, "index"), series=sorted_series, series_chunks=series_chunks)
+        self.write_tombstones(tombstones_path=os.path.join(tmp_dir, "tombstones"))
+        meta = {
+            "ulid": block_id,
+            # maxTime is exclusive
+            "minTime": min_time,
+            "maxTime": max_time + 1,
+            "stats": {"numSamples": len(self), "numSeries": len(sorted_series), "numChunks": num_chunks},
+            "compaction": {"level": 1, "sources": [block_id]},
+            "version": BLOCK_META_VERSION,
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as meta_file:
+            json.dump(meta, meta_file, indent="\t")
+
+        shutil.rmtree(block_dir, ignore_errors=True)
+        os.rename(tmp_dir, block_dir)
+        LOGGER.debug(f"Wrote TSDB block {block_dir} with {len(sorted_series)} series and {len(self)} samples")
+        return block_dir
+
+    def write_chunks(self, chunks_dir: str, series: List[TSDBLabels]) -> Tuple[List[List[TSDBChunkMeta]], int]:
+        """Write the XOR chunks of every series into the numbered chunk segment files.
+
+        Returns:
+            Tuple[List[List[TSDBChunkMeta]], int]: chunk metas per series in the order of the series & chunk count
+        """
+        out = []
+        num_chunks = 0
+        segment_idx, segment_file, segment_size = -1, None, MAX_CHUNK_SEGMENT_SIZE
+        try:
+            for series_labels in series:
+                samples = sorted(self.series[series_labels].items())
+                chunk_metas = []
+                for chunk_start in range(0, len(samples), MAX_SAMPLES_PER_CHUNK):
+                    chunk_samples = samples[chunk_start : chunk_start + MAX_SAMPLES_PER_CHUNK]
+                    chunk_data = bytes([XOR_CHUNK_ENCODING]) + encode_xor_chunk(chunk_samples)
+                    record = encode_uvarint(len(chunk_data) - 1) + chunk_data + encode_be32(crc32c(chunk_data))
+                    if segment_size + len(record) > MAX_CHUNK_SEGMENT_SIZE:
+                        if segment_file is not None:
+                            segment_file.close()
+                        segment_idx += 1
+                        segment_file = open(os.path.join(chunks_dir, f"{segment_idx + 1:06d}"), "wb")
+                        segment_file.write(encode_be32(CHUNKS_MAGIC) + bytes([CHUNKS_VERSION, 0, 0, 0]))
+                        segment_size = 8
+                    chunk_metas.append(
+                        TSDBChunkMeta(
+                            min_time=chunk_samples[0][0],
+                            max_time=chunk_samples[-1][0],
+                            ref=(segment_idx << 32) | segment_size,
+                        )
+                    )
+                    segment_file.write(record)
+                    segment_size += len(record)
+                    num_chunks += 1
+                out.append(chunk_metas)
+        finally:
+            if segment_file is not None:
+                segment_file.close()
+        return out, num_chunks
+
+    def write_index(self, index_path: str, series: List[TSDBLabels], series_chunks: List[List[TSDBChunkMeta]]):
+        """Write the v2 index: symbols, series, label indices, postings, label offset table, postings offset table
+        & TOC. The series must be sorted by label set."""
+        out = bytearray(encode_be32(INDEX_MAGIC) + bytes([INDEX_VERSION]))
+
+        def add_padding(alignment: int):
+            out.extend(bytes(-len(out) % alignment))
+
+        def add_section(content: bytes, with_len: bool = True):
+            if with_len:
+                out.extend(encode_be32(len(content)))
+            out.extend(content)
+            out.extend(encode_be32(crc32c(content)))
+
+        # Symbols: every label name & value, referenced by their position in the sorted symbol list
+        symbols = sorted({x for series_labels in series for pair in series_labels for x in pair})
+        symbol_refs = {x: idx for idx, x in enumerate(symbols)}
+        symbols_offset = len(out)
+        add_section(
+            encode_be32(len(symbols))
+            + b"".join(encode_uvarint(len(x.encode("utf-8"))) + x.encode("utf-8") for x in symbols)
+        )
+
+        # Series: 16 byte aligned, referenced in the postings by offset / 16
+        series_offset = None
+        # label name --> label value --> series references
+        postings: Dict[str, Dict[str, List[int]]] = {}
+        all_postings = []
+        for series_labels, chunk_metas in zip(series, series_chunks):
+            add_padding(16)
+            series_offset = len(out) if series_offset is None else series_offset
+            series_ref = len(out) // 16
+            all_postings.append(series_ref)
+            content = bytearray(encode_uvarint(len(series_labels)))
+            for label_name, label_value in series_labels:
+                content.extend(encode_uvarint(symbol_refs[label_name]) + encode_uvarint(symbol_refs[label_value]))
+                postings.setdefault(label_name, {}).setdefault(label_value, []).append(series_ref)
+            content.extend(encode_uvarint(len(chunk_metas)))
+            for chunk_idx, chunk_meta in enumerate(chunk_metas):
+                if chunk_idx == 0:
+                    content.extend(encode_varint(chunk_meta.min_time))
+                    content.extend(encode_uvarint(chunk_meta.max_time - chunk_meta.min_time))
+                    content.extend(encode_uvarint(chunk_meta.ref))
+                else:
+                    prev_meta = chunk_metas[chunk_idx - 1]
+                    content.extend(encode_uvarint(chunk_meta.min_time - prev_meta.max_time))
+                    content.extend(encode_uvarint(chunk_meta.max_time - chunk_meta.min_time))
+                    content.extend(encode_varint(chunk_meta.ref - prev_meta.ref))
+            out.extend(encode_uvarint(len(content)))
+            add_section(bytes(content), with_len=False)
+
+        # Label indices: sorted value symbols per label name. Not read by the v2 readers but written for completeness.
+        label_indices_offset = len(out)
+        label_index_offsets = []
+        for label_name in sorted(postings.keys()):
+            add_padding(4)
+            label_index_offsets.append((label_name, len(out)))
+            values = sorted(postings[label_name].keys())
+            add_section(
+                encode_be32(1) + encode_be32(len(values)) + b"".join(encode_be32(symbol_refs[x]) for x in values)
+            )
+
+        # Postings: the list of all the series under the empty label pair first, then every label pair in order
+        postings_offset = len(out)
+        postings_offsets = []
+        for label_name, label_value, series_refs in [("", "", all_postings)] + [
+            (k, v, postings[k][v]) for k in sorted(postings.keys()) for v in sorted(postings[k].keys())
+        ]:
+            add_padding(4)
+            postings_offsets.append((label_name, label_value, len(out)))
+            add_section(encode_be32(len(series_refs)) + b"".join(encode_be32(x) for x in series_refs))
+
+        label_offset_table_offset = len(out)
+        add_section(
+            encode_be32(len(label_index_offsets))
+            + b"".join(
+                encode_uvarint(1) + encode_uvarint(len(k.encode("utf-8"))) + k.encode("utf-8") + encode_uvarint(v)
+                for k, v in label_index_offsets
+            )
+        )
+        postings_offset_table_offset = len(out)
+        add_section(
+            encode_be32(len(postings_offsets))
+            + b"".join(
+                encode_uvarint(2)
+                + encode_uvarint(len(k.encode("utf-8")))
+                + k.encode("utf-8")
+                + encode_uvarint(len(v.encode("utf-8")))
+                + v.encode("utf-8")
+                + encode_uvarint(offset)
+                for k, v, offset in postings_offsets
+            )
+        )
+
+        toc = b"".join(
+            struct.pack(">Q", x)
+            for x in [
+                symbols_offset,
+                series_offset,
+                label_indices_offset,
+                label_offset_table_offset,
+                postings_offset,
+                postings_offset_table_offset,
+            ]
+        )
+        add_section(toc, with_len=False)
+        with open(index_path, "wb") as index_file:
+            index_file.write(out)
+
+    def write_tombstones(self, tombstones_path: str):
+        """Empty tombstones file: header & the checksum of no tombstones."""
+        with open(tombstones_path, "wb") as tombstones_file:
+            tombstones_file.write(
+                encode_be32(TOMBSTONES_MAGIC) + bytes([TOMBSTONES_VERSION]) + encode_be32(crc32c(b""))
+            )
+
+
+def iter_metric_samples(metrics: Iterable) -> Iterable[Tuple[str, Dict[str, str], float]]:
+    """(sample name, labels, value) for the samples of prometheus_client metric families."""
+    for metric in metrics:
+        for sample in metric.samples:
+            yield sample.name, sample.labels, sample.value
@@ -0,0 +1,170 @@
+import copy
+import datetime
+import decimal
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from ccloud.ccloud_api.api_keys import CCloudAPIKey, CCloudAPIKeyList
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS, CCloudBillingHandler
+from data_processing.data_handlers.ccloud_api_handler import (
+    OBJECTS_CATALOG_ATTRIBUTES,
+    CCloudObjectsDiff,
+    CCloudObjectsHandler,
+)
+from data_processing.data_handlers.ccloud_objects_snapshots import CCloudObjectsSnapshotStore
+from data_processing.data_handlers.chargeback_handler import CCloudChargebackHandler
+from data_processing.data_handlers.prom_metrics_api_handler import (
+    METRICS_API_COLUMNS,
+    METRICS_API_PROMETHEUS_QUERIES,
+    PrometheusMetricsDataHandler,
+)
+from data_processing.data_handlers.types import TimePartitionedDataset
+
+SMALL_ORG_DAY = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+# (resource ID, product type, billed amount for the day)
+SMALL_ORG_BILLING = [
+    ("lkc-1", "KAFKA_BASE", "24"),
+    ("lkc-1", "KAFKA_NUM_CKU", "48"),
+    ("lkc-2", "KAFKA_BASE", "12"),
+    ("lkc-2", "KAFKA_PARTITION", "6"),
+]
+# (principal, request bytes, response bytes) on lkc-1 for every hour
+SMALL_ORG_USAGE = [("sa-1", 300, 300), ("sa-2", 100, 100)]
+# (API Key, owner, resource ID)
+SMALL_ORG_API_KEYS = [
+    ("key-1", "sa-1", "lkc-1"),
+    ("key-2", "sa-1", "lkc-1"),
+    ("key-3", "sa-2", "lkc-1"),
+    ("key-4", "sa-2", "lkc-2"),
+]
+
+
+def small_org_billing_frame() -> pd.DataFrame:
+    """Billing rows of SMALL_ORG_BILLING split evenly over the 24 hours of SMALL_ORG_DAY."""
+    return pd.DataFrame.from_records(
+        [
+            {
+                BILLING_API_COLUMNS.calc_timestamp: pd.Timestamp(SMALL_ORG_DAY) + pd.Timedelta(hours=hour),
+                BILLING_API_COLUMNS.env_id: "env-1",
+                BILLING_API_COLUMNS.cluster_id: resource_id,
+                BILLING_API_COLUMNS.cluster_name: resource_id,
+                BILLING_API_COLUMNS.product_name: "KAFKA",
+                BILLING_API_COLUMNS.product_type: product_type,
+                BILLING_API_COLUMNS.calc_split_quantity: decimal.Decimal(1) / 24,
+                BILLING_API_COLUMNS.calc_split_amt: decimal.Decimal(amount) / 24,
+                BILLING_API_COLUMNS.calc_split_total: decimal.Decimal(amount) / 24,
+            }
+            for resource_id, product_type, amount in SMALL_ORG_BILLING
+            for hour in range(24)
+        ],
+        index=[
+            BILLING_API_COLUMNS.calc_timestamp,
+            BILLING_API_COLUMNS.env_id,
+            BILLING_API_COLUMNS.cluster_id,
+            BILLING_API_COLUMNS.product_name,
+            BILLING_API_COLUMNS.product_type,
+        ],
+    )
+
+
+def small_org_metrics_frame() -> pd.DataFrame:
+    return pd.DataFrame.from_records(
+        [
+            {
+                METRICS_API_COLUMNS.timestamp: pd.Timestamp(SMALL_ORG_DAY) + pd.Timedelta(hours=hour),
+                METRICS_API_COLUMNS.query_type: query_type,
+                METRICS_API_COLUMNS.cluster_id: "lkc-1",
+                METRICS_API_COLUMNS.principal_id: principal,
+                METRICS_API_COLUMNS.value: value,
+            }
+            for hour in range(24)
+            for principal, request_bytes, response_bytes in SMALL_ORG_USAGE
+            for query_type, value in [
+                (METRICS_API_PROMETHEUS_QUERIES.request_bytes_name, request_bytes),
+                (METRICS_API_PROMETHEUS_QUERIES.response_bytes_name, response_bytes),
+            ]
+        ],
+        index=[
+            METRICS_API_COLUMNS.timestamp,
+            METRICS_API_COLUMNS.query_type,
+            METRICS_API_COLUMNS.cluster_id,
+            METRICS_API_COLUMNS.principal_id,
+        ],
+    )
+
+
+def make_objects_handler(api_keys) -> CCloudObjectsHandler:
+    """Objects handler holding only the (API Key, owner, resource ID) API Keys, without any CCloud API call."""
+    out = object.__new__(CCloudObjectsHandler)
+    out.objects_version = 1
+    out.last_objects_diff = None
+    out.snapshots = CCloudObjectsSnapshotStore()
+    out.snapshot_views = {}
+    for object_type, (handler_attr, list_attr) in OBJECTS_CATALOG_ATTRIBUTES.items():
+        list_object = object.__new__(CCloudAPIKeyList) if object_type == "api_keys" else SimpleNamespace()
+        setattr(list_object, list_attr, {})
+        setattr(out, handler_attr, list_object)
+    set_api_keys(objects_handler=out, api_keys=api_keys)
+    return out
+
+
+def set_api_keys(objects_handler: CCloudObjectsHandler, api_keys):
+    # A refresh replaces the API Keys dict instead of mutating it, the previous catalog keeps the old one
+    objects_handler.cc_api_keys = copy.copy(objects_handler.cc_api_keys)
+    objects_handler.cc_api_keys.api_keys = {
+        api_key: CCloudAPIKey(
+            api_key=api_key,
+            api_secret="",
+            api_key_description="",
+            owner_id=owner_id,
+            cluster_id=resource_id,
+            created_at=SMALL_ORG_DAY,
+        )
+        for api_key, owner_id, resource_id in api_keys
+    }
+
+
+def refresh_api_keys(objects_handler: CCloudObjectsHandler, api_keys) -> CCloudObjectsDiff:
+    """Replace the API Keys the way a catalog refresh does and return the diff of the refresh."""
+    previous_objects = copy.copy(objects_handler)
+    previous_catalog = previous_objects.get_objects_catalog()
+    set_api_keys(objects_handler=objects_handler, api_keys=api_keys)
+    objects_handler.objects_version += 1
+    objects_handler.last_objects_diff = CCloudObjectsDiff.from_catalogs(
+        previous_catalog=previous_catalog,
+        current_catalog=objects_handler.get_objects_catalog(),
+        previous_version=objects_handler.objects_version - 1,
+        current_version=objects_handler.objects_version,
+        previous_objects=previous_objects,
+    )
+    return objects_handler.last_objects_diff
+
+
+def make_chargeback_handler(api_keys=SMALL_ORG_API_KEYS, billing_frame=None, **kwargs) -> CCloudChargebackHandler:
+    """Chargeback handler computed for SMALL_ORG_DAY from in-memory billing, metrics & objects."""
+    objects_handler = make_objects_handler(api_keys=api_keys)
+    billing_handler = object.__new__(CCloudBillingHandler)
+    billing_handler.billing_dataset = TimePartitionedDataset.from_frame(
+        small_org_billing_frame() if billing_frame is None else billing_frame,
+        ts_column_name=BILLING_API_COLUMNS.calc_timestamp,
+    )
+    metrics_handler = object.__new__(PrometheusMetricsDataHandler)
+    metrics_handler.metrics_dataset = TimePartitionedDataset.from_frame(
+        small_org_metrics_frame(), ts_column_name=METRICS_API_COLUMNS.timestamp
+    )
+    return CCloudChargebackHandler(
+        billing_dataset=billing_handler,
+        objects_dataset=objects_handler,
+        metrics_dataset=metrics_handler,
+        start_date=SMALL_ORG_DAY,
+        days_per_query=1,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def small_org():
+    """Factory for a chargeback handler over one day of a small org: two Kafka clusters with API Keys & usage."""
+    return make_chargeback_handler
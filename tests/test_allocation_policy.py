@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+import pytest
+
+from data_processing.chargeback_handlers.allocation_policy import (
+    AllocationPolicy,
+    SplitBasis,
+    compile_allocation_policies,
+)
+from data_processing.chargeback_handlers.types import ChargebackExecutorInputType
+
+
+def test_float_ratios_add_up_exactly():
+    # 0.7 + 0.2 + 0.1 != 1 in binary floating point, the ratios are compared as decimals of their text
+    policy = AllocationPolicy.from_config(
+        product_type="KAFKA_NUM_CKU",
+        in_config=[
+            {"ratio": 0.7, "split_basis": "usage"},
+            {"ratio": 0.2, "split_basis": "api_key_count"},
+            {"ratio": 0.1, "split_basis": "api_key_owners"},
+        ],
+    )
+    assert [x.ratio for x in policy.components] == [Decimal("0.7"), Decimal("0.2"), Decimal("0.1")]
+
+
+@pytest.mark.parametrize(
+    "in_config",
+    [
+        [{"ratio": 0.3, "split_basis": "usage"}, {"ratio": 0.6, "split_basis": "api_key_owners"}],
+        [{"ratio": 0.5, "split_basis": "usage"}, {"ratio": 0.6, "split_basis": "api_key_owners"}],
+        {"ratio": 0.99, "split_basis": "resource"},
+    ],
+)
+def test_ratios_not_adding_up_to_one_are_rejected(in_config):
+    with pytest.raises(ValueError, match="must add up to 1"):
+        AllocationPolicy.from_config(product_type="KAFKA_NUM_CKU", in_config=in_config)
+
+
+@pytest.mark.parametrize(
+    "in_config, message",
+    [
+        ([], "does not have any split definitions"),
+        (None, "does not have any split definitions"),
+        ({"ratio": 1}, "needs a split_basis"),
+        ({"split_basis": "principal"}, "needs a split_basis"),
+        ({"split_basis": "usage", "fallback": ["nobody"]}, "needs a split_basis"),
+        ({"split_basis": "usage", "usage_metrics": ["cpu_seconds"]}, "unknown usage metrics"),
+    ],
+)
+def test_invalid_definitions_are_rejected(in_config, message):
+    with pytest.raises(ValueError, match=message):
+        AllocationPolicy.from_config(product_type="KAFKA_NUM_CKU", in_config=in_config)
+
+
+def test_split_chain_ends_with_the_resource():
+    policy = AllocationPolicy.from_config(
+        product_type="KAFKA_NUM_CKU",
+        in_config={"split_basis": "USAGE", "fallback": ["resource", "api_key_owners"]},
+    )
+    # A missing ratio takes the whole cost & nothing after the resource is ever reached
+    assert policy.components[0].ratio == Decimal(1)
+    assert policy.components[0].split_chain == (SplitBasis.USAGE, SplitBasis.RESOURCE)
+
+
+def test_compiled_executors_are_keyed_by_upper_case_product_type():
+    out = compile_allocation_policies(
+        {
+            "kafka_num_cku": [
+                {"ratio": 0.3, "split_basis": "api_key_owners"},
+                {"ratio": 0.7, "split_basis": "usage", "fallback": ["api_key_owners"]},
+            ]
+        }
+    )
+    assert list(out.keys()) == ["KAFKA_NUM_CKU"]
+    assert out["KAFKA_NUM_CKU"].input_types == (
+        ChargebackExecutorInputType.OWNERSHIP_INDEX,
+        ChargebackExecutorInputType.FIXED_OWNER,
+        ChargebackExecutorInputType.USAGE_METRIC,
+    )
+    assert compile_allocation_policies(None) == {}
@@ -0,0 +1,50 @@
+import datetime
+
+from data_processing.data_handlers.ccloud_api_handler import CCloudObjectsDiff
+from data_processing.data_handlers.ccloud_objects_snapshots import CCloudObjectsSnapshotStore
+
+START = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+def catalog(*api_keys: str):
+    return {"api_keys": {k: k.lower() for k in api_keys}}
+
+
+def test_hours_before_the_first_snapshot_have_no_recorded_catalog():
+    store = CCloudObjectsSnapshotStore(checkpoint_interval=2)
+    assert store.as_of(ts=START) == (0, None)
+    store.record(refreshed_at=START, objects_version=1, current_catalog=catalog("K1"), previous_catalog=None)
+    store.record(
+        refreshed_at=START + datetime.timedelta(hours=5),
+        objects_version=2,
+        current_catalog=catalog("K1", "K2"),
+        previous_catalog=catalog("K1"),
+    )
+    store.record(
+        refreshed_at=START + datetime.timedelta(hours=9),
+        objects_version=3,
+        current_catalog=catalog("K2"),
+        previous_catalog=catalog("K1", "K2"),
+    )
+
+    assert store.history_start == START
+    assert store.as_of(ts=START - datetime.timedelta(hours=1)) == (0, None)
+    assert store.as_of(ts=START + datetime.timedelta(hours=4)) == (1, catalog("K1"))
+    assert store.as_of(ts=START + datetime.timedelta(hours=5)) == (2, catalog("K1", "K2"))
+    assert store.as_of(ts=START + datetime.timedelta(days=1)) == (3, catalog("K2"))
+
+
+def test_diff_changes_the_catalog_after_the_refresh_and_before_the_history():
+    diff = CCloudObjectsDiff.from_catalogs(
+        previous_catalog=catalog("K1"),
+        current_catalog=catalog("K1", "K2"),
+        previous_version=1,
+        current_version=2,
+        refreshed_at=START + datetime.timedelta(days=3),
+        history_start=START + datetime.timedelta(days=1),
+    )
+
+    assert diff.changes_catalog_at(ts=START)
+    assert not diff.changes_catalog_at(ts=START + datetime.timedelta(days=1))
+    assert not diff.changes_catalog_at(ts=START + datetime.timedelta(days=2))
+    assert diff.changes_catalog_at(ts=START + datetime.timedelta(days=3))
@@ -0,0 +1,78 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from data_processing.data_handlers.chargeback_cardinality import OTHER_PRINCIPAL, ChargebackCardinalityGuard
+
+TS = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+def totals(rows):
+    """(product type, env ID) --> (usage cost, shared cost) summed over the rows."""
+    out = {}
+    for _, _, product_type, env_id, usage, shared in rows:
+        curr_usage, curr_shared = out.get((product_type, env_id), (0, 0))
+        out[(product_type, env_id)] = (curr_usage + usage, curr_shared + shared)
+    return out
+
+
+def test_long_tail_is_folded_with_exact_totals():
+    rows = [
+        (f"sa-{idx}", TS, "KAFKA_BASE", "env-1", Decimal(idx) / 10, Decimal("0.01") * idx) for idx in range(1, 11)
+    ] + [("sa-1", TS, "KAFKA_BASE", "env-2", Decimal(1), Decimal(0))]
+
+    out, folded_counts = ChargebackCardinalityGuard(top_principals=3).fold_rows(rows)
+
+    assert [x[0] for x in out if x[3] == "env-1"] == ["sa-10", "sa-9", "sa-8", OTHER_PRINCIPAL]
+    assert out[3] == (OTHER_PRINCIPAL, TS, "KAFKA_BASE", "env-1", Decimal("2.8"), Decimal("0.28"))
+    assert totals(out) == totals(rows)
+    assert folded_counts == {("KAFKA_BASE", "env-1"): 7}
+
+
+def test_groups_within_the_limit_are_kept_as_is():
+    rows = [
+        ("sa-1", TS, "KAFKA_BASE", "env-1", 1, 0),
+        ("sa-2", TS, "KAFKA_BASE", "env-1", 2, 0),
+        ("sa-1", TS, "KAFKA_NETWORK_READ", "env-1", 3, 0),
+    ]
+    assert ChargebackCardinalityGuard(top_principals=2).fold_rows(rows) == (rows, {})
+
+
+def test_ties_are_ranked_by_principal():
+    rows = [(x, TS, "KAFKA_BASE", "env-1", 0, 1) for x in ["sa-c", "sa-a", "sa-b"]]
+
+    out, _ = ChargebackCardinalityGuard(top_principals=2).fold_rows(rows)
+
+    assert [x[0] for x in out] == ["sa-a", "sa-b", OTHER_PRINCIPAL]
+
+
+def test_principal_named_like_the_bucket_is_folded_into_it():
+    rows = [
+        (OTHER_PRINCIPAL, TS, "KAFKA_BASE", "env-1", 100, 0),
+        ("sa-1", TS, "KAFKA_BASE", "env-1", 1, 0),
+    ]
+
+    out, folded_counts = ChargebackCardinalityGuard(top_principals=5).fold_rows(rows)
+
+    assert out == [("sa-1", TS, "KAFKA_BASE", "env-1", 1, 0), (OTHER_PRINCIPAL, TS, "KAFKA_BASE", "env-1", 100, 0)]
+    assert folded_counts == {}
+
+
+def test_repeated_principal_keeps_its_last_row():
+    rows = [("sa-1", TS, "KAFKA_BASE", "env-1", 5, 0), ("sa-1", TS, "KAFKA_BASE", "env-1", 7, 0)]
+    assert ChargebackCardinalityGuard(top_principals=1).fold_rows(rows) == ([rows[1]], {})
+
+
+@pytest.mark.parametrize(
+    "in_config, top_principals",
+    [(None, None), ({}, None), ({"enabled": False}, None), ({"enabled": True}, 100), ({"top_principals": 5}, 5)],
+)
+def test_from_config(in_config, top_principals):
+    guard = ChargebackCardinalityGuard.from_config(in_config)
+    assert (guard.top_principals if guard else None) == top_principals
+
+
+def test_at_least_one_principal_is_kept():
+    with pytest.raises(ValueError, match="at least 1"):
+        ChargebackCardinalityGuard(top_principals=0)
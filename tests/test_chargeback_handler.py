@@ -0,0 +1,93 @@
+import datetime
+import decimal
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from data_processing.chargeback_handlers.types import ChargebackExecutorInputType
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
+from data_processing.data_handlers.chargeback_handler import (
+    CHARGEBACK_EXECUTORS,
+    CCloudChargebackHandler,
+    get_daily_billing_rows,
+)
+
+DAY = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+BILLING_INDEX = [
+    BILLING_API_COLUMNS.calc_timestamp,
+    BILLING_API_COLUMNS.env_id,
+    BILLING_API_COLUMNS.cluster_id,
+    BILLING_API_COLUMNS.product_name,
+    BILLING_API_COLUMNS.product_type,
+]
+
+
+def billing_frame(lines):
+    """Hourly split rows for (resource ID, line type, amount) billing lines of DAY, as the Billing handler builds
+    them."""
+    return pd.DataFrame.from_records(
+        [
+            {
+                BILLING_API_COLUMNS.calc_timestamp: pd.Timestamp(DAY) + pd.Timedelta(hours=hour),
+                BILLING_API_COLUMNS.env_id: "env-1",
+                BILLING_API_COLUMNS.cluster_id: resource_id,
+                BILLING_API_COLUMNS.cluster_name: resource_id,
+                BILLING_API_COLUMNS.product_name: "KAFKA",
+                BILLING_API_COLUMNS.product_type: line_type,
+                BILLING_API_COLUMNS.calc_split_quantity: decimal.Decimal(1) / 24,
+                BILLING_API_COLUMNS.calc_split_amt: decimal.Decimal(amount) / 24,
+                BILLING_API_COLUMNS.calc_split_total: decimal.Decimal(amount) / 24,
+            }
+            for resource_id, line_type, amount in lines
+            for hour in range(24)
+        ],
+        index=BILLING_INDEX,
+    )
+
+
+def locate_executor(product_type: str):
+    return CCloudChargebackHandler.locate_chargeback_executor(
+        SimpleNamespace(allocation_policies={}), product_type=product_type
+    )
+
+
+def is_metric_independent(product_type: str) -> bool:
+    return CCloudChargebackHandler.is_metric_independent(None, chargeback_executor=locate_executor(product_type))
+
+
+@pytest.mark.parametrize("product_type", sorted(CHARGEBACK_EXECUTORS.keys()))
+def test_row_executors_never_request_the_usage_pivot(product_type):
+    # Row based executors only receive the metrics rows, the pivoted usage is never handed to them
+    executor = locate_executor(product_type)
+    if executor.executor_func in CHARGEBACK_EXECUTORS.values():
+        assert ChargebackExecutorInputType.USAGE_METRIC not in executor.input_types
+
+
+@pytest.mark.parametrize("product_type", ["KAFKA_NETWORK_READ", "KAFKA_NETWORK_WRITE", "KAFKA_NUM_CKU"])
+def test_metric_reading_row_executors_are_computed_every_hour(product_type):
+    assert ChargebackExecutorInputType.METRICS_ROWS in locate_executor(product_type).input_types
+    assert not is_metric_independent(product_type)
+
+
+@pytest.mark.parametrize("product_type", ["KAFKA_BASE", "CONNECT_CAPACITY", "KAFKA_PARTITION", "SCHEMA_REGISTRY"])
+def test_catalog_only_executors_are_computed_once_per_day(product_type):
+    assert is_metric_independent(product_type)
+
+
+def test_daily_billing_rows_keep_every_line_of_a_key():
+    # A price change within the day leaves two billing lines with the same key
+    billing_data = billing_frame(
+        [("lkc-1", "KAFKA_BASE", "24"), ("lkc-1", "KAFKA_BASE", "48"), ("lkc-2", "KAFKA_BASE", "12")]
+    )
+
+    out = get_daily_billing_rows(billing_data=billing_data, day=DAY)
+
+    assert out.index.names == BILLING_INDEX
+    assert set(out.index.get_level_values(BILLING_API_COLUMNS.calc_timestamp)) == {pd.Timestamp(DAY)}
+    hourly_totals = out[BILLING_API_COLUMNS.calc_split_total].groupby(level=BILLING_API_COLUMNS.cluster_id).sum()
+    assert hourly_totals.to_dict() == {"lkc-1": decimal.Decimal(3), "lkc-2": decimal.Decimal("0.5")}
+    # The day fanned out to 24 hours adds up to the billed amount
+    billed_total = sum(billing_data[BILLING_API_COLUMNS.calc_split_total])
+    assert sum(out[BILLING_API_COLUMNS.calc_split_total]) * 24 == billed_total
+    assert len(out) == 2
@@ -0,0 +1,90 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from data_processing.data_handlers.chargeback_history import ChargebackHistory
+from helpers import to_epoch_hour
+
+DAY_0 = to_epoch_hour(datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc))
+
+
+@pytest.mark.parametrize(
+    "cost, encoded",
+    [
+        (Decimal("1.25"), 1_250_000_000),
+        (Decimal("0.000000001"), 1),
+        # Digits past the scale are rounded half to even, so the rounding does not drift in either direction
+        (Decimal("0.0000000005"), 0),
+        (Decimal("0.0000000015"), 2),
+        (Decimal("-0.0000000025"), -2),
+        (Decimal("1234567.123456789"), 1_234_567_123_456_789),
+        # Floats are converted to the scale, not kept with their binary representation error
+        (0.1, 100_000_000),
+    ],
+)
+def test_costs_are_fixed_point(cost, encoded):
+    history = ChargebackHistory()
+    assert history.encode_cost(cost) == encoded
+    assert history.decode_cost(encoded) == Decimal(encoded).scaleb(-9)
+
+
+def test_scale_digits_are_configurable():
+    history = ChargebackHistory(value_scale_digits=2)
+    assert history.encode_cost(Decimal("3.14159")) == 314
+    assert history.decode_cost(314) == Decimal("3.14")
+
+
+def test_rows_round_trip_hour_by_hour():
+    history = ChargebackHistory()
+    hourly_rows = [
+        ("sa-2", DAY_0 + 5, "KAFKA_BASE", "env-1", Decimal("0.1"), Decimal("0.2")),
+        ("sa-1", DAY_0, "KAFKA_BASE", "env-1", Decimal("1.000000001"), Decimal(0)),
+        ("sa-1", DAY_0 + 23, "KAFKA_NETWORK_READ", "env-2", Decimal("12345.678901234"), Decimal(0)),
+    ]
+    history.add_day(
+        day_start_hour=DAY_0,
+        hourly_rows=hourly_rows,
+        daily_rows=[("sa-3", "KAFKA_NUM_CKUS", "env-1", Decimal(0), Decimal("0.5"))],
+    )
+
+    assert list(history.iter_hour(DAY_0 + 5)) == [
+        hourly_rows[0],
+        ("sa-3", DAY_0 + 5, "KAFKA_NUM_CKUS", "env-1", Decimal(0), Decimal("0.5")),
+    ]
+    # The daily rows apply to every hour of the day
+    assert list(history.iter_hour(DAY_0 + 7)) == [
+        ("sa-3", DAY_0 + 7, "KAFKA_NUM_CKUS", "env-1", Decimal(0), Decimal("0.5"))
+    ]
+    rows = list(history.iter_rows())
+    assert len(rows) == len(history) == 3 + 24
+    assert [x for x in rows if x[0] != "sa-3"] == sorted(hourly_rows, key=lambda x: x[1])
+    assert history.keys == [
+        ("sa-1", "KAFKA_BASE", "env-1"),
+        ("sa-2", "KAFKA_BASE", "env-1"),
+        ("sa-1", "KAFKA_NETWORK_READ", "env-2"),
+        ("sa-3", "KAFKA_NUM_CKUS", "env-1"),
+    ]
+    assert list(history.iter_hour(DAY_0 + 24)) == []
+
+
+def test_days_are_replaced_and_evicted_whole():
+    history = ChargebackHistory(max_days=2)
+    for day_idx in range(3):
+        history.add_day(
+            day_start_hour=DAY_0 + 24 * day_idx,
+            hourly_rows=[("sa-1", DAY_0 + 24 * day_idx, "KAFKA_BASE", "env-1", Decimal(day_idx), Decimal(0))],
+            daily_rows=[],
+        )
+    history.add_day(
+        day_start_hour=DAY_0 + 24,
+        hourly_rows=[("sa-1", DAY_0 + 24, "KAFKA_BASE", "env-1", Decimal(7), Decimal(0))],
+        daily_rows=[],
+    )
+
+    assert sorted(history.chunks.keys()) == [DAY_0 + 24, DAY_0 + 48]
+    assert not history.has_hour(DAY_0 + 23) and history.has_hour(DAY_0 + 24)
+    assert history.end_hour == DAY_0 + 72
+    assert [x[4] for x in history.iter_rows()] == [Decimal(7), Decimal(2)]
+    # Every row shares the one key
+    assert len(history.keys) == 1
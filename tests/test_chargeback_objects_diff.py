@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+from conftest import SMALL_ORG_API_KEYS, make_chargeback_handler, refresh_api_keys
+
+from data_processing.chargeback_handlers.reconciliation import RECONCILIATION_COLUMNS
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
+
+OWNER_CHANGED = [("key-3", "sa-1", "lkc-1") if x[0] == "key-3" else x for x in SMALL_ORG_API_KEYS]
+# sa-2 loses its only API Key for lkc-1
+KEY_REMOVED = [x for x in SMALL_ORG_API_KEYS if x[0] != "key-3"]
+# No billing rows for lkc-3, so the new key does not change any chargeback row
+KEY_ON_UNBILLED_CLUSTER = SMALL_ORG_API_KEYS + [("key-5", "sa-3", "lkc-3")]
+
+
+def chargeback_costs(handler) -> pd.Series:
+    """Total cost per principal, hour, product type & env ID without the zero cost rows."""
+    out = handler.get_chargeback_dataframe().astype(float).sum(axis=1)
+    return out[out.abs() > 1e-9].sort_index()
+
+
+def assert_reconciled(handler):
+    reconciliation = handler.reconciliation_dataset
+    assert reconciliation[RECONCILIATION_COLUMNS.DRIFT].abs().sum() == pytest.approx(0, abs=1e-9)
+    hourly_costs = chargeback_costs(handler).groupby(level="Timestamp").sum()
+    hourly_billing = reconciliation.groupby(level=BILLING_API_COLUMNS.calc_timestamp)[
+        RECONCILIATION_COLUMNS.BILLED
+    ].sum()
+    assert len(hourly_costs) == 24
+    assert hourly_costs.to_numpy() == pytest.approx(hourly_billing.astype(float).to_numpy())
+
+
+@pytest.mark.parametrize("api_keys", [OWNER_CHANGED, KEY_REMOVED], ids=["owner_changed", "key_removed"])
+def test_objects_diff_matches_a_full_recompute(api_keys):
+    handler = make_chargeback_handler()
+    before = chargeback_costs(handler)
+
+    objects_diff = refresh_api_keys(objects_handler=handler.objects_dataset, api_keys=api_keys)
+    handler.apply_objects_diff(objects_diff=objects_diff)
+
+    assert handler.objects_version_applied == objects_diff.current_version
+    recomputed = chargeback_costs(make_chargeback_handler(api_keys=api_keys))
+    pd.testing.assert_series_equal(chargeback_costs(handler), recomputed, atol=1e-9)
+    assert not chargeback_costs(handler).equals(before)
+    assert_reconciled(handler)
+
+
+def test_owner_change_moves_the_shared_costs_of_the_key():
+    handler = make_chargeback_handler()
+    objects_diff = refresh_api_keys(objects_handler=handler.objects_dataset, api_keys=OWNER_CHANGED)
+
+    assert objects_diff.changed["api_keys"].keys() == {"key-3"}
+    assert (None, "lkc-1", "KAFKA_BASE") in handler.locate_affected_chargeback_rows(objects_diff=objects_diff)
+
+    handler.apply_objects_diff(objects_diff=objects_diff)
+    costs = chargeback_costs(handler).groupby(level=["Principal", "ProductType"]).sum()
+    # sa-1 owns every API Key of lkc-1, sa-2 keeps lkc-2 & the usage of lkc-1
+    assert costs[("sa-1", "KAFKA_BASE")] == pytest.approx(24)
+    assert costs[("sa-2", "KAFKA_BASE")] == pytest.approx(12)
+    assert costs[("sa-2", "KAFKA_NUM_CKU")] == pytest.approx(48 * 0.7 * 0.25)
+
+
+def test_removed_object_is_located_from_the_previous_catalog():
+    handler = make_chargeback_handler()
+    objects_diff = refresh_api_keys(objects_handler=handler.objects_dataset, api_keys=KEY_REMOVED)
+
+    assert objects_diff.removed["api_keys"].keys() == {"key-3"}
+    affected_rows = handler.locate_affected_chargeback_rows(objects_diff=objects_diff)
+    assert {x[1] for x in affected_rows} == {"lkc-1", None}
+
+
+def test_objects_diff_without_affected_chargeback_rows():
+    handler = make_chargeback_handler()
+    before = chargeback_costs(handler)
+    chargeback_dataset = dict(handler.chargeback_dataset)
+
+    objects_diff = refresh_api_keys(objects_handler=handler.objects_dataset, api_keys=KEY_ON_UNBILLED_CLUSTER)
+    assert objects_diff.added["api_keys"].keys() == {"key-5"}
+    handler.apply_objects_diff(objects_diff=objects_diff)
+
+    assert handler.objects_version_applied == objects_diff.current_version
+    assert handler.chargeback_dataset == chargeback_dataset
+    pd.testing.assert_series_equal(chargeback_costs(handler), before)
+    pd.testing.assert_series_equal(
+        before, chargeback_costs(make_chargeback_handler(api_keys=KEY_ON_UNBILLED_CLUSTER)), atol=1e-9
+    )
+    assert_reconciled(handler)
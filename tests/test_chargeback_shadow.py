@@ -0,0 +1,36 @@
+import datetime
+import tracemalloc
+
+import pytest
+
+from data_processing.data_handlers.chargeback_shadow import ChargebackShadowEngine
+
+START = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+class RecordingHandler:
+    """Chargeback handler stand in recording whether memory was traced while its window was computed."""
+
+    def __init__(self) -> None:
+        self.traced_runs = []
+
+    def compute_window(self, start_date, end_date):
+        self.traced_runs.append(tracemalloc.is_tracing())
+
+    def iter_chargeback_rows(self):
+        return iter([])
+
+
+@pytest.mark.parametrize("measure_memory", [False, True])
+def test_only_the_shadow_run_is_traced_and_only_on_request(measure_memory):
+    handler = RecordingHandler()
+    engine = ChargebackShadowEngine.from_config(org_id="org-1", in_config={"measure_memory": measure_memory})
+
+    engine.run_window(chargeback_handler=handler, start_date=START, end_date=START + datetime.timedelta(hours=1))
+
+    # The shadow run computes on a copy of the handler, which shares the recorded runs
+    assert handler.traced_runs == [False, measure_memory]
+    engines = engine.get_report()["windows"][0]["engines"]
+    assert engines["current"]["peak_memory_bytes"] is None
+    assert (engines["shadow"]["peak_memory_bytes"] is not None) == measure_memory
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,115 @@
+import csv
+import datetime
+import threading
+
+from prometheus_client.openmetrics.parser import text_string_to_metric_families
+
+from ccloud.org import CCloudOrg
+from data_processing.data_handlers.chargeback_handler import CHARGEBACK_COLUMNS, chargeback_prom_metrics
+from data_processing.data_handlers.chargeback_streaming import ChargebackCSVSink, ChargebackOpenMetricsSink
+from data_processing.data_handlers.prom_fetch_stats_handler import METRICS_API_PROMETHEUS_STATUS_QUERIES
+
+DAY = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+HEADER = [
+    CHARGEBACK_COLUMNS.PRINCIPAL,
+    CHARGEBACK_COLUMNS.TS,
+    CHARGEBACK_COLUMNS.PRODUCT_TYPE,
+    CHARGEBACK_COLUMNS.ENV_ID,
+    CHARGEBACK_COLUMNS.USAGE_COST,
+    CHARGEBACK_COLUMNS.SHARED_COST,
+]
+
+
+def read_csv(path):
+    with open(path, newline="") as in_file:
+        return list(csv.reader(in_file))
+
+
+def test_csv_sink_writes_one_file_per_day_and_replaces_older_runs(tmp_path):
+    stale_file = tmp_path / "chargeback_2023-06-01.csv"
+    stale_file.write_text("left over from an earlier run\n")
+    sink = ChargebackCSVSink(output_dir=str(tmp_path))
+    for hour_idx in [0, 1, 24]:
+        time_slice = DAY + datetime.timedelta(hours=hour_idx)
+        sink(time_slice, [("sa-1", time_slice, "KAFKA_BASE", "env-1", hour_idx, 0.5)])
+    sink.close()
+
+    assert sink.written_files == [str(stale_file), str(tmp_path / "chargeback_2023-06-02.csv")]
+    assert read_csv(stale_file) == [
+        HEADER,
+        ["sa-1", "2023-06-01T00:00:00+00:00", "KAFKA_BASE", "env-1", "0", "0.5"],
+        ["sa-1", "2023-06-01T01:00:00+00:00", "KAFKA_BASE", "env-1", "1", "0.5"],
+    ]
+    assert read_csv(sink.written_files[1]) == [
+        HEADER,
+        ["sa-1", "2023-06-02T00:00:00+00:00", "KAFKA_BASE", "env-1", "24", "0.5"],
+    ]
+
+
+def test_csv_backfill_streams_the_chargeback_rows_only(tmp_path):
+    org = object.__new__(CCloudOrg)
+    org.org_id = "org-1"
+    org.state_lock = threading.Lock()
+    calls = []
+
+    def run_streaming_export(start_date, end_date, sink, expose_inputs=False):
+        calls.append(expose_inputs)
+        sink(DAY, [("sa-1", DAY, "KAFKA_BASE", "env-1", 1, 2)])
+
+    org.run_streaming_export = run_streaming_export
+    org.run_backfill(
+        start_date=DAY, end_date=DAY + datetime.timedelta(days=1), output_dir=str(tmp_path), output_format="csv"
+    )
+
+    assert calls == [False]
+    assert read_csv(tmp_path / "chargeback_org-1_2023-06-01.csv")[0] == HEADER
+
+
+def test_openmetrics_sink_writes_one_parsable_file_per_day(tmp_path):
+    sink = ChargebackOpenMetricsSink(output_dir=str(tmp_path), file_prefix="chargeback_org-1")
+    for hour_idx in range(25):
+        time_slice = DAY + datetime.timedelta(hours=hour_idx)
+        sink(
+            time_slice,
+            [
+                ("sa-2", time_slice, "KAFKA_BASE", "env-1", hour_idx, 0.5),
+                ("sa-1", time_slice, "KAFKA_BASE", "env-1", hour_idx * 2, 0.25),
+            ],
+        )
+    sink.close()
+
+    assert sink.written_files == [
+        str(tmp_path / "chargeback_org-1_2023-06-01.om.txt"),
+        str(tmp_path / "chargeback_org-1_2023-06-02.om.txt"),
+    ]
+    content = (tmp_path / "chargeback_org-1_2023-06-01.om.txt").read_text()
+    assert content.endswith("\n# EOF\n") and content.count("# EOF") == 1
+    families = {x.name: x for x in text_string_to_metric_families(content)}
+    chargeback_name = chargeback_prom_metrics.describe()[0].name
+    status_name = METRICS_API_PROMETHEUS_STATUS_QUERIES.status_query
+    assert families.keys() == {chargeback_name, status_name}
+
+    # Timestamps in seconds, grouped per label set & ordered by timestamp within a label set
+    hours = [int((DAY + datetime.timedelta(hours=x)).timestamp()) for x in range(24)]
+    samples = families[chargeback_name].samples
+    assert len(samples) == 2 * 2 * 24
+    assert [float(x.timestamp) for x in samples[:24]] == hours
+    assert [(x.labels["principal"], x.labels["cost_type"]) for x in samples[::24]] == [
+        ("sa-1", CHARGEBACK_COLUMNS.SHARED_COST),
+        ("sa-1", CHARGEBACK_COLUMNS.USAGE_COST),
+        ("sa-2", CHARGEBACK_COLUMNS.SHARED_COST),
+        ("sa-2", CHARGEBACK_COLUMNS.USAGE_COST),
+    ]
+    assert [x.value for x in samples[24:48]] == [float(x * 2) for x in range(24)]
+    assert samples[0].labels == {
+        "principal": "sa-1",
+        "product_type": "KAFKA_BASE",
+        "env_id": "env-1",
+        "cost_type": CHARGEBACK_COLUMNS.SHARED_COST,
+    }
+    # The scrape status of every hour marks the hours as done for the scrape loop
+    assert [float(x.timestamp) for x in families[status_name].samples] == hours
+    assert {x.value for x in families[status_name].samples} == {1.0}
+
+    next_day = list(text_string_to_metric_families((tmp_path / "chargeback_org-1_2023-06-02.om.txt").read_text()))
+    assert [float(x.timestamp) for x in next_day[1].samples] == [hours[-1] + 3600]
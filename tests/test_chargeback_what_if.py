@@ -0,0 +1,126 @@
+import datetime
+import json
+import threading
+
+import pytest
+
+import internal_data_probe
+from ccloud.org import CCloudOrg
+from data_processing.chargeback_handlers.allocation_policy import compile_allocation_policies
+from data_processing.chargeback_handlers.types import ChargebackAllocationParams, OwnerPolicy
+from data_processing.data_handlers.chargeback_what_if import ChargebackWhatIfEngine
+from http_server import HTTPRequest
+
+DAY = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+def deltas(compare_result):
+    """(principal, product type) --> delta cost, leaving out the unchanged costs."""
+    return {k: round(v, 9) for k, v in compare_result["DeltaCost"].items() if abs(v) > 1e-9}
+
+
+@pytest.fixture
+def what_if(small_org):
+    return ChargebackWhatIfEngine(
+        chargeback_handler=small_org(), start_date=DAY, end_date=DAY + datetime.timedelta(days=1)
+    )
+
+
+def test_unchanged_params_reprice_to_the_live_chargeback(what_if):
+    out = what_if.compare(allocation_params=ChargebackAllocationParams())
+
+    assert deltas(out) == {}
+    assert out["CurrentCost"].sum() == pytest.approx(90)
+    live = what_if.chargeback_handler.get_chargeback_dataframe().astype(float)
+    assert out.loc[("sa-1", "KAFKA_NUM_CKU"), "CurrentCost"] == pytest.approx(
+        live.xs(("sa-1", "KAFKA_NUM_CKU"), level=[0, 2]).to_numpy().sum()
+    )
+
+
+def test_common_charge_ratio_moves_cost_between_shared_and_usage(what_if):
+    out = what_if.compare(allocation_params=ChargebackAllocationParams(common_charge_ratio=0.5))
+
+    # sa-1 has 3/4 of the bytes on lkc-1 & half of the shared CKU cost. 48 * (0.5 - 0.3) moves from usage to shared.
+    assert deltas(out) == {("sa-1", "KAFKA_NUM_CKU"): -2.4, ("sa-2", "KAFKA_NUM_CKU"): 2.4}
+    assert out["WhatIfCost"].sum() == pytest.approx(90)
+
+
+def test_owner_policy_changes_the_api_key_holder_split(what_if):
+    out = what_if.compare(allocation_params=ChargebackAllocationParams(owner_policy=OwnerPolicy.API_KEY_WEIGHTED))
+
+    # sa-1 holds 2 of the 3 API Keys for lkc-1, sa-2 is the only holder on lkc-2
+    assert deltas(out) == {
+        ("sa-1", "KAFKA_BASE"): 4.0,
+        ("sa-2", "KAFKA_BASE"): -4.0,
+        ("sa-1", "KAFKA_NUM_CKU"): 2.4,
+        ("sa-2", "KAFKA_NUM_CKU"): -2.4,
+    }
+
+
+def test_product_types_with_an_allocation_policy_report_the_ignored_params(small_org):
+    handler = small_org(
+        allocation_policies=compile_allocation_policies(
+            {"KAFKA_NUM_CKU": [{"ratio": 0.5, "split_basis": "usage"}, {"ratio": 0.5, "split_basis": "api_key_owners"}]}
+        )
+    )
+    what_if = ChargebackWhatIfEngine(
+        chargeback_handler=handler, start_date=DAY, end_date=DAY + datetime.timedelta(days=1)
+    )
+
+    params = ChargebackAllocationParams(common_charge_ratio=0.9)
+    assert deltas(what_if.compare(allocation_params=params)) == {}
+    assert what_if.get_not_repriced_product_types(allocation_params=params) == {
+        "KAFKA_NUM_CKU": ["common_charge_ratio"]
+    }
+
+    # The api_key_owners split of the policy follows the owner policy
+    params = ChargebackAllocationParams(owner_policy=OwnerPolicy.API_KEY_WEIGHTED)
+    assert ("sa-1", "KAFKA_NUM_CKU") in deltas(what_if.compare(allocation_params=params))
+    assert what_if.get_not_repriced_product_types(allocation_params=params) == {}
+
+
+@pytest.fixture
+def what_if_api(small_org, monkeypatch):
+    monkeypatch.setattr(internal_data_probe, "WHAT_IF_RUNNERS", {})
+    org = object.__new__(CCloudOrg)
+    org.org_id = "org-1"
+    org.state_lock = threading.Lock()
+    org.chargeback_handler = small_org()
+    internal_data_probe.register_what_if_runner(org_id=org.org_id, runner=org.run_what_if)
+
+    def get(org_id="org-1", **args):
+        response = internal_data_probe.internal_api.dispatch(
+            HTTPRequest(
+                method="GET",
+                path=f"/what_if/{org_id}",
+                args={"start_date": "2023-06-01T00:00:00", "end_date": "2023-06-02T00:00:00", **args},
+            )
+        )
+        return response.status, json.loads(response.body)
+
+    return get
+
+
+def test_what_if_endpoint(what_if_api):
+    status, body = what_if_api(common_charge_ratio="0.5")
+
+    assert status == 200
+    assert body["not_repriced"] == {}
+    costs = {(x["Principal"], x["ProductType"]): x["DeltaCost"] for x in body["costs"]}
+    assert costs[("sa-1", "KAFKA_NUM_CKU")] == pytest.approx(-2.4)
+
+
+@pytest.mark.parametrize(
+    "args", [{"common_charge_ratio": "1.5"}, {"common_charge_ratio": "half"}, {"owner_policy": "nobody"}, {}]
+)
+def test_what_if_endpoint_rejects_bad_params(what_if_api, args):
+    if not args:
+        # A missing date is as invalid as a bad parameter
+        args = {"start_date": "yesterday"}
+    status, body = what_if_api(**args)
+    assert status == 400
+    assert body["error"].startswith("Invalid what-if request")
+
+
+def test_what_if_endpoint_unknown_org(what_if_api):
+    assert what_if_api(org_id="nope")[0] == 404
@@ -0,0 +1,115 @@
+import datetime
+import decimal
+
+import pandas as pd
+import pytest
+
+pl = pytest.importorskip("polars")
+
+from data_processing.data_handlers.dataframe_backend import (  # noqa: E402
+    PandasDataFrameBackend,
+    PolarsDataFrameBackend,
+)
+
+DAY = pd.Timestamp(datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc))
+
+
+@pytest.fixture
+def backends():
+    return PandasDataFrameBackend(), PolarsDataFrameBackend()
+
+
+def hourly_dataset(principals, hours=3) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Interval": [DAY + pd.Timedelta(hours=x) for x in range(hours) for _ in principals],
+            "Principal": [x for _ in range(hours) for x in principals],
+            "Value": [float(x) for x in range(hours * len(principals))],
+        }
+    ).set_index(["Interval", "Principal"])
+
+
+def test_join_keeps_the_left_row_order(backends):
+    left = pd.DataFrame({"key": ["b", "a", "c", "b", "a"], "left_value": [1, 2, 3, 4, 5]})
+    right = pd.DataFrame({"key": ["a", "b", "b", "d"], "right_value": [10, 20, 30, 40]})
+
+    pandas_out, polars_out = [x.join(left=left, right=right, on="key") for x in backends]
+
+    pd.testing.assert_frame_equal(polars_out, pandas_out, check_dtype=False)
+    # Grouped by the first left row of every key, then in the order of the left & right rows
+    assert list(zip(polars_out["left_value"], polars_out["right_value"])) == [
+        (1, 20),
+        (1, 30),
+        (4, 20),
+        (4, 30),
+        (2, 10),
+        (5, 10),
+    ]
+
+
+def test_group_sum_adds_decimals_in_pandas(backends):
+    dataset = pd.DataFrame(
+        {
+            "principal": ["sa-2", "sa-1", "sa-2", "sa-1", "sa-3"],
+            "product_type": ["KAFKA_BASE"] * 5,
+            "cost": [decimal.Decimal(x) for x in ["0.1", "0.2", "0.3", "0.4", "1E-30"]],
+            "bytes": [1.5, 2.0, 3.0, 4.0, 0.0],
+        }
+    )
+
+    pandas_out, polars_out = [
+        x.group_sum(dataset=dataset, by=["principal", "product_type"], value_columns=["cost", "bytes"])
+        for x in backends
+    ]
+
+    pd.testing.assert_frame_equal(polars_out, pandas_out, check_dtype=False)
+    # The Decimal sums are exact & stay Decimal, the first group is the one of the first row
+    assert polars_out["principal"].tolist() == ["sa-2", "sa-1", "sa-3"]
+    assert polars_out["cost"].tolist() == [decimal.Decimal("0.4"), decimal.Decimal("0.6"), decimal.Decimal("1E-30")]
+    assert all(isinstance(x, decimal.Decimal) for x in polars_out["cost"])
+
+
+def test_group_sum_of_an_empty_frame(backends):
+    dataset = pd.DataFrame({"principal": pd.Series([], dtype=object), "cost": pd.Series([], dtype=object)})
+
+    pandas_out, polars_out = [x.group_sum(dataset=dataset, by=["principal"], value_columns=["cost"]) for x in backends]
+
+    assert polars_out.empty and pandas_out.empty
+    assert polars_out.columns.tolist() == ["principal", "cost"]
+
+
+def test_time_filters_match_pandas(backends):
+    dataset = hourly_dataset(principals=["sa-1", "sa-2"])
+
+    for time_slice in [DAY, DAY + pd.Timedelta(hours=2), DAY + pd.Timedelta(hours=5)]:
+        pandas_out, polars_out = [
+            x.filter_time_slice(dataset=dataset, ts_column_name="Interval", time_slice=time_slice) for x in backends
+        ]
+        pd.testing.assert_frame_equal(polars_out, pandas_out)
+    pandas_out, polars_out = [
+        x.filter_time_range(
+            dataset=dataset, ts_column_name="Interval", start_datetime=DAY, end_datetime=DAY + pd.Timedelta(hours=2)
+        )
+        for x in backends
+    ]
+    pd.testing.assert_frame_equal(polars_out, pandas_out)
+
+
+def test_ts_column_cache_is_not_reused_for_another_dataset_with_the_same_id(backends):
+    _, polars_backend = backends
+    first = hourly_dataset(principals=["sa-1"])
+    second = hourly_dataset(principals=["sa-1", "sa-2"], hours=2)
+    polars_backend.filter_time_slice(dataset=first, ts_column_name="Interval", time_slice=DAY)
+
+    # A dataset created after the first one was garbage collected can get the same id
+    polars_backend.ts_columns[id(second)] = polars_backend.ts_columns[id(first)]
+    out = polars_backend.filter_time_slice(dataset=second, ts_column_name="Interval", time_slice=DAY)
+
+    pd.testing.assert_frame_equal(out, second.iloc[:2])
+    assert len(polars_backend.ts_columns[id(second)][2]) == len(second)
+
+    # The entries of the collected datasets are dropped on the next conversion
+    del first, second
+    third = hourly_dataset(principals=["sa-3"])
+    polars_backend.filter_time_slice(dataset=third, ts_column_name="Interval", time_slice=DAY)
+    assert [x[0]() is third for x in polars_backend.ts_columns.values()] == [True]
@@ -0,0 +1,117 @@
+import datetime
+
+import pytest
+from prometheus_client import CollectorRegistry
+from prometheus_client.openmetrics import exposition as openmetrics_exposition
+from prometheus_client.openmetrics.parser import text_string_to_metric_families
+
+import internal_data_probe
+from http_server import HTTPRequest, HTTPRouter
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
+from prometheus_processing.exposition_cache import ExpositionCache, add_exposition_routes
+from prometheus_processing.notifier import Observer
+
+BEGIN = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+class HourStepper(Observer):
+    """Exposes one sample per hour for the org and moves to the next hour on every notification."""
+
+    def __init__(self, principal: str, collector: ArrayTimestampedCollector):
+        Observer.__init__(self)
+        self.principal, self.collector, self.hour = principal, collector, 0
+        self.attach(collector)
+        self.expose()
+
+    def expose(self):
+        self.collector.set_timestamp(curr_timestamp=BEGIN + datetime.timedelta(hours=self.hour))
+        self.collector.set_samples(label_values=[(self.principal,)], values=[self.hour])
+
+    def update(self, notifier):
+        self.hour += 1
+        self.expose()
+
+
+@pytest.fixture(autouse=True)
+def probe_state(monkeypatch):
+    monkeypatch.setattr(internal_data_probe, "READINESS_FLAG", False)
+    monkeypatch.setattr(internal_data_probe, "ORG_READINESS_FLAGS", {})
+
+
+@pytest.fixture
+def template():
+    return ArrayTimestampedCollector("test_cost", "Test cost", ["principal"], in_begin_timestamp=BEGIN, registry=None)
+
+
+def make_cache(template, principal: str, **kwargs) -> ExpositionCache:
+    scope = ScopedCollectors(registry=CollectorRegistry(auto_describe=True))
+    HourStepper(principal=principal, collector=scope.get(template))
+    return ExpositionCache(registry=scope.registry, scope=scope, **kwargs)
+
+
+def sample_lines(payload: bytes):
+    return [x for x in payload.decode("utf-8").splitlines() if x.startswith("test_cost{")]
+
+
+def test_org_caches_drive_their_own_readiness(template):
+    default_cache = make_cache(template, principal="a", org_id="org_a")
+    org_cache = make_cache(template, principal="b", publish_readiness=False, org_id="org_b")
+    try:
+        default_cache.start_producer()
+        org_cache.start_producer()
+        assert internal_data_probe.ORG_READINESS_FLAGS == {"org_a": True, "org_b": True}
+        assert internal_data_probe.READINESS_FLAG is True
+
+        with org_cache.condition:
+            assert org_cache.condition.wait_for(lambda: org_cache.back is not None, timeout=5)
+        org_cache.stop_producer()
+        # The stopped producer never renders the hour after the back buffer, so the org is not ready anymore once
+        # both buffers were served
+        org_cache.get_payload(accept_header=None, accept_encoding_header=None)
+        assert internal_data_probe.ORG_READINESS_FLAGS["org_b"] is True
+        org_cache.get_payload(accept_header=None, accept_encoding_header=None)
+        assert internal_data_probe.ORG_READINESS_FLAGS["org_b"] is False
+        assert internal_data_probe.READINESS_FLAG is True
+    finally:
+        default_cache.stop_producer()
+        org_cache.stop_producer()
+
+
+def test_routes_serve_every_org(template):
+    default_cache = make_cache(template, principal="a")
+    org_cache = make_cache(template, principal="b", publish_readiness=False)
+    router = HTTPRouter()
+    org_caches = {}
+    add_exposition_routes(router=router, org_caches=org_caches)
+
+    def get(path):
+        return router.dispatch(HTTPRequest(method="GET", path=path))
+
+    assert get("/metrics").status == 503
+    org_caches.update({"org_a": default_cache, "org_b": org_cache})
+
+    assert sample_lines(get("/metrics/org_b").body) == ['test_cost{principal="b"} 0.0 1685577600']
+    assert sample_lines(get("/metrics/org_a").body) == ['test_cost{principal="a"} 0.0 1685577600']
+    # The root path serves the first org, without the process & Python runtime metrics of the default registry
+    assert sample_lines(get("/metrics").body) == ['test_cost{principal="a"} 0.0 1685577600']
+    assert sample_lines(get("/").body) == ['test_cost{principal="a"} 0.0 1685577600']
+    assert b"process_" not in get("/").body and b"python_" not in get("/").body
+    assert get("/metrics/nope").status == 404
+
+
+def test_both_formats_carry_the_sample_timestamps_in_seconds(template):
+    cache = make_cache(template, principal="a")
+    cache.front = cache.render()
+
+    text_payload, _, _ = cache.get_payload(accept_header=None, accept_encoding_header=None)
+    openmetrics_payload, content_type, _ = cache.get_payload(
+        accept_header="application/openmetrics-text; version=1.0.0", accept_encoding_header=None
+    )
+
+    assert content_type == openmetrics_exposition.CONTENT_TYPE_LATEST
+    # The text payload holds seconds where the text format expects milliseconds, collector.sh imports it as OpenMetrics
+    assert sample_lines(text_payload) == ['test_cost{principal="a"} 0.0 1685577600']
+    samples = [
+        x for metric in text_string_to_metric_families(openmetrics_payload.decode("utf-8")) for x in metric.samples
+    ]
+    assert [float(x.timestamp) for x in samples] == [BEGIN.timestamp()]
@@ -0,0 +1,40 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from helpers import epoch_hour_to_day, from_epoch_hour, to_epoch_hour
+
+UTC = datetime.timezone.utc
+# 2023-06-01T00:00:00Z is 1685577600 seconds after the epoch
+DAY_EPOCH_HOUR = 1685577600 // 3600
+
+
+@pytest.mark.parametrize(
+    "ts",
+    [
+        datetime.datetime(2023, 6, 1, 5, tzinfo=UTC),
+        datetime.datetime(2023, 6, 1, 5, 59, 59, 999999, tzinfo=UTC),
+        # Naive datetimes are UTC, not local time
+        datetime.datetime(2023, 6, 1, 5, 30),
+        datetime.datetime(2023, 6, 1, 7, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+        pd.Timestamp("2023-06-01T05:15:00Z"),
+    ],
+)
+def test_to_epoch_hour_truncates_to_the_utc_hour(ts):
+    assert to_epoch_hour(ts) == DAY_EPOCH_HOUR + 5
+
+
+def test_epoch_hours_round_trip():
+    for epoch_hour in [0, DAY_EPOCH_HOUR, DAY_EPOCH_HOUR + 23]:
+        ts = from_epoch_hour(epoch_hour)
+        assert ts.tzinfo == UTC
+        assert to_epoch_hour(ts) == epoch_hour
+    assert from_epoch_hour(DAY_EPOCH_HOUR + 1) == datetime.datetime(2023, 6, 1, 1, tzinfo=UTC)
+
+
+def test_epoch_hour_to_day_is_the_utc_midnight():
+    assert [epoch_hour_to_day(DAY_EPOCH_HOUR + x) for x in [0, 1, 23, 24]] == [DAY_EPOCH_HOUR] * 3 + [
+        DAY_EPOCH_HOUR + 24
+    ]
+    assert from_epoch_hour(epoch_hour_to_day(DAY_EPOCH_HOUR + 23)) == datetime.datetime(2023, 6, 1, tzinfo=UTC)
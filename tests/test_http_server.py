@@ -0,0 +1,203 @@
+import datetime
+import decimal
+import gzip
+import http.client
+import json
+import socket
+
+import pytest
+
+from http_server import (
+    MAX_HEADER_COUNT,
+    MIN_COMPRESS_BYTES,
+    AsyncHTTPServer,
+    HTTPRequest,
+    HTTPResponse,
+    HTTPRouter,
+    accepts_gzip,
+    jsonify,
+)
+
+LARGE_BODY = "x" * MIN_COMPRESS_BYTES
+
+
+@pytest.fixture
+def router():
+    out = HTTPRouter()
+
+    @out.route("/echo/<name>/")
+    def echo(request, name):
+        return jsonify({"name": name, "args": request.args, "method": request.method})
+
+    @out.route("/large")
+    def large(request):
+        return LARGE_BODY
+
+    @out.route("/created")
+    def created(request):
+        return "made", 201
+
+    @out.route("/fail")
+    def fail(request):
+        raise RuntimeError("handler failed")
+
+    return out
+
+
+@pytest.fixture
+def server(router):
+    out = AsyncHTTPServer(router=router, ports=[0], addr="127.0.0.1", keep_alive_timeout_secs=5).start()
+    yield out
+    out.stop()
+
+
+def send_raw(server, data: bytes) -> bytes:
+    """Send the bytes on a new connection and read until the server closes it."""
+    with socket.create_connection(("127.0.0.1", server.ports[0]), timeout=5) as conn:
+        conn.sendall(data)
+        chunks = []
+        while chunk := conn.recv(65536):
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_router_matches_segments_and_trailing_slashes(router):
+    response = router.dispatch(HTTPRequest(method="GET", path="/echo/sa%201", args={"a": "1"}))
+    assert json.loads(response.body) == {"name": "sa 1", "args": {"a": "1"}, "method": "GET"}
+    assert router.dispatch(HTTPRequest(method="GET", path="/echo/sa-1/")).status == 200
+    assert router.dispatch(HTTPRequest(method="GET", path="/echo/sa-1/more")).status == 404
+    assert router.dispatch(HTTPRequest(method="GET", path="/created")).status == 201
+
+
+def test_kept_alive_connection_serves_several_requests(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.ports[0], timeout=5)
+    conn.request("GET", "/echo/sa-1?window=1h&window=2h&empty=")
+    response = conn.getresponse()
+    assert response.status == 200
+    assert response.getheader("Connection") == "keep-alive"
+    # Repeated parameters keep the first value & blank values are dropped
+    assert json.loads(response.read())["args"] == {"window": "1h"}
+    sock = conn.sock
+
+    conn.request("GET", "/missing")
+    response = conn.getresponse()
+    assert (response.status, response.read()) == (404, b"Not Found")
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_pipelined_requests_are_answered_in_order(server):
+    out = send_raw(
+        server,
+        b"GET /echo/first HTTP/1.1\r\nHost: x\r\n\r\n"
+        # The body is not used, but has to be skipped to find the next request
+        b"GET /echo/second HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello"
+        b"GET /echo/third HTTP/1.1\r\nConnection: close\r\n\r\n",
+    )
+    assert out.count(b"HTTP/1.1 200 OK") == 3
+    assert out.index(b'"first"') < out.index(b'"second"') < out.index(b'"third"')
+    assert out.rstrip().endswith(b'"third"}')
+
+
+def test_http_1_0_closes_unless_kept_alive(server):
+    assert b"Connection: close" in send_raw(server, b"GET /echo/sa-1 HTTP/1.0\r\n\r\n")
+
+
+@pytest.mark.parametrize("accept_encoding, gzipped", [("gzip, deflate", True), ("gzip;q=0", False), (None, False)])
+def test_large_responses_are_gzipped_when_accepted(server, accept_encoding, gzipped):
+    conn = http.client.HTTPConnection("127.0.0.1", server.ports[0], timeout=5)
+    conn.request("GET", "/large", headers={"Accept-Encoding": accept_encoding} if accept_encoding else {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+
+    assert (response.getheader("Content-Encoding") == "gzip") == gzipped
+    assert (gzip.decompress(body) if gzipped else body) == LARGE_BODY.encode()
+    assert int(response.getheader("Content-Length")) == len(body)
+
+
+def test_small_responses_are_not_gzipped(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.ports[0], timeout=5)
+    conn.request("GET", "/created", headers={"Accept-Encoding": "gzip"})
+    response = conn.getresponse()
+    assert (response.status, response.getheader("Content-Encoding"), response.read()) == (201, None, b"made")
+    conn.close()
+
+
+def test_head_has_the_headers_without_the_body(server):
+    out = send_raw(server, b"HEAD /large HTTP/1.1\r\nConnection: close\r\n\r\n")
+    head, _, body = out.partition(b"\r\n\r\n")
+    assert f"Content-Length: {len(LARGE_BODY)}".encode() in head
+    assert body == b""
+
+
+@pytest.mark.parametrize(
+    "request_bytes, status_line",
+    [
+        (b"POST /large HTTP/1.1\r\nConnection: close\r\n\r\n", b"HTTP/1.1 405 Method Not Allowed"),
+        (b"GET /fail HTTP/1.1\r\nConnection: close\r\n\r\n", b"HTTP/1.1 500 Internal Server Error"),
+        (b"GET /large\r\n\r\n", b"HTTP/1.1 400 Bad Request"),
+        (b"GET /large HTTP/1.1\r\nContent-Length: many\r\n\r\n", b"HTTP/1.1 400 Bad Request"),
+        (b"GET /" + b"a" * 9000 + b" HTTP/1.1\r\n\r\n", b"HTTP/1.1 400 Bad Request"),
+        (
+            b"GET / HTTP/1.1\r\n" + b"X-Header: 1\r\n" * (MAX_HEADER_COUNT + 1) + b"\r\n",
+            b"HTTP/1.1 400 Bad Request",
+        ),
+        # The connection closes before the announced body arrives
+        (b"GET /large HTTP/1.1\r\nContent-Length: 10\r\n\r\nshort", b"HTTP/1.1 400 Bad Request"),
+    ],
+    ids=[
+        "post",
+        "handler_error",
+        "no_version",
+        "bad_content_length",
+        "long_request_line",
+        "repeated_headers",
+        "truncated_body",
+    ],
+)
+def test_failed_requests(server, request_bytes, status_line):
+    with socket.create_connection(("127.0.0.1", server.ports[0]), timeout=5) as conn:
+        conn.sendall(request_bytes)
+        conn.shutdown(socket.SHUT_WR)
+        out = b""
+        while chunk := conn.recv(65536):
+            out += chunk
+    assert out.startswith(status_line)
+
+
+def test_stop_closes_kept_alive_connections(router):
+    server = AsyncHTTPServer(router=router, ports=[0], addr="127.0.0.1").start()
+    conn = socket.create_connection(("127.0.0.1", server.ports[0]), timeout=5)
+    conn.sendall(b"GET /created HTTP/1.1\r\n\r\n")
+    # The head & the body of the response might arrive in separate segments
+    response = b""
+    while not response.endswith(b"made"):
+        response += conn.recv(65536)
+    assert response.startswith(b"HTTP/1.1 201 Created")
+
+    server.stop()
+
+    assert conn.recv(65536) == b""
+    assert not server.thread.is_alive()
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [("gzip", True), ("deflate, GZIP;q=0.5", True), ("*", True), ("gzip;q=0", False), ("br", False), ("", False)],
+)
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) == expected
+
+
+def test_jsonify_converts_dates_and_decimals():
+    response = jsonify(
+        {"ts": datetime.datetime(2023, 6, 1, 2, 30), "day": datetime.date(2023, 6, 1), "cost": decimal.Decimal("0.1")}
+    )
+    assert isinstance(response, HTTPResponse) and response.content_type == "application/json"
+    assert json.loads(response.body) == {
+        "cost": "0.1",
+        "day": "Thu, 01 Jun 2023 00:00:00 GMT",
+        "ts": "Thu, 01 Jun 2023 02:30:00 GMT",
+    }
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+import internal_data_probe
+from http_server import HTTPRequest
+
+EXPOSED_DATE = datetime.datetime(2023, 6, 1, 3, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def probe_state(monkeypatch):
+    monkeypatch.setattr(internal_data_probe, "READINESS_FLAG", False)
+    monkeypatch.setattr(internal_data_probe, "CURRENT_EXPOSED_DATE", None)
+    monkeypatch.setattr(internal_data_probe, "ORG_READINESS_FLAGS", {})
+    monkeypatch.setattr(internal_data_probe, "ORG_EXPOSED_DATES", {})
+
+
+def get(path: str):
+    response = internal_data_probe.internal_api.dispatch(HTTPRequest(method="GET", path=path))
+    return response.status, response.body.decode("utf-8")
+
+
+def test_org_probes_are_independent():
+    internal_data_probe.set_current_exposed_date(exposed_date=EXPOSED_DATE, org_id="org_a")
+    internal_data_probe.set_current_exposed_date(
+        exposed_date=EXPOSED_DATE + datetime.timedelta(hours=5), org_id="org_b"
+    )
+    internal_data_probe.set_readiness(readiness_flag=True, org_id="org_a")
+
+    assert get("/is_ready/org_a") == (200, "True")
+    assert get("/is_ready/org_b") == (200, "False")
+    assert get("/current_timestamp/org_a") == (200, str(int(EXPOSED_DATE.timestamp())))
+    assert get("/current_timestamp/org_b") == (200, str(int(EXPOSED_DATE.timestamp()) + 5 * 3600))
+    assert get("/current_exposed_date/org_b") == (200, "2023-06-01 08:00:00+00:00")
+    assert get("/orgs") == (200, "org_a\norg_b\n")
+    # The process wide probes are left alone by the orgs
+    assert get("/is_ready") == (200, "False")
+
+
+def test_unknown_org_probes_are_not_found():
+    assert get("/is_ready/nope")[0] == 404
+    assert get("/current_timestamp/nope")[0] == 404
+    assert get("/current_exposed_date/nope")[0] == 404
+    assert get("/orgs") == (200, "")
+
+
+def test_process_wide_probes():
+    internal_data_probe.set_current_exposed_date(exposed_date=EXPOSED_DATE)
+    internal_data_probe.set_readiness(readiness_flag=True)
+
+    assert get("/is_ready") == (200, "True")
+    assert get("/current_timestamp") == (200, str(int(EXPOSED_DATE.timestamp())))
+    assert get("/orgs") == (200, "")
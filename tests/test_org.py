@@ -0,0 +1,158 @@
+import datetime
+import threading
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+import ccloud.org
+import internal_data_probe
+from ccloud.org import CCloudOrg, CCloudOrgList, scrape_status_metrics
+from helpers import to_epoch_hour
+from prometheus_processing.custom_collector import ArrayTimestampedCollector, ScopedCollectors
+
+HOUR = datetime.datetime(2023, 6, 1, 5, tzinfo=datetime.timezone.utc)
+
+
+def bare_org(chargeback_handler) -> CCloudOrg:
+    org = object.__new__(CCloudOrg)
+    org.state_lock = threading.Lock()
+    org.chargeback_handler = chargeback_handler
+    return org
+
+
+def test_chargeback_reader_waits_for_the_step_to_finish():
+    reader_called = threading.Event()
+
+    def get_chargeback_rows_for_hour(time_slice):
+        reader_called.set()
+        return [("sa-1", time_slice, "KAFKA_BASE", "env-1", 1, 2)]
+
+    org = bare_org(SimpleNamespace(get_chargeback_rows_for_hour=get_chargeback_rows_for_hour))
+    result = []
+    with org.state_lock:
+        reader = threading.Thread(target=lambda: result.extend(org.get_chargeback_for_hour(time_slice=HOUR)))
+        reader.start()
+        assert not reader_called.wait(timeout=0.2)
+    reader.join(timeout=5)
+
+    assert result == [
+        {
+            "principal": "sa-1",
+            "timestamp": HOUR.isoformat(),
+            "product_type": "KAFKA_BASE",
+            "env_id": "env-1",
+            "usage_cost": 1.0,
+            "shared_cost": 2.0,
+        }
+    ]
+
+
+def test_update_steps_the_org_under_the_state_lock():
+    org = bare_org(chargeback_handler=None)
+    lock_held = []
+
+    def locate_next_fetch_date(start_date, is_notifier_update=False):
+        lock_held.append(org.state_lock.locked())
+        return start_date
+
+    org.exposed_metrics_datetime = datetime.datetime.now(tz=datetime.timezone.utc)
+    org.locate_next_fetch_date = locate_next_fetch_date
+    org.update(notifier=None)
+
+    assert lock_held == [True]
+    assert not org.state_lock.locked()
+
+
+@pytest.fixture
+def probe_state(monkeypatch):
+    monkeypatch.setattr(internal_data_probe, "CURRENT_EXPOSED_DATE", None)
+    monkeypatch.setattr(internal_data_probe, "ORG_EXPOSED_DATES", {})
+
+
+def test_only_the_first_org_is_the_root_org(monkeypatch):
+    monkeypatch.setattr(ccloud.org, "CCloudOrg", lambda **kwargs: SimpleNamespace(**kwargs))
+    orgs = CCloudOrgList(in_orgs=[{"id": "org_a"}, {"id": "org_b"}, {"id": "org_c"}], in_headless=True).orgs
+
+    assert {k: x.is_root_org for k, x in orgs.items()} == {"org_a": True, "org_b": False, "org_c": False}
+
+
+@pytest.mark.parametrize("is_root_org", [True, False])
+def test_root_org_drives_the_process_wide_exposed_date(probe_state, is_root_org):
+    org = object.__new__(CCloudOrg)
+    org.org_id, org.is_root_org = "org_a", is_root_org
+    org.publish_exposed_date(exposed_date=HOUR)
+
+    assert internal_data_probe.ORG_EXPOSED_DATES == {"org_a": HOUR}
+    assert internal_data_probe.CURRENT_EXPOSED_DATE == (HOUR if is_root_org else None)
+
+
+@pytest.fixture
+def catch_up_org(probe_state, monkeypatch):
+    """Org 6 hours behind exposed_end_date with a catch-up lag of 2 hours. Every handler is replaced by a stub and the
+    chargeback handler exposes the hour number as the cost of sa-1."""
+    monkeypatch.setattr(ccloud.org, "set_reconciliation_summary", lambda org_id, summary: None)
+    org = bare_org(chargeback_handler=None)
+    org.org_id, org.is_root_org, org.reset_counter = "org_a", False, 0
+    org.prom_collectors = ScopedCollectors(registry=CollectorRegistry(auto_describe=True))
+    cost = org.prom_collectors.get(
+        ArrayTimestampedCollector("test_catch_up_cost", "Test cost", ["principal"], registry=None)
+    )
+
+    def expose_chargeback(exposed_timestamp):
+        cost.set_timestamp(curr_timestamp=exposed_timestamp)
+        cost.set_samples(label_values=[("sa-1",)], values=[exposed_timestamp.hour])
+
+    stub = SimpleNamespace(execute_requests=lambda exposed_timestamp: None, force_clear_prom_metrics=lambda: None)
+    org.objects_handler = org.metrics_handler = org.billing_handler = stub
+    org.chargeback_handler = SimpleNamespace(
+        execute_requests=expose_chargeback,
+        force_clear_prom_metrics=cost.clear,
+        get_reconciliation_summary=lambda: {},
+        shadow_engine=None,
+    )
+    org.status_metrics_handler = SimpleNamespace(
+        is_dataset_present=lambda scrape_type, ts_in_millis: False, convert_epoch_hour_to_ts=lambda x: x
+    )
+    org.catch_up_max_hours, org.catch_up_lag_hours = 24, 2
+    org.exposed_end_date = datetime.datetime.utcnow().replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=datetime.timezone.utc
+    ) - datetime.timedelta(days=2)
+    org.exposed_metrics_datetime = org.epoch_start_date = org.exposed_end_date - datetime.timedelta(hours=6)
+    return org, org.prom_collectors.get(scrape_status_metrics), cost
+
+
+def cost_samples(cost):
+    """(hour number, sample timestamp as epoch hour) of every collected sample. The collectors keep the timestamps
+    in thousands of seconds, so that the text exposition writes them in seconds."""
+    return [
+        (x.value, to_epoch_hour(datetime.datetime.fromtimestamp(x.timestamp * 1000, tz=datetime.timezone.utc)))
+        for metric in cost.collect()
+        for x in metric.samples
+    ]
+
+
+def test_catch_up_exposes_a_batch_of_hours_in_one_collect(catch_up_org):
+    org, notifier, cost = catch_up_org
+    end_hour = to_epoch_hour(org.exposed_end_date)
+
+    assert org.get_catch_up_batch_hours() == 4
+    org.update(notifier=notifier)
+
+    # The 4 hours after the exposed hour, every one with its own timestamp
+    assert cost_samples(cost) == [(float((23 - x) % 24), end_hour - 1 - x) for x in [4, 3, 2, 1]]
+    # The staged samples are cleared once merged, the next collect only has the current hour
+    assert cost._staged_metrics == {}
+    assert cost_samples(cost) == [(22.0, end_hour - 2)]
+    assert org.exposed_metrics_datetime == org.exposed_end_date - datetime.timedelta(hours=2)
+
+    # Within catch_up_lag_hours, one hour per step
+    assert org.get_catch_up_batch_hours() == 1
+    org.update(notifier=notifier)
+    assert cost_samples(cost) == [(23.0, end_hour - 1)]
+    assert org.exposed_metrics_datetime == org.exposed_end_date - datetime.timedelta(hours=1)
+
+    # Caught up: exposed_end_date is never exposed and the last hour is cleared so that it is not exposed again
+    org.update(notifier=notifier)
+    assert cost_samples(cost) == []
+    assert org.exposed_metrics_datetime == org.exposed_end_date - datetime.timedelta(hours=1)
@@ -0,0 +1,89 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from ccloud.connections import CCloudConnection
+from data_processing.data_handlers.prom_metrics_api_handler import (
+    METRICS_API_COLUMNS,
+    METRICS_API_PROMETHEUS_QUERIES,
+    PrometheusMetricsDataHandler,
+)
+
+START = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+INDEX = [
+    METRICS_API_COLUMNS.timestamp,
+    METRICS_API_COLUMNS.query_type,
+    METRICS_API_COLUMNS.cluster_id,
+    METRICS_API_COLUMNS.principal_id,
+]
+
+
+def metrics_frame(rows):
+    return pd.DataFrame.from_records(
+        [
+            {
+                METRICS_API_COLUMNS.timestamp: pd.Timestamp(ts),
+                METRICS_API_COLUMNS.query_type: query_type,
+                METRICS_API_COLUMNS.cluster_id: cluster_id,
+                METRICS_API_COLUMNS.principal_id: principal_id,
+                METRICS_API_COLUMNS.value: value,
+            }
+            for ts, query_type, cluster_id, principal_id, value in rows
+        ],
+        index=INDEX,
+    )
+
+
+@pytest.fixture
+def metrics_handler():
+    return PrometheusMetricsDataHandler(
+        in_ccloud_connection=CCloudConnection(in_api_key="key", in_api_secret="secret"),
+        start_date=START,
+        in_connection_kwargs={},
+        in_connection_auth={},
+        read_on_init=False,
+    )
+
+
+def test_usage_dataframe_sums_repeated_samples(metrics_handler):
+    request_bytes = METRICS_API_PROMETHEUS_QUERIES.request_bytes_name
+    response_bytes = METRICS_API_PROMETHEUS_QUERIES.response_bytes_name
+    metrics_handler.metrics_dataset.append(
+        dataset=metrics_frame(
+            [
+                (START, request_bytes, "lkc-1", "sa-1", "10"),
+                (START, request_bytes, "lkc-1", "sa-1", "5"),
+                (START, response_bytes, "lkc-1", "sa-2", "7"),
+            ]
+        )
+    )
+
+    out = metrics_handler.get_usage_dataframe_for_time_slice(time_slice=pd.Timestamp(START))
+
+    out = out.set_index(METRICS_API_COLUMNS.principal_id)
+    assert out.loc["sa-1", request_bytes] == 15
+    assert out.loc["sa-1", response_bytes] == 0
+    assert out.loc["sa-2", response_bytes] == 7
+
+
+def test_read_all_leaves_the_end_hour_to_the_next_fetch(metrics_handler, monkeypatch):
+    request_bytes = METRICS_API_PROMETHEUS_QUERIES.request_bytes_name
+
+    def fake_frames(start_date, end_date, query_type, params):
+        # query_range returns every step within [start, end], both ends included
+        hours = pd.date_range(start_date, end_date, freq="1H")
+        yield metrics_frame([(ts, query_type, "lkc-1", "sa-1", "1") for ts in hours])
+
+    monkeypatch.setattr(metrics_handler, "iter_metrics_frames", fake_frames)
+    boundary = START + datetime.timedelta(hours=2)
+    metrics_handler.read_all(start_date=START, end_date=boundary, query_type=request_bytes)
+    metrics_handler.read_all(
+        start_date=boundary, end_date=boundary + datetime.timedelta(hours=2), query_type=request_bytes
+    )
+
+    assert len(metrics_handler.metrics_dataset) == 4
+    boundary_rows = metrics_handler.metrics_dataset.get_time_slice(time_slice=boundary)
+    assert len(boundary_rows) == 1
+    out = metrics_handler.get_usage_dataframe_for_time_slice(time_slice=pd.Timestamp(boundary))
+    assert out[request_bytes].to_list() == [1]
@@ -0,0 +1,105 @@
+import datetime
+import decimal
+
+import pandas as pd
+import pytest
+
+from data_processing.chargeback_handlers.reconciliation import (
+    RECONCILIATION_COLUMNS,
+    reconcile_chargeback,
+    summarize_reconciliation,
+)
+from data_processing.data_handlers.billing_api_handler import BILLING_API_COLUMNS
+from helpers import to_epoch_hour
+
+DAY = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+HOUR_0, HOUR_1 = to_epoch_hour(DAY), to_epoch_hour(DAY) + 1
+
+
+def billing_frame(hourly_totals):
+    """Billing rows of env-1 for the first two hours of DAY from product type --> hourly TotalAfterSplit."""
+    return pd.DataFrame.from_records(
+        [
+            {
+                BILLING_API_COLUMNS.calc_timestamp: pd.Timestamp(DAY) + pd.Timedelta(hours=hour),
+                BILLING_API_COLUMNS.env_id: "env-1",
+                BILLING_API_COLUMNS.cluster_id: "lkc-1",
+                BILLING_API_COLUMNS.product_name: "KAFKA",
+                BILLING_API_COLUMNS.product_type: product_type,
+                BILLING_API_COLUMNS.calc_split_total: decimal.Decimal(total),
+            }
+            for hour in range(2)
+            for product_type, total in hourly_totals.items()
+        ]
+    ).set_index(
+        [
+            BILLING_API_COLUMNS.calc_timestamp,
+            BILLING_API_COLUMNS.env_id,
+            BILLING_API_COLUMNS.cluster_id,
+            BILLING_API_COLUMNS.product_name,
+            BILLING_API_COLUMNS.product_type,
+        ]
+    )
+
+
+@pytest.fixture
+def reconciliation():
+    return reconcile_chargeback(
+        billing_data=billing_frame({"KAFKA_BASE": 10, "KAFKA_NUM_CKUS": 2, "UNKNOWN_TYPE": 5}),
+        chargeback_dataset={
+            ("sa-1", HOUR_0, "KAFKA_BASE", "env-1"): (decimal.Decimal(4), decimal.Decimal(0)),
+            ("sa-2", HOUR_0, "KAFKA_BASE", "env-1"): (decimal.Decimal(0), decimal.Decimal(5)),
+            ("sa-1", HOUR_1, "KAFKA_BASE", "env-1"): (decimal.Decimal(10), decimal.Decimal(0)),
+        },
+        # Per hour costs of the day, keyed by the epoch hour of the midnight
+        daily_chargeback_dataset={
+            ("sa-1", HOUR_0, "KAFKA_NUM_CKUS", "env-1"): (decimal.Decimal(1), decimal.Decimal("0.5")),
+            ("sa-2", HOUR_0, "KAFKA_NUM_CKUS", "env-1"): (decimal.Decimal(0), decimal.Decimal("0.5")),
+        },
+        allocatable_product_types={"KAFKA_BASE", "KAFKA_NUM_CKUS"},
+    )
+
+
+def test_drift_and_unallocated_per_hour_env_and_product_type(reconciliation):
+    columns = [
+        RECONCILIATION_COLUMNS.BILLED,
+        RECONCILIATION_COLUMNS.ALLOCATED,
+        RECONCILIATION_COLUMNS.DRIFT,
+        RECONCILIATION_COLUMNS.UNALLOCATED,
+    ]
+    out = {(k[0].hour, k[2]): list(v) for k, v in reconciliation[columns].iterrows()}
+    assert out == {
+        (0, "KAFKA_BASE"): [10.0, 9.0, -1.0, 0.0],
+        (1, "KAFKA_BASE"): [10.0, 10.0, 0.0, 0.0],
+        # The daily allocation counts for every hour of its day
+        (0, "KAFKA_NUM_CKUS"): [2.0, 2.0, 0.0, 0.0],
+        (1, "KAFKA_NUM_CKUS"): [2.0, 2.0, 0.0, 0.0],
+        (0, "UNKNOWN_TYPE"): [5.0, 0.0, 0.0, 5.0],
+        (1, "UNKNOWN_TYPE"): [5.0, 0.0, 0.0, 5.0],
+    }
+
+
+def test_summary_totals_and_worst_hour(reconciliation):
+    out = summarize_reconciliation(reconciliation_dataset=reconciliation)
+
+    assert {k: v for k, v in out.items() if k != "product_types"} == {
+        "window_start": "2023-06-01T00:00:00+00:00",
+        "window_end": "2023-06-01T02:00:00+00:00",
+        "hours": 2,
+        "billed": 34.0,
+        "allocated": 23.0,
+        "drift": -1.0,
+        "unallocated": 10.0,
+        "abs_drift": 1.0,
+        "max_abs_hourly_drift": 1.0,
+        "max_abs_hourly_drift_timestamp": "2023-06-01T00:00:00+00:00",
+    }
+    assert out["product_types"]["KAFKA_BASE"] == {"billed": 20.0, "allocated": 19.0, "drift": -1.0, "unallocated": 0.0}
+
+
+def test_empty_billing_reconciles_to_nothing():
+    out = reconcile_chargeback(
+        billing_data=None, chargeback_dataset={}, daily_chargeback_dataset={}, allocatable_product_types=set()
+    )
+    assert out.empty
+    assert summarize_reconciliation(reconciliation_dataset=out) == {"hours": 0}
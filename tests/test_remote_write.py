@@ -0,0 +1,210 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from prometheus_processing import remote_write
+from prometheus_processing.remote_write import (
+    REMOTE_WRITE_HEADERS,
+    RemoteWriteClient,
+    decode_write_request,
+    encode_write_request,
+    snappy_compress,
+    snappy_decompress,
+)
+
+# Golden bytes are worked out by hand from the snappy format description & the remote write 1.0 protobuf schema
+SNAPPY_GOLDEN = [
+    (b"", "00"),
+    (b"a", "01" + "00" + "61"),
+    # literal "abcd" | copy with a 1 byte offset: offset 4, length 4
+    (b"abcd" * 2, "08" + "0c" + "61626364" + "0104"),
+    # literal "abcd" | copy with a 2 byte offset, as lengths over 11 do not fit the 1 byte offset form
+    (b"abcd" * 4, "10" + "0c" + "61626364" + "2e0400"),
+    # literal "a" | copy of 64 | copy of the remaining 35, both with offset 1
+    (b"a" * 100, "64" + "0061" + "fe0100" + "8a0100"),
+    # literal longer than 60 bytes: length - 1 follows the tag in one byte
+    (bytes(range(100)), "64" + "f063" + bytes(range(100)).hex()),
+]
+WRITE_REQUEST_SERIES = [((("__name__", "up"),), [(1000, 1.0)])]
+WRITE_REQUEST_GOLDEN = (
+    # WriteRequest.timeseries
+    "0a1e"
+    # TimeSeries.labels: name "__name__", value "up"
+    + "0a0e" + "0a08" + b"__name__".hex() + "1202" + b"up".hex()
+    # TimeSeries.samples: double value 1.0, int64 timestamp 1000
+    + "120c" + "09" + "000000000000f03f" + "10e807"
+)
+
+
+@pytest.fixture
+def pure_python_snappy(monkeypatch):
+    monkeypatch.setattr(remote_write, "_native_snappy", None)
+
+
+@pytest.mark.parametrize("data, expected", SNAPPY_GOLDEN)
+def test_snappy_golden_bytes(pure_python_snappy, data, expected):
+    assert snappy_compress(data) == bytes.fromhex(expected)
+    assert snappy_decompress(bytes.fromhex(expected)) == data
+
+
+def test_snappy_round_trips_across_blocks(pure_python_snappy):
+    data = b"".join(b"chargeback_cost{principal=\"sa-%d\"} %d\n" % (x % 97, x) for x in range(5000))
+    assert len(data) > remote_write.SNAPPY_BLOCK_SIZE
+    compressed = snappy_compress(data)
+    assert len(compressed) < len(data) / 4
+    assert snappy_decompress(compressed) == data
+
+
+def test_snappy_is_readable_by_python_snappy(pure_python_snappy):
+    snappy = pytest.importorskip("snappy")
+    for data, expected in SNAPPY_GOLDEN:
+        assert snappy.decompress(bytes.fromhex(expected)) == data
+        assert snappy_decompress(snappy.compress(data)) == data
+
+
+def test_write_request_golden_bytes():
+    assert encode_write_request(WRITE_REQUEST_SERIES) == bytes.fromhex(WRITE_REQUEST_GOLDEN)
+    assert decode_write_request(bytes.fromhex(WRITE_REQUEST_GOLDEN)) == WRITE_REQUEST_SERIES
+
+
+def test_write_request_matches_protobuf():
+    pytest.importorskip("google.protobuf")
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+    file_proto = descriptor_pb2.FileDescriptorProto(name="remote_write_test.proto", package="prometheus")
+    schema = {
+        "Label": [("name", 1, "TYPE_STRING", None), ("value", 2, "TYPE_STRING", None)],
+        "Sample": [("value", 1, "TYPE_DOUBLE", None), ("timestamp", 2, "TYPE_INT64", None)],
+        "TimeSeries": [
+            ("labels", 1, "TYPE_MESSAGE", ".prometheus.Label"),
+            ("samples", 2, "TYPE_MESSAGE", ".prometheus.Sample"),
+        ],
+        "WriteRequest": [("timeseries", 1, "TYPE_MESSAGE", ".prometheus.TimeSeries")],
+    }
+    for message_name, fields in schema.items():
+        message_proto = file_proto.message_type.add(name=message_name)
+        for field_name, number, field_type, type_name in fields:
+            message_proto.field.add(
+                name=field_name,
+                number=number,
+                type=getattr(descriptor_pb2.FieldDescriptorProto, field_type),
+                label=getattr(
+                    descriptor_pb2.FieldDescriptorProto, "LABEL_REPEATED" if type_name else "LABEL_OPTIONAL"
+                ),
+                type_name=type_name,
+            )
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+    descriptor = pool.FindMessageTypeByName("prometheus.WriteRequest")
+    if hasattr(message_factory, "GetMessageClass"):
+        write_request_class = message_factory.GetMessageClass(descriptor)
+    else:
+        write_request_class = message_factory.MessageFactory(pool).GetPrototype(descriptor)
+
+    series = [
+        (
+            (("__name__", "chargeback_cost"), ("principal", "sa-1")),
+            [(1_685_577_600_000, 0.25), (1_685_581_200_000, 3.5)],
+        ),
+        ((("__name__", "up"),), [(1000, 1.0)]),
+    ]
+    message = write_request_class()
+    message.ParseFromString(encode_write_request(series))
+    assert [
+        (tuple((x.name, x.value) for x in item.labels), [(x.timestamp, x.value) for x in item.samples])
+        for item in message.timeseries
+    ] == series
+    assert decode_write_request(message.SerializeToString()) == series
+
+
+class FakeSession:
+    """requests.Session stand in returning the queued outcomes: a status code or an exception to raise."""
+
+    def __init__(self, outcomes=()) -> None:
+        self.outcomes = list(outcomes)
+        self.posts = []
+        self.lock = threading.Lock()
+
+    def post(self, url, data, headers, auth, timeout, **kwargs):
+        with self.lock:
+            self.posts.append((url, data, headers))
+            outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(status_code=outcome, text="")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out = []
+    monkeypatch.setattr(remote_write, "time", SimpleNamespace(sleep=out.append))
+    return out
+
+
+@pytest.fixture
+def client():
+    out = RemoteWriteClient(
+        url="http://receiver/api/v1/write", concurrency=1, max_retries=3, min_backoff_secs=0.5, max_backoff_secs=1.5
+    )
+    yield out
+    out.close()
+
+
+BATCH = {(("__name__", "chargeback_cost"), ("principal", "sa-1")): [(1000, 1.0), (2000, 2.0)]}
+
+
+def test_retries_with_capped_exponential_backoff(client, sleeps):
+    session = FakeSession([503, 429, requests.ConnectionError("refused"), 200])
+
+    client.send_batch(session=session, batch=BATCH)
+
+    assert sleeps == [0.5, 1.0, 1.5]
+    assert len(session.posts) == 4
+    assert (client.samples_sent, client.requests_sent, client.samples_failed) == (2, 1, 0)
+    url, body, headers = session.posts[-1]
+    assert url == "http://receiver/api/v1/write"
+    assert headers == REMOTE_WRITE_HEADERS
+    assert decode_write_request(snappy_decompress(body)) == list(BATCH.items())
+
+
+def test_gives_up_after_max_retries(client, sleeps):
+    session = FakeSession([500] * 10)
+
+    client.send_batch(session=session, batch=BATCH)
+
+    assert len(session.posts) == 4
+    assert sleeps == [0.5, 1.0, 1.5]
+    assert (client.samples_sent, client.samples_failed) == (0, 2)
+
+
+@pytest.mark.parametrize("status_code", [400, 404, 413])
+def test_client_errors_are_dropped_without_retries(client, sleeps, status_code):
+    session = FakeSession([status_code, 200])
+
+    client.send_batch(session=session, batch=BATCH)
+
+    assert len(session.posts) == 1
+    assert sleeps == []
+    assert (client.samples_sent, client.samples_failed) == (0, 2)
+
+
+def test_shards_keep_every_series_in_order(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(remote_write.requests, "Session", lambda: session)
+    client = RemoteWriteClient(url="http://receiver/api/v1/write", batch_size=7, concurrency=3)
+    for ts_idx in range(20):
+        for principal in ["sa-1", "sa-2", "sa-3", "sa-4"]:
+            client.add_sample("chargeback_cost", {"principal": principal}, ts_idx * 1000, ts_idx)
+    client.close()
+
+    received = {}
+    for _, body, _ in session.posts:
+        for series_labels, samples in decode_write_request(snappy_decompress(body)):
+            received.setdefault(series_labels, []).extend(samples)
+    assert (client.samples_sent, client.samples_failed) == (80, 0)
+    assert received == {
+        (("__name__", "chargeback_cost"), ("principal", principal)): [(x * 1000, float(x)) for x in range(20)]
+        for principal in ["sa-1", "sa-2", "sa-3", "sa-4"]
+    }
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from data_processing.chargeback_handlers.split_ratio_cache import SplitRatioCache, SplitRatios
+
+RESOURCE = ("env-1", "lkc-1")
+
+
+def ratios(principal: str) -> SplitRatios:
+    return SplitRatios(principal=[principal], usage_ratio=[Decimal(0)], shared_ratio=[Decimal(1)])
+
+
+def test_objects_versions_are_cached_side_by_side():
+    cache = SplitRatioCache()
+    cache.put(product_type="KAFKA_BASE", resource=RESOURCE, objects_version=1, split_ratios=ratios("sa-1"))
+    cache.put(product_type="KAFKA_BASE", resource=RESOURCE, objects_version=2, split_ratios=ratios("sa-2"))
+
+    assert cache.get(product_type="KAFKA_BASE", resource=RESOURCE, objects_version=1) == ratios("sa-1")
+    assert cache.get(product_type="KAFKA_BASE", resource=RESOURCE, objects_version=2) == ratios("sa-2")
+    assert cache.get(product_type="KAFKA_STORAGE", resource=RESOURCE, objects_version=1) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SplitRatioCache(max_entries=2)
+    for objects_version in [1, 2]:
+        cache.put(
+            product_type="KAFKA_BASE", resource=RESOURCE, objects_version=objects_version, split_ratios=ratios("sa-1")
+        )
+    cache.get(product_type="KAFKA_BASE", resource=RESOURCE, objects_version=1)
+    cache.put(product_type="KAFKA_BASE", resource=RESOURCE, objects_version=3, split_ratios=ratios("sa-1"))
+
+    assert list(cache.ratios.keys()) == [(1, "KAFKA_BASE", RESOURCE), (3, "KAFKA_BASE", RESOURCE)]
@@ -0,0 +1,106 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from data_processing.data_handlers.types import TimePartitionedDataset
+from helpers import to_epoch_hour
+
+DAY = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc)
+TS = "Timestamp"
+
+
+def rows(*offsets_in_minutes):
+    """Frame indexed by (Timestamp, Resource) with one row per offset from DAY, Value being the offset."""
+    return pd.DataFrame.from_records(
+        [
+            {TS: pd.Timestamp(DAY) + pd.Timedelta(minutes=x), "Resource": f"lkc-{x}", "Value": x}
+            for x in offsets_in_minutes
+        ]
+    ).set_index([TS, "Resource"])
+
+
+def values(frame):
+    return frame["Value"].to_list()
+
+
+OFFSETS = [0, 0, 30, 60, 120, 23 * 60, 24 * 60, 25 * 60 + 30]
+
+
+@pytest.mark.parametrize("partition_hours, keys", [(1, [0, 1, 2, 23, 24, 25]), (24, [0, 24])])
+def test_rows_are_split_per_partition(partition_hours, keys):
+    dataset = TimePartitionedDataset.from_frame(rows(*OFFSETS), ts_column_name=TS, partition_hours=partition_hours)
+
+    assert sorted(dataset.partitions.keys()) == [to_epoch_hour(DAY) + x for x in keys]
+    assert len(dataset) == len(OFFSETS)
+    assert values(dataset.to_frame()) == OFFSETS
+
+
+def test_appends_extend_only_the_partitions_receiving_rows():
+    dataset = TimePartitionedDataset.from_frame(rows(0, 60), ts_column_name=TS)
+    untouched = dataset.partitions[to_epoch_hour(DAY) + 1]
+    dataset.append(rows(30, 120))
+
+    assert dataset.partitions[to_epoch_hour(DAY) + 1] is untouched
+    assert values(dataset.partitions[to_epoch_hour(DAY)]) == [0, 30]
+    assert values(dataset.to_frame()) == [0, 30, 60, 120]
+
+
+@pytest.mark.parametrize("partition_hours", [1, 24])
+def test_time_slices_hold_only_the_exact_timestamp(partition_hours):
+    dataset = TimePartitionedDataset.from_frame(rows(*OFFSETS), ts_column_name=TS, partition_hours=partition_hours)
+
+    assert values(dataset.get_time_slice(DAY)) == [0, 0]
+    assert values(dataset.get_time_slice(DAY + datetime.timedelta(minutes=30))) == [30]
+    # Naive datetimes are UTC
+    assert values(dataset.get_time_slice(datetime.datetime(2023, 6, 1, 23))) == [23 * 60]
+    assert dataset.get_time_slice(DAY + datetime.timedelta(hours=5)).empty
+    assert dataset.get_time_slice(DAY - datetime.timedelta(days=1)).empty
+
+
+def test_whole_hour_slices_of_aligned_hourly_partitions_are_the_stored_frames():
+    dataset = TimePartitionedDataset.from_frame(rows(0, 60, 60), ts_column_name=TS)
+    dataset.append(rows(30))
+
+    assert dataset.get_time_slice(DAY + datetime.timedelta(hours=1)) is dataset.partitions[to_epoch_hour(DAY) + 1]
+    assert values(dataset.get_time_slice(DAY)) == [0]
+
+
+@pytest.mark.parametrize("partition_hours", [1, 24])
+@pytest.mark.parametrize(
+    "start_minutes, end_minutes",
+    [(0, 24 * 60), (30, 120), (15, 25 * 60 + 31), (60, 61), (-600, 0), (26 * 60, 48 * 60)],
+)
+def test_time_ranges_match_a_filter_of_the_whole_frame(partition_hours, start_minutes, end_minutes):
+    frame = rows(*OFFSETS)
+    dataset = TimePartitionedDataset.from_frame(frame, ts_column_name=TS, partition_hours=partition_hours)
+    start, end = DAY + datetime.timedelta(minutes=start_minutes), DAY + datetime.timedelta(minutes=end_minutes)
+
+    expected = [x for x in OFFSETS if start_minutes <= x < end_minutes]
+    assert values(dataset.get_time_range(start_datetime=start, end_datetime=end)) == expected
+
+
+@pytest.mark.parametrize("partition_hours, kept", [(1, [120, 23 * 60]), (24, [0, 0, 30, 60, 120, 23 * 60])])
+def test_eviction_drops_the_partitions_outside_the_retained_period(partition_hours, kept):
+    dataset = TimePartitionedDataset.from_frame(rows(*OFFSETS), ts_column_name=TS, partition_hours=partition_hours)
+    dataset.evict(
+        start_datetime=DAY + datetime.timedelta(hours=2), end_datetime=DAY + datetime.timedelta(hours=23, minutes=30)
+    )
+    # Partitions overlapping the retained period are kept whole
+    assert values(dataset.to_frame()) == kept
+
+
+def test_never_initialized_is_not_the_same_as_empty():
+    dataset = TimePartitionedDataset(ts_column_name=TS)
+    assert dataset.is_none and dataset.empty
+    assert dataset.to_frame() is None
+
+    dataset.append(pd.DataFrame(columns=[TS, "Resource", "Value"]).set_index([TS, "Resource"]))
+    assert not dataset.is_none and dataset.empty
+    assert dataset.to_frame().empty
+    assert list(dataset.get_time_slice(DAY).columns) == ["Value"]
+
+
+def test_only_hourly_or_daily_partitions():
+    with pytest.raises(ValueError, match="hourly or daily"):
+        TimePartitionedDataset(ts_column_name=TS, partition_hours=6)
@@ -0,0 +1,237 @@
+import json
+import math
+import os
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from prometheus_processing import tsdb_block_writer
+from prometheus_processing.tsdb_block_writer import TSDBBlockWriter, crc32c, encode_xor_chunk
+
+# Readers below follow the Prometheus tsdb/chunkenc & tsdb/index Go readers, independently of the writer code.
+
+
+def read_uvarint(data: bytes, pos: int):
+    out = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        out |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return out, pos
+        shift += 7
+
+
+def read_varint(data: bytes, pos: int):
+    value, pos = read_uvarint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+class BitReader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def read_bits(self, nbits: int) -> int:
+        out = 0
+        for _ in range(nbits):
+            out = (out << 1) | ((self.data[self.pos >> 3] >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return out
+
+    def read_varint(self, signed: bool) -> int:
+        data = bytearray([self.read_bits(8)])
+        while data[-1] >= 0x80:
+            data.append(self.read_bits(8))
+        return (read_varint if signed else read_uvarint)(bytes(data), 0)[0]
+
+
+def decode_xor_chunk(data: bytes):
+    num_samples = struct.unpack(">H", data[:2])[0]
+    stream = BitReader(data[2:])
+    out = []
+    ts = ts_delta = value_bits = leading = trailing = 0
+    for sample_idx in range(num_samples):
+        if sample_idx == 0:
+            ts, value_bits = stream.read_varint(signed=True), stream.read_bits(64)
+            out.append((ts, struct.unpack(">d", struct.pack(">Q", value_bits))[0]))
+            continue
+        if sample_idx == 1:
+            ts_delta = stream.read_varint(signed=False)
+        else:
+            prefix = 0
+            for _ in range(4):
+                prefix <<= 1
+                if stream.read_bits(1) == 0:
+                    break
+                prefix |= 1
+            nbits = {0b0: 0, 0b10: 14, 0b110: 17, 0b1110: 20, 0b1111: 64}[prefix]
+            delta_of_delta = stream.read_bits(nbits)
+            if nbits and delta_of_delta > (1 << (nbits - 1)):
+                delta_of_delta -= 1 << nbits
+            ts_delta += delta_of_delta
+        ts += ts_delta
+        if stream.read_bits(1):
+            if stream.read_bits(1):
+                leading, significant_bits = stream.read_bits(5), stream.read_bits(6) or 64
+                trailing = 64 - leading - significant_bits
+            value_bits ^= stream.read_bits(64 - leading - trailing) << trailing
+        out.append((ts, struct.unpack(">d", struct.pack(">Q", value_bits))[0]))
+    return out
+
+
+def read_section(index: bytes, offset: int) -> bytes:
+    length = struct.unpack(">I", index[offset : offset + 4])[0]
+    content = index[offset + 4 : offset + 4 + length]
+    assert struct.unpack(">I", index[offset + 4 + length : offset + 8 + length])[0] == crc32c(content)
+    return content
+
+
+def read_block(block_dir: str):
+    """Series of the block as label set --> samples, read through the TOC, the postings & the chunk references."""
+    with open(os.path.join(block_dir, "index"), "rb") as index_file:
+        index = index_file.read()
+    assert index[:5] == bytes.fromhex("baaad700") + b"\x02"
+    toc = index[-52:]
+    assert struct.unpack(">I", toc[48:])[0] == crc32c(toc[:48])
+    symbols_offset, series_offset, _, _, _, postings_offset_table_offset = struct.unpack(">6Q", toc[:48])
+    assert symbols_offset == 5
+    assert series_offset % 16 == 0
+
+    content = read_section(index, symbols_offset)
+    symbols, pos = [], 4
+    for _ in range(struct.unpack(">I", content[:4])[0]):
+        length, pos = read_uvarint(content, pos)
+        symbols.append(content[pos : pos + length].decode("utf-8"))
+        pos += length
+
+    content = read_section(index, postings_offset_table_offset)
+    postings_offsets, pos = {}, 4
+    for _ in range(struct.unpack(">I", content[:4])[0]):
+        _, pos = read_uvarint(content, pos)
+        name_len, pos = read_uvarint(content, pos)
+        name, pos = content[pos : pos + name_len].decode("utf-8"), pos + name_len
+        value_len, pos = read_uvarint(content, pos)
+        value, pos = content[pos : pos + value_len].decode("utf-8"), pos + value_len
+        postings_offsets[(name, value)], pos = read_uvarint(content, pos)
+    assert next(iter(postings_offsets)) == ("", "")
+
+    content = read_section(index, postings_offsets[("", "")])
+    series_refs = struct.unpack(f">{struct.unpack('>I', content[:4])[0]}I", content[4:])
+    assert series_refs[0] * 16 == series_offset
+
+    out = {}
+    for series_ref in series_refs:
+        length, pos = read_uvarint(index, series_ref * 16)
+        content = index[pos : pos + length]
+        assert struct.unpack(">I", index[pos + length : pos + length + 4])[0] == crc32c(content)
+        num_labels, pos = read_uvarint(content, 0)
+        labels = []
+        for _ in range(num_labels):
+            name_ref, pos = read_uvarint(content, pos)
+            value_ref, pos = read_uvarint(content, pos)
+            labels.append((symbols[name_ref], symbols[value_ref]))
+        num_chunks, pos = read_uvarint(content, pos)
+        samples, max_time, chunk_ref = [], None, None
+        for chunk_idx in range(num_chunks):
+            if chunk_idx == 0:
+                min_time, pos = read_varint(content, pos)
+                delta, pos = read_uvarint(content, pos)
+                chunk_ref, pos = read_uvarint(content, pos)
+            else:
+                delta, pos = read_uvarint(content, pos)
+                min_time = max_time + delta
+                delta, pos = read_uvarint(content, pos)
+                ref_delta, pos = read_varint(content, pos)
+                chunk_ref += ref_delta
+            max_time = min_time + delta
+            with open(os.path.join(block_dir, "chunks", f"{(chunk_ref >> 32) + 1:06d}"), "rb") as segment_file:
+                segment = segment_file.read()
+            assert segment[:8] == bytes.fromhex("85bd40dd") + b"\x01\x00\x00\x00"
+            length, chunk_pos = read_uvarint(segment, chunk_ref & 0xFFFFFFFF)
+            chunk = segment[chunk_pos : chunk_pos + 1 + length]
+            assert chunk[0] == 1
+            assert struct.unpack(">I", segment[chunk_pos + 1 + length : chunk_pos + 5 + length])[0] == crc32c(chunk)
+            chunk_samples = decode_xor_chunk(chunk[1:])
+            assert (chunk_samples[0][0], chunk_samples[-1][0]) == (min_time, max_time)
+            samples.extend(chunk_samples)
+        out[tuple(labels)] = samples
+    return out
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        # RFC 3720 B.4 test vectors & the common check value
+        (b"", 0x00000000),
+        (b"123456789", 0xE3069283),
+        (bytes(32), 0x8A9136AA),
+        (b"\xff" * 32, 0x62A8AB43),
+        (bytes(range(32)), 0x46DD794E),
+        (bytes(range(31, -1, -1)), 0x113FDB5C),
+    ],
+)
+def test_crc32c_known_vectors(monkeypatch, data, expected):
+    monkeypatch.setattr(tsdb_block_writer, "_native_crc32c", None)
+    assert crc32c(data) == expected
+
+
+def test_xor_chunk_golden_bytes():
+    # count | zig-zag varint of 1000 | bits of 1.0
+    assert encode_xor_chunk([(1000, 1.0)]) == bytes.fromhex("0001" + "d00f" + "3ff0000000000000")
+    # ... | uvarint of the 1000 ms delta | a single 0 bit for the unchanged value, padded
+    assert encode_xor_chunk([(1000, 1.0), (2000, 1.0)]) == bytes.fromhex(
+        "0002" + "d00f" + "3ff0000000000000" + "e807" + "00"
+    )
+
+
+def test_xor_chunk_decodes_every_delta_of_delta_width():
+    # One delta of delta per width: 0, 14, 17, 20 & 64 bits, both signs
+    timestamps, ts_delta = [-5000, 0], 5000
+    for delta_of_delta in [0, 8000, -8191, 60_000, -500_000, 10_000_000, -10_000_000, 0]:
+        ts_delta += delta_of_delta
+        timestamps.append(timestamps[-1] + ts_delta)
+    values = [0.0, 1.5, 1.5, -2.25, 1e300, 5e-324, math.inf, 3.0, 3.0, -0.0]
+    samples = list(zip(timestamps, values))
+    assert decode_xor_chunk(encode_xor_chunk(samples)) == samples
+
+
+def test_block_round_trips_through_the_index(tmp_path):
+    writer = TSDBBlockWriter()
+    hour_ms = 3_600_000
+    start_ms = 1_685_577_600_000
+    for hour_idx in range(130):
+        ts_in_ms = start_ms + hour_idx * hour_ms
+        writer.add_sample("chargeback_cost", {"principal": "sa-1", "env": "env-1"}, ts_in_ms, hour_idx)
+    writer.add_sample("chargeback_cost", {"principal": "sa-2", "env": "env-1"}, start_ms, 0.25)
+    writer.add_sample("chargeback_cost", {"principal": "sa-2", "env": "env-1"}, start_ms, 0.5)
+
+    block_dir = writer.write(output_dir=str(tmp_path), block_seed="test")
+
+    with open(os.path.join(block_dir, "meta.json")) as meta_file:
+        meta = json.load(meta_file)
+    assert meta["ulid"] == os.path.basename(block_dir)
+    assert (meta["minTime"], meta["maxTime"]) == (start_ms, start_ms + 129 * hour_ms + 1)
+    assert meta["stats"] == {"numSamples": 131, "numSeries": 2, "numChunks": 3}
+    assert read_block(block_dir) == {
+        (("__name__", "chargeback_cost"), ("env", "env-1"), ("principal", "sa-1")): [
+            (start_ms + x * hour_ms, float(x)) for x in range(130)
+        ],
+        (("__name__", "chargeback_cost"), ("env", "env-1"), ("principal", "sa-2")): [(start_ms, 0.5)],
+    }
+
+
+@pytest.mark.skipif(shutil.which("promtool") is None, reason="promtool is not installed")
+def test_block_is_readable_by_promtool(tmp_path):
+    writer = TSDBBlockWriter()
+    for hour_idx in range(3):
+        writer.add_sample("chargeback_cost", {"principal": "sa-1"}, 1_685_577_600_000 + hour_idx * 3_600_000, 1.0)
+    block_dir = writer.write(output_dir=str(tmp_path), block_seed="test")
+
+    result = subprocess.run(
+        ["promtool", "tsdb", "analyze", str(tmp_path), os.path.basename(block_dir)], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Total Series: 1" in result.stdout
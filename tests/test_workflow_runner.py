@@ -0,0 +1,87 @@
+import datetime
+import os
+import subprocess
+import sys
+from argparse import Namespace
+
+import pytest
+import yaml
+
+import workflow_runner
+
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture
+def backfill_runs(tmp_path, monkeypatch):
+    """Run execute_backfill with a config file & record the org list it builds instead of calling the APIs."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        yaml.safe_dump({"config": {"system": {"output_dir_name": str(tmp_path / "output")}, "org_details": []}})
+    )
+    calls = []
+
+    class RecordingOrgList:
+        def __init__(self, in_orgs, in_days_in_memory, in_headless):
+            calls.append({"in_headless": in_headless})
+
+        def run_backfill(self, **kwargs):
+            calls[-1].update(kwargs)
+
+    monkeypatch.setattr(workflow_runner, "CCloudOrgList", RecordingOrgList)
+    monkeypatch.setattr(workflow_runner, "set_dataframe_backend", lambda backend: None)
+
+    def run(**args):
+        arg_flags = Namespace(
+            config_file=str(config_file),
+            **{"backfill_end": None, "backfill_output_dir": None, "backfill_format": "openmetrics", **args},
+        )
+        workflow_runner.execute_backfill(arg_flags)
+        return calls[-1]
+
+    return run
+
+
+def test_backfill_dates_are_utc_days(backfill_runs, tmp_path):
+    call = backfill_runs(
+        backfill_start="2023-06-01", backfill_end="2023-06-03", backfill_output_dir=str(tmp_path), backfill_format="csv"
+    )
+
+    assert call == {
+        "in_headless": True,
+        "start_date": datetime.datetime(2023, 6, 1, tzinfo=UTC),
+        "end_date": datetime.datetime(2023, 6, 3, tzinfo=UTC),
+        "output_dir": str(tmp_path),
+        "output_format": "csv",
+    }
+
+
+def test_backfill_defaults_to_the_last_finalized_day(backfill_runs, tmp_path):
+    call = backfill_runs(backfill_start="2023-06-01")
+
+    today = datetime.datetime.now(tz=UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    assert call["end_date"] == today - datetime.timedelta(days=2)
+    assert call["output_dir"] == os.path.join(str(tmp_path / "output"), "backfill")
+    assert call["output_format"] == "openmetrics"
+
+
+@pytest.mark.parametrize(
+    "args", [{"backfill_start": "06/01/2023"}, {"backfill_start": "2023-06-01", "backfill_end": "2023-06-03T00:00"}]
+)
+def test_backfill_rejects_other_date_formats(backfill_runs, args):
+    with pytest.raises(ValueError):
+        backfill_runs(**args)
+
+
+def test_backfill_format_is_one_of_the_sinks():
+    # main.py parses the arguments on import, so the parser is checked through the command line
+    result = subprocess.run(
+        [sys.executable, "main.py", "--backfill-start", "2023-06-01", "--backfill-format", "parquet"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 2
+    assert "--backfill-format: invalid choice: 'parquet'" in result.stderr
@@ -1,22 +1,25 @@
+import datetime
 import logging
-import threading
+import os
 from argparse import Namespace
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from time import sleep
 from typing import Dict, List
 
-import prometheus_client
 import yaml
 
 import internal_data_probe
 from ccloud.org import CCloudOrgList
+from data_processing.data_handlers.dataframe_backend import set_dataframe_backend
 from helpers import (
     env_parse_replace,
     logged_method,
     set_breadcrumb_flag,
     set_logger_level,
 )
+from http_server import AsyncHTTPServer
+from prometheus_processing.exposition_cache import ExpositionCache, add_exposition_routes
 
 LOGGER = logging.getLogger(__name__)
 
@@ -26,6 +29,7 @@ class AppProps:
     days_in_memory: int = field(default=30)
     relative_output_dir: str = field(default="output")
     loglevel: str = field(default="INFO")
+    dataframe_backend: str = field(default="pandas")
 
 
 @logged_method
@@ -67,7 +71,9 @@ def get_app_props(in_config: Dict):
             days_in_memory=config.get("days_in_memory", 7),
             relative_output_dir=config.get("output_dir_name", "output"),
             loglevel=loglevel,
+            dataframe_backend=config.get("dataframe_backend", "pandas"),
         )
+        set_dataframe_backend(APP_PROPS.dataframe_backend)
 
 
 class WorkflowStage(Enum):
@@ -131,26 +137,33 @@ def execute_workflow(arg_flags: Namespace):
         for item in threads_list:
             item.start()
 
-        LOGGER.debug("Starting Prometheus Server")
-        prometheus_client.start_http_server(8000)
-
-        LOGGER.debug("Starting Internal API Server for state sharing and readiness")
-        threading.Thread(
-            target=internal_data_probe.internal_api.run,
-            kwargs={"host": "0.0.0.0", "port": 8001},
-        ).start()
+        LOGGER.debug("Starting the HTTP Server for the Prometheus exposition and the internal API")
+        org_caches: Dict[str, ExpositionCache] = {}
+        add_exposition_routes(router=internal_data_probe.internal_api, org_caches=org_caches)
+        # Both ports serve every route. 8001 stays open for the readiness probe URLs of the existing deployments.
+        AsyncHTTPServer(router=internal_data_probe.internal_api, ports=[8000, 8001]).start()
 
         # This step will initialize the CCloudOrg structure along with all the internal Objects in it.
         # Those will include the first run for all the data gather step as well.
         # There are some safeguards already implemented to prevent request choking, it should be safe in most use cases.
         LOGGER.info("Initializing Core CCloudOrgList Object")
-        CCloudOrgList(
+        ccloud_orgs = CCloudOrgList(
             in_orgs=core_config["config"]["org_details"],
             in_days_in_memory=APP_PROPS.days_in_memory,
         )
 
         LOGGER.info("Initialization Complete.")
-        internal_data_probe.set_readiness(readiness_flag=True)
+        # Every org is served & stepped on its own, and its buffers drive its readiness under /is_ready/<org_id>.
+        # The root org is also served on / & /metrics and drives the process wide readiness.
+        for org_id, ccloud_org in ccloud_orgs.orgs.items():
+            org_caches[org_id] = ExpositionCache(
+                registry=ccloud_org.prom_collectors.registry,
+                scope=ccloud_org.prom_collectors,
+                publish_readiness=ccloud_org.is_root_org,
+                org_id=org_id,
+            )
+        for org_cache in org_caches.values():
+            org_cache.start_producer()
 
         # This is the main loop for the application.
         LOGGER.info("Starting Main Loop")
@@ -165,3 +178,32 @@ def execute_workflow(arg_flags: Namespace):
         LOGGER.info("Waiting for State Sync ticker for Final sync before exit")
         for item in threads_list:
             item.join()
+
+
+@logged_method
+def execute_backfill(arg_flags: Namespace):
+    """Headless backfill: compute the chargeback for the date range of every org straight from the APIs and write
+    it per day as OpenMetrics files, TSDB blocks or CSV files, or push it with remote_write. Neither the Prometheus
+    exposition nor the internal API are started."""
+    LOGGER.info("Starting Headless Backfill")
+    core_config = try_parse_config_file(config_yaml_path=arg_flags.config_file)
+    get_app_props(core_config["config"])
+    start_date = datetime.datetime.strptime(arg_flags.backfill_start, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    if arg_flags.backfill_end is not None:
+        end_date = datetime.datetime.strptime(arg_flags.backfill_end, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    else:
+        end_date = datetime.datetime.utcnow().replace(
+            hour=0, minute=0, second=0, microsecond=0, tzinfo=datetime.timezone.utc
+        ) - datetime.timedelta(days=2)
+    output_dir = arg_flags.backfill_output_dir or os.path.join(APP_PROPS.relative_output_dir, "backfill")
+    LOGGER.info(
+        f"Backfilling Chargeback between {start_date} and {end_date} into {output_dir} as {arg_flags.backfill_format}"
+    )
+    CCloudOrgList(
+        in_orgs=core_config["config"]["org_details"],
+        in_days_in_memory=APP_PROPS.days_in_memory,
+        in_headless=True,
+    ).run_backfill(
+        start_date=start_date, end_date=end_date, output_dir=output_dir, output_format=arg_flags.backfill_format
+    )
+    LOGGER.info("Headless Backfill Complete.")